@@ -0,0 +1,100 @@
+"""add beneficiary_summary and municipality_summary tables
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'beneficiary_summary',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('level', sa.String(10), nullable=False),  # national, region, state
+        sa.Column('code', sa.String(7), nullable=False),  # BR, NE, SP
+        sa.Column('program_id', sa.Integer(), sa.ForeignKey('programs.id'), nullable=False),
+        sa.Column('reference_date', sa.Date(), nullable=False),
+        sa.Column('total_beneficiaries', sa.BigInteger(), nullable=True),
+        sa.Column('total_families', sa.BigInteger(), nullable=True),
+        sa.Column('total_value_brl', sa.Numeric(18, 2), nullable=True),
+        sa.Column('coverage_sum', sa.Numeric(14, 4), nullable=True),
+        sa.Column('coverage_count', sa.Integer(), nullable=True),
+        sa.Column('municipality_count', sa.Integer(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('level', 'code', 'program_id', 'reference_date', name='uq_beneficiary_summary_key'),
+    )
+    op.create_index(
+        'ix_beneficiary_summary_level_date', 'beneficiary_summary', ['level', 'reference_date'], unique=False
+    )
+
+    op.create_table(
+        'municipality_summary',
+        sa.Column('municipality_id', sa.Integer(), sa.ForeignKey('municipalities.id'), nullable=False),
+        sa.Column('program_id', sa.Integer(), sa.ForeignKey('programs.id'), nullable=False),
+        sa.Column('total_beneficiaries', sa.BigInteger(), nullable=True),
+        sa.Column('total_families', sa.BigInteger(), nullable=True),
+        sa.Column('total_value_brl', sa.Numeric(18, 2), nullable=True),
+        sa.Column('coverage_sum', sa.Numeric(14, 4), nullable=True),
+        sa.Column('coverage_count', sa.Integer(), nullable=True),
+        sa.Column('months', sa.Integer(), nullable=True),
+        sa.Column('last_reference_date', sa.Date(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('municipality_id', 'program_id'),
+    )
+
+    # Initial fill from the existing history
+    op.execute("""
+        INSERT INTO beneficiary_summary (
+            level, code, program_id, reference_date, total_beneficiaries, total_families,
+            total_value_brl, coverage_sum, coverage_count, municipality_count, refreshed_at
+        )
+        SELECT 'national', 'BR', bd.program_id, bd.reference_date,
+               SUM(bd.total_beneficiaries), SUM(bd.total_families), SUM(bd.total_value_brl),
+               SUM(bd.coverage_rate), COUNT(bd.coverage_rate), COUNT(DISTINCT bd.municipality_id), now()
+        FROM beneficiary_data bd
+        GROUP BY bd.program_id, bd.reference_date
+        UNION ALL
+        SELECT 'region', s.region, bd.program_id, bd.reference_date,
+               SUM(bd.total_beneficiaries), SUM(bd.total_families), SUM(bd.total_value_brl),
+               SUM(bd.coverage_rate), COUNT(bd.coverage_rate), COUNT(DISTINCT bd.municipality_id), now()
+        FROM beneficiary_data bd
+        JOIN municipalities m ON m.id = bd.municipality_id
+        JOIN states s ON s.id = m.state_id
+        GROUP BY s.region, bd.program_id, bd.reference_date
+        UNION ALL
+        SELECT 'state', s.abbreviation, bd.program_id, bd.reference_date,
+               SUM(bd.total_beneficiaries), SUM(bd.total_families), SUM(bd.total_value_brl),
+               SUM(bd.coverage_rate), COUNT(bd.coverage_rate), COUNT(DISTINCT bd.municipality_id), now()
+        FROM beneficiary_data bd
+        JOIN municipalities m ON m.id = bd.municipality_id
+        JOIN states s ON s.id = m.state_id
+        GROUP BY s.abbreviation, bd.program_id, bd.reference_date
+    """)
+    op.execute("""
+        INSERT INTO municipality_summary (
+            municipality_id, program_id, total_beneficiaries, total_families, total_value_brl,
+            coverage_sum, coverage_count, months, last_reference_date, refreshed_at
+        )
+        SELECT bd.municipality_id, bd.program_id,
+               SUM(bd.total_beneficiaries), SUM(bd.total_families), SUM(bd.total_value_brl),
+               SUM(bd.coverage_rate), COUNT(bd.coverage_rate),
+               COUNT(DISTINCT bd.reference_date), MAX(bd.reference_date), now()
+        FROM beneficiary_data bd
+        GROUP BY bd.municipality_id, bd.program_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('municipality_summary')
+    op.drop_index('ix_beneficiary_summary_level_date', table_name='beneficiary_summary')
+    op.drop_table('beneficiary_summary')
@@ -0,0 +1,35 @@
+"""unique key on beneficiary_data (municipality, program, month)
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep only the latest row of any duplicated key before adding the constraint
+    op.execute("""
+        DELETE FROM beneficiary_data bd
+        USING beneficiary_data newer
+        WHERE bd.municipality_id = newer.municipality_id
+          AND bd.program_id = newer.program_id
+          AND bd.reference_date = newer.reference_date
+          AND bd.id < newer.id
+    """)
+    op.create_unique_constraint(
+        'uq_beneficiary_data_key',
+        'beneficiary_data',
+        ['municipality_id', 'program_id', 'reference_date'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_beneficiary_data_key', 'beneficiary_data', type_='unique')
@@ -0,0 +1,30 @@
+"""indexes for the set-based coverage recompute
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nearest CadÚnico month per municipality (LATERAL join)
+    op.create_index(
+        'ix_cadunico_data_municipality_date', 'cadunico_data', ['municipality_id', 'reference_date']
+    )
+    # Incremental mode: rows loaded since the last run
+    op.create_index('ix_beneficiary_data_ingested_at', 'beneficiary_data', ['ingested_at'])
+    op.create_index('ix_cadunico_data_ingested_at', 'cadunico_data', ['ingested_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cadunico_data_ingested_at', table_name='cadunico_data')
+    op.drop_index('ix_beneficiary_data_ingested_at', table_name='beneficiary_data')
+    op.drop_index('ix_cadunico_data_municipality_date', table_name='cadunico_data')
@@ -0,0 +1,34 @@
+"""add scrape_checkpoints table for resumable scrapers
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scrape_checkpoints',
+        sa.Column('job', sa.String(50), nullable=False),
+        sa.Column('run_key', sa.String(20), nullable=False),  # e.g. reference month 2024-10-01
+        sa.Column('municipality_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(10), nullable=False),  # done, empty, failed
+        sa.Column('method', sa.String(10), nullable=True),  # http, browser
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('job', 'run_key', 'municipality_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scrape_checkpoints')
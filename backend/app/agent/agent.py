@@ -6,7 +6,11 @@ Pode ser executado via CLI do ADK ou integrado ao FastAPI.
 
 import os
 import uuid
+import asyncio
+import inspect
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Optional
 
 import google.generativeai as genai
@@ -14,7 +18,7 @@ from google.generativeai.types import FunctionDeclaration, Tool
 
 from app.agent.prompts import SYSTEM_PROMPT, WELCOME_MESSAGE, ERROR_MESSAGE
 from app.agent.tools.validar_cpf import validar_cpf
-from app.agent.tools.buscar_cep import buscar_cep_sync
+from app.agent.tools.buscar_cep import buscar_cep, buscar_cep_sync
 from app.agent.tools.consultar_api import consultar_beneficios
 from app.agent.tools.checklist import gerar_checklist, listar_beneficios
 from app.agent.tools.buscar_cras import buscar_cras_sync
@@ -137,10 +141,16 @@ try:
     from app.config import settings
     GOOGLE_API_KEY = settings.GOOGLE_API_KEY or os.getenv("GOOGLE_API_KEY", "")
     AGENT_MODEL = settings.AGENT_MODEL
+    AGENT_MODEL_TIMEOUT = settings.AGENT_MODEL_TIMEOUT
+    AGENT_TOOL_TIMEOUT = settings.AGENT_TOOL_TIMEOUT
+    AGENT_TOOL_MAX_WORKERS = settings.AGENT_TOOL_MAX_WORKERS
 except ImportError:
     # Fallback para execução standalone
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
     AGENT_MODEL = os.getenv("AGENT_MODEL", "gemini-2.0-flash-exp")
+    AGENT_MODEL_TIMEOUT = 60.0
+    AGENT_TOOL_TIMEOUT = 20.0
+    AGENT_TOOL_MAX_WORKERS = 16
 
 if GOOGLE_API_KEY:
     genai.configure(api_key=GOOGLE_API_KEY)
@@ -1883,6 +1893,30 @@ TOOL_FUNCTIONS = {
     "verificar_tarifa_energia": verificar_tarifa_energia,
 }
 
+# Versoes async nativas (usadas pelo loop async no lugar do wrapper sync)
+ASYNC_TOOL_FUNCTIONS = {
+    "buscar_cep": buscar_cep,
+}
+
+# Tools com timeout proprio (segundos); as demais usam AGENT_TOOL_TIMEOUT
+TOOL_TIMEOUTS = {
+    "processar_receita": 45.0,
+}
+
+# Pool limitado para tools sincronas (httpx sync, SessionLocal, etc.)
+_tool_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Retorna o pool de threads compartilhado para tools sincronas."""
+    global _tool_executor
+    if _tool_executor is None:
+        _tool_executor = ThreadPoolExecutor(
+            max_workers=AGENT_TOOL_MAX_WORKERS,
+            thread_name_prefix="agent-tool",
+        )
+    return _tool_executor
+
 
 class TaNaMaoAgent:
     """Agente conversacional Tá na Mão usando Gemini Flash."""
@@ -1891,7 +1925,9 @@ class TaNaMaoAgent:
         self,
         session_id: Optional[str] = None,
         model_name: str = None,
-        api_base_url: str = "http://localhost:8000"
+        api_base_url: str = "http://localhost:8000",
+        history: Optional[list] = None,
+        tools_used: Optional[list] = None,
     ):
         """Inicializa o agente.
 
@@ -1899,6 +1935,8 @@ class TaNaMaoAgent:
             session_id: ID da sessão. Se não fornecido, gera um novo.
             model_name: Nome do modelo Gemini a usar.
             api_base_url: URL base da API Tá na Mão para consultas.
+            history: Histórico do chat (Contents) para retomar uma conversa.
+            tools_used: Tools já usadas na sessão retomada.
         """
         # Usa modelo da config se não especificado
         if model_name is None:
@@ -1906,8 +1944,9 @@ class TaNaMaoAgent:
         self.session_id = session_id or str(uuid.uuid4())
         self.model_name = model_name
         self.api_base_url = api_base_url
-        self.history = []
-        self.tools_used = []
+        self.history = list(history or [])
+        self.tools_used = list(tools_used or [])
+        self._lock = asyncio.Lock()
 
         # Configura o modelo com as tools
         self.tools = Tool(function_declarations=TOOL_DECLARATIONS)
@@ -1920,6 +1959,19 @@ class TaNaMaoAgent:
         # Inicia chat com histórico
         self.chat = self.model.start_chat(history=self.history)
 
+    def _prepare_call(self, function_call) -> tuple:
+        """Extrai nome e argumentos de uma function call do Gemini."""
+        function_name = function_call.name
+        function_args = dict(function_call.args)
+
+        logger.info(f"Executando tool: {function_name} com args: {function_args}")
+
+        # Adiciona api_base_url para consultar_beneficios
+        if function_name == "consultar_beneficios":
+            function_args["api_base_url"] = self.api_base_url
+
+        return function_name, function_args
+
     def _execute_function(self, function_call) -> dict:
         """Executa uma função chamada pelo modelo.
 
@@ -1929,18 +1981,11 @@ class TaNaMaoAgent:
         Returns:
             dict: Resultado da execução da função.
         """
-        function_name = function_call.name
-        function_args = dict(function_call.args)
-
-        logger.info(f"Executando tool: {function_name} com args: {function_args}")
+        function_name, function_args = self._prepare_call(function_call)
 
         if function_name not in TOOL_FUNCTIONS:
             return {"error": f"Função {function_name} não encontrada"}
 
-        # Adiciona api_base_url para consultar_beneficios
-        if function_name == "consultar_beneficios":
-            function_args["api_base_url"] = self.api_base_url
-
         try:
             result = TOOL_FUNCTIONS[function_name](**function_args)
             self.tools_used.append(function_name)
@@ -1949,9 +1994,82 @@ class TaNaMaoAgent:
             logger.error(f"Erro ao executar {function_name}: {e}")
             return {"error": str(e)}
 
+    async def _execute_function_async(self, function_call) -> dict:
+        """Executa uma função sem bloquear o event loop.
+
+        Tools async rodam nativamente; tools sincronas rodam no pool de
+        threads limitado. Ambas respeitam o timeout da tool.
+
+        Args:
+            function_call: Objeto FunctionCall do Gemini.
+
+        Returns:
+            dict: Resultado da execução da função.
+        """
+        function_name, function_args = self._prepare_call(function_call)
+
+        function = ASYNC_TOOL_FUNCTIONS.get(function_name) or TOOL_FUNCTIONS.get(function_name)
+        if function is None:
+            return {"error": f"Função {function_name} não encontrada"}
+
+        timeout = TOOL_TIMEOUTS.get(function_name, AGENT_TOOL_TIMEOUT)
+        try:
+            if inspect.iscoroutinefunction(function):
+                call = function(**function_args)
+            else:
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(
+                    get_tool_executor(), partial(function, **function_args)
+                )
+            result = await asyncio.wait_for(call, timeout=timeout)
+            self.tools_used.append(function_name)
+            return result
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout ({timeout}s) ao executar {function_name}")
+            return {"error": f"Tempo esgotado ao executar {function_name}"}
+        except Exception as e:
+            logger.error(f"Erro ao executar {function_name}: {e}")
+            return {"error": str(e)}
+
+    @staticmethod
+    def _function_calls(response) -> list:
+        """Lista as function calls da resposta do modelo."""
+        return [
+            part.function_call
+            for part in response.candidates[0].content.parts
+            if hasattr(part, 'function_call') and part.function_call.name
+        ]
+
+    @staticmethod
+    def _function_response_parts(function_responses: list) -> list:
+        """Monta as Parts com os resultados das funções para o modelo."""
+        return [
+            genai.protos.Part(
+                function_response=genai.protos.FunctionResponse(
+                    name=fr["name"],
+                    response={"result": fr["response"]}
+                )
+            )
+            for fr in function_responses
+        ]
+
+    @staticmethod
+    def _response_text(response) -> str:
+        """Extrai o texto final da resposta do modelo."""
+        text_parts = [
+            part.text
+            for part in response.candidates[0].content.parts
+            if hasattr(part, 'text') and part.text
+        ]
+
+        return " ".join(text_parts) if text_parts else "Desculpe, não consegui processar sua solicitação."
+
     def process_message(self, user_message: str) -> str:
         """Processa uma mensagem do usuário e retorna a resposta.
 
+        Versão bloqueante, usada pelo modo interativo (CLI). Em handlers
+        async use `process_message_async`.
+
         Args:
             user_message: Mensagem enviada pelo usuário.
 
@@ -1964,12 +2082,7 @@ class TaNaMaoAgent:
 
             # Processa function calls se houver
             while response.candidates[0].content.parts:
-                # Verifica se há function calls
-                function_calls = [
-                    part.function_call
-                    for part in response.candidates[0].content.parts
-                    if hasattr(part, 'function_call') and part.function_call.name
-                ]
+                function_calls = self._function_calls(response)
 
                 if not function_calls:
                     # Não há function calls, retorna o texto
@@ -1986,30 +2099,66 @@ class TaNaMaoAgent:
 
                 # Envia os resultados de volta ao modelo
                 response = self.chat.send_message(
-                    [
-                        genai.protos.Part(
-                            function_response=genai.protos.FunctionResponse(
-                                name=fr["name"],
-                                response={"result": fr["response"]}
-                            )
-                        )
-                        for fr in function_responses
-                    ]
+                    self._function_response_parts(function_responses)
                 )
 
-            # Extrai texto da resposta
-            text_parts = [
-                part.text
-                for part in response.candidates[0].content.parts
-                if hasattr(part, 'text') and part.text
-            ]
-
-            return " ".join(text_parts) if text_parts else "Desculpe, não consegui processar sua solicitação."
+            return self._response_text(response)
 
         except Exception as e:
             logger.error(f"Erro ao processar mensagem: {e}")
             return ERROR_MESSAGE
 
+    async def process_message_async(self, user_message: str) -> str:
+        """Processa uma mensagem sem bloquear o event loop.
+
+        As chamadas ao Gemini usam a API async e as function calls de um
+        mesmo turno do modelo são executadas concorrentemente, cada uma com
+        seu timeout. Mensagens da mesma sessão são processadas em ordem.
+
+        Args:
+            user_message: Mensagem enviada pelo usuário.
+
+        Returns:
+            str: Resposta do agente.
+        """
+        async with self._lock:
+            try:
+                response = await asyncio.wait_for(
+                    self.chat.send_message_async(user_message),
+                    timeout=AGENT_MODEL_TIMEOUT,
+                )
+
+                while response.candidates[0].content.parts:
+                    function_calls = self._function_calls(response)
+
+                    if not function_calls:
+                        break
+
+                    # Chamadas independentes do mesmo turno rodam em paralelo
+                    results = await asyncio.gather(*(
+                        self._execute_function_async(fc) for fc in function_calls
+                    ))
+                    function_responses = [
+                        {"name": fc.name, "response": result}
+                        for fc, result in zip(function_calls, results)
+                    ]
+
+                    response = await asyncio.wait_for(
+                        self.chat.send_message_async(
+                            self._function_response_parts(function_responses)
+                        ),
+                        timeout=AGENT_MODEL_TIMEOUT,
+                    )
+
+                return self._response_text(response)
+
+            except asyncio.TimeoutError:
+                logger.error(f"Timeout ({AGENT_MODEL_TIMEOUT}s) aguardando o modelo")
+                return ERROR_MESSAGE
+            except Exception as e:
+                logger.error(f"Erro ao processar mensagem: {e}")
+                return ERROR_MESSAGE
+
     def get_welcome_message(self) -> str:
         """Retorna a mensagem de boas-vindas."""
         return WELCOME_MESSAGE
@@ -2025,16 +2174,22 @@ class TaNaMaoAgent:
 root_agent = None
 
 
-def create_agent(session_id: Optional[str] = None) -> TaNaMaoAgent:
+def create_agent(
+    session_id: Optional[str] = None,
+    history: Optional[list] = None,
+    tools_used: Optional[list] = None,
+) -> TaNaMaoAgent:
     """Factory function para criar agentes.
 
     Args:
         session_id: ID da sessão (opcional).
+        history: Histórico do chat para retomar a conversa (opcional).
+        tools_used: Tools já usadas na sessão (opcional).
 
     Returns:
         TaNaMaoAgent: Nova instância do agente.
     """
-    return TaNaMaoAgent(session_id=session_id)
+    return TaNaMaoAgent(session_id=session_id, history=history, tools_used=tools_used)
 
 
 # Para compatibilidade com adk run
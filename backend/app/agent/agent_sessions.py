@@ -0,0 +1,250 @@
+"""
+Sessões do agente V1 (``TaNaMaoAgent``) compartilhadas entre workers.
+
+Cada agente guarda um chat Gemini vivo, caro em memória. Aqui o estado que
+importa (histórico do chat e tools usadas) é gravado no Redis a cada
+mensagem, e o processo mantém só um LRU limitado de agentes recentes:
+
+- Agentes ociosos há mais de ``idle_seconds``, ou além de ``max_agents``,
+  saem da memória; o histórico continua no Redis.
+- O chat é reconstruído sob demanda, quando chega uma mensagem da sessão
+  e o agente não está em memória (ou outro worker gravou uma versão mais
+  nova do histórico).
+
+Assim a memória de cada worker fica limitada e qualquer worker atrás do
+load balancer atende qualquer sessão.
+
+A versão de cada gravação vem de um contador no Redis (``INCR`` em
+``<prefixo><sessão>:v``), então dois workers nunca gravam a mesma versão
+e o agente local só é reaproveitado se a versão gravada for a dele.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import google.generativeai as genai
+
+from app.core.cache import adelete_cache, aget_cache, aset_cache, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+
+def history_to_dicts(contents) -> List[dict]:
+    """Converte o histórico do chat (Contents do Gemini) em dicts serializáveis."""
+    return [type(content).to_dict(content) for content in contents]
+
+
+def history_from_dicts(data: List[dict]) -> list:
+    """Reconstrói os Contents do Gemini a partir de ``history_to_dicts``."""
+    return [genai.protos.Content(item) for item in data]
+
+
+def _starts_turn(content: dict) -> bool:
+    """Mensagem de texto do usuário (início válido de histórico)."""
+    return content.get("role") == "user" and any("text" in part for part in content.get("parts", []))
+
+
+def trim_history(history: List[dict], max_messages: int) -> List[dict]:
+    """Mantém as últimas mensagens, começando sempre em uma mensagem do usuário.
+
+    Cortar no meio de uma troca function_call/function_response deixaria um
+    histórico que o Gemini rejeita.
+    """
+    if len(history) <= max_messages:
+        return history
+    trimmed = history[-max_messages:]
+    for i, content in enumerate(trimmed):
+        if _starts_turn(content):
+            return trimmed[i:]
+    return []
+
+
+@dataclass
+class _LocalAgent:
+    agent: object
+    version: int
+    last_used: float
+
+
+class AgentSessionStore:
+    """
+    LRU de agentes em memória na frente do histórico gravado no Redis.
+
+    A cada ``get_or_create`` o contador de versões no Redis é comparado com a
+    versão do agente em memória: igual, o agente local é reaproveitado; diferente
+    (outro worker atendeu a sessão), o chat é reconstruído. Se o Redis não
+    responder, o agente local continua valendo.
+    """
+
+    def __init__(
+        self,
+        factory: Optional[Callable] = None,
+        max_agents: int = 200,
+        idle_seconds: float = 900,
+        ttl_seconds: int = 86400,
+        max_history: int = 40,
+        prefix: str = "tanamao:agent:",
+    ):
+        """
+        Args:
+            factory: Cria o agente ``factory(session_id, history, tools_used)``
+                (padrão: ``create_agent``)
+            max_agents: Agentes mantidos em memória neste processo
+            idle_seconds: Tempo sem uso até o agente sair da memória
+            ttl_seconds: Tempo de vida do histórico no Redis
+            max_history: Mensagens do chat gravadas por sessão
+            prefix: Prefixo das chaves no Redis
+        """
+        if factory is None:
+            from app.agent.agent import create_agent
+            factory = create_agent
+        self.factory = factory
+        self.max_agents = max_agents
+        self.idle_seconds = idle_seconds
+        self.ttl_seconds = ttl_seconds
+        self.max_history = max_history
+        self.prefix = prefix
+        self._agents: "OrderedDict[str, _LocalAgent]" = OrderedDict()
+        self.rebuilds = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._agents
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _version_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:v"
+
+    async def _next_version(self, session_id: str) -> Optional[int]:
+        """Próxima versão da sessão, atômica entre workers (None sem Redis)."""
+        client = get_async_redis()
+        if client is None:
+            return None
+        key = self._version_key(session_id)
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.incr(key)
+                pipe.expire(key, self.ttl_seconds)
+                version, _ = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Falha ao gerar versão da sessão {session_id}: {e}")
+            return None
+        return int(version)
+
+    async def _stored_version(self, session_id: str) -> Optional[int]:
+        """Versão gravada da sessão, lida só do contador (None sem Redis ou sem sessão)."""
+        client = get_async_redis()
+        if client is None:
+            return None
+        try:
+            version = await client.get(self._version_key(session_id))
+        except Exception as e:
+            logger.warning(f"Falha ao ler versão da sessão {session_id}: {e}")
+            return None
+        return int(version) if version is not None else None
+
+    def _touch(self, local: _LocalAgent):
+        local.last_used = time.monotonic()
+        self._agents.move_to_end(local.agent.session_id)
+        return local.agent
+
+    def _remember(self, agent, version: int) -> None:
+        self._agents[agent.session_id] = _LocalAgent(agent, version, time.monotonic())
+        self._agents.move_to_end(agent.session_id)
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove da memória agentes ociosos e o excesso acima de ``max_agents``."""
+        removed = 0
+        limite = time.monotonic() - self.idle_seconds
+        while self._agents:
+            session_id, local = next(iter(self._agents.items()))
+            if local.last_used >= limite and len(self._agents) <= self.max_agents:
+                break
+            del self._agents[session_id]
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    async def get(self, session_id: str):
+        """Agente da sessão (memória ou Redis), ou None se não existir.
+
+        Com agente em memória, só o contador de versões é lido; o histórico
+        é buscado e decodificado apenas quando outro worker gravou depois.
+        """
+        local = self._agents.get(session_id)
+        if local is not None:
+            version = await self._stored_version(session_id)
+            if version is None or version == local.version:
+                return self._touch(local)
+
+        stored = await aget_cache(self._key(session_id))
+        if stored is None:
+            if local is not None:
+                return self._touch(local)
+            return None
+
+        agent = self.factory(
+            session_id,
+            history=history_from_dicts(stored.get("history", [])),
+            tools_used=stored.get("tools_used", []),
+        )
+        self.rebuilds += 1
+        self._remember(agent, stored.get("version", 0))
+        logger.debug(f"Agente {session_id} reconstruído do Redis")
+        return agent
+
+    async def get_or_create(self, session_id: Optional[str] = None):
+        """Agente existente da sessão ou um novo (com o ID informado, se houver)."""
+        if session_id:
+            agent = await self.get(session_id)
+            if agent is not None:
+                return agent
+
+        agent = self.factory(session_id)
+        self._remember(agent, 0)
+        return agent
+
+    async def save(self, agent) -> bool:
+        """Grava o histórico do agente no Redis (nova versão).
+
+        Sem Redis, a versão só avança localmente (nada é gravado).
+        """
+        version = await self._next_version(agent.session_id)
+        if version is None:
+            local = self._agents.get(agent.session_id)
+            version = (local.version if local else 0) + 1
+        payload = {
+            "version": version,
+            "history": trim_history(history_to_dicts(agent.chat.history), self.max_history),
+            "tools_used": agent.tools_used[-50:],
+        }
+        saved = await aset_cache(self._key(agent.session_id), payload, ttl=self.ttl_seconds)
+        self._remember(agent, version)
+        return saved
+
+    async def reset(self, session_id: str) -> bool:
+        """Reinicia a conversa da sessão. False se a sessão não existir."""
+        agent = await self.get(session_id)
+        if agent is None:
+            return False
+        agent.reset()
+        await self.save(agent)
+        return True
+
+    async def delete(self, session_id: str) -> None:
+        """Remove a sessão da memória e do Redis.
+
+        O contador de versões fica (expira pelo TTL): recomeçar do zero
+        poderia repetir a versão de um agente ainda em memória em outro worker.
+        """
+        self._agents.pop(session_id, None)
+        await adelete_cache(self._key(session_id))
@@ -0,0 +1,192 @@
+"""
+Fila de respostas do WhatsApp Chat.
+
+O webhook do Twilio tem timeout curto (~15s) e reenvia a mensagem quando
+nao recebe resposta a tempo. Baixar a imagem, chamar o Gemini e as tools
+dentro da requisicao passa desse limite com carga, e a mesma mensagem
+acaba processada duas vezes.
+
+Com a fila, o webhook so valida, descarta reenvios (``registrar_message_sid``)
+e enfileira; a resposta sai depois pela API do Twilio.
+
+- ``FilaPorSessao`` processa com um numero fixo de workers asyncio.
+- Mensagens da mesma sessao (mesmo telefone) sao processadas uma de cada
+  vez, na ordem de chegada; sessoes diferentes andam em paralelo.
+- A fila tem limite de mensagens pendentes; cheia, ``enfileirar`` recusa.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.middleware.metrics import (
+    whatsapp_messages_total,
+    whatsapp_queue_depth,
+    whatsapp_reply_latency_seconds,
+)
+
+logger = logging.getLogger(__name__)
+
+# Reenvios do Twilio chegam em minutos; 1 dia cobre com folga
+_SID_TTL = 86400
+_SID_PREFIXO = "tanamao:whatsapp:sid:"
+
+# Sem Redis: ultimos SIDs vistos neste worker
+_SIDS_LOCAIS_MAX = 10_000
+_sids_locais: "OrderedDict[str, None]" = OrderedDict()
+
+
+@dataclass
+class MensagemWhatsApp:
+    """Mensagem recebida pelo webhook, como o Twilio enviou."""
+
+    message_sid: str
+    session_id: str
+    telefone: str
+    body: Optional[str] = None
+    num_media: int = 0
+    media_url: Optional[str] = None
+    media_content_type: Optional[str] = None
+    latitude: Optional[str] = None
+    longitude: Optional[str] = None
+    recebida_em: float = field(default_factory=time.monotonic)
+
+
+async def registrar_message_sid(message_sid: Optional[str]) -> bool:
+    """Marca o ``MessageSid`` como visto.
+
+    Returns:
+        True na primeira vez; False se for reenvio do Twilio.
+        Sem SID, sempre True.
+    """
+    if not message_sid:
+        return True
+
+    from app.core.cache import get_async_redis
+
+    client = get_async_redis()
+    if client is not None:
+        try:
+            return bool(await client.set(f"{_SID_PREFIXO}{message_sid}", b"1", nx=True, ex=_SID_TTL))
+        except Exception as e:
+            logger.warning(f"Redis indisponivel para dedupe do WhatsApp: {e}")
+
+    if message_sid in _sids_locais:
+        return False
+    _sids_locais[message_sid] = None
+    if len(_sids_locais) > _SIDS_LOCAIS_MAX:
+        _sids_locais.popitem(last=False)
+    return True
+
+
+class FilaPorSessao:
+    """
+    Workers asyncio com ordem garantida por sessao.
+
+    Cada sessao tem sua fila (``deque``); a fila ``_prontas`` tem as
+    sessoes com mensagem esperando e sem worker. Um worker pega uma
+    sessao, processa uma mensagem e, se chegaram outras, devolve a sessao
+    para o fim de ``_prontas`` (sessoes ativas nao monopolizam workers).
+    """
+
+    def __init__(
+        self,
+        processar: Callable[[MensagemWhatsApp], Awaitable[None]],
+        workers: int = 8,
+        max_pendentes: int = 1000,
+    ):
+        """
+        Args:
+            processar: Corrotina que responde uma mensagem
+            workers: Mensagens processadas em paralelo
+            max_pendentes: Limite de mensagens esperando
+        """
+        self.processar = processar
+        self.workers = workers
+        self.max_pendentes = max_pendentes
+        self._por_sessao: Dict[str, Deque[MensagemWhatsApp]] = {}
+        self._prontas: Optional[asyncio.Queue] = None
+        self._tarefas: List[asyncio.Task] = []
+        self.pendentes = 0
+
+    def iniciar(self) -> None:
+        """Cria os workers no event loop atual (idempotente)."""
+        if self._tarefas:
+            return
+        self._prontas = asyncio.Queue()
+        self._tarefas = [
+            asyncio.create_task(self._worker(), name=f"whatsapp-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Fila do WhatsApp iniciada com {self.workers} workers")
+
+    def enfileirar(self, mensagem: MensagemWhatsApp) -> bool:
+        """Coloca a mensagem na fila da sessao.
+
+        Returns:
+            False se a fila estiver cheia
+        """
+        if self.pendentes >= self.max_pendentes:
+            return False
+        self.iniciar()
+
+        fila = self._por_sessao.get(mensagem.session_id)
+        if fila is None:
+            fila = self._por_sessao[mensagem.session_id] = deque()
+            self._prontas.put_nowait(mensagem.session_id)
+        fila.append(mensagem)
+
+        self.pendentes += 1
+        whatsapp_queue_depth.set(self.pendentes)
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            session_id = await self._prontas.get()
+            fila = self._por_sessao[session_id]
+            mensagem = fila.popleft()
+            try:
+                await self.processar(mensagem)
+                whatsapp_reply_latency_seconds.observe(time.monotonic() - mensagem.recebida_em)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                whatsapp_messages_total.labels(result="failed").inc()
+                logger.error(f"Erro ao processar mensagem do WhatsApp: {e}", exc_info=True)
+            finally:
+                self.pendentes -= 1
+                whatsapp_queue_depth.set(self.pendentes)
+                if fila:
+                    self._prontas.put_nowait(session_id)
+                else:
+                    del self._por_sessao[session_id]
+
+    async def aguardar_vazia(self, timeout: Optional[float] = None) -> bool:
+        """Espera as mensagens pendentes terminarem.
+
+        Returns:
+            False se o ``timeout`` acabou antes
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self.pendentes:
+            if limite is not None and time.monotonic() >= limite:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    async def parar(self, timeout: float = 10.0) -> None:
+        """Termina as mensagens em andamento (ate ``timeout``) e para os workers."""
+        if not self._tarefas:
+            return
+        if not await self.aguardar_vazia(timeout):
+            logger.warning(f"Fila do WhatsApp parada com {self.pendentes} mensagens pendentes")
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        self._por_sessao.clear()
+        self.pendentes = 0
+        whatsapp_queue_depth.set(0)
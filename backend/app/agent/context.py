@@ -387,6 +387,26 @@ class SessionManager:
 
         return len(expired)
 
+    # Mesma API async do RedisSessionManager (usada pelo orquestrador)
+
+    async def aget_or_create(self, session_id: Optional[str] = None) -> ConversationContext:
+        return self.get_or_create(session_id)
+
+    async def aget(self, session_id: str) -> Optional[ConversationContext]:
+        return self.get(session_id)
+
+    async def asave(self, context: ConversationContext) -> bool:
+        """Guarda o contexto (os objetos já vivem em memória)."""
+        context.last_activity = datetime.now()
+        self._sessions[context.session_id] = context
+        return True
+
+    async def adelete(self, session_id: str) -> bool:
+        return self.delete(session_id)
+
+    async def areset(self, session_id: str) -> bool:
+        return self.reset(session_id)
+
 
 # =============================================================================
 # Factory de Session Manager
@@ -8,19 +8,35 @@ Classifica mensagens do usuário em categorias de fluxo:
 - geral: conversa geral
 
 Usa primeiro keywords simples, fallback para LLM se necessário.
+
+Todas as keywords (categorias, mensagens especiais e, se informadas, as de
+urgência) são buscadas juntas em uma única passada pelo texto sem acento
+(``KeywordMatcher``); os padrões regex rodam no mesmo texto normalizado.
+``analyze`` devolve tudo de uma vez para o orquestrador.
 """
 
 import re
 import logging
-from typing import Optional, List, Tuple
-from dataclasses import dataclass
+from collections import defaultdict
+from typing import Dict, Optional, List, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 
 from .context import FlowType
+from .keyword_matcher import KeywordMatcher, normalizar
 
 logger = logging.getLogger(__name__)
 
 
+def _normalizar_padrao(padrao: str) -> str:
+    """Minúsculas e sem acento no padrão, preservando escapes (``\\D`` != ``\\d``)."""
+    return re.sub(
+        r"\\.|[^\\]+",
+        lambda m: m.group() if m.group().startswith("\\") else normalizar(m.group()),
+        padrao,
+    )
+
+
 class IntentCategory(str, Enum):
     """Categorias de intenção."""
 
@@ -58,6 +74,18 @@ class Intent:
         return self.category.to_flow_type()
 
 
+@dataclass
+class MessageAnalysis:
+    """Tudo que o roteamento precisa saber de uma mensagem (uma passada)."""
+
+    intent: Intent
+    greeting: bool = False
+    thanks: bool = False
+    help: bool = False
+    restart: bool = False
+    urgency: Dict[str, List[str]] = field(default_factory=dict)  # categoria -> keywords
+
+
 class IntentClassifier:
     """
     Classificador de intenção baseado em keywords e padrões.
@@ -199,24 +227,121 @@ class IntentClassifier:
         "pattern": 0.9
     }
 
-    def __init__(self, use_llm_fallback: bool = True):
+    # Saudações: mensagem inteira ou início da mensagem
+    GREETINGS = [
+        "oi", "olá", "ola", "bom dia", "boa tarde", "boa noite",
+        "hey", "e aí", "e ai", "tudo bem", "opa", "fala"
+    ]
+
+    # Mensagens especiais: keyword em qualquer parte da mensagem
+    SPECIAL_KEYWORDS = {
+        "thanks": [
+            "obrigado", "obrigada", "valeu", "vlw", "thanks",
+            "muito obrigado", "muito obrigada", "brigado", "brigada"
+        ],
+        "help": [
+            "ajuda", "help", "o que você faz", "o que voce faz",
+            "como funciona", "me ajuda", "preciso de ajuda"
+        ],
+        "restart": [
+            "voltar ao início", "voltar ao inicio", "começar de novo",
+            "comecar de novo", "recomeçar", "recomecar", "reiniciar",
+            "menu principal", "início", "inicio", "voltar",
+            "menu", "sair", "cancelar tudo", "novo atendimento"
+        ],
+    }
+
+    def __init__(
+        self,
+        use_llm_fallback: bool = True,
+        urgency_keywords: Optional[Dict[str, List[str]]] = None,
+    ):
         """
         Inicializa o classificador.
 
         Args:
             use_llm_fallback: Se deve usar LLM para casos ambíguos
+            urgency_keywords: Keywords de urgência por categoria, buscadas
+                na mesma passada (ver ``rede_protecao.keywords_urgencia``)
         """
         self.use_llm_fallback = use_llm_fallback
         self._compile_patterns()
+        self._compile_keywords(urgency_keywords or {})
 
     def _compile_patterns(self):
-        """Compila padrões regex."""
-        self._compiled_patterns = {}
-        for category, patterns in self.PATTERNS.items():
-            self._compiled_patterns[category] = [
-                re.compile(p, re.IGNORECASE)
-                for p in patterns
-            ]
+        """Compila padrões regex para o texto já normalizado (sem IGNORECASE).
+
+        Cada padrão fica separado: sem IGNORECASE o ``search`` pula direto
+        para o literal inicial, o que sai mais barato que juntar os padrões
+        em uma regex com lookaheads.
+        """
+        self._compiled_patterns = [
+            (category, re.compile(_normalizar_padrao(p)), f"pattern:{p[:30]}")
+            for category, patterns in self.PATTERNS.items()
+            for p in patterns
+        ]
+
+    def _compile_keywords(self, urgency_keywords: Dict[str, List[str]]):
+        """Monta o matcher único e o que cada keyword significa."""
+        self._labels: Dict[str, list] = defaultdict(list)
+        vistos = set()
+        ordem = 0
+        for category, keywords in self.KEYWORDS.items():
+            for keyword_type, keyword_list in keywords.items():
+                weight = self.WEIGHTS.get(keyword_type, 0.5)
+                for keyword in keyword_list:
+                    chave = normalizar(keyword)
+                    # "remédio" e "remedio" contam uma vez so
+                    if (category, keyword_type, chave) in vistos:
+                        continue
+                    vistos.add((category, keyword_type, chave))
+                    self._labels[chave].append(("category", category, weight, ordem))
+                    ordem += 1
+
+        for nome, keyword_list in self.SPECIAL_KEYWORDS.items():
+            for keyword in {normalizar(k) for k in keyword_list}:
+                self._labels[keyword].append(("special", nome))
+
+        for categoria, keyword_list in urgency_keywords.items():
+            for keyword in {normalizar(k) for k in keyword_list}:
+                self._labels[keyword].append(("urgency", categoria))
+
+        self._matcher = KeywordMatcher(self._labels)
+        greetings = sorted({normalizar(g) for g in self.GREETINGS}, key=len, reverse=True)
+        self._greeting = re.compile("(?:" + "|".join(map(re.escape, greetings)) + ")(?: |$)")
+
+    def analyze(self, message: str) -> MessageAnalysis:
+        """
+        Analisa a mensagem em uma passada: intenção, saudação, agradecimento,
+        ajuda, reinício e urgência.
+
+        Args:
+            message: Texto da mensagem do usuário
+        """
+        texto = normalizar(message)
+        encontradas = self._matcher.find(texto)
+
+        por_categoria: Dict[IntentCategory, list] = defaultdict(list)
+        especiais = set()
+        urgency: Dict[str, List[str]] = {}
+        for keyword in encontradas:
+            for label in self._labels[keyword]:
+                if label[0] == "category":
+                    _, category, weight, ordem = label
+                    por_categoria[category].append((ordem, keyword, weight))
+                elif label[0] == "special":
+                    especiais.add(label[1])
+                else:
+                    urgency.setdefault(label[1], []).append(keyword)
+
+        return MessageAnalysis(
+            intent=self._score(texto, por_categoria),
+            greeting=bool(self._greeting.match(texto.strip())),
+            thanks="thanks" in especiais,
+            help="help" in especiais,
+            restart="restart" in especiais,
+            urgency=urgency,
+        )
 
     def classify(self, message: str) -> Intent:
         """
@@ -228,24 +353,35 @@ class IntentClassifier:
         Returns:
             Intent com categoria, confiança e keywords matched
         """
-        message_lower = message.lower()
-        scores: dict[IntentCategory, Tuple[float, List[str]]] = {}
+        return self.analyze(message).intent
 
-        # Pontuar cada categoria
-        for category in [IntentCategory.FARMACIA, IntentCategory.BENEFICIO, IntentCategory.DOCUMENTACAO, IntentCategory.PROTECAO, IntentCategory.TRABALHISTA]:
-            score, matched = self._score_category(message_lower, category)
-            if score > 0:
-                scores[category] = (score, matched)
+    def _score(self, texto: str, por_categoria: Dict[IntentCategory, list]) -> Intent:
+        """Pontua as categorias a partir das keywords encontradas e dos padrões."""
+        scores: dict[IntentCategory, Tuple[float, List[str]]] = {}
+        com_espacos = f" {texto} "
+
+        # Pontuar cada categoria (na ordem de KEYWORDS: desempate)
+        for category in self.KEYWORDS:
+            if category not in por_categoria:
+                continue
+            score = 0.0
+            matched = []
+            for _, keyword, weight in sorted(por_categoria[category]):
+                score += weight
+                matched.append(keyword)
+                # Bonus para match exato
+                if f" {keyword} " in com_espacos:
+                    score += 0.1
+            scores[category] = (score, matched)
 
         # Verificar padrões regex
-        for category, patterns in self._compiled_patterns.items():
-            for pattern in patterns:
-                if pattern.search(message):
-                    current_score, current_matched = scores.get(category, (0, []))
-                    scores[category] = (
-                        current_score + self.WEIGHTS["pattern"],
-                        current_matched + [f"pattern:{pattern.pattern[:30]}"]
-                    )
+        for category, pattern, label in self._compiled_patterns:
+            if pattern.search(texto):
+                current_score, current_matched = scores.get(category, (0, []))
+                scores[category] = (
+                    current_score + self.WEIGHTS["pattern"],
+                    current_matched + [label]
+                )
 
         # Selecionar categoria com maior score
         if scores:
@@ -268,33 +404,6 @@ class IntentClassifier:
             matched_keywords=[]
         )
 
-    def _score_category(
-        self,
-        message: str,
-        category: IntentCategory
-    ) -> Tuple[float, List[str]]:
-        """
-        Pontua mensagem para uma categoria.
-
-        Returns:
-            (score, lista de keywords encontradas)
-        """
-        keywords = self.KEYWORDS.get(category, {})
-        total_score = 0.0
-        matched = []
-
-        for keyword_type, keyword_list in keywords.items():
-            weight = self.WEIGHTS.get(keyword_type, 0.5)
-            for keyword in keyword_list:
-                if keyword in message:
-                    total_score += weight
-                    matched.append(keyword)
-                    # Bonus para match exato
-                    if f" {keyword} " in f" {message} ":
-                        total_score += 0.1
-
-        return total_score, matched
-
     async def classify_with_llm(self, message: str) -> Intent:
         """
         Classifica usando LLM (Gemini) para casos ambíguos.
@@ -359,40 +468,26 @@ Responda APENAS com a categoria (uma palavra): FARMACIA, BENEFICIO, DOCUMENTACAO
             logger.error(f"Erro ao classificar com LLM: {e}")
             return local_intent
 
+    def _special(self, message: str, nome: str) -> bool:
+        """Se a mensagem tem alguma keyword especial ``nome`` (thanks, help, restart)."""
+        return any(
+            label[0] == "special" and label[1] == nome
+            for keyword in self._matcher.find(normalizar(message))
+            for label in self._labels[keyword]
+        )
+
     def is_greeting(self, message: str) -> bool:
         """Verifica se é uma saudação."""
-        greetings = [
-            "oi", "olá", "ola", "bom dia", "boa tarde", "boa noite",
-            "hey", "e aí", "e ai", "tudo bem", "opa", "fala"
-        ]
-        message_lower = message.lower().strip()
-        return any(g == message_lower or message_lower.startswith(g + " ") for g in greetings)
+        return bool(self._greeting.match(normalizar(message).strip()))
 
     def is_thanks(self, message: str) -> bool:
         """Verifica se é agradecimento."""
-        thanks = [
-            "obrigado", "obrigada", "valeu", "vlw", "thanks",
-            "muito obrigado", "muito obrigada", "brigado", "brigada"
-        ]
-        message_lower = message.lower()
-        return any(t in message_lower for t in thanks)
+        return self._special(message, "thanks")
 
     def is_help(self, message: str) -> bool:
         """Verifica se está pedindo ajuda."""
-        help_words = [
-            "ajuda", "help", "o que você faz", "o que voce faz",
-            "como funciona", "me ajuda", "preciso de ajuda"
-        ]
-        message_lower = message.lower()
-        return any(h in message_lower for h in help_words)
+        return self._special(message, "help")
 
     def is_restart(self, message: str) -> bool:
         """Verifica se quer voltar ao início/recomeçar."""
-        restart_words = [
-            "voltar ao início", "voltar ao inicio", "começar de novo",
-            "comecar de novo", "recomeçar", "recomecar", "reiniciar",
-            "menu principal", "início", "inicio", "voltar",
-            "menu", "sair", "cancelar tudo", "novo atendimento"
-        ]
-        message_lower = message.lower().strip()
-        return any(r in message_lower for r in restart_words)
+        return self._special(message, "restart")
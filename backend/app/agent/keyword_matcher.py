@@ -0,0 +1,75 @@
+"""
+Busca de muitas keywords em uma unica passada pelo texto.
+
+As keywords (sem acento, minusculas) viram uma regex em forma de trie,
+dentro de um lookahead: ``finditer`` testa cada posicao do texto uma vez,
+em C, e acha a keyword mais longa que comeca ali. As keywords mais curtas
+que sao prefixo dela (``farmacia`` dentro de ``farmacia popular``) vem de
+uma tabela montada na construcao. O resultado e o mesmo de testar
+``keyword in texto`` para cada keyword, com o custo de uma busca so.
+"""
+
+import re
+from typing import Dict, Iterable, List, Set
+
+_SEM_ACENTO = str.maketrans(
+    "áàâãäéèêëíìîïóòôõöúùûüçñ",
+    "aaaaaeeeeiiiiooooouuuucn",
+)
+
+
+def normalizar(texto: str) -> str:
+    """Minusculas e sem acento (``"Remédio"`` -> ``"remedio"``)."""
+    return texto.lower().translate(_SEM_ACENTO)
+
+
+def _regex_trie(palavras: Iterable[str]) -> str:
+    """Alternativa das palavras fatorada por prefixo comum (mais longa primeiro)."""
+    trie: dict = {}
+    for palavra in palavras:
+        no = trie
+        for ch in palavra:
+            no = no.setdefault(ch, {})
+        no[""] = True
+
+    def montar(no: dict) -> str:
+        ramos = [re.escape(ch) + montar(filho) for ch, filho in sorted(no.items()) if ch]
+        if not ramos:
+            return ""
+        corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+        # Fim de palavra com continuacoes: tenta a mais longa, senao para aqui
+        return f"(?:{corpo})?" if "" in no else corpo
+
+    return montar(trie)
+
+
+class KeywordMatcher:
+    """Acha todas as keywords contidas em um texto ja normalizado."""
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Args:
+            keywords: Keywords (normalizadas com ``normalizar``)
+        """
+        self.keywords: List[str] = sorted({k for k in keywords if k})
+        if self.keywords:
+            self._regex = re.compile(f"(?=({_regex_trie(self.keywords)}))")
+        else:
+            self._regex = None
+        conjunto = set(self.keywords)
+        self._prefixos: Dict[str, List[str]] = {
+            k: [k[:i] for i in range(1, len(k) + 1) if k[:i] in conjunto]
+            for k in self.keywords
+        }
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def find(self, texto: str) -> Set[str]:
+        """Keywords que aparecem em ``texto`` (como ``keyword in texto``)."""
+        if self._regex is None:
+            return set()
+        encontradas: Set[str] = set()
+        for match in self._regex.finditer(texto):
+            encontradas.update(self._prefixos[match.group(1)])
+        return encontradas
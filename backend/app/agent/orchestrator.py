@@ -30,7 +30,7 @@ from .response_types import (
 )
 from .intent_classifier import IntentClassifier
 from .subagents import FarmaciaSubAgent, BeneficioSubAgent, DocumentacaoSubAgent, ProtecaoSubAgent
-from .tools.rede_protecao import detectar_urgencia as _detectar_urgencia
+from .tools.rede_protecao import keywords_urgencia, resultado_urgencia
 
 logger = logging.getLogger(__name__)
 
@@ -59,7 +59,10 @@ class AgentOrchestrator:
             model_name: Nome do modelo Gemini para fallback
         """
         self.model_name = model_name
-        self.intent_classifier = IntentClassifier(use_llm_fallback=True)
+        self.intent_classifier = IntentClassifier(
+            use_llm_fallback=True,
+            urgency_keywords=keywords_urgencia(),
+        )
         self._setup_gemini()
 
     def _setup_gemini(self):
@@ -118,7 +121,7 @@ Se não souber algo específico, oriente a procurar o CRAS."""
             AgentResponse estruturado
         """
         # Obter ou criar contexto
-        context = session_manager.get_or_create(session_id)
+        context = await session_manager.aget_or_create(session_id)
 
         # Registrar mensagem do usuário
         context.add_message(MessageRole.USER, message)
@@ -141,6 +144,7 @@ Se não souber algo específico, oriente a procurar o CRAS."""
 
         # Registrar resposta do assistente
         context.add_message(MessageRole.ASSISTANT, response.text)
+        await session_manager.asave(context)
 
         return response
 
@@ -159,21 +163,24 @@ Se não souber algo específico, oriente a procurar o CRAS."""
         3. Se intenção é geral, usa Gemini fallback
         """
 
+        # Uma passada: mensagens especiais, urgencia e intencao
+        analysis = self.intent_classifier.analyze(message)
+
         # 1. Verificar mensagens especiais
-        if self.intent_classifier.is_greeting(message):
+        if analysis.greeting:
             return self._handle_greeting(context)
 
-        if self.intent_classifier.is_thanks(message):
+        if analysis.thanks:
             return self._handle_thanks()
 
-        if self.intent_classifier.is_help(message):
+        if analysis.help:
             return self._handle_help()
 
-        if self.intent_classifier.is_restart(message):
+        if analysis.restart:
             return self._handle_restart(context)
 
         # 2. PRIORIDADE MAXIMA: Verificar urgencia/protecao
-        urgencia_result = _detectar_urgencia(message)
+        urgencia_result = resultado_urgencia(analysis.urgency)
         if urgencia_result["urgencia_detectada"]:
             logger.warning(f"Urgencia detectada: nivel={urgencia_result['nivel']}")
             context.start_flow(FlowType.PROTECAO)
@@ -187,7 +194,7 @@ Se não souber algo específico, oriente a procurar o CRAS."""
             return await subagent.process(message, image_base64)
 
         # 4. Classificar intenção
-        intent = self.intent_classifier.classify(message)
+        intent = analysis.intent
         logger.info(f"Intent classificado: {intent.category} (conf={intent.confidence:.2f})")
 
         # 5. Se confiança baixa, tenta LLM
@@ -3,33 +3,116 @@ Gerenciador de sessões com Redis.
 
 Alternativa ao SessionManager em memória para uso em produção.
 Persiste ConversationContext entre reinicializações do servidor.
+
+Cada operação é um único round-trip (pipeline):
+
+- ``get`` faz ``GETEX`` (lê e renova o TTL no mesmo comando)
+- ``save`` grava a sessão e atualiza o índice de sessões ativas
+- ``count_sessions`` usa o índice (sorted set com a expiração de cada
+  sessão) em vez de ``KEYS``
+
+A sessão é gravada em formato binário compacto: orjson (``app.core.cache``)
+comprimido com zstd (se ``zstandard`` estiver instalado) ou zlib, com só as
+últimas ``max_stored_history`` mensagens do histórico.
+
+Os handlers async usam ``aget``/``aget_or_create``/``asave``/..., sobre
+``redis.asyncio``; os métodos sync continuam disponíveis para scripts. A
+latência de cada operação vai para o histograma
+``session_store_duration_seconds`` (endpoint ``/metrics``).
 """
 
+import time
 import uuid
+import zlib
 import logging
+from contextlib import contextmanager
 from typing import Optional
 from datetime import datetime
 
 try:
     import redis
+    import redis.asyncio as aioredis
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
     redis = None
+    aioredis = None
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+from app.core.cache import dumps, loads
+from app.middleware.metrics import session_store_duration_seconds
 
 from .context import ConversationContext
 
 logger = logging.getLogger(__name__)
 
 
+# Primeiro byte do valor gravado (sessões antigas em JSON começam com "{")
+FORMAT_RAW = b"\x00"
+FORMAT_ZLIB = b"\x01"
+FORMAT_ZSTD = b"\x02"
+
+# Abaixo disso a compressão não compensa
+COMPRESS_MIN_BYTES = 512
+
+# Mensagens do histórico gravadas (o orquestrador usa as últimas 10)
+MAX_STORED_HISTORY = 10
+
+# Segundos sem tentar o Redis após erro de conexão
+REDIS_RETRY_INTERVAL = 30.0
+
+if ZSTD_AVAILABLE:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def encode_context(context: ConversationContext, max_history: int = MAX_STORED_HISTORY) -> bytes:
+    """Serializa o contexto em bytes compactos (cabeçalho de 1 byte + payload)."""
+    data = context.model_dump()
+    if max_history is not None:
+        data["history"] = data["history"][-max_history:] if max_history else []
+    payload = dumps(data)
+
+    if len(payload) < COMPRESS_MIN_BYTES:
+        return FORMAT_RAW + payload
+    if ZSTD_AVAILABLE:
+        return FORMAT_ZSTD + _zstd_compressor.compress(payload)
+    return FORMAT_ZLIB + zlib.compress(payload, 1)
+
+
+def decode_context(data: bytes) -> ConversationContext:
+    """Lê o formato de ``encode_context`` (ou o JSON das versões anteriores)."""
+    if isinstance(data, str):
+        data = data.encode()
+
+    header, payload = data[:1], data[1:]
+    if header == FORMAT_RAW:
+        return ConversationContext.model_validate(loads(payload))
+    if header == FORMAT_ZLIB:
+        return ConversationContext.model_validate(loads(zlib.decompress(payload)))
+    if header == FORMAT_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Sessão comprimida com zstd, mas zstandard não está instalado")
+        return ConversationContext.model_validate(loads(_zstd_decompressor.decompress(payload)))
+    return ConversationContext.model_validate_json(data)
+
+
 class RedisSessionManager:
     """
     Gerenciador de sessões usando Redis.
 
     Características:
     - TTL de 24h para sessões inativas (configurável)
-    - Serialização automática via Pydantic
-    - Renovação automática de TTL a cada acesso
+    - Serialização compacta (orjson + zstd/zlib) com histórico limitado
+    - Renovação de TTL na própria leitura (GETEX)
+    - Contagem de sessões por índice, sem KEYS
+    - API async (``aget``, ``asave``...) para os handlers
     - Fallback gracioso se Redis não estiver disponível
     """
 
@@ -37,7 +120,8 @@ class RedisSessionManager:
         self,
         redis_url: Optional[str] = None,
         ttl_seconds: int = 86400,  # 24 horas
-        prefix: str = "tanamao:session:"
+        prefix: str = "tanamao:session:",
+        max_stored_history: int = MAX_STORED_HISTORY,
     ):
         """
         Inicializa o gerenciador de sessões.
@@ -46,10 +130,16 @@ class RedisSessionManager:
             redis_url: URL de conexão Redis (padrão: de settings)
             ttl_seconds: Tempo de vida das sessões em segundos
             prefix: Prefixo para chaves no Redis
+            max_stored_history: Mensagens do histórico gravadas por sessão
         """
         self.ttl_seconds = ttl_seconds
         self.prefix = prefix
-        self._redis: Optional[redis.Redis] = None
+        self.index_key = f"{prefix}index"
+        self.max_stored_history = max_stored_history
+        self._redis_url = redis_url
+        self._redis: Optional["redis.Redis"] = None
+        self._async_redis: Optional["aioredis.Redis"] = None
+        self._down_until = 0.0
         self._fallback_sessions: dict = {}  # Fallback se Redis falhar
 
         if not REDIS_AVAILABLE:
@@ -63,10 +153,10 @@ class RedisSessionManager:
             if redis_url is None:
                 from app.config import settings
                 redis_url = settings.REDIS_URL
+            self._redis_url = redis_url
 
             self._redis = redis.from_url(
                 redis_url,
-                decode_responses=True,
                 socket_connect_timeout=5,
                 socket_timeout=5
             )
@@ -84,15 +174,73 @@ class RedisSessionManager:
         return f"{self.prefix}{session_id}"
 
     def _is_redis_available(self) -> bool:
-        """Verifica se Redis está disponível."""
-        if self._redis is None:
-            return False
+        """Verifica se Redis está disponível (sem ping a cada operação)."""
+        return self._redis is not None and time.monotonic() >= self._down_until
 
+    def _get_async(self) -> Optional["aioredis.Redis"]:
+        """Cliente asyncio, criado na primeira operação async."""
+        if not self._is_redis_available():
+            return None
+        if self._async_redis is None:
+            self._async_redis = aioredis.from_url(
+                self._redis_url,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+        return self._async_redis
+
+    def _mark_down(self, error: Exception) -> None:
+        """Usa o fallback por um tempo após erro de conexão."""
+        if isinstance(error, (redis.ConnectionError, redis.TimeoutError, OSError)):
+            self._down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+
+    @contextmanager
+    def _timed(self, operation: str):
+        inicio = time.perf_counter()
         try:
-            self._redis.ping()
-            return True
-        except Exception:
-            return False
+            yield
+        finally:
+            session_store_duration_seconds.labels(operation=operation).observe(
+                time.perf_counter() - inicio
+            )
+
+    # -------------------------------------------------------------------------
+    # Comandos (iguais no pipeline sync e no async)
+    # -------------------------------------------------------------------------
+
+    def _queue_get(self, pipe, session_id: str) -> None:
+        pipe.getex(self._key(session_id), ex=self.ttl_seconds)
+        pipe.zadd(self.index_key, {session_id: time.time() + self.ttl_seconds}, xx=True)
+
+    def _queue_save(self, pipe, context: ConversationContext) -> None:
+        pipe.set(
+            self._key(context.session_id),
+            encode_context(context, self.max_stored_history),
+            ex=self.ttl_seconds
+        )
+        pipe.zadd(self.index_key, {context.session_id: time.time() + self.ttl_seconds})
+
+    def _queue_delete(self, pipe, session_id: str) -> None:
+        pipe.delete(self._key(session_id))
+        pipe.zrem(self.index_key, session_id)
+
+    def _queue_count(self, pipe) -> None:
+        pipe.zremrangebyscore(self.index_key, "-inf", time.time())
+        pipe.zcard(self.index_key)
+
+    def _loaded(self, session_id: str, data: Optional[bytes]) -> Optional[ConversationContext]:
+        if data:
+            try:
+                context = decode_context(data)
+                context.last_activity = datetime.now()
+                return context
+            except Exception as e:
+                logger.error(f"Sessão {session_id} ilegível no Redis: {e}")
+        return self._fallback_sessions.get(session_id)
+
+    # -------------------------------------------------------------------------
+    # API sync
+    # -------------------------------------------------------------------------
 
     def get_or_create(self, session_id: Optional[str] = None) -> ConversationContext:
         """
@@ -111,8 +259,7 @@ class RedisSessionManager:
                 return existing
 
         # Criar nova sessão
-        new_session_id = session_id or str(uuid.uuid4())
-        context = ConversationContext(session_id=new_session_id)
+        context = ConversationContext(session_id=session_id or str(uuid.uuid4()))
 
         # Salvar no Redis
         self.save(context)
@@ -121,7 +268,7 @@ class RedisSessionManager:
 
     def get(self, session_id: str) -> Optional[ConversationContext]:
         """
-        Obtém sessão existente.
+        Obtém sessão existente e renova o TTL.
 
         Args:
             session_id: ID da sessão
@@ -129,22 +276,18 @@ class RedisSessionManager:
         Returns:
             ConversationContext ou None se não existir
         """
+        data = None
         if self._is_redis_available():
-            try:
-                data = self._redis.get(self._key(session_id))
-                if data:
-                    context = ConversationContext.model_validate_json(data)
-                    context.last_activity = datetime.now()
-
-                    # Renovar TTL
-                    self._redis.expire(self._key(session_id), self.ttl_seconds)
+            with self._timed("get"):
+                try:
+                    pipe = self._redis.pipeline(transaction=False)
+                    self._queue_get(pipe, session_id)
+                    data, _ = pipe.execute()
+                except Exception as e:
+                    self._mark_down(e)
+                    logger.error(f"Erro ao obter sessão do Redis: {e}")
 
-                    return context
-            except Exception as e:
-                logger.error(f"Erro ao obter sessão do Redis: {e}")
-
-        # Fallback para memória
-        return self._fallback_sessions.get(session_id)
+        return self._loaded(session_id, data)
 
     def save(self, context: ConversationContext) -> bool:
         """
@@ -159,15 +302,15 @@ class RedisSessionManager:
         context.last_activity = datetime.now()
 
         if self._is_redis_available():
-            try:
-                self._redis.setex(
-                    self._key(context.session_id),
-                    self.ttl_seconds,
-                    context.model_dump_json()
-                )
-                return True
-            except Exception as e:
-                logger.error(f"Erro ao salvar sessão no Redis: {e}")
+            with self._timed("save"):
+                try:
+                    pipe = self._redis.pipeline(transaction=False)
+                    self._queue_save(pipe, context)
+                    pipe.execute()
+                    return True
+                except Exception as e:
+                    self._mark_down(e)
+                    logger.error(f"Erro ao salvar sessão no Redis: {e}")
 
         # Fallback para memória
         self._fallback_sessions[context.session_id] = context
@@ -184,11 +327,16 @@ class RedisSessionManager:
             True se removeu com sucesso
         """
         if self._is_redis_available():
-            try:
-                result = self._redis.delete(self._key(session_id))
-                return result > 0
-            except Exception as e:
-                logger.error(f"Erro ao deletar sessão do Redis: {e}")
+            with self._timed("delete"):
+                try:
+                    pipe = self._redis.pipeline(transaction=False)
+                    self._queue_delete(pipe, session_id)
+                    deleted, _ = pipe.execute()
+                    self._fallback_sessions.pop(session_id, None)
+                    return deleted > 0
+                except Exception as e:
+                    self._mark_down(e)
+                    logger.error(f"Erro ao deletar sessão do Redis: {e}")
 
         # Fallback
         if session_id in self._fallback_sessions:
@@ -252,11 +400,15 @@ class RedisSessionManager:
             Número de sessões
         """
         if self._is_redis_available():
-            try:
-                keys = self._redis.keys(f"{self.prefix}*")
-                return len(keys)
-            except Exception as e:
-                logger.error(f"Erro ao contar sessões no Redis: {e}")
+            with self._timed("count"):
+                try:
+                    pipe = self._redis.pipeline(transaction=False)
+                    self._queue_count(pipe)
+                    _, count = pipe.execute()
+                    return count
+                except Exception as e:
+                    self._mark_down(e)
+                    logger.error(f"Erro ao contar sessões no Redis: {e}")
 
         return len(self._fallback_sessions)
 
@@ -284,3 +436,100 @@ class RedisSessionManager:
             "has_cpf": context.citizen.cpf is not None,
             "has_location": context.citizen.has_geolocation(),
         }
+
+    # -------------------------------------------------------------------------
+    # API async (handlers)
+    # -------------------------------------------------------------------------
+
+    async def aget_or_create(self, session_id: Optional[str] = None) -> ConversationContext:
+        """Versão async de ``get_or_create``."""
+        if session_id:
+            existing = await self.aget(session_id)
+            if existing:
+                return existing
+
+        context = ConversationContext(session_id=session_id or str(uuid.uuid4()))
+        await self.asave(context)
+        return context
+
+    async def aget(self, session_id: str) -> Optional[ConversationContext]:
+        """Versão async de ``get`` (um round-trip: GETEX + índice)."""
+        data = None
+        client = self._get_async()
+        if client is not None:
+            with self._timed("get"):
+                try:
+                    async with client.pipeline(transaction=False) as pipe:
+                        self._queue_get(pipe, session_id)
+                        data, _ = await pipe.execute()
+                except Exception as e:
+                    self._mark_down(e)
+                    logger.error(f"Erro ao obter sessão do Redis: {e}")
+
+        return self._loaded(session_id, data)
+
+    async def asave(self, context: ConversationContext) -> bool:
+        """Versão async de ``save``."""
+        context.last_activity = datetime.now()
+
+        client = self._get_async()
+        if client is not None:
+            with self._timed("save"):
+                try:
+                    async with client.pipeline(transaction=False) as pipe:
+                        self._queue_save(pipe, context)
+                        await pipe.execute()
+                    return True
+                except Exception as e:
+                    self._mark_down(e)
+                    logger.error(f"Erro ao salvar sessão no Redis: {e}")
+
+        self._fallback_sessions[context.session_id] = context
+        return True
+
+    async def adelete(self, session_id: str) -> bool:
+        """Versão async de ``delete``."""
+        client = self._get_async()
+        if client is not None:
+            with self._timed("delete"):
+                try:
+                    async with client.pipeline(transaction=False) as pipe:
+                        self._queue_delete(pipe, session_id)
+                        deleted, _ = await pipe.execute()
+                    self._fallback_sessions.pop(session_id, None)
+                    return deleted > 0
+                except Exception as e:
+                    self._mark_down(e)
+                    logger.error(f"Erro ao deletar sessão do Redis: {e}")
+
+        return self._fallback_sessions.pop(session_id, None) is not None
+
+    async def areset(self, session_id: str) -> bool:
+        """Versão async de ``reset``."""
+        context = await self.aget(session_id)
+        if context:
+            context.reset()
+            return await self.asave(context)
+        return False
+
+    async def acount_sessions(self) -> int:
+        """Versão async de ``count_sessions``."""
+        client = self._get_async()
+        if client is not None:
+            with self._timed("count"):
+                try:
+                    async with client.pipeline(transaction=False) as pipe:
+                        self._queue_count(pipe)
+                        _, count = await pipe.execute()
+                    return count
+                except Exception as e:
+                    self._mark_down(e)
+                    logger.error(f"Erro ao contar sessões no Redis: {e}")
+
+        return len(self._fallback_sessions)
+
+    async def aclose(self) -> None:
+        """Fecha o cliente asyncio (shutdown da aplicação)."""
+        if self._async_redis is not None:
+            await self._async_redis.aclose()
+            self._async_redis = None
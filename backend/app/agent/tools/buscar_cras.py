@@ -231,20 +231,57 @@ def buscar_cras_sync(
     return buscar_cras(cep=cep, ibge_code=ibge_code, limite=limite)
 
 
+def _buscar_cras_local(
+    latitude: float,
+    longitude: float,
+    raio_metros: int,
+    limite: int
+) -> List[Dict[str, Any]]:
+    """Busca os CRAS mais próximos no índice espacial local (sem API externa)."""
+    from app.services.spatial_index import CRAS, get_spatial_index
+    from .google_places import _formatar_distancia
+
+    cras_list = []
+    for cras, distancia in get_spatial_index(CRAS).nearest(
+        latitude, longitude, k=limite, radius_m=raio_metros
+    ):
+        lat, lng = cras["latitude"], cras["longitude"]
+        cras_list.append({
+            **cras,
+            "distancia": _formatar_distancia(distancia),
+            "distancia_metros": round(distancia),
+            "aberto_agora": None,
+            "fonte": "local",
+            "links": {
+                "maps": f"https://www.google.com/maps/search/?api=1&query={lat},{lng}",
+                "direcoes": f"https://www.google.com/maps/dir/?api=1&destination={lat},{lng}"
+            }
+        })
+    return cras_list
+
+
 async def buscar_cras_por_coordenadas(
     latitude: float,
     longitude: float,
     raio_metros: int = 10000,
-    limite: int = 3
+    limite: int = 3,
+    enriquecer: bool = False
 ) -> dict:
     """
-    Busca CRAS próximos usando coordenadas GPS (Google Places API).
+    Busca CRAS próximos usando coordenadas GPS.
+
+    Quando o índice espacial vem da tabela ``cras_locations``, ele é a fonte
+    primária e a Google Places API só é consultada para enriquecer os
+    resultados locais (quando `enriquecer`) ou quando não há CRAS da base
+    local no raio. Com a base de exemplo, a Google Places API vem primeiro
+    e o índice local só é usado se ela falhar.
 
     Args:
         latitude: Latitude do usuário
         longitude: Longitude do usuário
         raio_metros: Raio de busca em metros (padrão: 10km)
         limite: Número máximo de CRAS a retornar
+        enriquecer: Completa os resultados locais com dados do Google Places
 
     Returns:
         dict: {
@@ -254,15 +291,42 @@ async def buscar_cras_por_coordenadas(
             "texto_formatado": str
         }
     """
+    from app.services.spatial_index import CRAS, get_spatial_index
     from .google_places import buscar_cras_proximos
 
     try:
-        resultado = await buscar_cras_proximos(
-            latitude=latitude,
-            longitude=longitude,
-            raio_metros=raio_metros,
-            limite=limite
-        )
+        # Base de exemplo: Google Places primeiro, índice só como fallback offline
+        indice_confiavel = not get_spatial_index(CRAS).sample
+        cras_locais = []
+        if indice_confiavel:
+            cras_locais = _buscar_cras_local(latitude, longitude, raio_metros, limite)
+
+        if cras_locais:
+            if enriquecer:
+                cras_locais = await _enriquecer_cras(
+                    cras_locais, latitude, longitude, raio_metros, limite
+                )
+            resultado = {
+                "sucesso": True,
+                "cras": cras_locais,
+                "coordenadas_busca": {"latitude": latitude, "longitude": longitude},
+            }
+        else:
+            resultado = await buscar_cras_proximos(
+                latitude=latitude,
+                longitude=longitude,
+                raio_metros=raio_metros,
+                limite=limite
+            )
+            if not resultado.get("sucesso") and not indice_confiavel:
+                cras_locais = _buscar_cras_local(latitude, longitude, raio_metros, limite)
+                if cras_locais:
+                    logger.warning("Google Places API falhou, usando dados locais")
+                    resultado = {
+                        "sucesso": True,
+                        "cras": cras_locais,
+                        "coordenadas_busca": {"latitude": latitude, "longitude": longitude},
+                    }
 
         if not resultado.get("sucesso") or not resultado.get("cras"):
             # Fallback para informações genéricas
@@ -288,7 +352,12 @@ async def buscar_cras_por_coordenadas(
                 "endereco": cras["endereco"],
                 "distancia": cras.get("distancia", ""),
                 "distancia_metros": cras.get("distancia_metros", 0),
+                "telefone": cras.get("telefone"),
+                "horario": cras.get("horario"),
                 "aberto_agora": cras.get("aberto_agora"),
+                "latitude": cras.get("latitude"),
+                "longitude": cras.get("longitude"),
+                "fonte": cras.get("fonte", "google_places"),
                 "links": links
             })
 
@@ -335,6 +404,38 @@ async def buscar_cras_por_coordenadas(
         }
 
 
+async def _enriquecer_cras(
+    cras_locais: List[Dict[str, Any]],
+    latitude: float,
+    longitude: float,
+    raio_metros: int,
+    limite: int
+) -> List[Dict[str, Any]]:
+    """Completa os CRAS locais com horário/status do Google Places.
+
+    Falhas na API externa nunca descartam os resultados locais.
+    """
+    from app.services.spatial_index import merge_by_proximity
+    from .google_places import buscar_cras_proximos
+
+    try:
+        externo = await buscar_cras_proximos(
+            latitude=latitude,
+            longitude=longitude,
+            raio_metros=raio_metros,
+            limite=limite
+        )
+    except Exception as e:
+        logger.warning(f"Enriquecimento via Google Places falhou: {e}")
+        return cras_locais
+
+    if not externo.get("sucesso"):
+        return cras_locais
+    return merge_by_proximity(
+        cras_locais, externo.get("cras", []), fields=("aberto_agora", "place_id")
+    )
+
+
 def _texto_fallback_cras() -> str:
     """Texto de fallback quando não encontra CRAS por coordenadas."""
     return (
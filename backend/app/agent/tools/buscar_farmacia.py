@@ -405,22 +405,100 @@ async def _buscar_farmacia_google_direto(
         }
 
 
+def _buscar_farmacia_local(
+    latitude: float,
+    longitude: float,
+    raio_metros: int,
+    limite: int,
+    programa: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Busca as farmácias mais próximas no índice espacial local (sem API externa)."""
+    from app.services.spatial_index import FARMACIAS, get_spatial_index
+    from .google_places import _formatar_distancia
+
+    where = (lambda f: programa in f.get("programas", [])) if programa else None
+
+    farmacias = []
+    for farm, distancia in get_spatial_index(FARMACIAS).nearest(
+        latitude, longitude, k=limite, radius_m=raio_metros, where=where
+    ):
+        lat, lng = farm["latitude"], farm["longitude"]
+        links = {
+            "maps": _gerar_link_maps(lat, lng, farm["nome"]),
+            "direcoes": f"https://www.google.com/maps/dir/?api=1&destination={lat},{lng}",
+            "waze": _gerar_link_waze(lat, lng),
+        }
+        if farm.get("whatsapp"):
+            links["whatsapp"] = _gerar_link_whatsapp(farm["whatsapp"])
+
+        farmacias.append({
+            **farm,
+            "distancia": _formatar_distancia(distancia),
+            "distancia_metros": round(distancia),
+            "aberto_agora": None,
+            "links": links,
+            "fonte": "local"
+        })
+    return farmacias
+
+
+async def _enriquecer_farmacias(
+    farmacias: List[Dict[str, Any]],
+    latitude: float,
+    longitude: float,
+    raio_metros: int,
+    limite: int
+) -> List[Dict[str, Any]]:
+    """Completa as farmácias locais com avaliação/status do Google Maps.
+
+    Falhas na API externa nunca descartam os resultados locais.
+    """
+    from app.services.spatial_index import merge_by_proximity
+
+    externas = await _buscar_farmacia_mcp(
+        latitude=latitude,
+        longitude=longitude,
+        raio_metros=raio_metros,
+        limite=limite
+    )
+    if not externas:
+        resultado = await _buscar_farmacia_google_direto(
+            latitude=latitude,
+            longitude=longitude,
+            raio_metros=raio_metros,
+            limite=limite
+        )
+        externas = resultado.get("farmacias", []) if resultado.get("sucesso") else []
+
+    return merge_by_proximity(
+        farmacias, externas, fields=("aberto_agora", "avaliacao", "place_id")
+    )
+
+
 async def buscar_farmacia_por_coordenadas(
     latitude: float,
     longitude: float,
     raio_metros: int = 3000,
-    limite: int = 5
+    limite: int = 5,
+    programa: Optional[str] = None,
+    enriquecer: bool = False
 ) -> dict:
     """
     Busca farmácias próximas usando coordenadas GPS.
 
-    Usa MCP Google Maps como fonte primária, com fallback para Google Places API.
+    Quando o índice espacial vem de uma base ingerida, ele é a fonte
+    primária e MCP Google Maps / Google Places API só são consultados para
+    enriquecer os resultados locais (quando `enriquecer`) ou quando não há
+    farmácia local no raio. Com a base de exemplo, a ordem é MCP, Google
+    Places e, só se ambos falharem, o índice local.
 
     Args:
         latitude: Latitude do usuário
         longitude: Longitude do usuário
         raio_metros: Raio de busca em metros (padrão: 3km)
         limite: Número máximo de farmácias a retornar
+        programa: Filtra a base local por programa (ex: FARMACIA_POPULAR)
+        enriquecer: Completa os resultados locais com dados do Google Maps
 
     Returns:
         dict: {
@@ -430,19 +508,35 @@ async def buscar_farmacia_por_coordenadas(
             "texto_formatado": str
         }
     """
+    from app.services.spatial_index import FARMACIAS, get_spatial_index
+
     try:
-        # Tenta MCP primeiro
-        farmacias_mcp = await _buscar_farmacia_mcp(
-            latitude=latitude,
-            longitude=longitude,
-            raio_metros=raio_metros,
-            limite=limite
-        )
+        # Base de exemplo: APIs externas primeiro, índice só como fallback offline
+        indice_confiavel = not get_spatial_index(FARMACIAS).sample
+
+        farmacias = []
+        if indice_confiavel:
+            farmacias = _buscar_farmacia_local(
+                latitude, longitude, raio_metros, limite, programa
+            )
+            if farmacias:
+                logger.debug("Farmácias encontradas no índice local")
+                if enriquecer:
+                    farmacias = await _enriquecer_farmacias(
+                        farmacias, latitude, longitude, raio_metros, limite
+                    )
 
-        if farmacias_mcp:
-            logger.debug("Farmácias encontradas via MCP")
-            farmacias = farmacias_mcp
-        else:
+        if not farmacias:
+            farmacias = await _buscar_farmacia_mcp(
+                latitude=latitude,
+                longitude=longitude,
+                raio_metros=raio_metros,
+                limite=limite
+            ) or []
+            if farmacias:
+                logger.debug("Farmácias encontradas via MCP")
+
+        if not farmacias:
             # Fallback para Google Places API direto
             logger.debug("Falling back to Google Places API")
             resultado_fallback = await _buscar_farmacia_google_direto(
@@ -452,18 +546,23 @@ async def buscar_farmacia_por_coordenadas(
                 limite=limite
             )
 
-            if not resultado_fallback.get("sucesso"):
+            if resultado_fallback.get("sucesso"):
+                farmacias = resultado_fallback.get("farmacias", [])
+            else:
                 # Último fallback para dados locais
                 logger.warning("Google Places API falhou, usando dados locais")
-                return {
-                    "erro": False,
-                    "encontrados": 0,
-                    "farmacias": [],
-                    "redes_nacionais": _get_redes_nacionais(),
-                    "texto_formatado": _texto_redes_nacionais_fallback()
-                }
-
-            farmacias = resultado_fallback.get("farmacias", [])
+                if not indice_confiavel:
+                    farmacias = _buscar_farmacia_local(
+                        latitude, longitude, raio_metros, limite, programa
+                    )
+                if not farmacias:
+                    return {
+                        "erro": False,
+                        "encontrados": 0,
+                        "farmacias": [],
+                        "redes_nacionais": _get_redes_nacionais(),
+                        "texto_formatado": _texto_redes_nacionais_fallback()
+                    }
 
         if not farmacias:
             return {
@@ -501,6 +600,10 @@ async def buscar_farmacia_por_coordenadas(
                 "avaliacao": farm.get("avaliacao"),
                 "aberto_agora": farm.get("aberto_agora"),
                 "telefone": farm.get("telefone"),
+                "horario": farm.get("horario"),
+                "delivery": farm.get("delivery"),
+                "latitude": farm.get("latitude"),
+                "longitude": farm.get("longitude"),
                 "links": links,
                 "fonte": farm.get("fonte", "unknown")
             })
@@ -37,7 +37,7 @@ async def consultar_govbr(cpf: str) -> dict:
     Returns:
         dict com dados auto-preenchidos
     """
-    from app.services import serpro_service, transparencia_service
+    from app.services import beneficiarios_service, serpro_service
 
     cpf_limpo = re.sub(r'\D', '', cpf)
 
@@ -84,7 +84,7 @@ async def consultar_govbr(cpf: str) -> dict:
         resultado["fontes"].append("SERPRO nao habilitado (validacao nao realizada)")
 
     # 2. Portal da Transparencia - beneficios
-    beneficios = await transparencia_service.consultar_beneficios_ou_mock(cpf_limpo)
+    beneficios = await beneficiarios_service.consultar_beneficios(cpf_limpo)
 
     if beneficios.get("beneficiario_algum_programa"):
         resultado["eh_beneficiario"] = True
@@ -99,6 +99,13 @@ async def consultar_govbr(cpf: str) -> dict:
         resultado["beneficios"] = []
         resultado["total_mensal"] = 0
 
+    # Resposta da base local sem Auxilio Gas / Seguro Defeso
+    if beneficios.get("parcial"):
+        resultado["beneficios_parcial"] = True
+        resultado["programas_consultados"] = beneficios.get("programas_consultados", [])
+        if resultado.get("mensagem_beneficios"):
+            resultado["mensagem_beneficios"] += f" {beneficios.get('aviso_parcial', '')}".rstrip()
+
     if "Mock" not in beneficios.get("fonte", ""):
         resultado["fontes"].append("Portal da Transparencia")
     else:
@@ -174,7 +181,7 @@ async def consultar_beneficios(cpf: str) -> dict:
     Returns:
         dict com dados dos beneficios
     """
-    from app.services import transparencia_service
+    from app.services import beneficiarios_service
 
     cpf_limpo = re.sub(r'\D', '', cpf)
 
@@ -183,7 +190,7 @@ async def consultar_beneficios(cpf: str) -> dict:
             "erro": "CPF invalido",
         }
 
-    beneficios = await transparencia_service.consultar_beneficios_ou_mock(cpf_limpo)
+    beneficios = await beneficiarios_service.consultar_beneficios(cpf_limpo)
 
     if beneficios.get("beneficiario_algum_programa"):
         return {
@@ -193,6 +200,8 @@ async def consultar_beneficios(cpf: str) -> dict:
             "total_mensal": beneficios.get("total_mensal_estimado", 0),
             "detalhes": beneficios.get("detalhes", {}),
             "fonte": beneficios.get("fonte", "Portal da Transparencia"),
+            "programas_consultados": beneficios.get("programas_consultados"),
+            "parcial": beneficios.get("parcial", False),
         }
 
     return {
@@ -200,6 +209,8 @@ async def consultar_beneficios(cpf: str) -> dict:
         "eh_beneficiario": False,
         "mensagem": "CPF nao consta como beneficiario de programas sociais federais.",
         "fonte": beneficios.get("fonte", "Portal da Transparencia"),
+        "programas_consultados": beneficios.get("programas_consultados"),
+        "parcial": beneficios.get("parcial", False),
         "aviso": (
             "Isso nao significa que voce nao tem direito! "
             "Posso ajudar a verificar sua elegibilidade."
@@ -15,7 +15,8 @@ from typing import Optional, List, Dict, Any
 from enum import Enum
 
 from app.database import SessionLocal
-from app.models.beneficiario import Beneficiario
+from app.models.beneficiario import Beneficiario, hash_cpf
+from app.services.beneficiarios_service import pode_estar_na_base
 from app.agent.tools.base import ToolResult, UIHint
 
 
@@ -122,6 +123,16 @@ def identificar_por_cpf(cpf: str) -> IdentificacaoResult:
             pode_continuar=False
         )
 
+    nao_encontrado = (
+        "CPF nao encontrado na base de beneficiarios. "
+        "Isso pode significar que voce ainda nao esta cadastrado "
+        "no CadUnico ou nao recebe beneficios federais."
+    )
+
+    # Filtro de Bloom: a maioria dos CPFs nao esta na base, sem ir ao banco
+    if not pode_estar_na_base(hash_cpf(cpf_limpo)):
+        return IdentificacaoResult.nao_identificado(nao_encontrado)
+
     db = SessionLocal()
     try:
         beneficiario = Beneficiario.buscar_por_cpf(db, cpf_limpo)
@@ -133,11 +144,7 @@ def identificar_por_cpf(cpf: str) -> IdentificacaoResult:
                 confianca="alta"
             )
         else:
-            return IdentificacaoResult.nao_identificado(
-                "CPF nao encontrado na base de beneficiarios. "
-                "Isso pode significar que voce ainda nao esta cadastrado "
-                "no CadUnico ou nao recebe beneficios federais."
-            )
+            return IdentificacaoResult.nao_identificado(nao_encontrado)
     finally:
         db.close()
 
@@ -12,6 +12,8 @@ import re
 import logging
 from typing import Optional, Dict, Any, List
 
+from ..keyword_matcher import KeywordMatcher, normalizar
+
 logger = logging.getLogger(__name__)
 
 
@@ -128,6 +130,16 @@ _KEYWORDS_URGENCIA = {
     },
 }
 
+# Mesmas keywords sem acento ("violência" e "violencia" viram uma so),
+# buscadas todas de uma vez
+_KEYWORDS_NORMALIZADAS = {
+    categoria: list(dict.fromkeys(normalizar(kw) for kw in config["keywords"]))
+    for categoria, config in _KEYWORDS_URGENCIA.items()
+}
+_MATCHER_URGENCIA = KeywordMatcher(
+    kw for keywords in _KEYWORDS_NORMALIZADAS.values() for kw in keywords
+)
+
 # Servicos de protecao com informacoes de contato
 _SERVICOS_PROTECAO: Dict[str, Dict[str, Any]] = {
     TipoServico.SAMU: {
@@ -225,6 +237,15 @@ _SERVICOS_PROTECAO: Dict[str, Dict[str, Any]] = {
 # Tools
 # =============================================================================
 
+def keywords_urgencia() -> Dict[str, List[str]]:
+    """Keywords de urgencia (sem acento) por categoria.
+
+    Usado pelo classificador de intencao para buscar urgencia na mesma
+    passada das outras keywords (ver ``resultado_urgencia``).
+    """
+    return {categoria: list(keywords) for categoria, keywords in _KEYWORDS_NORMALIZADAS.items()}
+
+
 def detectar_urgencia(mensagem: str) -> dict:
     """Detecta situacoes de urgencia/vulnerabilidade na mensagem.
 
@@ -237,13 +258,31 @@ def detectar_urgencia(mensagem: str) -> dict:
     Returns:
         dict com nivel de urgencia, categorias detectadas e servicos recomendados
     """
-    mensagem_lower = mensagem.lower()
+    encontradas = _MATCHER_URGENCIA.find(normalizar(mensagem))
+    return resultado_urgencia({
+        categoria: [kw for kw in keywords if kw in encontradas]
+        for categoria, keywords in _KEYWORDS_NORMALIZADAS.items()
+    })
+
+
+def resultado_urgencia(encontradas: Dict[str, List[str]]) -> dict:
+    """Monta o resultado de ``detectar_urgencia`` a partir das keywords achadas.
+
+    Args:
+        encontradas: categoria -> keywords encontradas (sem acento)
+
+    Returns:
+        dict com nivel de urgencia, categorias detectadas e servicos recomendados
+    """
     categorias_detectadas = []
 
     for categoria, config in _KEYWORDS_URGENCIA.items():
+        if not encontradas.get(categoria):
+            continue
+        achadas = set(encontradas.get(categoria, ()))
         keywords_encontradas = [
-            kw for kw in config["keywords"]
-            if kw in mensagem_lower
+            kw for kw in _KEYWORDS_NORMALIZADAS[categoria]
+            if kw in achadas
         ]
         if keywords_encontradas:
             categorias_detectadas.append({
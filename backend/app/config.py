@@ -31,10 +31,26 @@ class Settings(BaseSettings):
     CACHE_TTL_GEOJSON: int = 86400  # 24 hours
     CACHE_TTL_AGGREGATIONS: int = 3600  # 1 hour
     CACHE_TTL_MUNICIPALITIES: int = 1800  # 30 minutes
+    CACHE_STALE_TTL: int = 600  # served stale while refreshing
+    CACHE_ENABLED: bool = True
+    CACHE_LOCAL_TTL: int = 60  # in-process LRU in front of Redis
+    CACHE_LOCAL_MAX_ENTRIES: int = 512
+    CACHE_LOCAL_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_GENERATION_CHECK_INTERVAL: float = 5.0  # seconds between data generation reads
+
+    # Benefit catalog (in-memory, compiled eligibility rules)
+    BENEFIT_CATALOG_CHECK_INTERVAL: int = 60  # seconds between change checks
 
     # Agent (Gemini)
     GOOGLE_API_KEY: str = ""  # Chave da API do Google AI Studio
     AGENT_MODEL: str = "gemini-2.0-flash-exp"  # Modelo Gemini a usar
+    AGENT_MODEL_TIMEOUT: float = 60.0  # Timeout por chamada ao Gemini (segundos)
+    AGENT_TOOL_TIMEOUT: float = 20.0  # Timeout padrao por tool (segundos)
+    AGENT_TOOL_MAX_WORKERS: int = 16  # Threads para tools sincronas
+    AGENT_SESSION_MAX_LOCAL: int = 200  # Agentes (chats Gemini) mantidos em memoria por worker
+    AGENT_SESSION_IDLE_SECONDS: int = 900  # Agente ocioso sai da memoria (historico fica no Redis)
+    AGENT_SESSION_TTL: int = 86400  # Tempo de vida do historico no Redis
+    AGENT_SESSION_MAX_HISTORY: int = 40  # Mensagens do chat gravadas por sessao
 
     # Twilio (WhatsApp, SMS, Voice)
     TWILIO_ACCOUNT_SID: str = ""  # Account SID do Twilio
@@ -43,6 +59,9 @@ class Settings(BaseSettings):
     TWILIO_WEBHOOK_URL: str = ""  # URL do webhook para respostas
     TWILIO_SMS_FROM: str = ""  # Numero para SMS
     TWILIO_VOICE_FROM: str = ""  # Numero para Voice (0800)
+    WHATSAPP_QUEUE_ENABLED: bool = True  # Responde o chat pela API do Twilio (precisa das credenciais)
+    WHATSAPP_QUEUE_WORKERS: int = 8  # Mensagens do chat processadas em paralelo
+    WHATSAPP_QUEUE_MAX_PENDING: int = 1000  # Limite de mensagens esperando resposta
 
     # SMS Provider (twilio, zenvia, infobip)
     SMS_PROVIDER: str = "twilio"
@@ -71,6 +90,7 @@ class Settings(BaseSettings):
     # Portal da Transparencia (gratuito, dados publicos de beneficios)
     # Cadastre-se em: https://portaldatransparencia.gov.br/api-de-dados
     TRANSPARENCIA_API_KEY: str = ""
+    BENEFICIARIOS_MAX_IDADE_DIAS: int = 62  # Base local (beneficiarios) mais antiga que isso: consulta a API
 
     # SERPRO Consulta CPF (pago, ~R$ 0,66/consulta)
     # Contrate em: https://loja.serpro.gov.br/pin
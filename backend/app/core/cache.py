@@ -1,20 +1,151 @@
-"""Redis cache utilities."""
+"""Redis cache utilities.
 
-import json
-from typing import Any, Optional
+Two APIs share the same keys and orjson encoding:
+
+- Sync helpers (``get_cache``/``set_cache``/...) for jobs and scripts.
+- Async helpers (``aget_cache``/``aset_cache``/...) on ``redis.asyncio`` for
+  request handlers, plus the ``cached`` decorator for router functions.
+
+``cached`` coalesces concurrent misses for the same key in this process
+(single-flight) and supports stale-while-revalidate: after ``ttl`` a value is
+still served for ``stale_ttl`` seconds while one background task refreshes it.
+If Redis is unreachable the decorator calls the function directly and skips
+Redis for ``REDIS_RETRY_INTERVAL`` seconds instead of failing requests.
+
+Two tiers: with ``local_ttl`` a bounded in-process LRU (``LocalCache``) is
+checked before Redis. With ``versioned=True`` keys include the current data
+generation, a Redis counter the ETL bumps when new data is loaded
+(``bump_data_generation``): one INCR makes every versioned entry, in Redis
+and in every process' LRU, unreachable at once.
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
 import redis
+import redis.asyncio as aioredis
+from pydantic import BaseModel
+
 from app.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Keys deleted per UNLINK while scanning a pattern
+SCAN_BATCH_SIZE = 500
+
+# Seconds to bypass Redis after a connection error
+REDIS_RETRY_INTERVAL = 30.0
+
 # Redis client (lazy initialization)
 _redis_client: Optional[redis.Redis] = None
+_async_client: Optional[aioredis.Redis] = None
+_async_down_until: float = 0.0
+
+# Redis counter versioning cached data (see bump_data_generation)
+DATA_GENERATION_KEY = "cache:data_generation"
+_generation: int = 0
+_generation_checked: float = float("-inf")
+
+# Single-flight: key -> task computing the value in this process
+_inflight: Dict[str, asyncio.Task] = {}
+# Strong references to background stale refreshes
+_background: set = set()
+
+
+def _json_default(value: Any) -> Any:
+    """Encode types orjson does not handle natively."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a value for the cache."""
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def loads(data: Any) -> Any:
+    """Deserialize a cached value."""
+    return orjson.loads(data)
 
 
+class LocalCache:
+    """Thread-safe in-process LRU bounded by entry count and total bytes.
+
+    Entries also expire after their own TTL. Sizes are the length of the
+    encoded value, so the byte budget tracks what Redis would hold.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return ``(found, value)``; expired entries count as missing."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.bytes -= size
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: float, size: int) -> None:
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (time.monotonic() + ttl, value, size)
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.bytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+
+local_cache = LocalCache(
+    max_entries=settings.CACHE_LOCAL_MAX_ENTRIES,
+    max_bytes=settings.CACHE_LOCAL_MAX_BYTES,
+)
+
+
+# =============================================================================
+# Sync API
+# =============================================================================
+
 def get_redis_client() -> redis.Redis:
     """Get or create Redis client.
-    
+
     Returns:
         Redis client instance
     """
@@ -37,10 +168,10 @@ def get_redis_client() -> redis.Redis:
 
 def get_cache(key: str) -> Optional[Any]:
     """Get value from cache.
-    
+
     Args:
         key: Cache key
-        
+
     Returns:
         Cached value or None
     """
@@ -48,7 +179,7 @@ def get_cache(key: str) -> Optional[Any]:
         client = get_redis_client()
         value = client.get(key)
         if value:
-            return json.loads(value)
+            return loads(value)
     except Exception as e:
         logger.warning("cache_get_failed", key=key, error=str(e))
     return None
@@ -56,18 +187,18 @@ def get_cache(key: str) -> Optional[Any]:
 
 def set_cache(key: str, value: Any, ttl: int = 3600) -> bool:
     """Set value in cache.
-    
+
     Args:
         key: Cache key
         value: Value to cache (must be JSON serializable)
         ttl: Time to live in seconds
-        
+
     Returns:
         True if successful, False otherwise
     """
     try:
         client = get_redis_client()
-        client.setex(key, ttl, json.dumps(value))
+        client.setex(key, ttl, dumps(value))
         return True
     except Exception as e:
         logger.warning("cache_set_failed", key=key, error=str(e))
@@ -76,10 +207,10 @@ def set_cache(key: str, value: Any, ttl: int = 3600) -> bool:
 
 def delete_cache(key: str) -> bool:
     """Delete key from cache.
-    
+
     Args:
         key: Cache key
-        
+
     Returns:
         True if successful, False otherwise
     """
@@ -94,25 +225,360 @@ def delete_cache(key: str) -> bool:
 
 def clear_cache_pattern(pattern: str) -> int:
     """Clear all keys matching pattern.
-    
+
+    Uses incremental ``SCAN`` + ``UNLINK`` in batches, so it never blocks
+    Redis the way ``KEYS`` does on large keyspaces.
+
     Args:
         pattern: Redis key pattern (e.g., "cache:*")
-        
+
     Returns:
         Number of keys deleted
     """
     try:
         client = get_redis_client()
-        keys = client.keys(pattern)
-        if keys:
-            return client.delete(*keys)
+        deleted = 0
+        batch = []
+        for key in client.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= SCAN_BATCH_SIZE:
+                deleted += client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += client.unlink(*batch)
+        return deleted
+    except Exception as e:
+        logger.warning("cache_clear_pattern_failed", pattern=pattern, error=str(e))
+        return 0
+
+
+def bump_data_generation() -> Optional[int]:
+    """Invalidate all versioned cache entries (call after an ETL load).
+
+    Returns:
+        The new generation, or None if Redis is unavailable
+    """
+    local_cache.clear()
+    try:
+        client = get_redis_client()
+        generation = int(client.incr(DATA_GENERATION_KEY))
+        logger.info("cache_generation_bumped", generation=generation)
+        return generation
+    except Exception as e:
+        logger.warning("cache_generation_bump_failed", error=str(e))
+        return None
+
+
+# =============================================================================
+# Async API
+# =============================================================================
+
+def get_async_redis() -> Optional[aioredis.Redis]:
+    """Get or create the asyncio Redis client.
+
+    Returns None while Redis is marked as down (see ``REDIS_RETRY_INTERVAL``).
+    """
+    global _async_client
+    if time.monotonic() < _async_down_until:
+        return None
+    if _async_client is None:
+        _async_client = aioredis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+        )
+    return _async_client
+
+
+def _mark_redis_down(error: Exception) -> None:
+    """Skip Redis for a while after a connection error."""
+    global _async_down_until
+    if isinstance(error, (redis.ConnectionError, redis.TimeoutError, OSError)):
+        _async_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+
+
+async def close_async_redis() -> None:
+    """Close the asyncio client (application shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def _aget_raw(key: str) -> Optional[bytes]:
+    client = get_async_redis()
+    if client is None:
+        return None
+    try:
+        return await client.get(key)
+    except Exception as e:
+        _mark_redis_down(e)
+        logger.warning("cache_get_failed", key=key, error=str(e))
+        return None
+
+
+async def _aset_raw(key: str, payload: bytes, ttl: int) -> bool:
+    client = get_async_redis()
+    if client is None:
+        return False
+    try:
+        await client.set(key, payload, ex=ttl)
+        return True
+    except Exception as e:
+        _mark_redis_down(e)
+        logger.warning("cache_set_failed", key=key, error=str(e))
+        return False
+
+
+async def aget_cache(key: str) -> Optional[Any]:
+    """Async version of ``get_cache``."""
+    value = await _aget_raw(key)
+    if value:
+        try:
+            return loads(value)
+        except orjson.JSONDecodeError as e:
+            logger.warning("cache_get_failed", key=key, error=str(e))
+    return None
+
+
+async def aset_cache(key: str, value: Any, ttl: int = 3600) -> bool:
+    """Async version of ``set_cache``."""
+    return await _aset_raw(key, dumps(value), ttl)
+
+
+async def adelete_cache(key: str) -> bool:
+    """Async version of ``delete_cache``."""
+    client = get_async_redis()
+    if client is None:
+        return False
+    try:
+        await client.delete(key)
+        return True
+    except Exception as e:
+        _mark_redis_down(e)
+        logger.warning("cache_delete_failed", key=key, error=str(e))
+        return False
+
+
+async def aclear_cache_pattern(pattern: str) -> int:
+    """Async version of ``clear_cache_pattern`` (SCAN + UNLINK in batches)."""
+    client = get_async_redis()
+    if client is None:
         return 0
+    try:
+        deleted = 0
+        batch = []
+        async for key in client.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= SCAN_BATCH_SIZE:
+                deleted += await client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await client.unlink(*batch)
+        return deleted
     except Exception as e:
+        _mark_redis_down(e)
         logger.warning("cache_clear_pattern_failed", pattern=pattern, error=str(e))
         return 0
 
 
+async def abump_data_generation() -> Optional[int]:
+    """Async version of ``bump_data_generation``."""
+    global _generation, _generation_checked
+    local_cache.clear()
+    client = get_async_redis()
+    if client is None:
+        return None
+    try:
+        generation = int(await client.incr(DATA_GENERATION_KEY))
+    except Exception as e:
+        _mark_redis_down(e)
+        logger.warning("cache_generation_bump_failed", error=str(e))
+        return None
+    _generation, _generation_checked = generation, time.monotonic()
+    logger.info("cache_generation_bumped", generation=generation)
+    return generation
+
+
+async def get_data_generation() -> int:
+    """Current data generation, re-read from Redis at most every
+    ``CACHE_GENERATION_CHECK_INTERVAL`` seconds.
+
+    Keeps the last known value while Redis is unavailable.
+    """
+    global _generation, _generation_checked
+    now = time.monotonic()
+    if now - _generation_checked < settings.CACHE_GENERATION_CHECK_INTERVAL:
+        return _generation
+    _generation_checked = now
+    client = get_async_redis()
+    if client is None:
+        return _generation
+    try:
+        _generation = int(await client.get(DATA_GENERATION_KEY) or 0)
+    except Exception as e:
+        _mark_redis_down(e)
+        logger.warning("cache_generation_read_failed", error=str(e))
+    return _generation
+
+
+# =============================================================================
+# Decorator
+# =============================================================================
+
+_KEY_TYPES = (str, int, float, bool, type(None), Enum)
+
+
+def _key_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return [_key_value(v) for v in value]
+    return value
+
+
+def build_cache_key(prefix: str, func: Callable, args: tuple, kwargs: dict) -> str:
+    """Build a stable key from the function's simple arguments.
+
+    Arguments that are not plain values (DB sessions, requests, ...) are
+    ignored, so ``Depends`` parameters never end up in the key.
+    """
+    bound = inspect.signature(func).bind_partial(*args, **kwargs)
+    parts = {
+        name: _key_value(value)
+        for name, value in sorted(bound.arguments.items())
+        if isinstance(value, _KEY_TYPES)
+        or (isinstance(value, (list, tuple)) and all(isinstance(v, _KEY_TYPES) for v in value))
+    }
+    if not parts:
+        return prefix
+    encoded = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)
+    if len(encoded) > 128:
+        return f"{prefix}:{hashlib.sha1(encoded).hexdigest()}"
+    return f"{prefix}:{encoded.decode()}"
+
+
+async def _store(key: str, value: Any, ttl: int, stale_ttl: int, local_ttl: int) -> None:
+    payload = dumps({"v": value, "t": time.time()})
+    if local_ttl:
+        local_cache.set(key, value, min(local_ttl, ttl), len(payload))
+    await _aset_raw(key, payload, ttl + stale_ttl)
+
+
+async def _compute(
+    key: str,
+    func: Callable[..., Awaitable[Any]],
+    args: tuple,
+    kwargs: dict,
+    ttl: int,
+    stale_ttl: int,
+    local_ttl: int = 0,
+) -> Any:
+    """Run ``func`` once per key in this process and store the result."""
+    task = _inflight.get(key)
+    if task is None:
+        async def run():
+            try:
+                value = await func(*args, **kwargs)
+                await _store(key, value, ttl, stale_ttl, local_ttl)
+                return value
+            finally:
+                _inflight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        _inflight[key] = task
+    # shield: a cancelled waiter must not cancel the shared computation
+    return await asyncio.shield(task)
+
+
+def _refresh_in_background(key, func, args, kwargs, ttl, stale_ttl, local_ttl) -> None:
+    if key in _inflight:
+        return
+
+    async def refresh():
+        from sqlalchemy.ext.asyncio import AsyncSession
+        from app.database import AsyncSessionLocal
+
+        try:
+            # The request's session is closed once it returns the stale value
+            if any(isinstance(v, AsyncSession) for v in kwargs.values()):
+                async with AsyncSessionLocal() as session:
+                    fresh_kwargs = {
+                        k: session if isinstance(v, AsyncSession) else v
+                        for k, v in kwargs.items()
+                    }
+                    await _compute(key, func, args, fresh_kwargs, ttl, stale_ttl, local_ttl)
+            else:
+                await _compute(key, func, args, kwargs, ttl, stale_ttl, local_ttl)
+        except Exception as e:
+            logger.warning("cache_refresh_failed", key=key, error=str(e))
+
+    task = asyncio.ensure_future(refresh())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def cached(
+    prefix: str,
+    ttl: int = 3600,
+    stale_ttl: int = 0,
+    local_ttl: int = 0,
+    versioned: bool = False,
+    key_builder: Optional[Callable[..., str]] = None,
+):
+    """Cache an async function (typically a FastAPI route) in Redis.
+
+    Args:
+        prefix: Key prefix, e.g. ``"aggregations:states"``
+        ttl: Seconds a value is fresh
+        stale_ttl: Extra seconds a value is served stale while refreshing
+        local_ttl: Seconds a value is also kept in the in-process LRU (0 = off)
+        versioned: Include the data generation in the key
+        key_builder: Optional ``(prefix, func, args, kwargs) -> key``
+
+    The function's return value must be JSON serializable (dicts, lists,
+    pydantic models, Decimal). Hits return the decoded JSON value; values
+    from the in-process tier are shared between requests and must not be
+    mutated.
+    """
+    make_key = key_builder or build_cache_key
+
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not settings.CACHE_ENABLED:
+                return await func(*args, **kwargs)
+
+            key_prefix = prefix
+            if versioned:
+                key_prefix = f"{prefix}:g{await get_data_generation()}"
+            key = make_key(key_prefix, func, args, kwargs)
+
+            if local_ttl:
+                found, value = local_cache.get(key)
+                if found:
+                    return value
 
+            raw = await _aget_raw(key)
+            try:
+                entry = loads(raw) if raw else None
+            except orjson.JSONDecodeError:
+                entry = None
+            if isinstance(entry, dict) and "v" in entry:
+                age = time.time() - entry.get("t", 0)
+                if age < ttl:
+                    if local_ttl:
+                        local_cache.set(key, entry["v"], min(local_ttl, ttl - age), len(raw))
+                    return entry["v"]
+                if age < ttl + stale_ttl:
+                    _refresh_in_background(
+                        key, func, args, kwargs, ttl, stale_ttl, local_ttl
+                    )
+                    return entry["v"]
 
+            return await _compute(key, func, args, kwargs, ttl, stale_ttl, local_ttl)
 
+        wrapper.cache_prefix = prefix
+        return wrapper
 
+    return decorator
@@ -0,0 +1,236 @@
+"""Atualiza as tabelas de resumo usadas pelos dashboards.
+
+``beneficiary_summary`` guarda totais mensais por programa nos niveis
+nacional, regiao e estado; ``municipality_summary`` guarda o total de todo
+o historico por municipio e programa (tabelas do admin e exportacao).
+
+A atualizacao e incremental: apos uma carga a cobertura das linhas
+carregadas e recalculada (``update_coverage``) e so os grupos afetados
+(programa e/ou mes) sao apagados e recalculados com ``INSERT ... SELECT``,
+na mesma transacao. Sem escopo, recalcula tudo.
+
+Uso:
+    python -m app.jobs.atualizar_agregados                      # tudo
+    python -m app.jobs.atualizar_agregados --programa BPC --referencia 2024-05
+"""
+
+import argparse
+import logging
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import bump_data_generation
+from app.database import SessionLocal
+from app.models import (
+    BeneficiaryData,
+    BeneficiarySummary,
+    Municipality,
+    MunicipalitySummary,
+    Program,
+    State,
+    SummaryLevel,
+)
+from app.models.aggregate_summary import NATIONAL_CODE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLUMNS = [
+    "level", "code", "program_id", "reference_date",
+    "total_beneficiaries", "total_families", "total_value_brl",
+    "coverage_sum", "coverage_count", "municipality_count", "refreshed_at",
+]
+
+MUNICIPALITY_COLUMNS = [
+    "municipality_id", "program_id",
+    "total_beneficiaries", "total_families", "total_value_brl",
+    "coverage_sum", "coverage_count", "months", "last_reference_date", "refreshed_at",
+]
+
+
+def _medidas():
+    """Somas comuns a todos os niveis."""
+    return [
+        func.sum(BeneficiaryData.total_beneficiaries),
+        func.sum(BeneficiaryData.total_families),
+        func.sum(BeneficiaryData.total_value_brl),
+        func.sum(BeneficiaryData.coverage_rate),
+        func.count(BeneficiaryData.coverage_rate),
+    ]
+
+
+def _no_escopo(stmt, programa_ids, datas):
+    if programa_ids is not None:
+        stmt = stmt.where(BeneficiaryData.program_id.in_(programa_ids))
+    if datas is not None:
+        stmt = stmt.where(BeneficiaryData.reference_date.in_(datas))
+    return stmt
+
+
+def _consulta_nivel(nivel: str, agora: datetime):
+    """SELECT agrupado de ``beneficiary_data`` para um nivel."""
+    if nivel == SummaryLevel.NATIONAL:
+        codigo = literal(NATIONAL_CODE)
+    elif nivel == SummaryLevel.REGION:
+        codigo = State.region
+    else:
+        codigo = State.abbreviation
+
+    stmt = select(
+        literal(nivel),
+        codigo,
+        BeneficiaryData.program_id,
+        BeneficiaryData.reference_date,
+        *_medidas(),
+        func.count(func.distinct(BeneficiaryData.municipality_id)),
+        literal(agora),
+    ).select_from(BeneficiaryData)
+
+    if nivel == SummaryLevel.NATIONAL:
+        return stmt.group_by(BeneficiaryData.program_id, BeneficiaryData.reference_date)
+
+    return (
+        stmt.join(Municipality, Municipality.id == BeneficiaryData.municipality_id)
+        .join(State, State.id == Municipality.state_id)
+        .group_by(codigo, BeneficiaryData.program_id, BeneficiaryData.reference_date)
+    )
+
+
+def atualizar_resumo_mensal(
+    db: Session,
+    programa_ids: Optional[Iterable[int]] = None,
+    datas: Optional[Iterable[date]] = None,
+) -> int:
+    """Recalcula ``beneficiary_summary`` no escopo (programas x meses)."""
+    programa_ids = list(programa_ids) if programa_ids is not None else None
+    datas = list(datas) if datas is not None else None
+    agora = datetime.utcnow()
+
+    remover = delete(BeneficiarySummary)
+    if programa_ids is not None:
+        remover = remover.where(BeneficiarySummary.program_id.in_(programa_ids))
+    if datas is not None:
+        remover = remover.where(BeneficiarySummary.reference_date.in_(datas))
+    db.execute(remover)
+
+    total = 0
+    for nivel in (SummaryLevel.NATIONAL, SummaryLevel.REGION, SummaryLevel.STATE):
+        consulta = _no_escopo(_consulta_nivel(nivel, agora), programa_ids, datas)
+        result = db.execute(
+            insert(BeneficiarySummary).from_select(SUMMARY_COLUMNS, consulta)
+        )
+        total += result.rowcount or 0
+    return total
+
+
+def atualizar_resumo_municipios(
+    db: Session,
+    programa_ids: Optional[Iterable[int]] = None,
+) -> int:
+    """Recalcula ``municipality_summary`` (todo o historico) dos programas."""
+    programa_ids = list(programa_ids) if programa_ids is not None else None
+
+    remover = delete(MunicipalitySummary)
+    if programa_ids is not None:
+        remover = remover.where(MunicipalitySummary.program_id.in_(programa_ids))
+    db.execute(remover)
+
+    consulta = _no_escopo(
+        select(
+            BeneficiaryData.municipality_id,
+            BeneficiaryData.program_id,
+            *_medidas(),
+            func.count(func.distinct(BeneficiaryData.reference_date)),
+            func.max(BeneficiaryData.reference_date),
+            literal(datetime.utcnow()),
+        ).group_by(BeneficiaryData.municipality_id, BeneficiaryData.program_id),
+        programa_ids,
+        None,
+    )
+    result = db.execute(insert(MunicipalitySummary).from_select(MUNICIPALITY_COLUMNS, consulta))
+    return result.rowcount or 0
+
+
+def atualizar_agregados(
+    db: Session,
+    programa_ids: Optional[Iterable[int]] = None,
+    datas: Optional[Iterable[date]] = None,
+) -> Dict[str, int]:
+    """Atualiza as duas tabelas de resumo e faz commit.
+
+    Args:
+        db: Sessao do banco
+        programa_ids: Programas afetados pela carga (None = todos)
+        datas: Meses de referencia afetados (None = todos)
+
+    Returns:
+        Linhas gravadas em cada tabela
+    """
+    programa_ids = list(programa_ids) if programa_ids is not None else None
+    inicio = time.monotonic()
+    try:
+        mensal = atualizar_resumo_mensal(db, programa_ids, datas)
+        municipios = atualizar_resumo_municipios(db, programa_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(
+        f"Resumos atualizados em {time.monotonic() - inicio:.1f}s: "
+        f"{mensal} mensais, {municipios} municipais"
+    )
+    return {"beneficiary_summary": mensal, "municipality_summary": municipios}
+
+
+def atualizar_apos_carga(
+    programa: Optional[str] = None,
+    referencia: Optional[date] = None,
+) -> Dict[str, int]:
+    """Recalcula a cobertura e os resumos apos uma carga e invalida o cache.
+
+    Args:
+        programa: Codigo do programa carregado (None = todos)
+        referencia: Mes carregado (None = todos)
+    """
+    # update_coverage importa este modulo
+    from app.jobs.update_coverage import recompute_coverage
+
+    db = SessionLocal()
+    try:
+        programa_ids = None
+        if programa:
+            programa_ids = db.execute(
+                select(Program.id).where(Program.code == programa.upper())
+            ).scalars().all()
+            if not programa_ids:
+                logger.warning(f"Programa {programa} nao encontrado; resumos nao atualizados")
+                return {"beneficiary_summary": 0, "municipality_summary": 0}
+        datas = [referencia] if referencia else None
+        recompute_coverage(db, programa_ids, datas)
+        resultado = atualizar_agregados(db, programa_ids, datas)
+    finally:
+        db.close()
+
+    bump_data_generation()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza as tabelas de resumo dos dashboards")
+    parser.add_argument("--programa", help="Codigo do programa (padrao: todos)")
+    parser.add_argument("--referencia", help="Mes de referencia AAAA-MM (padrao: todos)")
+    args = parser.parse_args()
+
+    referencia = None
+    if args.referencia:
+        referencia = datetime.strptime(args.referencia, "%Y-%m").date()
+    atualizar_apos_carga(args.programa, referencia)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Avaliacao de elegibilidade em lote para coortes do CadUnico.
+
+Le uma tabela de perfis de familias (CSV, Parquet ou Arrow), avalia todos os
+beneficios ativos do catalogo com operacoes vetorizadas e grava o resultado
+por familia em NDJSON, seguido de uma linha com os agregados.
+
+Uso:
+    python -m app.jobs.avaliar_elegibilidade_lote familias.csv -o resultado.ndjson
+    python -m app.jobs.avaliar_elegibilidade_lote familias.parquet --scope municipal
+    python -m app.jobs.avaliar_elegibilidade_lote familias.csv --separador ";"
+
+Colunas aceitas: as mesmas do CitizenProfile (camelCase ou snake_case),
+por exemplo estado, municipioIbge, pessoasNaCasa, rendaFamiliarMensal.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+from app.database import AsyncSessionLocal
+from app.services.batch_eligibility import (
+    DEFAULT_CHUNK_SIZE,
+    BatchEligibilityEngine,
+    detect_format,
+    iter_ndjson,
+    read_profile_chunks,
+)
+from app.services.benefit_catalog import BenefitCatalog, get_benefit_catalog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def carregar_catalogo() -> BenefitCatalog:
+    """Carrega o catalogo compilado de beneficios ativos."""
+    async with AsyncSessionLocal() as session:
+        return await get_benefit_catalog(session)
+
+
+def avaliar_arquivo(
+    catalog: BenefitCatalog,
+    entrada: str,
+    saida,
+    formato: str,
+    scope: str = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    separador: str = ",",
+) -> dict:
+    """Avalia um arquivo de perfis e grava o NDJSON em `saida`.
+
+    Returns:
+        Dict com os agregados do lote
+    """
+    engine = BatchEligibilityEngine(catalog, scope=scope)
+    chunks = read_profile_chunks(entrada, formato, chunk_size=chunk_size, separator=separador)
+
+    inicio = time.perf_counter()
+    for linha in iter_ndjson(engine, chunks):
+        saida.write(linha)
+    duracao = time.perf_counter() - inicio
+
+    total = engine.aggregates.total_families
+    logger.info(
+        f"{total:,} familias avaliadas em {duracao:.1f}s "
+        f"({total / max(duracao, 1e-9):,.0f} familias/s)"
+    )
+    return engine.aggregates.to_dict()
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description="Avalia elegibilidade de uma coorte de familias em lote"
+    )
+    parser.add_argument("entrada", help="Arquivo de perfis (CSV, Parquet ou Arrow)")
+    parser.add_argument(
+        "-o", "--saida",
+        help="Arquivo NDJSON de saida (padrao: stdout)"
+    )
+    parser.add_argument(
+        "--formato",
+        choices=["csv", "parquet", "arrow"],
+        help="Formato da entrada (padrao: pela extensao)"
+    )
+    parser.add_argument(
+        "--scope",
+        choices=["federal", "state", "municipal", "sectoral"],
+        help="Avaliar apenas beneficios deste escopo"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Familias por bloco (padrao: {DEFAULT_CHUNK_SIZE})"
+    )
+    parser.add_argument(
+        "--separador",
+        default=",",
+        help="Separador de colunas do CSV (padrao: ',')"
+    )
+
+    args = parser.parse_args()
+    formato = args.formato or detect_format(args.entrada)
+
+    catalog = asyncio.run(carregar_catalogo())
+    logger.info(f"Catalogo com {len(catalog)} beneficios ativos")
+
+    if args.saida:
+        with open(args.saida, "wb") as saida:
+            avaliar_arquivo(
+                catalog, args.entrada, saida, formato,
+                args.scope, args.chunk_size, args.separador,
+            )
+    else:
+        avaliar_arquivo(
+            catalog, args.entrada, sys.stdout.buffer, formato,
+            args.scope, args.chunk_size, args.separador,
+        )
+
+
+if __name__ == "__main__":
+    main()
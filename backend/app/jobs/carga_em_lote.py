@@ -0,0 +1,321 @@
+"""Carga set-based de ``beneficiary_data`` para os jobs de ingestao.
+
+Os jobs ``ingest_*`` agregam os dados por municipio e entregam as linhas
+(municipio, programa, mes e metricas) a ``carregar_beneficiary_data``, que:
+
+1. Faz ``COPY`` das linhas para uma tabela de staging temporaria
+2. Faz um unico ``INSERT ... ON CONFLICT`` da staging para
+   ``beneficiary_data`` pela chave (municipality_id, program_id,
+   reference_date), contando inseridos e atualizados
+
+Uma carga historica inteira vira dois comandos, em vez de um SELECT e um
+INSERT/UPDATE por municipio e mes.
+
+Tambem ficam aqui os utilitarios de COPY em streaming (``CopyStream``)
+usados pelo indexador de beneficiarios.
+"""
+
+import csv
+import io
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, select, text
+from sqlalchemy.orm import Session
+
+from app.models import CadUnicoData, Municipality, Program
+
+logger = logging.getLogger(__name__)
+
+# Linhas por bloco de texto enviado ao COPY
+COPY_BLOCK_ROWS = 5000
+
+# Chave de conflito (uq_beneficiary_data_key)
+KEY_COLUMNS = ("municipality_id", "program_id", "reference_date")
+
+# Metricas aceitas em cada linha; colunas ausentes vao como NULL
+METRIC_COLUMNS = (
+    "total_beneficiaries",
+    "total_families",
+    "total_value_brl",
+    "coverage_rate",
+    "extra_data",
+    "data_source",
+)
+
+# Colunas da staging, na ordem do COPY
+STAGING_COLUMNS = KEY_COLUMNS + METRIC_COLUMNS
+
+
+def csv_blocks(rows: Iterable[Tuple], block_rows: int = COPY_BLOCK_ROWS) -> Iterator[Tuple[str, int]]:
+    """Agrupa linhas em blocos de texto CSV `(texto, quantidade)` para o COPY."""
+    rows = iter(rows)
+    while True:
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            if count >= block_rows:
+                break
+        if not count:
+            return
+        yield out.getvalue(), count
+
+
+class CopyStream(io.TextIOBase):
+    """Arquivo somente leitura que entrega blocos CSV ao COPY sob demanda.
+
+    O driver chama `read(size)` repetidamente; cada chamada consome so os
+    blocos necessarios do iterador, entao a memoria fica limitada a poucos
+    blocos. Use `from_rows` para montar os blocos a partir de linhas.
+    """
+
+    def __init__(self, blocks: Iterable[Tuple[str, int]]):
+        self._blocks = iter(blocks)
+        self._buffer = ""
+        self.rows_read = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple], block_rows: int = COPY_BLOCK_ROWS) -> "CopyStream":
+        return cls(csv_blocks(rows, block_rows))
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self) -> bool:
+        block = next(self._blocks, None)
+        if block is None:
+            return False
+        data, count = block
+        self.rows_read += count
+        self._buffer += data
+        return True
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            while self._fill():
+                pass
+            data, self._buffer = self._buffer, ""
+            return data
+        while len(self._buffer) < size and self._fill():
+            pass
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size: int = -1) -> str:
+        while "\n" not in self._buffer and self._fill():
+            pass
+        end = self._buffer.find("\n") + 1 or len(self._buffer)
+        data, self._buffer = self._buffer[:end], self._buffer[end:]
+        return data
+
+
+def copy_to_table(db: Session, table: str, columns: Sequence[str], stream: CopyStream) -> float:
+    """``COPY ... FROM STDIN`` do stream na conexao da sessao.
+
+    Returns:
+        Segundos gastos no COPY
+    """
+    inicio = time.perf_counter()
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            stream,
+        )
+    finally:
+        cursor.close()
+    return time.perf_counter() - inicio
+
+
+# =============================================================================
+# Lookups usados pelos jobs
+# =============================================================================
+
+def mapa_municipios(db: Session) -> Dict[str, int]:
+    """Codigo IBGE -> id do municipio, com 7 e com 6 digitos."""
+    mapa = {}
+    for municipio_id, ibge_code in db.execute(select(Municipality.id, Municipality.ibge_code)):
+        mapa[ibge_code] = municipio_id
+        if len(ibge_code) == 7:
+            mapa.setdefault(ibge_code[:6], municipio_id)
+    return mapa
+
+
+def resolver_municipio(mapa: Mapping[str, int], ibge_code: str) -> Optional[int]:
+    """Id do municipio para um codigo de 6 ou 7 digitos (None se desconhecido)."""
+    municipio_id = mapa.get(ibge_code)
+    if municipio_id is None and len(ibge_code) == 7:
+        municipio_id = mapa.get(ibge_code[:6])
+    if municipio_id is None and len(ibge_code) == 6:
+        municipio_id = mapa.get(ibge_code + "0")
+    return municipio_id
+
+
+def id_programa(db: Session, codigo: str) -> Optional[int]:
+    """Id do programa pelo codigo (None se nao cadastrado)."""
+    return db.execute(select(Program.id).where(Program.code == codigo)).scalar_one_or_none()
+
+
+def familias_cadunico(db: Session) -> Dict[int, int]:
+    """Familias no CadUnico mais recente de cada municipio, em uma consulta.
+
+    Substitui a busca de ``CadUnicoData`` por municipio dentro dos loops
+    que calculam cobertura.
+    """
+    ultima = (
+        select(
+            CadUnicoData.municipality_id,
+            func.max(CadUnicoData.reference_date).label("reference_date"),
+        )
+        .group_by(CadUnicoData.municipality_id)
+        .subquery()
+    )
+    stmt = select(CadUnicoData.municipality_id, CadUnicoData.total_families).join(
+        ultima,
+        and_(
+            CadUnicoData.municipality_id == ultima.c.municipality_id,
+            CadUnicoData.reference_date == ultima.c.reference_date,
+        ),
+    )
+    return {municipio_id: familias or 0 for municipio_id, familias in db.execute(stmt)}
+
+
+# =============================================================================
+# Carga
+# =============================================================================
+
+@dataclass
+class ResultadoLote:
+    """Contagens de uma carga em lote."""
+    inseridos: int = 0
+    atualizados: int = 0
+    linhas: int = 0
+    segundos: float = 0.0
+
+    @property
+    def duplicadas(self) -> int:
+        """Linhas repetidas para a mesma chave (vale a ultima)."""
+        return self.linhas - self.inseridos - self.atualizados
+
+
+def _registros(linhas) -> Iterable[Mapping]:
+    """Aceita iteravel de dicts ou DataFrame do pandas."""
+    if hasattr(linhas, "to_dict"):
+        # NaN do pandas vira NULL
+        return linhas.astype(object).where(linhas.notna(), None).to_dict("records")
+    return linhas
+
+
+def staging_rows(linhas) -> Iterator[Tuple]:
+    """Converte linhas (dicts ou DataFrame) em tuplas na ordem da staging."""
+    for linha in _registros(linhas):
+        extra = linha.get("extra_data")
+        yield (
+            *(linha[coluna] for coluna in KEY_COLUMNS),
+            linha.get("total_beneficiaries"),
+            linha.get("total_families"),
+            linha.get("total_value_brl"),
+            linha.get("coverage_rate"),
+            json.dumps(extra, ensure_ascii=False) if extra is not None else None,
+            linha.get("data_source"),
+        )
+
+
+def merge_sql(atualizar: Sequence[str]) -> str:
+    """Upsert set-based da staging para ``beneficiary_data``.
+
+    Linhas repetidas para a mesma chave sao resolvidas pela ultima enviada
+    (``ordem``), como no loop antigo com SELECT + UPDATE.
+    """
+    insert_cols = [*STAGING_COLUMNS, "ingested_at"]
+    update_cols = [*atualizar, "ingested_at"]
+    return f"""
+        WITH upserted AS (
+            INSERT INTO beneficiary_data ({", ".join(insert_cols)})
+            SELECT DISTINCT ON ({", ".join(f"s.{c}" for c in KEY_COLUMNS)})
+                   {", ".join(f"s.{c}" for c in STAGING_COLUMNS)}, :agora
+            FROM beneficiary_data_staging s
+            ORDER BY {", ".join(f"s.{c}" for c in KEY_COLUMNS)}, s.ordem DESC
+            ON CONFLICT ({", ".join(KEY_COLUMNS)}) DO UPDATE SET
+                {", ".join(f"{c} = EXCLUDED.{c}" for c in update_cols)}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT
+            count(*) FILTER (WHERE inserted),
+            count(*) FILTER (WHERE NOT inserted)
+        FROM upserted
+    """
+
+
+def carregar_beneficiary_data(
+    db: Session,
+    linhas,
+    atualizar: Optional[Sequence[str]] = None,
+) -> ResultadoLote:
+    """Carrega linhas em ``beneficiary_data`` via COPY + um unico upsert.
+
+    Tudo roda em uma transacao: a staging e temporaria (ON COMMIT DROP) e o
+    merge so e confirmado se todas as linhas carregarem.
+
+    Args:
+        db: Sessao do banco (PostgreSQL)
+        linhas: Dicts ou DataFrame com as colunas de ``KEY_COLUMNS`` e
+            qualquer subconjunto de ``METRIC_COLUMNS``
+        atualizar: Metricas sobrescritas quando a linha ja existe (padrao:
+            todas). As demais so sao gravadas na insercao, por exemplo
+            ``coverage_rate`` calculada depois por ``update_coverage``.
+
+    Returns:
+        ResultadoLote com inseridos, atualizados e linhas enviadas
+    """
+    atualizar = METRIC_COLUMNS if atualizar is None else tuple(atualizar)
+    desconhecidas = set(atualizar) - set(METRIC_COLUMNS)
+    if desconhecidas:
+        raise ValueError(f"Colunas desconhecidas: {sorted(desconhecidas)}")
+
+    stream = CopyStream.from_rows(staging_rows(linhas))
+    inicio = time.perf_counter()
+    try:
+        db.execute(text("""
+            CREATE TEMP TABLE beneficiary_data_staging (
+                ordem BIGSERIAL,
+                municipality_id INTEGER NOT NULL,
+                program_id INTEGER NOT NULL,
+                reference_date DATE NOT NULL,
+                total_beneficiaries INTEGER,
+                total_families INTEGER,
+                total_value_brl NUMERIC(15, 2),
+                coverage_rate NUMERIC(5, 4),
+                extra_data JSONB,
+                data_source VARCHAR(100)
+            ) ON COMMIT DROP
+        """))
+        copy_seconds = copy_to_table(db, "beneficiary_data_staging", STAGING_COLUMNS, stream)
+
+        inseridos, atualizados = db.execute(
+            text(merge_sql(atualizar)), {"agora": datetime.utcnow()}
+        ).one()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    resultado = ResultadoLote(
+        inseridos=inseridos,
+        atualizados=atualizados,
+        linhas=stream.rows_read,
+        segundos=time.perf_counter() - inicio,
+    )
+    logger.info(
+        f"beneficiary_data: {resultado.inseridos:,} inseridos, "
+        f"{resultado.atualizados:,} atualizados, {resultado.duplicadas:,} duplicadas "
+        f"em {resultado.segundos:.1f}s (COPY {copy_seconds:.1f}s)"
+    )
+    return resultado
@@ -9,8 +9,17 @@ import json
 from typing import Dict, Any, List
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
+from decimal import Decimal
 from pathlib import Path
 
+from app.database import SessionLocal
+from app.jobs.carga_em_lote import (
+    carregar_beneficiary_data,
+    id_programa,
+    mapa_municipios,
+    resolver_municipio,
+)
+
 from .transformador import ResultadoTransformacao, RegistroTransformado
 
 logger = logging.getLogger(__name__)
@@ -33,7 +42,7 @@ class CarregadorDados:
     """Carrega dados transformados no destino.
 
     Em modo mock/dev: salva em arquivo JSON.
-    Em producao: faz upsert na tabela BeneficiaryData via SQLAlchemy.
+    Em producao: faz upsert na tabela BeneficiaryData via carga em lote.
     """
 
     def __init__(self, modo_mock: bool = True, diretorio_saida: str = "/tmp/dados_abertos"):
@@ -114,10 +123,54 @@ class CarregadorDados:
             )
 
     def _carregar_banco(self, transformacao: ResultadoTransformacao) -> ResultadoCarga:
-        """Faz upsert no banco de dados.
+        """Faz upsert em ``beneficiary_data`` (COPY + INSERT ON CONFLICT).
 
-        TODO: Implementar quando modelo BeneficiaryData estiver pronto.
-        Usa INSERT ON CONFLICT UPDATE por (municipio_ibge, programa, referencia).
+        A chave e (municipio, programa, referencia); a cobertura so e gravada
+        na insercao e depois recalculada por ``update_coverage``.
         """
-        logger.warning("Carga em banco nao implementada. Usando modo arquivo.")
-        return self._carregar_arquivo(transformacao)
+        resultado = ResultadoCarga(
+            programa=transformacao.programa,
+            referencia=transformacao.referencia,
+            modo="banco",
+        )
+        referencia = datetime.strptime(transformacao.referencia, "%Y-%m").date()
+
+        db = SessionLocal()
+        try:
+            programa_id = id_programa(db, transformacao.programa)
+            if not programa_id:
+                logger.error(f"Programa {transformacao.programa} nao cadastrado")
+                resultado.sucesso = False
+                return resultado
+
+            municipios = mapa_municipios(db)
+            linhas = []
+            for registro in transformacao.registros:
+                municipio_id = resolver_municipio(municipios, registro.municipio_ibge)
+                if municipio_id is None:
+                    resultado.erros += 1
+                    continue
+                linhas.append({
+                    "municipality_id": municipio_id,
+                    "program_id": programa_id,
+                    "reference_date": referencia,
+                    "total_beneficiaries": registro.beneficiarios,
+                    "total_value_brl": Decimal(str(registro.valor_total)),
+                    "data_source": "DADOS_ABERTOS",
+                })
+
+            lote = carregar_beneficiary_data(
+                db, linhas, atualizar=("total_beneficiaries", "total_value_brl", "data_source")
+            )
+            resultado.inseridos = lote.inseridos
+            resultado.atualizados = lote.atualizados
+        except Exception as e:
+            logger.error(f"Erro na carga em banco: {e}")
+            resultado.erros += 1
+            resultado.sucesso = False
+        finally:
+            db.close()
+
+        if resultado.erros:
+            logger.warning(f"{resultado.erros} municipios nao encontrados")
+        return resultado
@@ -9,15 +9,18 @@ Scheduler:
     Configure via environment or run manually via /api/v1/admin/jobs/{job_name}/run
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional, Callable
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import date, datetime
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 
+from app.jobs.atualizar_agregados import atualizar_apos_carga
+
 from .extrator import ExtratorDadosAbertos, PROGRAMA_FONTE
 from .transformador import TransformadorDados
 from .carregador import CarregadorDados, ResultadoCarga
@@ -155,6 +158,9 @@ class OrquestradorETL:
 
                 if not carga.sucesso:
                     resultado.erro = "Falha na carga"
+                elif carga.modo == "banco" and resultado.registros_carregados:
+                    # Novos dados: atualiza os resumos e invalida os caches
+                    atualizar_apos_carga(programa, date(ano, mes, 1))
             except Exception as e:
                 resultado.erro = f"Erro na carga: {str(e)}"
 
@@ -357,13 +363,17 @@ async def _run_farmacia_ingestion():
     from app.jobs.ingest_farmacia_real import ingest_farmacia_real
     logger.info("Starting scheduled Farmacia Popular ingestion")
     await ingest_farmacia_real()
+    # Recalculo pesado e sincrono: fora do event loop da aplicacao
+    await asyncio.to_thread(atualizar_apos_carga, "FARMACIA_POPULAR")
 
 
 async def _run_programa_etl(programa: str):
     """Wrapper for generic program ETL."""
     now = datetime.now()
     orq = OrquestradorETL(modo_mock=False)
-    result = orq.executar_pipeline(programa, now.month, now.year)
+    # Pipeline sincrono (extracao, carga e atualizar_apos_carga): numa thread,
+    # para nao travar as requisicoes no event loop do scheduler
+    result = await asyncio.to_thread(orq.executar_pipeline, programa, now.month, now.year)
     return result
 
 
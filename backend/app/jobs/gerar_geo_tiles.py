@@ -0,0 +1,99 @@
+"""Gera o GeoJSON pre-serializado dos municipios para o mapa.
+
+Para cada nivel de zoom em ``ZOOM_TOLERANCES`` simplifica as geometrias no
+PostGIS (``ST_SimplifyPreserveTopology``), grava os fragmentos JSON de cada
+municipio e o mapa nacional ja comprimido (gzip e, se disponivel, brotli).
+O endpoint ``/geo/municipalities`` passa a servir esses bytes diretamente.
+
+Executar apos ``ingest_mun_geometries`` (ou quando a populacao mudar):
+    python -m app.jobs.gerar_geo_tiles
+"""
+
+import argparse
+import logging
+import time
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.services.geo_tiles import (
+    COORD_DECIMALS,
+    TILES_DIR,
+    ZOOM_TOLERANCES,
+    write_manifest,
+    write_tileset,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MUNICIPIOS_SQL = """
+    SELECT m.ibge_code, m.name, m.state_id, m.population,
+           s.abbreviation AS state,
+           ST_AsGeoJSON({geometria}, :decimais) AS geometry
+    FROM municipalities m
+    JOIN states s ON s.id = m.state_id
+    WHERE m.geometry IS NOT NULL
+    ORDER BY m.ibge_code
+"""
+
+
+def consultar_municipios(db: Session, tolerancia: float) -> Iterator[Dict]:
+    """Municipios com a geometria ja em texto GeoJSON para uma tolerancia."""
+    if tolerancia > 0:
+        geometria = "ST_SimplifyPreserveTopology(m.geometry, :tolerancia)"
+    else:
+        geometria = "m.geometry"
+    result = db.execute(
+        text(MUNICIPIOS_SQL.format(geometria=geometria)),
+        {"tolerancia": tolerancia, "decimais": COORD_DECIMALS},
+    )
+    for row in result.mappings():
+        yield dict(row)
+
+
+def gerar_geo_tiles(
+    db: Session,
+    niveis: Optional[List[int]] = None,
+    diretorio: str = TILES_DIR,
+) -> Dict[int, int]:
+    """Gera os niveis pedidos (todos por padrao).
+
+    Returns:
+        Quantidade de municipios por nivel
+    """
+    contagens = {}
+    for nivel in sorted(niveis or ZOOM_TOLERANCES):
+        inicio = time.monotonic()
+        contagens[nivel] = write_tileset(
+            nivel, consultar_municipios(db, ZOOM_TOLERANCES[nivel]), diretorio
+        )
+        logger.info(
+            f"Nivel z{nivel}: {contagens[nivel]} municipios "
+            f"em {time.monotonic() - inicio:.1f}s"
+        )
+    write_manifest(contagens, diretorio)
+    return contagens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera GeoJSON pre-serializado dos municipios")
+    parser.add_argument(
+        "--niveis", type=int, nargs="*", choices=sorted(ZOOM_TOLERANCES),
+        help="Niveis de zoom a gerar (padrao: todos)",
+    )
+    parser.add_argument("--diretorio", default=TILES_DIR, help="Diretorio de saida")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        contagens = gerar_geo_tiles(db, args.niveis, args.diretorio)
+    finally:
+        db.close()
+    logger.info(f"Geo tiles gerados em {args.diretorio}: {contagens}")
+
+
+if __name__ == "__main__":
+    main()
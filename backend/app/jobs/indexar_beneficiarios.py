@@ -6,6 +6,16 @@ na tabela `beneficiarios` para permitir consultas individuais por CPF.
 Diferente dos outros jobs que agregam por municipio, este armazena dados
 individuais com CPF hashificado (para privacidade).
 
+Os dumps mensais tem varios GB, entao o pipeline e todo em streaming, com
+memoria constante independente do tamanho do arquivo:
+
+1. Download para disco com retomada via HTTP Range (`download_to_file`)
+2. Descompressao do membro CSV do ZIP direto do disco, linha a linha
+3. `COPY` para uma tabela de staging temporaria
+4. Um unico upsert set-based da staging para `beneficiarios`
+5. Reconstrucao do filtro de Bloom de `cpf_hash` (`app.services.filtro_cpf`),
+   que as consultas usam para descartar CPFs fora da base sem ir ao banco
+
 Fonte: https://portaldatransparencia.gov.br/download-de-dados/
 - Bolsa Familia: /novo-bolsa-familia/{YYYYMM}
 - BPC: /bpc/{YYYYMM}
@@ -14,19 +24,28 @@ Fonte: https://portaldatransparencia.gov.br/download-de-dados/
 import asyncio
 import csv
 import io
+import multiprocessing
 import os
+import shutil
+import tempfile
+import time
 import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Optional, Dict, Iterator
+from itertools import islice
+from typing import Optional, Dict, Iterator, Iterable, Tuple, Union
 import logging
-import codecs
 
 import httpx
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
 
 from app.database import SessionLocal
+from app.jobs.carga_em_lote import CopyStream, copy_to_table
 from app.models.beneficiario import Beneficiario, hash_cpf, mask_cpf
+from app.services.filtro_cpf import construir_filtro_beneficiarios
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,6 +54,15 @@ logger = logging.getLogger(__name__)
 BF_URL = "https://dadosabertos-download.cgu.gov.br/PortalDaTransparencia/saida/novo-bolsa-familia"
 BPC_URL = "https://dadosabertos-download.cgu.gov.br/PortalDaTransparencia/saida/bpc"
 
+# Diretorio dos ZIPs baixados (mantidos para retomar downloads interrompidos)
+DOWNLOAD_DIR = os.environ.get(
+    "INDEXAR_DOWNLOAD_DIR",
+    os.path.join(tempfile.gettempdir(), "tanamao_downloads")
+)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_MAX_RETRIES = 5
+DOWNLOAD_RETRY_DELAY = 2.0
+
 # SIAFI to IBGE mapping
 SIAFI_MAPPING_FILE = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
@@ -57,24 +85,184 @@ def load_siafi_mapping() -> Dict[str, str]:
     return mapping
 
 
-async def download_zip(url: str) -> Optional[bytes]:
-    """Download ZIP file."""
-    logger.info(f"Downloading: {url}")
-    async with httpx.AsyncClient(timeout=300.0, follow_redirects=True) as client:
-        try:
-            response = await client.get(url)
-            if response.status_code == 200:
-                logger.info(f"Downloaded {len(response.content):,} bytes")
-                return response.content
-            else:
-                logger.error(f"Download failed: HTTP {response.status_code}")
-                return None
-        except Exception as e:
-            logger.error(f"Download error: {e}")
+async def download_to_file(
+    url: str,
+    dest_path: str,
+    client: Optional[httpx.AsyncClient] = None,
+    max_retries: int = DOWNLOAD_MAX_RETRIES,
+) -> Optional[str]:
+    """Baixa um arquivo para disco em streaming, retomando de onde parou.
+
+    O conteudo vai para `dest_path + ".part"`; a cada tentativa o download
+    continua do tamanho ja gravado usando `Range: bytes=N-`. Se o servidor
+    ignorar o Range (HTTP 200) o arquivo e reescrito do inicio. Arquivos ja
+    concluidos sao reaproveitados.
+
+    Returns:
+        Caminho do arquivo baixado ou None se falhar
+    """
+    if os.path.exists(dest_path):
+        logger.info(f"Using cached download: {dest_path}")
+        return dest_path
+
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    part_path = dest_path + ".part"
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(timeout=300.0, follow_redirects=True)
+
+    try:
+        for attempt in range(1, max_retries + 1):
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            logger.info(f"Downloading: {url} (from byte {offset:,}, attempt {attempt})")
+
+            try:
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 416:
+                        # Nada depois do offset: o .part ja esta completo
+                        break
+                    if response.status_code not in (200, 206):
+                        logger.error(f"Download failed: HTTP {response.status_code}")
+                        return None
+
+                    total = _expected_size(response, offset)
+                    mode = "ab" if response.status_code == 206 else "wb"
+                    with open(part_path, mode) as f:
+                        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+
+                size = os.path.getsize(part_path)
+                if total is None or size >= total:
+                    break
+                logger.warning(f"Incomplete download ({size:,}/{total:,} bytes), resuming")
+            except httpx.HTTPError as e:
+                logger.warning(f"Download error: {e}")
+                await asyncio.sleep(min(DOWNLOAD_RETRY_DELAY * 2 ** (attempt - 1), 30))
+        else:
+            logger.error(f"Download failed after {max_retries} attempts")
             return None
+    finally:
+        if own_client:
+            await client.aclose()
+
+    os.replace(part_path, dest_path)
+    logger.info(f"Downloaded {os.path.getsize(dest_path):,} bytes to {dest_path}")
+    return dest_path
+
+
+def _expected_size(response: httpx.Response, offset: int) -> Optional[int]:
+    """Tamanho total esperado do arquivo, pelos headers da resposta."""
+    content_range = response.headers.get("content-range", "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    length = response.headers.get("content-length")
+    if length and length.isdigit():
+        return int(length) + (offset if response.status_code == 206 else 0)
+    return None
+
+
+def _open_csv_member(zip_source: Union[str, bytes]) -> Iterator[list]:
+    """Abre o primeiro CSV do ZIP e retorna um csv.reader em streaming.
+
+    `zip_source` pode ser o caminho do ZIP em disco (descomprimido sob
+    demanda, sem carregar o arquivo) ou o conteudo em bytes.
+    """
+    if isinstance(zip_source, bytes):
+        zip_source = io.BytesIO(zip_source)
 
+    with zipfile.ZipFile(zip_source) as zf:
+        csv_files = [f for f in zf.namelist() if f.endswith('.csv')]
+        if not csv_files:
+            logger.error("No CSV file found in ZIP")
+            return
+
+        csv_name = csv_files[0]
+        logger.info(f"Processing {csv_name}...")
+
+        with zf.open(csv_name) as csv_file:
+            text_stream = io.TextIOWrapper(csv_file, encoding='latin-1', newline='')
+            yield from csv.reader(text_stream, delimiter=';')
+
+
+def map_bolsa_familia_columns(header: list) -> Dict[str, int]:
+    """Mapeia o cabecalho do CSV do Bolsa Familia para indices de coluna."""
+    col_map = {}
+    for i, col in enumerate(header):
+        col_upper = col.upper().strip()
+        if 'CPF' in col_upper:
+            col_map['cpf'] = i
+        elif 'NIS' in col_upper:
+            col_map['nis'] = i
+        elif 'NOME FAVORECIDO' in col_upper or 'NOME_FAVORECIDO' in col_upper:
+            col_map['nome'] = i
+        elif 'SIAFI' in col_upper:
+            col_map['siafi'] = i
+        elif 'VALOR PARCELA' in col_upper or 'VALOR_PARCELA' in col_upper:
+            col_map['valor'] = i
+        elif col_upper == 'UF':
+            col_map['uf'] = i
+        elif 'MES REFERENCIA' in col_upper or 'MES_REFERENCIA' in col_upper:
+            col_map['mes_ref'] = i
+    return col_map
+
+
+def parse_bolsa_familia_row(
+    row: list,
+    col_map: Dict[str, int],
+    siafi_mapping: Dict[str, str]
+) -> Optional[Dict]:
+    """Converte uma linha do CSV do Bolsa Familia; None se nao tiver CPF."""
+    # Extract CPF
+    cpf = row[col_map['cpf']].strip().replace('.', '').replace('-', '').replace('*', '')
+    if not cpf or len(cpf) < 11:
+        return None
+
+    # Pad with zeros if needed
+    cpf = cpf.zfill(11)
 
-def parse_bolsa_familia_csv(zip_content: bytes, siafi_mapping: Dict[str, str]) -> Iterator[Dict]:
+    # SIAFI to IBGE
+    ibge_code = None
+    if 'siafi' in col_map:
+        siafi = row[col_map['siafi']].strip()
+        ibge_code = siafi_mapping.get(siafi)
+        if not ibge_code and len(siafi) == 7:
+            ibge_code = siafi
+
+    # Parse value
+    valor = 0.0
+    if 'valor' in col_map:
+        try:
+            valor_str = row[col_map['valor']].replace('.', '').replace(',', '.')
+            valor = float(valor_str)
+        except:
+            valor = 0.0
+
+    # Parse reference month
+    mes_ref = None
+    if 'mes_ref' in col_map:
+        mes_str = row[col_map['mes_ref']].strip()
+        if len(mes_str) == 6:  # YYYYMM
+            mes_ref = f"{mes_str[:4]}-{mes_str[4:]}"
+
+    return {
+        'cpf': cpf,
+        'nis': row[col_map.get('nis', 0)].strip() if 'nis' in col_map else None,
+        'nome': row[col_map.get('nome', 0)].strip()[:200] if 'nome' in col_map else None,
+        'uf': row[col_map.get('uf', 0)].strip() if 'uf' in col_map else None,
+        'ibge_code': ibge_code,
+        'bf_valor': valor,
+        'bf_parcela_mes': mes_ref,
+        'programa': 'BOLSA_FAMILIA'
+    }
+
+
+def parse_bolsa_familia_csv(
+    zip_source: Union[str, bytes],
+    siafi_mapping: Dict[str, str]
+) -> Iterator[Dict]:
     """Parse Bolsa Familia CSV e retorna iterador de beneficiarios.
 
     Campos do CSV:
@@ -88,107 +276,109 @@ def parse_bolsa_familia_csv(zip_content: bytes, siafi_mapping: Dict[str, str]) -
     - NOME FAVORECIDO
     - VALOR PARCELA
     """
-    zip_buffer = io.BytesIO(zip_content)
+    reader = _open_csv_member(zip_source)
+    header = next(reader, None)
+    if header is None:
+        return
 
-    with zipfile.ZipFile(zip_buffer) as zf:
-        csv_files = [f for f in zf.namelist() if f.endswith('.csv')]
-        if not csv_files:
-            logger.error("No CSV file found in ZIP")
-            return
+    col_map = map_bolsa_familia_columns(header)
+    logger.info(f"Column mapping: {col_map}")
 
-        csv_name = csv_files[0]
-        logger.info(f"Processing {csv_name}...")
+    if 'cpf' not in col_map:
+        logger.error("CPF column not found!")
+        return
 
-        with zf.open(csv_name) as csv_file:
-            text_stream = codecs.getreader('latin-1')(csv_file)
-            reader = csv.reader(text_stream, delimiter=';')
-            header = next(reader)
-
-            # Map column indices
-            col_map = {}
-            for i, col in enumerate(header):
-                col_upper = col.upper().strip()
-                if 'CPF' in col_upper:
-                    col_map['cpf'] = i
-                elif 'NIS' in col_upper:
-                    col_map['nis'] = i
-                elif 'NOME FAVORECIDO' in col_upper or 'NOME_FAVORECIDO' in col_upper:
-                    col_map['nome'] = i
-                elif 'SIAFI' in col_upper:
-                    col_map['siafi'] = i
-                elif 'VALOR PARCELA' in col_upper or 'VALOR_PARCELA' in col_upper:
-                    col_map['valor'] = i
-                elif col_upper == 'UF':
-                    col_map['uf'] = i
-                elif 'MES REFERENCIA' in col_upper or 'MES_REFERENCIA' in col_upper:
-                    col_map['mes_ref'] = i
-
-            logger.info(f"Column mapping: {col_map}")
-
-            if 'cpf' not in col_map:
-                logger.error("CPF column not found!")
-                return
-
-            row_count = 0
-            for row in reader:
-                row_count += 1
-
-                try:
-                    # Extract CPF
-                    cpf = row[col_map['cpf']].strip().replace('.', '').replace('-', '').replace('*', '')
-                    if not cpf or len(cpf) < 11:
-                        continue
-
-                    # Pad with zeros if needed
-                    cpf = cpf.zfill(11)
-
-                    # SIAFI to IBGE
-                    ibge_code = None
-                    if 'siafi' in col_map:
-                        siafi = row[col_map['siafi']].strip()
-                        ibge_code = siafi_mapping.get(siafi)
-                        if not ibge_code and len(siafi) == 7:
-                            ibge_code = siafi
-
-                    # Parse value
-                    valor = 0.0
-                    if 'valor' in col_map:
-                        try:
-                            valor_str = row[col_map['valor']].replace('.', '').replace(',', '.')
-                            valor = float(valor_str)
-                        except:
-                            valor = 0.0
-
-                    # Parse reference month
-                    mes_ref = None
-                    if 'mes_ref' in col_map:
-                        mes_str = row[col_map['mes_ref']].strip()
-                        if len(mes_str) == 6:  # YYYYMM
-                            mes_ref = f"{mes_str[:4]}-{mes_str[4:]}"
-
-                    yield {
-                        'cpf': cpf,
-                        'nis': row[col_map.get('nis', 0)].strip() if 'nis' in col_map else None,
-                        'nome': row[col_map.get('nome', 0)].strip()[:200] if 'nome' in col_map else None,
-                        'uf': row[col_map.get('uf', 0)].strip() if 'uf' in col_map else None,
-                        'ibge_code': ibge_code,
-                        'bf_valor': valor,
-                        'bf_parcela_mes': mes_ref,
-                        'programa': 'BOLSA_FAMILIA'
-                    }
-
-                except Exception as e:
-                    if row_count < 10:
-                        logger.warning(f"Error parsing row {row_count}: {e}")
-                    continue
-
-                if row_count % 1000000 == 0:
-                    logger.info(f"Processed {row_count:,} rows...")
-
-            logger.info(f"Total rows: {row_count:,}")
-
-
-def parse_bpc_csv(zip_content: bytes, siafi_mapping: Dict[str, str]) -> Iterator[Dict]:
+    row_count = 0
+    for row in reader:
+        row_count += 1
+
+        try:
+            beneficiario = parse_bolsa_familia_row(row, col_map, siafi_mapping)
+        except Exception as e:
+            if row_count < 10:
+                logger.warning(f"Error parsing row {row_count}: {e}")
+            continue
+
+        if beneficiario:
+            yield beneficiario
+
+        if row_count % 1000000 == 0:
+            logger.info(f"Processed {row_count:,} rows...")
+
+    logger.info(f"Total rows: {row_count:,}")
+
+
+def map_bpc_columns(header: list) -> Dict[str, int]:
+    """Mapeia o cabecalho do CSV do BPC para indices de coluna."""
+    col_map = {}
+    for i, col in enumerate(header):
+        col_upper = col.upper().strip()
+        if 'CPF BENEFICIARIO' in col_upper:
+            col_map['cpf'] = i
+        elif 'NIS BENEFICIARIO' in col_upper:
+            col_map['nis'] = i
+        elif 'NOME BENEFICIARIO' in col_upper:
+            col_map['nome'] = i
+        elif 'SIAFI' in col_upper:
+            col_map['siafi'] = i
+        elif 'VALOR PARCELA' in col_upper:
+            col_map['valor'] = i
+        elif col_upper == 'UF':
+            col_map['uf'] = i
+    return col_map
+
+
+def parse_bpc_row(
+    row: list,
+    col_map: Dict[str, int],
+    siafi_mapping: Dict[str, str]
+) -> Optional[Dict]:
+    """Converte uma linha do CSV do BPC; None se nao tiver identificador."""
+    # BPC pode nao ter CPF, usa NIS como fallback
+    id_col = 'cpf' if 'cpf' in col_map else 'nis'
+
+    # Extract identifier
+    id_value = row[col_map[id_col]].strip().replace('.', '').replace('-', '').replace('*', '')
+    if not id_value:
+        return None
+
+    # Use NIS as CPF if no CPF available (create synthetic hash)
+    if id_col == 'nis':
+        cpf = f"NIS{id_value.zfill(11)}"[:11]
+    else:
+        cpf = id_value.zfill(11)
+
+    # SIAFI to IBGE
+    ibge_code = None
+    if 'siafi' in col_map:
+        siafi = row[col_map['siafi']].strip()
+        ibge_code = siafi_mapping.get(siafi)
+
+    # Parse value
+    valor = 0.0
+    if 'valor' in col_map:
+        try:
+            valor_str = row[col_map['valor']].replace('.', '').replace(',', '.')
+            valor = float(valor_str)
+        except:
+            valor = 0.0
+
+    return {
+        'cpf': cpf,
+        'nis': row[col_map.get('nis', 0)].strip() if 'nis' in col_map else None,
+        'nome': row[col_map.get('nome', 0)].strip()[:200] if 'nome' in col_map else None,
+        'uf': row[col_map.get('uf', 0)].strip() if 'uf' in col_map else None,
+        'ibge_code': ibge_code,
+        'bpc_valor': valor,
+        'bpc_tipo': 'BPC',  # Could be parsed from "tipo beneficio" column
+        'programa': 'BPC'
+    }
+
+
+def parse_bpc_csv(
+    zip_source: Union[str, bytes],
+    siafi_mapping: Dict[str, str]
+) -> Iterator[Dict]:
     """Parse BPC CSV e retorna iterador de beneficiarios.
 
     Campos tipicos do CSV BPC (variam por ano):
@@ -205,265 +395,520 @@ def parse_bpc_csv(zip_content: bytes, siafi_mapping: Dict[str, str]) -> Iterator
     - BENEFICIO CONCEDIDO JUDICIALMENTE
     - VALOR PARCELA
     """
-    zip_buffer = io.BytesIO(zip_content)
+    reader = _open_csv_member(zip_source)
+    header = next(reader, None)
+    if header is None:
+        return
 
-    with zipfile.ZipFile(zip_buffer) as zf:
-        csv_files = [f for f in zf.namelist() if f.endswith('.csv')]
-        if not csv_files:
-            logger.error("No CSV file found in ZIP")
-            return
+    logger.info(f"Headers: {header[:15]}")
 
-        csv_name = csv_files[0]
-        logger.info(f"Processing {csv_name}...")
+    col_map = map_bpc_columns(header)
+    logger.info(f"Column mapping: {col_map}")
 
-        with zf.open(csv_name) as csv_file:
-            text_stream = codecs.getreader('latin-1')(csv_file)
-            reader = csv.reader(text_stream, delimiter=';')
-            header = next(reader)
-
-            logger.info(f"Headers: {header[:15]}")
-
-            # Map column indices
-            col_map = {}
-            for i, col in enumerate(header):
-                col_upper = col.upper().strip()
-                if 'CPF BENEFICIARIO' in col_upper:
-                    col_map['cpf'] = i
-                elif 'NIS BENEFICIARIO' in col_upper:
-                    col_map['nis'] = i
-                elif 'NOME BENEFICIARIO' in col_upper:
-                    col_map['nome'] = i
-                elif 'SIAFI' in col_upper:
-                    col_map['siafi'] = i
-                elif 'VALOR PARCELA' in col_upper:
-                    col_map['valor'] = i
-                elif col_upper == 'UF':
-                    col_map['uf'] = i
-
-            logger.info(f"Column mapping: {col_map}")
-
-            # BPC pode nao ter CPF, usa NIS como fallback
-            id_col = 'cpf' if 'cpf' in col_map else 'nis'
-            if id_col not in col_map:
-                logger.error("No CPF or NIS column found!")
-                return
-
-            row_count = 0
-            for row in reader:
-                row_count += 1
-
-                try:
-                    # Extract identifier
-                    id_value = row[col_map[id_col]].strip().replace('.', '').replace('-', '').replace('*', '')
-                    if not id_value:
-                        continue
-
-                    # Use NIS as CPF if no CPF available (create synthetic hash)
-                    if id_col == 'nis':
-                        cpf = f"NIS{id_value.zfill(11)}"[:11]
-                    else:
-                        cpf = id_value.zfill(11)
-
-                    # SIAFI to IBGE
-                    ibge_code = None
-                    if 'siafi' in col_map:
-                        siafi = row[col_map['siafi']].strip()
-                        ibge_code = siafi_mapping.get(siafi)
-
-                    # Parse value
-                    valor = 0.0
-                    if 'valor' in col_map:
-                        try:
-                            valor_str = row[col_map['valor']].replace('.', '').replace(',', '.')
-                            valor = float(valor_str)
-                        except:
-                            valor = 0.0
-
-                    yield {
-                        'cpf': cpf,
-                        'nis': row[col_map.get('nis', 0)].strip() if 'nis' in col_map else None,
-                        'nome': row[col_map.get('nome', 0)].strip()[:200] if 'nome' in col_map else None,
-                        'uf': row[col_map.get('uf', 0)].strip() if 'uf' in col_map else None,
-                        'ibge_code': ibge_code,
-                        'bpc_valor': valor,
-                        'bpc_tipo': 'BPC',  # Could be parsed from "tipo beneficio" column
-                        'programa': 'BPC'
-                    }
-
-                except Exception as e:
-                    if row_count < 10:
-                        logger.warning(f"Error parsing row {row_count}: {e}")
-                    continue
-
-                if row_count % 500000 == 0:
-                    logger.info(f"Processed {row_count:,} rows...")
-
-            logger.info(f"Total rows: {row_count:,}")
-
-
-def upsert_beneficiarios(db: Session, beneficiarios: Iterator[Dict], batch_size: int = 10000):
-    """Insere ou atualiza beneficiarios em lotes.
-
-    Usa upsert para atualizar se CPF ja existe.
-    """
-    batch = []
-    total_inserted = 0
-    total_updated = 0
+    if 'cpf' not in col_map and 'nis' not in col_map:
+        logger.error("No CPF or NIS column found!")
+        return
+
+    row_count = 0
+    for row in reader:
+        row_count += 1
+
+        try:
+            beneficiario = parse_bpc_row(row, col_map, siafi_mapping)
+        except Exception as e:
+            if row_count < 10:
+                logger.warning(f"Error parsing row {row_count}: {e}")
+            continue
 
+        if beneficiario:
+            yield beneficiario
+
+        if row_count % 500000 == 0:
+            logger.info(f"Processed {row_count:,} rows...")
+
+    logger.info(f"Total rows: {row_count:,}")
+
+
+# Colunas da staging, na ordem do COPY
+STAGING_COLUMNS = (
+    "cpf_hash", "cpf_masked", "nis", "nome", "uf", "ibge_code",
+    "valor", "parcela_mes", "tipo",
+)
+
+# Campos especificos de cada programa em `beneficiarios`
+PROGRAM_COLUMNS = {
+    "BOLSA_FAMILIA": {
+        "ativo": "bf_ativo",
+        "valor": "bf_valor",
+        "parcela_mes": "bf_parcela_mes",
+        "data_referencia": "bf_data_referencia",
+    },
+    "BPC": {
+        "ativo": "bpc_ativo",
+        "valor": "bpc_valor",
+        "tipo": "bpc_tipo",
+        "data_referencia": "bpc_data_referencia",
+    },
+}
+
+
+def staging_rows(beneficiarios: Iterable[Dict]) -> Iterator[Tuple]:
+    """Converte beneficiarios parseados em linhas da staging (CPF ja hasheado)."""
     for ben in beneficiarios:
         cpf = ben['cpf']
-        cpf_hashed = hash_cpf(cpf)
-        cpf_masked = mask_cpf(cpf)
-
-        record = {
-            'cpf_hash': cpf_hashed,
-            'cpf_masked': cpf_masked,
-            'nis': ben.get('nis'),
-            'nome': ben.get('nome'),
-            'uf': ben.get('uf'),
-            'ibge_code': ben.get('ibge_code'),
-            'atualizado_em': datetime.utcnow(),
-            'fonte': 'PORTAL_TRANSPARENCIA'
-        }
-
-        # Set program-specific fields
-        if ben.get('programa') == 'BOLSA_FAMILIA':
-            record['bf_ativo'] = True
-            record['bf_valor'] = ben.get('bf_valor')
-            record['bf_parcela_mes'] = ben.get('bf_parcela_mes')
-            record['bf_data_referencia'] = date.today()
-        elif ben.get('programa') == 'BPC':
-            record['bpc_ativo'] = True
-            record['bpc_valor'] = ben.get('bpc_valor')
-            record['bpc_tipo'] = ben.get('bpc_tipo')
-            record['bpc_data_referencia'] = date.today()
-
-        batch.append(record)
-
-        if len(batch) >= batch_size:
-            inserted, updated = _execute_upsert(db, batch)
-            total_inserted += inserted
-            total_updated += updated
-            batch = []
-            logger.info(f"Progress: {total_inserted + total_updated:,} records processed")
-
-    # Final batch
-    if batch:
-        inserted, updated = _execute_upsert(db, batch)
-        total_inserted += inserted
-        total_updated += updated
-
-    logger.info(f"Total: {total_inserted:,} inserted, {total_updated:,} updated")
-    return total_inserted, total_updated
-
-
-def _execute_upsert(db: Session, records: list) -> tuple:
-    """Execute upsert for a batch of records."""
-    if not records:
-        return 0, 0
-
-    stmt = insert(Beneficiario).values(records)
-
-    # On conflict, update relevant fields
-    update_dict = {
-        'nome': stmt.excluded.nome,
-        'uf': stmt.excluded.uf,
-        'ibge_code': stmt.excluded.ibge_code,
-        'atualizado_em': stmt.excluded.atualizado_em,
+        programa = ben.get('programa')
+        yield (
+            hash_cpf(cpf),
+            mask_cpf(cpf),
+            ben.get('nis'),
+            ben.get('nome'),
+            ben.get('uf'),
+            ben.get('ibge_code'),
+            ben.get('bf_valor') if programa == 'BOLSA_FAMILIA' else ben.get('bpc_valor'),
+            ben.get('bf_parcela_mes'),
+            ben.get('bpc_tipo'),
+        )
+
+
+def _merge_sql(programa: str) -> str:
+    """Upsert set-based da staging para `beneficiarios` de um programa."""
+    cols = PROGRAM_COLUMNS[programa]
+    program_values = {
+        cols["ativo"]: "TRUE",
+        cols["valor"]: "s.valor",
+        cols["data_referencia"]: ":data_referencia",
     }
+    if "parcela_mes" in cols:
+        program_values[cols["parcela_mes"]] = "s.parcela_mes"
+    if "tipo" in cols:
+        program_values[cols["tipo"]] = "s.tipo"
+
+    insert_cols = [
+        "cpf_hash", "cpf_masked", "nis", "nome", "uf", "ibge_code",
+        *program_values, "fonte", "criado_em", "atualizado_em",
+    ]
+    select_values = [
+        "s.cpf_hash", "s.cpf_masked", "s.nis", "s.nome", "s.uf",
+        # FK: codigos fora de municipalities viram NULL em vez de abortar o lote
+        "m.ibge_code",
+        *program_values.values(),
+        "'PORTAL_TRANSPARENCIA'", ":agora", ":agora",
+    ]
+    update_cols = ["nome", "uf", "ibge_code", "atualizado_em", *program_values]
+
+    return f"""
+        WITH upserted AS (
+            INSERT INTO beneficiarios ({", ".join(insert_cols)})
+            SELECT DISTINCT ON (s.cpf_hash) {", ".join(select_values)}
+            FROM beneficiarios_staging s
+            LEFT JOIN municipalities m ON m.ibge_code = s.ibge_code
+            ORDER BY s.cpf_hash
+            ON CONFLICT (cpf_hash) DO UPDATE SET
+                {", ".join(f"{c} = EXCLUDED.{c}" for c in update_cols)}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT
+            count(*) FILTER (WHERE inserted),
+            count(*) FILTER (WHERE NOT inserted)
+        FROM upserted
+    """
 
-    # Update program-specific fields based on what's being inserted
-    if records[0].get('bf_ativo'):
-        update_dict.update({
-            'bf_ativo': stmt.excluded.bf_ativo,
-            'bf_valor': stmt.excluded.bf_valor,
-            'bf_parcela_mes': stmt.excluded.bf_parcela_mes,
-            'bf_data_referencia': stmt.excluded.bf_data_referencia,
-        })
-    if records[0].get('bpc_ativo'):
-        update_dict.update({
-            'bpc_ativo': stmt.excluded.bpc_ativo,
-            'bpc_valor': stmt.excluded.bpc_valor,
-            'bpc_tipo': stmt.excluded.bpc_tipo,
-            'bpc_data_referencia': stmt.excluded.bpc_data_referencia,
-        })
-
-    upsert_stmt = stmt.on_conflict_do_update(
-        index_elements=['cpf_hash'],
-        set_=update_dict
-    )
 
+def _copy_and_merge(
+    db: Session,
+    stream: CopyStream,
+    programa: str,
+    data_referencia: date,
+) -> Dict[str, float]:
+    """COPY do stream para a staging e upsert set-based, em uma transacao.
+
+    Returns:
+        Dict com inserted, updated, copied, copy_seconds e merge_seconds
+    """
     try:
-        db.execute(upsert_stmt)
+        db.execute(text("""
+            CREATE TEMP TABLE beneficiarios_staging (
+                cpf_hash VARCHAR(64) NOT NULL,
+                cpf_masked VARCHAR(14),
+                nis VARCHAR(11),
+                nome VARCHAR(200),
+                uf VARCHAR(2),
+                ibge_code VARCHAR(7),
+                valor NUMERIC(10, 2),
+                parcela_mes VARCHAR(7),
+                tipo VARCHAR(20)
+            ) ON COMMIT DROP
+        """))
+
+        copy_seconds = copy_to_table(db, "beneficiarios_staging", STAGING_COLUMNS, stream)
+        logger.info(f"COPY: {stream.rows_read:,} linhas em {copy_seconds:.1f}s")
+
+        inicio = time.perf_counter()
+        inserted, updated = db.execute(
+            text(_merge_sql(programa)),
+            {"data_referencia": data_referencia, "agora": datetime.utcnow()},
+        ).one()
         db.commit()
-        # PostgreSQL doesn't easily tell us inserted vs updated, so we estimate
-        return len(records), 0
-    except Exception as e:
-        logger.error(f"Upsert error: {e}")
+        merge_seconds = time.perf_counter() - inicio
+    except Exception:
         db.rollback()
-        return 0, 0
+        raise
+
+    logger.info(
+        f"Total: {inserted:,} inserted, {updated:,} updated "
+        f"({stream.rows_read - inserted - updated:,} linhas duplicadas), "
+        f"merge em {merge_seconds:.1f}s"
+    )
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "copied": stream.rows_read,
+        "copy_seconds": copy_seconds,
+        "merge_seconds": merge_seconds,
+    }
+
+
+def upsert_beneficiarios(
+    db: Session,
+    beneficiarios: Iterable[Dict],
+    programa: str,
+    data_referencia: Optional[date] = None,
+) -> Tuple[int, int]:
+    """Carrega beneficiarios via COPY em staging e faz um unico upsert.
+
+    Tudo roda em uma transacao: a staging e temporaria (ON COMMIT DROP) e o
+    merge so e confirmado se o arquivo inteiro carregar.
+
+    Returns:
+        Tupla (inseridos, atualizados)
+    """
+    result = _copy_and_merge(
+        db,
+        CopyStream.from_rows(staging_rows(beneficiarios)),
+        programa,
+        data_referencia or date.today(),
+    )
+    return result["inserted"], result["updated"]
+
+
+# =============================================================================
+# Modo paralelo (process pool)
+# =============================================================================
+
+# Bytes do CSV descomprimido por tarefa (~80 mil linhas)
+PARALLEL_CHUNK_BYTES = 8 * 1024 * 1024
+
+PARSERS = {
+    "BOLSA_FAMILIA": (map_bolsa_familia_columns, parse_bolsa_familia_row),
+    "BPC": (map_bpc_columns, parse_bpc_row),
+}
+
+
+@dataclass
+class PipelineStats:
+    """Contadores e tempos por estagio do modo paralelo.
+
+    `parse_seconds` e `hash_seconds` somam o tempo de CPU de todos os
+    workers; a vazao por estagio divide pelo numero de workers.
+    """
+    workers: int
+    chunks: int = 0
+    rows_parsed: int = 0
+    rows_valid: int = 0
+    parse_seconds: float = 0.0
+    hash_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    copy_seconds: float = 0.0
+    merge_seconds: float = 0.0
+
+    def add_chunk(self, rows: int, valid: int, parse_seconds: float, hash_seconds: float):
+        self.chunks += 1
+        self.rows_parsed += rows
+        self.rows_valid += valid
+        self.parse_seconds += parse_seconds
+        self.hash_seconds += hash_seconds
+
+    @staticmethod
+    def _rate(rows: int, seconds: float) -> float:
+        return rows / seconds if seconds > 0 else 0.0
+
+    @property
+    def parsed_per_second(self) -> float:
+        return self._rate(self.rows_parsed, self.parse_seconds / self.workers)
+
+    @property
+    def hashed_per_second(self) -> float:
+        return self._rate(self.rows_valid, self.hash_seconds / self.workers)
+
+    @property
+    def loaded_per_second(self) -> float:
+        # Tempo do COPY sem a espera pelos workers
+        return self._rate(self.rows_valid, max(self.copy_seconds - self.wait_seconds, 0.0))
+
+    def log(self):
+        logger.info(
+            f"Pipeline ({self.workers} workers, {self.chunks} chunks): "
+            f"parse {self.parsed_per_second:,.0f} linhas/s, "
+            f"hash {self.hashed_per_second:,.0f} linhas/s, "
+            f"load {self.loaded_per_second:,.0f} linhas/s, "
+            f"espera por workers {self.wait_seconds:.1f}s, merge {self.merge_seconds:.1f}s"
+        )
+
+
+def extract_csv_member(zip_path: str, dest_dir: str) -> Optional[str]:
+    """Descomprime o primeiro CSV do ZIP para disco, em streaming."""
+    with zipfile.ZipFile(zip_path) as zf:
+        csv_files = [f for f in zf.namelist() if f.endswith('.csv')]
+        if not csv_files:
+            logger.error("No CSV file found in ZIP")
+            return None
+
+        os.makedirs(dest_dir, exist_ok=True)
+        fd, csv_path = tempfile.mkstemp(suffix=".csv", dir=dest_dir)
+        with zf.open(csv_files[0]) as src, os.fdopen(fd, "wb") as dst:
+            shutil.copyfileobj(src, dst, DOWNLOAD_CHUNK_SIZE)
+    return csv_path
+
+
+def read_csv_header(csv_path: str) -> Tuple[list, int]:
+    """Le o cabecalho do CSV; retorna (colunas, offset do fim do cabecalho)."""
+    with open(csv_path, "rb") as f:
+        line = f.readline()
+        header = next(csv.reader([line.decode("latin-1")], delimiter=';'), [])
+        return header, f.tell()
+
+
+def split_line_ranges(csv_path: str, start: int, chunk_bytes: int) -> list:
+    """Divide o arquivo em faixas de bytes `(inicio, fim)` alinhadas em fim de linha.
+
+    Os CSVs do Portal nao tem quebras de linha dentro de campos, entao cada
+    faixa pode ser parseada de forma independente.
+    """
+    size = os.path.getsize(csv_path)
+    ranges = []
+    with open(csv_path, "rb") as f:
+        pos = start
+        while pos < size:
+            end = min(pos + chunk_bytes, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((pos, end))
+            pos = end
+    return ranges
+
+
+_worker_state: Dict[str, object] = {}
+
+
+def _init_worker(programa: str, col_map: Dict[str, int], siafi_mapping: Dict[str, str]):
+    """Inicializa o worker com o que e igual para todas as faixas."""
+    _worker_state["parse_row"] = PARSERS[programa][1]
+    _worker_state["col_map"] = col_map
+    _worker_state["siafi_mapping"] = siafi_mapping
+
+
+def _process_range(csv_path: str, start: int, end: int) -> Tuple[str, int, int, float, float]:
+    """Parseia e hasheia uma faixa do CSV no worker.
+
+    Returns:
+        (texto CSV para o COPY, linhas lidas, linhas validas,
+         segundos de parse, segundos de hash/serializacao)
+    """
+    parse_row = _worker_state["parse_row"]
+    col_map = _worker_state["col_map"]
+    siafi_mapping = _worker_state["siafi_mapping"]
+
+    inicio = time.perf_counter()
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    reader = csv.reader(io.StringIO(data.decode("latin-1"), newline=""), delimiter=';')
+    parsed = []
+    rows = 0
+    for row in reader:
+        rows += 1
+        try:
+            beneficiario = parse_row(row, col_map, siafi_mapping)
+        except Exception:
+            continue
+        if beneficiario:
+            parsed.append(beneficiario)
+    parsed_at = time.perf_counter()
+
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerows(staging_rows(parsed))
+    hashed_at = time.perf_counter()
 
+    return out.getvalue(), rows, len(parsed), parsed_at - inicio, hashed_at - parsed_at
 
-async def indexar_bolsa_familia(year: int, month: int):
+
+def parallel_staging_blocks(
+    csv_path: str,
+    programa: str,
+    siafi_mapping: Dict[str, str],
+    stats: PipelineStats,
+    chunk_bytes: int = PARALLEL_CHUNK_BYTES,
+) -> Iterator[Tuple[str, int]]:
+    """Gera os blocos da staging, na ordem do arquivo, parseados em paralelo.
+
+    No maximo `2 * workers` faixas ficam em voo, entao a memoria nao cresce
+    se o COPY for mais lento que os workers.
+    """
+    map_columns = PARSERS[programa][0]
+    header, header_end = read_csv_header(csv_path)
+    col_map = map_columns(header)
+    logger.info(f"Column mapping: {col_map}")
+    if 'cpf' not in col_map and not (programa == "BPC" and 'nis' in col_map):
+        logger.error("No CPF column found!")
+        return
+
+    ranges = split_line_ranges(csv_path, header_end, chunk_bytes)
+    max_inflight = 2 * stats.workers
+
+    with ProcessPoolExecutor(
+        max_workers=stats.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(programa, col_map, siafi_mapping),
+    ) as executor:
+        pending = deque()
+        remaining = iter(ranges)
+        for start, end in islice(remaining, max_inflight):
+            pending.append(executor.submit(_process_range, csv_path, start, end))
+
+        while pending:
+            esperando = time.perf_counter()
+            data, rows, valid, parse_seconds, hash_seconds = pending.popleft().result()
+            stats.wait_seconds += time.perf_counter() - esperando
+
+            proxima = next(remaining, None)
+            if proxima:
+                pending.append(executor.submit(_process_range, csv_path, *proxima))
+
+            stats.add_chunk(rows, valid, parse_seconds, hash_seconds)
+            if stats.chunks % 50 == 0:
+                logger.info(f"Processed {stats.rows_parsed:,} rows ({stats.chunks}/{len(ranges)} chunks)...")
+            if valid:
+                yield data, valid
+
+
+def upsert_beneficiarios_paralelo(
+    db: Session,
+    zip_path: str,
+    programa: str,
+    siafi_mapping: Dict[str, str],
+    workers: Optional[int] = None,
+    chunk_bytes: int = PARALLEL_CHUNK_BYTES,
+    data_referencia: Optional[date] = None,
+) -> Tuple[int, int, PipelineStats]:
+    """Como `upsert_beneficiarios`, com parse e hash em um process pool.
+
+    O CSV e descomprimido para disco, dividido em faixas de bytes alinhadas
+    em linhas, parseado/hasheado em todos os cores e entregue em ordem a um
+    unico COPY.
+
+    Returns:
+        Tupla (inseridos, atualizados, estatisticas por estagio)
+    """
+    stats = PipelineStats(workers=workers or os.cpu_count() or 1)
+    csv_path = extract_csv_member(zip_path, DOWNLOAD_DIR)
+    if not csv_path:
+        return 0, 0, stats
+
+    try:
+        result = _copy_and_merge(
+            db,
+            CopyStream(parallel_staging_blocks(csv_path, programa, siafi_mapping, stats, chunk_bytes)),
+            programa,
+            data_referencia or date.today(),
+        )
+    finally:
+        os.remove(csv_path)
+
+    stats.copy_seconds = result["copy_seconds"]
+    stats.merge_seconds = result["merge_seconds"]
+    stats.log()
+    return result["inserted"], result["updated"], stats
+
+
+async def _carregar(zip_path: str, programa: str, parse, workers: Optional[int]) -> Tuple[int, int]:
+    """Carrega um ZIP baixado no modo serial ou paralelo (`workers`)."""
+    siafi_mapping = load_siafi_mapping()
+
+    db = SessionLocal()
+    try:
+        if workers:
+            inserted, updated, _ = await asyncio.to_thread(
+                upsert_beneficiarios_paralelo, db, zip_path, programa, siafi_mapping, workers
+            )
+        else:
+            inserted, updated = await asyncio.to_thread(
+                upsert_beneficiarios, db, parse(zip_path, siafi_mapping), programa
+            )
+        await asyncio.to_thread(construir_filtro_beneficiarios, db)
+        return inserted, updated
+    finally:
+        db.close()
+
+
+def reconstruir_filtro() -> None:
+    """Reconstroi o filtro de CPFs a partir da tabela (sem nova carga)."""
+    db = SessionLocal()
+    try:
+        construir_filtro_beneficiarios(db)
+    finally:
+        db.close()
+
+
+async def indexar_bolsa_familia(year: int, month: int, workers: Optional[int] = None):
     """Indexa beneficiarios do Bolsa Familia de um mes.
 
     Args:
         year: Ano (ex: 2024)
         month: Mes (1-12)
+        workers: Processos para parse/hash em paralelo (None = serial)
     """
     period = f"{year}{month:02d}"
     url = f"{BF_URL}/{period}_NovoBolsaFamilia.zip"
 
     logger.info(f"=== Indexando Bolsa Familia {period} ===")
 
-    # Download
-    zip_content = await download_zip(url)
-    if not zip_content:
+    # Download (streaming para disco, retomavel)
+    zip_path = await download_to_file(url, os.path.join(DOWNLOAD_DIR, os.path.basename(url)))
+    if not zip_path:
         logger.error("Failed to download")
         return
 
-    # Load SIAFI mapping
-    siafi_mapping = load_siafi_mapping()
-
-    # Parse and insert
-    db = SessionLocal()
-    try:
-        beneficiarios = parse_bolsa_familia_csv(zip_content, siafi_mapping)
-        inserted, updated = upsert_beneficiarios(db, beneficiarios)
-        logger.info(f"=== Concluido: {inserted + updated:,} beneficiarios indexados ===")
-    finally:
-        db.close()
+    # Parse and load
+    inserted, updated = await _carregar(zip_path, "BOLSA_FAMILIA", parse_bolsa_familia_csv, workers)
+    logger.info(f"=== Concluido: {inserted + updated:,} beneficiarios indexados ===")
 
 
-async def indexar_bpc(year: int, month: int):
+async def indexar_bpc(year: int, month: int, workers: Optional[int] = None):
     """Indexa beneficiarios do BPC de um mes.
 
     Args:
         year: Ano (ex: 2024)
         month: Mes (1-12)
+        workers: Processos para parse/hash em paralelo (None = serial)
     """
     period = f"{year}{month:02d}"
     url = f"{BPC_URL}/{period}_BPC.zip"
 
     logger.info(f"=== Indexando BPC {period} ===")
 
-    # Download
-    zip_content = await download_zip(url)
-    if not zip_content:
+    # Download (streaming para disco, retomavel)
+    zip_path = await download_to_file(url, os.path.join(DOWNLOAD_DIR, os.path.basename(url)))
+    if not zip_path:
         logger.error("Failed to download")
         return
 
-    # Load SIAFI mapping
-    siafi_mapping = load_siafi_mapping()
-
-    # Parse and insert
-    db = SessionLocal()
-    try:
-        beneficiarios = parse_bpc_csv(zip_content, siafi_mapping)
-        inserted, updated = upsert_beneficiarios(db, beneficiarios)
-        logger.info(f"=== Concluido: {inserted + updated:,} beneficiarios indexados ===")
-    finally:
-        db.close()
+    # Parse and load
+    inserted, updated = await _carregar(zip_path, "BPC", parse_bpc_csv, workers)
+    logger.info(f"=== Concluido: {inserted + updated:,} beneficiarios indexados ===")
 
 
 def consultar_por_cpf(cpf: str) -> Optional[Dict]:
@@ -489,24 +934,36 @@ def consultar_por_cpf(cpf: str) -> Optional[Dict]:
 if __name__ == "__main__":
     import sys
 
-    if len(sys.argv) < 3:
+    if len(sys.argv) < 3 and sys.argv[1:] != ["filtro"]:
         print("Uso:")
         print("  python -m app.jobs.indexar_beneficiarios bf 2024 10")
         print("  python -m app.jobs.indexar_beneficiarios bpc 2024 10")
+        print("  python -m app.jobs.indexar_beneficiarios bf 2024 10 --workers 8")
         print("  python -m app.jobs.indexar_beneficiarios consultar 12345678900")
+        print("  python -m app.jobs.indexar_beneficiarios filtro")
         sys.exit(1)
 
+    # --workers N: parse/hash em process pool (0 = todos os cores)
+    workers = None
+    if "--workers" in sys.argv:
+        pos = sys.argv.index("--workers")
+        workers = int(sys.argv[pos + 1]) or os.cpu_count()
+        del sys.argv[pos:pos + 2]
+
     comando = sys.argv[1].lower()
 
     if comando == "bf":
         year = int(sys.argv[2])
         month = int(sys.argv[3])
-        asyncio.run(indexar_bolsa_familia(year, month))
+        asyncio.run(indexar_bolsa_familia(year, month, workers))
 
     elif comando == "bpc":
         year = int(sys.argv[2])
         month = int(sys.argv[3])
-        asyncio.run(indexar_bpc(year, month))
+        asyncio.run(indexar_bpc(year, month, workers))
+
+    elif comando == "filtro":
+        reconstruir_filtro()
 
     elif comando == "consultar":
         cpf = sys.argv[2]
@@ -20,12 +20,20 @@ import httpx
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
-from app.models import Municipality, Program, BeneficiaryData
+from app.jobs.carga_em_lote import (
+    carregar_beneficiary_data,
+    id_programa,
+    mapa_municipios,
+    resolver_municipio,
+)
 from app.models.program import ProgramCode
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Metrics overwritten when the month is re-ingested
+UPDATE_COLUMNS = ("total_beneficiaries", "total_families", "total_value_brl")
+
 # Portal da Transparência URLs
 BASE_URL = "https://portaldatransparencia.gov.br/download-de-dados/novo-bolsa-familia"
 DIRECT_URL = "https://dadosabertos-download.cgu.gov.br/PortalDaTransparencia/saida/novo-bolsa-familia"
@@ -196,28 +204,22 @@ def save_as_cadunico(db: Session, data: Dict[str, Dict], reference_date: date):
     Since all BF beneficiaries are in CadÚnico, this provides a baseline
     for the most vulnerable population.
     """
-    # Build municipality lookup
-    municipalities = {m.ibge_code: m for m in db.query(Municipality).all()}
-    for mun in list(municipalities.values()):
-        if len(mun.ibge_code) == 7:
-            municipalities[mun.ibge_code[:6]] = mun
-
-    records_created = 0
-    records_updated = 0
+    municipalities = mapa_municipios(db)
+
+    program_id = id_programa(db, ProgramCode.BOLSA_FAMILIA)
+    if not program_id:
+        logger.error("Bolsa Família program not found in database")
+        return 0, 0
+
+    rows = []
     not_found = 0
 
     total_families = 0
     total_persons = 0
 
     for ibge_code, mun_data in data.items():
-        # Find municipality
-        municipality = municipalities.get(ibge_code)
-        if not municipality and len(ibge_code) == 7:
-            municipality = municipalities.get(ibge_code[:6])
-        if not municipality and len(ibge_code) == 6:
-            municipality = municipalities.get(ibge_code + "0")
-
-        if not municipality:
+        municipality_id = resolver_municipio(municipalities, ibge_code)
+        if municipality_id is None:
             not_found += 1
             continue
 
@@ -228,48 +230,21 @@ def save_as_cadunico(db: Session, data: Dict[str, Dict], reference_date: date):
         total_families += families
         total_persons += persons
 
-        # Estimate income brackets based on BF eligibility
-        # BF: 100% in poverty or extreme poverty
-        # ~60% extreme poverty, ~40% poverty
-        int(families * 0.60)
-        int(families * 0.40)
-
-        # Get or create Bolsa Família program
-        program = db.query(Program).filter(Program.code == ProgramCode.BOLSA_FAMILIA).first()
-        if not program:
-            logger.error("Bolsa Família program not found in database")
-            continue
-
-        # Check if exists
-        existing = db.query(BeneficiaryData).filter(
-            BeneficiaryData.municipality_id == municipality.id,
-            BeneficiaryData.program_id == program.id,
-            BeneficiaryData.reference_date == reference_date
-        ).first()
-
-        if existing:
-            existing.total_beneficiaries = families  # BF = families, not persons
-            existing.total_families = families
-            existing.total_value_brl = Decimal(str(mun_data["total_value"]))
+        rows.append({
+            "municipality_id": municipality_id,
+            "program_id": program_id,
+            "reference_date": reference_date,
+            "total_beneficiaries": families,  # BF = families, not persons
+            "total_families": families,
+            "total_value_brl": Decimal(str(mun_data["total_value"])),
             # Coverage is calculated as families / total families in CadÚnico
             # This will be updated later when we have real CadÚnico data
-            records_updated += 1
-        else:
-            beneficiary_data = BeneficiaryData(
-                municipality_id=municipality.id,
-                program_id=program.id,
-                reference_date=reference_date,
-                total_beneficiaries=families,  # BF = families, not persons
-                total_families=families,
-                total_value_brl=Decimal(str(mun_data["total_value"])),
-                coverage_rate=0.0,  # Will be calculated later with real CadÚnico data
-            )
-            db.add(beneficiary_data)
-            records_created += 1
-
-    db.commit()
-
-    logger.info(f"Created {records_created}, updated {records_updated} records")
+            "coverage_rate": 0.0,
+        })
+
+    result = carregar_beneficiary_data(db, rows, atualizar=UPDATE_COLUMNS)
+
+    logger.info(f"Created {result.inseridos}, updated {result.atualizados} records")
     logger.info(f"Not found: {not_found} municipalities")
     logger.info(f"Total families: {total_families:,}")
     logger.info(f"Total persons (estimated): {total_persons:,}")
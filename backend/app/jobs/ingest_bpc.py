@@ -21,11 +21,15 @@ from sqlalchemy import func
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.database import SessionLocal
-from app.models import Municipality, Program, BeneficiaryData
+from app.jobs.carga_em_lote import carregar_beneficiary_data, familias_cadunico
+from app.models import Municipality, Program
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Metrics overwritten when the month is re-ingested
+UPDATE_COLUMNS = ("total_beneficiaries", "total_families", "total_value_brl")
+
 # Portal da Transparência API
 API_BASE_URL = "https://api.portaldatransparencia.gov.br/api-de-dados"
 API_TOKEN = os.getenv("PORTAL_TRANSPARENCIA_TOKEN", "")
@@ -110,56 +114,33 @@ async def fetch_all_municipalities_bpc(year_month: str, db: Session) -> Dict[str
 
 def save_bpc_data(db: Session, data: Dict[str, Dict], reference_date: date, program_id: int):
     """Save BPC data to database."""
-    records_created = 0
+    cadunico_families = familias_cadunico(db)
+    rows = []
 
     for ibge_code, mun_data in data.items():
-        # Get CadÚnico families for coverage calculation
-        from app.models import CadUnicoData
-
-        cadunico = (
-            db.query(CadUnicoData)
-            .filter(CadUnicoData.municipality_id == mun_data["municipality_id"])
-            .order_by(CadUnicoData.reference_date.desc())
-            .first()
-        )
-
-        cadunico_families = cadunico.total_families if cadunico else 0
+        # CadÚnico families for coverage calculation
+        families = cadunico_families.get(mun_data["municipality_id"], 0)
         coverage = (
-            mun_data["total_beneficiaries"] / cadunico_families
-            if cadunico_families > 0 else 0
+            mun_data["total_beneficiaries"] / families
+            if families > 0 else 0
         )
 
-        # Check if record exists
-        existing = db.query(BeneficiaryData).filter(
-            BeneficiaryData.municipality_id == mun_data["municipality_id"],
-            BeneficiaryData.program_id == program_id,
-            BeneficiaryData.reference_date == reference_date
-        ).first()
-
-        if existing:
-            existing.total_beneficiaries = mun_data["total_beneficiaries"]
-            existing.total_families = int(mun_data["total_beneficiaries"] * 0.9)  # Estimate
-            existing.total_value_brl = Decimal(str(mun_data["total_value_brl"]))
-            existing.coverage_rate = Decimal(str(min(coverage, 1.0)))
-            existing.data_source = "PORTAL_TRANSPARENCIA"
-        else:
-            beneficiary_data = BeneficiaryData(
-                municipality_id=mun_data["municipality_id"],
-                program_id=program_id,
-                reference_date=reference_date,
-                total_beneficiaries=mun_data["total_beneficiaries"],
-                total_families=int(mun_data["total_beneficiaries"] * 0.9),
-                total_value_brl=Decimal(str(mun_data["total_value_brl"])),
-                coverage_rate=Decimal(str(min(coverage, 1.0))),
-                data_source="PORTAL_TRANSPARENCIA",
-                extra_data={"source": "BPC/LOAS"}
-            )
-            db.add(beneficiary_data)
-
-        records_created += 1
+        rows.append({
+            "municipality_id": mun_data["municipality_id"],
+            "program_id": program_id,
+            "reference_date": reference_date,
+            "total_beneficiaries": mun_data["total_beneficiaries"],
+            "total_families": int(mun_data["total_beneficiaries"] * 0.9),  # Estimate
+            "total_value_brl": Decimal(str(mun_data["total_value_brl"])),
+            "coverage_rate": Decimal(str(min(coverage, 1.0))),
+            "data_source": "PORTAL_TRANSPARENCIA",
+            "extra_data": {"source": "BPC/LOAS"},
+        })
 
-    db.commit()
-    logger.info(f"Saved {records_created} BPC records")
+    result = carregar_beneficiary_data(
+        db, rows, atualizar=(*UPDATE_COLUMNS, "coverage_rate", "data_source")
+    )
+    logger.info(f"Saved {result.inseridos + result.atualizados} BPC records")
 
 
 async def ingest_bpc_data(year_month: Optional[str] = None):
@@ -246,10 +227,11 @@ async def ingest_bpc_simulated():
         # Get total population
         total_pop = db.query(func.sum(Municipality.population)).scalar() or 1
 
-        municipalities = db.query(Municipality).all()
+        municipalities = db.query(Municipality.id, Municipality.population).all()
+        cadunico_families = familias_cadunico(db)
         reference_date = date(2024, 11, 1)
 
-        records_created = 0
+        rows = []
         for mun in municipalities:
             pop = mun.population or 0
             pop_ratio = pop / total_pop if total_pop > 0 else 0
@@ -262,44 +244,25 @@ async def ingest_bpc_simulated():
             value = beneficiaries * AVERAGE_BENEFIT
 
             # Calculate coverage
-            from app.models import CadUnicoData
-            cadunico = (
-                db.query(CadUnicoData)
-                .filter(CadUnicoData.municipality_id == mun.id)
-                .first()
-            )
-            cadunico_families = cadunico.total_families if cadunico else 0
-            coverage = beneficiaries / cadunico_families if cadunico_families > 0 else 0
-
-            # Check if exists
-            existing = db.query(BeneficiaryData).filter(
-                BeneficiaryData.municipality_id == mun.id,
-                BeneficiaryData.program_id == program.id,
-                BeneficiaryData.reference_date == reference_date
-            ).first()
-
-            if existing:
-                existing.total_beneficiaries = beneficiaries
-                existing.total_families = int(beneficiaries * 0.95)
-                existing.total_value_brl = Decimal(str(value))
-                existing.coverage_rate = Decimal(str(min(coverage, 1.0)))
-            else:
-                data = BeneficiaryData(
-                    municipality_id=mun.id,
-                    program_id=program.id,
-                    reference_date=reference_date,
-                    total_beneficiaries=beneficiaries,
-                    total_families=int(beneficiaries * 0.95),
-                    total_value_brl=Decimal(str(value)),
-                    coverage_rate=Decimal(str(min(coverage, 1.0))),
-                    data_source="SIMULATED",
-                    extra_data={"method": "proportional_by_population"}
-                )
-                db.add(data)
-
-            records_created += 1
-
-        db.commit()
+            families = cadunico_families.get(mun.id, 0)
+            coverage = beneficiaries / families if families > 0 else 0
+
+            rows.append({
+                "municipality_id": mun.id,
+                "program_id": program.id,
+                "reference_date": reference_date,
+                "total_beneficiaries": beneficiaries,
+                "total_families": int(beneficiaries * 0.95),
+                "total_value_brl": Decimal(str(value)),
+                "coverage_rate": Decimal(str(min(coverage, 1.0))),
+                "data_source": "SIMULATED",
+                "extra_data": {"method": "proportional_by_population"},
+            })
+
+        result = carregar_beneficiary_data(
+            db, rows, atualizar=(*UPDATE_COLUMNS, "coverage_rate")
+        )
+        records_created = result.inseridos + result.atualizados
         logger.info(f"Created {records_created} simulated BPC records")
 
     finally:
@@ -21,11 +21,22 @@ import httpx
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
-from app.models import Municipality, Program, BeneficiaryData, CadUnicoData
+from app.jobs.carga_em_lote import (
+    carregar_beneficiary_data,
+    familias_cadunico,
+    mapa_municipios,
+    resolver_municipio,
+)
+from app.models import Program
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Metrics overwritten when the month is re-ingested
+UPDATE_COLUMNS = (
+    "total_beneficiaries", "total_families", "total_value_brl", "coverage_rate", "data_source",
+)
+
 # Portal da Transparência download URLs
 # Format: https://portaldatransparencia.gov.br/download-de-dados/bpc/{YYYYMM}
 BASE_DOWNLOAD_URL = "https://portaldatransparencia.gov.br/download-de-dados/bpc"
@@ -185,73 +196,44 @@ def parse_bpc_csv(zip_content: bytes, siafi_mapping: Dict[str, str]) -> Dict[str
 def save_bpc_data(db: Session, data: Dict[str, Dict], reference_date: date, program_id: int):
     """Save real BPC data to database."""
 
-    # Build municipality lookup
-    municipalities = {m.ibge_code: m for m in db.query(Municipality).all()}
-
-    # Also try 6-digit codes (convert to list to avoid modifying dict during iteration)
-    for mun in list(municipalities.values()):
-        if len(mun.ibge_code) == 7:
-            municipalities[mun.ibge_code[:6]] = mun
+    # Municipality lookup (7- and 6-digit codes) and CadÚnico families
+    municipalities = mapa_municipios(db)
+    cadunico_families = familias_cadunico(db)
 
-    records_created = 0
-    records_updated = 0
+    rows = []
     not_found = 0
 
     for ibge_code, mun_data in data.items():
         # Find municipality
-        municipality = municipalities.get(ibge_code)
-        if not municipality and len(ibge_code) == 7:
-            municipality = municipalities.get(ibge_code[:6])
-
-        if not municipality:
+        municipality_id = resolver_municipio(municipalities, ibge_code)
+        if municipality_id is None:
             not_found += 1
             continue
 
         # Get CadÚnico families for coverage calculation
-        cadunico = (
-            db.query(CadUnicoData)
-            .filter(CadUnicoData.municipality_id == municipality.id)
-            .order_by(CadUnicoData.reference_date.desc())
-            .first()
-        )
-
-        cadunico_families = cadunico.total_families if cadunico else 0
+        families = cadunico_families.get(municipality_id, 0)
         coverage = (
-            mun_data["total_beneficiaries"] / cadunico_families
-            if cadunico_families > 0 else 0
+            mun_data["total_beneficiaries"] / families
+            if families > 0 else 0
         )
 
-        # Check if record exists
-        existing = db.query(BeneficiaryData).filter(
-            BeneficiaryData.municipality_id == municipality.id,
-            BeneficiaryData.program_id == program_id,
-            BeneficiaryData.reference_date == reference_date
-        ).first()
-
-        if existing:
-            existing.total_beneficiaries = mun_data["total_beneficiaries"]
-            existing.total_families = int(mun_data["total_beneficiaries"] * 0.95)
-            existing.total_value_brl = Decimal(str(mun_data["total_value"]))
-            existing.coverage_rate = Decimal(str(min(coverage, 1.0)))
-            existing.data_source = "PORTAL_TRANSPARENCIA_CSV"
-            records_updated += 1
-        else:
-            beneficiary_data = BeneficiaryData(
-                municipality_id=municipality.id,
-                program_id=program_id,
-                reference_date=reference_date,
-                total_beneficiaries=mun_data["total_beneficiaries"],
-                total_families=int(mun_data["total_beneficiaries"] * 0.95),
-                total_value_brl=Decimal(str(mun_data["total_value"])),
-                coverage_rate=Decimal(str(min(coverage, 1.0))),
-                data_source="PORTAL_TRANSPARENCIA_CSV",
-                extra_data={"source": "BPC/LOAS", "records_in_csv": mun_data["count"]}
-            )
-            db.add(beneficiary_data)
-            records_created += 1
-
-    db.commit()
-    logger.info(f"Created {records_created}, updated {records_updated} records. {not_found} municipalities not found.")
+        rows.append({
+            "municipality_id": municipality_id,
+            "program_id": program_id,
+            "reference_date": reference_date,
+            "total_beneficiaries": mun_data["total_beneficiaries"],
+            "total_families": int(mun_data["total_beneficiaries"] * 0.95),
+            "total_value_brl": Decimal(str(mun_data["total_value"])),
+            "coverage_rate": Decimal(str(min(coverage, 1.0))),
+            "data_source": "PORTAL_TRANSPARENCIA_CSV",
+            "extra_data": {"source": "BPC/LOAS", "records_in_csv": mun_data["count"]},
+        })
+
+    result = carregar_beneficiary_data(db, rows, atualizar=UPDATE_COLUMNS)
+    logger.info(
+        f"Created {result.inseridos}, updated {result.atualizados} records. "
+        f"{not_found} municipalities not found."
+    )
 
 
 async def ingest_bpc_real(year: Optional[int] = None, month: Optional[int] = None):
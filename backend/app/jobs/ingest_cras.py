@@ -292,6 +292,11 @@ def save_cras_to_db(
 
     db.commit()
     logger.info(f"Database save complete: {stats}")
+
+    # Rebuild the nearest-CRAS index with the new points on next lookup
+    from app.services.spatial_index import CRAS, invalidate_spatial_index
+    invalidate_spatial_index(CRAS)
+
     return stats
 
 
@@ -24,7 +24,13 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.database import SessionLocal
-from app.models import Municipality, Program, BeneficiaryData, CadUnicoData
+from app.jobs.carga_em_lote import (
+    carregar_beneficiary_data,
+    familias_cadunico,
+    mapa_municipios,
+    resolver_municipio,
+)
+from app.models import Municipality, Program
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,6 +41,11 @@ OPENDATASUS_URL = "https://demas-dados-abertos.s3.amazonaws.com/csv/pfpbdm.csv.z
 # Average value per beneficiary (2 packs/month * R$ 12/pack = R$ 24/month)
 AVG_VALUE_PER_BENEFICIARY = 24.0
 
+# Simulated rows keep their original source metadata when re-run
+SIMULATED_UPDATE_COLUMNS = (
+    "total_beneficiaries", "total_families", "total_value_brl", "coverage_rate",
+)
+
 
 async def fetch_opendatasus_dignidade(period: Optional[str] = None) -> Tuple[Dict[str, Dict], Optional[str]]:
     """Fetch real Dignidade Menstrual data from OpenDataSUS.
@@ -134,72 +145,42 @@ def save_dignidade_real_data(
     month = int(period[4:6])
     reference_date = date(year, month, 1)
 
-    # Build municipality lookup
-    municipalities = {m.ibge_code: m for m in db.query(Municipality).all()}
-    for mun in list(municipalities.values()):
-        if len(mun.ibge_code) == 7:
-            municipalities[mun.ibge_code[:6]] = mun
+    # Municipality lookup (7- and 6-digit codes) and CadÚnico families
+    municipalities = mapa_municipios(db)
+    cadunico_families = familias_cadunico(db)
 
-    records_created = 0
-    records_updated = 0
+    rows = []
     not_found = 0
 
     for ibge_code, mun_data in data.items():
-        municipality = municipalities.get(ibge_code)
-        if not municipality and len(ibge_code) == 7:
-            municipality = municipalities.get(ibge_code[:6])
-        if not municipality and len(ibge_code) == 6:
-            municipality = municipalities.get(ibge_code + "0")
-
-        if not municipality:
+        municipality_id = resolver_municipio(municipalities, ibge_code)
+        if municipality_id is None:
             not_found += 1
             continue
 
         beneficiaries = mun_data["beneficiaries"]
         value = beneficiaries * AVG_VALUE_PER_BENEFICIARY
 
-        # Get CadÚnico for coverage
-        cadunico = (
-            db.query(CadUnicoData)
-            .filter(CadUnicoData.municipality_id == municipality.id)
-            .order_by(CadUnicoData.reference_date.desc())
-            .first()
-        )
-
-        cadunico_families = cadunico.total_families if cadunico else 0
-        coverage = beneficiaries / cadunico_families if cadunico_families > 0 else 0
-
-        existing = db.query(BeneficiaryData).filter(
-            BeneficiaryData.municipality_id == municipality.id,
-            BeneficiaryData.program_id == program_id,
-            BeneficiaryData.reference_date == reference_date
-        ).first()
-
-        if existing:
-            existing.total_beneficiaries = beneficiaries
-            existing.total_families = int(beneficiaries * 0.9)
-            existing.total_value_brl = Decimal(str(value))
-            existing.coverage_rate = Decimal(str(min(coverage, 1.0)))
-            existing.data_source = "OPENDATASUS"
-            existing.extra_data = {"source": "opendatasus.saude.gov.br", "period": period}
-            records_updated += 1
-        else:
-            beneficiary_data = BeneficiaryData(
-                municipality_id=municipality.id,
-                program_id=program_id,
-                reference_date=reference_date,
-                total_beneficiaries=beneficiaries,
-                total_families=int(beneficiaries * 0.9),
-                total_value_brl=Decimal(str(value)),
-                coverage_rate=Decimal(str(min(coverage, 1.0))),
-                data_source="OPENDATASUS",
-                extra_data={"source": "opendatasus.saude.gov.br", "period": period}
-            )
-            db.add(beneficiary_data)
-            records_created += 1
+        # CadÚnico families for coverage
+        families = cadunico_families.get(municipality_id, 0)
+        coverage = beneficiaries / families if families > 0 else 0
 
-    db.commit()
-    logger.info(f"Created {records_created}, updated {records_updated} records. {not_found} not found.")
+        rows.append({
+            "municipality_id": municipality_id,
+            "program_id": program_id,
+            "reference_date": reference_date,
+            "total_beneficiaries": beneficiaries,
+            "total_families": int(beneficiaries * 0.9),
+            "total_value_brl": Decimal(str(value)),
+            "coverage_rate": Decimal(str(min(coverage, 1.0))),
+            "data_source": "OPENDATASUS",
+            "extra_data": {"source": "opendatasus.saude.gov.br", "period": period},
+        })
+
+    result = carregar_beneficiary_data(db, rows)
+    logger.info(
+        f"Created {result.inseridos}, updated {result.atualizados} records. {not_found} not found."
+    )
 
 
 async def ingest_dignidade_menstrual(use_real_data: bool = True):
@@ -280,18 +261,11 @@ async def ingest_dignidade_simulated():
         ESTIMATED_BENEFICIARIES = 8_000_000
         MONTHLY_VALUE = 24.00  # Average per beneficiary
 
-        # Get municipalities with CadÚnico data
-        from app.models import CadUnicoData
-
-        municipalities = db.query(Municipality).all()
-
-        # Get total eligible population (women 10-49 in CadÚnico)
-        # Use age groups from CadÚnico: 6-14, 15-17, 18-64
-        # We'll estimate ~40% of CadÚnico persons are eligible women
-        db.query(func.sum(CadUnicoData.total_persons)).scalar() or 1
+        municipalities = db.query(Municipality.id, Municipality.population).all()
+        cadunico_families = familias_cadunico(db)
 
         reference_date = date(2024, 11, 1)
-        records_created = 0
+        rows = []
 
         # Get total population
         total_pop = db.query(func.sum(Municipality.population)).scalar() or 1
@@ -301,20 +275,13 @@ async def ingest_dignidade_simulated():
             if pop == 0:
                 continue
 
-            # Get CadÚnico data for this municipality
-            cadunico = (
-                db.query(CadUnicoData)
-                .filter(CadUnicoData.municipality_id == mun.id)
-                .first()
-            )
-
-            cadunico_families = cadunico.total_families if cadunico else 0
+            families = cadunico_families.get(mun.id, 0)
 
             # Estimate eligible women based on population
             # ~20% of population are women aged 10-49 in vulnerable situation
             eligible_women = int(pop * 0.20 * 0.15)  # 15% of women 10-49 are in CadÚnico
             if eligible_women == 0:
-                eligible_women = max(1, int(cadunico_families * 0.3) if cadunico_families else 1)
+                eligible_women = max(1, int(families * 0.3) if families else 1)
 
             # Calculate beneficiaries based on population distribution
             pop_ratio = pop / total_pop if total_pop > 0 else 0
@@ -328,38 +295,23 @@ async def ingest_dignidade_simulated():
             # Coverage rate relative to eligible women
             coverage = beneficiaries / eligible_women if eligible_women > 0 else 0
 
-            # Check if exists
-            existing = db.query(BeneficiaryData).filter(
-                BeneficiaryData.municipality_id == mun.id,
-                BeneficiaryData.program_id == program.id,
-                BeneficiaryData.reference_date == reference_date
-            ).first()
-
-            if existing:
-                existing.total_beneficiaries = beneficiaries
-                existing.total_families = int(beneficiaries * 0.9)
-                existing.total_value_brl = Decimal(str(value))
-                existing.coverage_rate = Decimal(str(min(coverage, 1.0)))
-            else:
-                data = BeneficiaryData(
-                    municipality_id=mun.id,
-                    program_id=program.id,
-                    reference_date=reference_date,
-                    total_beneficiaries=beneficiaries,
-                    total_families=int(beneficiaries * 0.9),
-                    total_value_brl=Decimal(str(value)),
-                    coverage_rate=Decimal(str(min(coverage, 1.0))),
-                    data_source="SIMULATED",
-                    extra_data={
-                        "method": "cadunico_demographics",
-                        "eligible_women": eligible_women,
-                    }
-                )
-                db.add(data)
-
-            records_created += 1
-
-        db.commit()
+            rows.append({
+                "municipality_id": mun.id,
+                "program_id": program.id,
+                "reference_date": reference_date,
+                "total_beneficiaries": beneficiaries,
+                "total_families": int(beneficiaries * 0.9),
+                "total_value_brl": Decimal(str(value)),
+                "coverage_rate": Decimal(str(min(coverage, 1.0))),
+                "data_source": "SIMULATED",
+                "extra_data": {
+                    "method": "cadunico_demographics",
+                    "eligible_women": eligible_women,
+                },
+            })
+
+        result = carregar_beneficiary_data(db, rows, atualizar=SIMULATED_UPDATE_COLUMNS)
+        records_created = result.inseridos + result.atualizados
         logger.info(f"Created {records_created} Dignidade Menstrual records")
 
     finally:
@@ -17,11 +17,17 @@ import logging
 from sqlalchemy import func
 
 from app.database import SessionLocal
-from app.models import Municipality, Program, BeneficiaryData
+from app.jobs.carga_em_lote import carregar_beneficiary_data, familias_cadunico
+from app.models import Municipality, Program
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Simulated rows keep their original source metadata when re-run
+SIMULATED_UPDATE_COLUMNS = (
+    "total_beneficiaries", "total_families", "total_value_brl", "coverage_rate",
+)
+
 
 async def ingest_farmacia_popular():
     """Main function to ingest Farmácia Popular data."""
@@ -66,11 +72,12 @@ async def ingest_farmacia_simulated():
         AVERAGE_VALUE = 30.00  # Per transaction
 
         # Get population by municipality
-        municipalities = db.query(Municipality).all()
+        municipalities = db.query(Municipality.id, Municipality.population).all()
         total_pop = db.query(func.sum(Municipality.population)).scalar() or 1
+        cadunico_families = familias_cadunico(db)
 
         reference_date = date(2024, 11, 1)
-        records_created = 0
+        rows = []
 
         for mun in municipalities:
             pop = mun.population or 0
@@ -95,48 +102,27 @@ async def ingest_farmacia_simulated():
             value = beneficiaries * AVERAGE_VALUE
 
             # Calculate coverage using CadÚnico as base
-            from app.models import CadUnicoData
-            cadunico = (
-                db.query(CadUnicoData)
-                .filter(CadUnicoData.municipality_id == mun.id)
-                .first()
-            )
-            cadunico_families = cadunico.total_families if cadunico else 0
+            families = cadunico_families.get(mun.id, 0)
             # Farmácia Popular reaches beyond CadÚnico, so coverage can exceed 100%
-            coverage = beneficiaries / (cadunico_families * 2) if cadunico_families > 0 else 0
-
-            # Check if exists
-            existing = db.query(BeneficiaryData).filter(
-                BeneficiaryData.municipality_id == mun.id,
-                BeneficiaryData.program_id == program.id,
-                BeneficiaryData.reference_date == reference_date
-            ).first()
-
-            if existing:
-                existing.total_beneficiaries = beneficiaries
-                existing.total_families = int(beneficiaries * 0.8)
-                existing.total_value_brl = Decimal(str(value))
-                existing.coverage_rate = Decimal(str(min(coverage, 1.0)))
-            else:
-                data = BeneficiaryData(
-                    municipality_id=mun.id,
-                    program_id=program.id,
-                    reference_date=reference_date,
-                    total_beneficiaries=beneficiaries,
-                    total_families=int(beneficiaries * 0.8),
-                    total_value_brl=Decimal(str(value)),
-                    coverage_rate=Decimal(str(min(coverage, 1.0))),
-                    data_source="SIMULATED",
-                    extra_data={
-                        "method": "proportional_by_population_urban_adjusted",
-                        "urban_factor": urban_factor,
-                    }
-                )
-                db.add(data)
-
-            records_created += 1
-
-        db.commit()
+            coverage = beneficiaries / (families * 2) if families > 0 else 0
+
+            rows.append({
+                "municipality_id": mun.id,
+                "program_id": program.id,
+                "reference_date": reference_date,
+                "total_beneficiaries": beneficiaries,
+                "total_families": int(beneficiaries * 0.8),
+                "total_value_brl": Decimal(str(value)),
+                "coverage_rate": Decimal(str(min(coverage, 1.0))),
+                "data_source": "SIMULATED",
+                "extra_data": {
+                    "method": "proportional_by_population_urban_adjusted",
+                    "urban_factor": urban_factor,
+                },
+            })
+
+        result = carregar_beneficiary_data(db, rows, atualizar=SIMULATED_UPDATE_COLUMNS)
+        records_created = result.inseridos + result.atualizados
         logger.info(f"Created {records_created} Farmácia Popular records")
         logger.info(f"Total beneficiaries: {NATIONAL_BENEFICIARIES:,}")
 
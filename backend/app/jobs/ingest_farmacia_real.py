@@ -24,7 +24,13 @@ import httpx
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
-from app.models import Municipality, Program, BeneficiaryData, CadUnicoData
+from app.jobs.carga_em_lote import (
+    carregar_beneficiary_data,
+    familias_cadunico,
+    mapa_municipios,
+    resolver_municipio,
+)
+from app.models import Municipality, Program
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -227,93 +233,53 @@ def save_farmacia_data(
 ):
     """Save Farmácia Popular data to database."""
 
-    # Build municipality lookup
-    municipalities = {m.ibge_code: m for m in db.query(Municipality).all()}
+    # Municipality lookup (7- and 6-digit codes), populations and CadÚnico families
+    municipalities = mapa_municipios(db)
+    populations = dict(db.query(Municipality.id, Municipality.population).all())
+    cadunico_families = familias_cadunico(db)
 
-    # Also try 6-digit codes
-    for mun in list(municipalities.values()):
-        if len(mun.ibge_code) == 7:
-            municipalities[mun.ibge_code[:6]] = mun
-
-    records_created = 0
-    records_updated = 0
+    rows = []
     not_found = 0
 
-    # Get national average value per beneficiary (R$ ~30/month based on program data)
-    AVG_VALUE_PER_BENEFICIARY = 30.0
-
     for ibge_code, mun_data in data.items():
         # Find municipality
-        municipality = municipalities.get(ibge_code)
-        if not municipality and len(ibge_code) == 7:
-            municipality = municipalities.get(ibge_code[:6])
-        if not municipality and len(ibge_code) == 6:
-            municipality = municipalities.get(ibge_code + "0")
-
-        if not municipality:
+        municipality_id = resolver_municipio(municipalities, ibge_code)
+        if municipality_id is None:
             not_found += 1
             continue
 
         # Estimate beneficiaries from establishment count
         beneficiaries = estimate_beneficiaries_from_establishments(
             mun_data["count"],
-            municipality.population or 0
+            populations.get(municipality_id) or 0
         )
 
         value = beneficiaries * AVG_VALUE_PER_BENEFICIARY
 
-        # Get CadÚnico families for coverage calculation
-        cadunico = (
-            db.query(CadUnicoData)
-            .filter(CadUnicoData.municipality_id == municipality.id)
-            .order_by(CadUnicoData.reference_date.desc())
-            .first()
-        )
-
-        cadunico_families = cadunico.total_families if cadunico else 0
-        coverage = (
-            beneficiaries / cadunico_families
-            if cadunico_families > 0 else 0
-        )
-
-        # Check if record exists
-        existing = db.query(BeneficiaryData).filter(
-            BeneficiaryData.municipality_id == municipality.id,
-            BeneficiaryData.program_id == program_id,
-            BeneficiaryData.reference_date == reference_date
-        ).first()
-
-        if existing:
-            existing.total_beneficiaries = beneficiaries
-            existing.total_families = int(beneficiaries * 0.8)  # Estimate families
-            existing.total_value_brl = Decimal(str(value))
-            existing.coverage_rate = Decimal(str(min(coverage, 1.0)))
-            existing.data_source = "SAGE_WFS"
-            existing.extra_data = {
+        # CadÚnico families for coverage calculation
+        families = cadunico_families.get(municipality_id, 0)
+        coverage = beneficiaries / families if families > 0 else 0
+
+        rows.append({
+            "municipality_id": municipality_id,
+            "program_id": program_id,
+            "reference_date": reference_date,
+            "total_beneficiaries": beneficiaries,
+            "total_families": int(beneficiaries * 0.8),  # Estimate families
+            "total_value_brl": Decimal(str(value)),
+            "coverage_rate": Decimal(str(min(coverage, 1.0))),
+            "data_source": "SAGE_WFS",
+            "extra_data": {
                 "establishments": mun_data["count"],
                 "source": "i3geo.saude.gov.br"
-            }
-            records_updated += 1
-        else:
-            beneficiary_data = BeneficiaryData(
-                municipality_id=municipality.id,
-                program_id=program_id,
-                reference_date=reference_date,
-                total_beneficiaries=beneficiaries,
-                total_families=int(beneficiaries * 0.8),
-                total_value_brl=Decimal(str(value)),
-                coverage_rate=Decimal(str(min(coverage, 1.0))),
-                data_source="SAGE_WFS",
-                extra_data={
-                    "establishments": mun_data["count"],
-                    "source": "i3geo.saude.gov.br"
-                }
-            )
-            db.add(beneficiary_data)
-            records_created += 1
+            },
+        })
 
-    db.commit()
-    logger.info(f"Created {records_created}, updated {records_updated} records. {not_found} municipalities not found.")
+    result = carregar_beneficiary_data(db, rows)
+    logger.info(
+        f"Created {result.inseridos}, updated {result.atualizados} records. "
+        f"{not_found} municipalities not found."
+    )
 
 
 def save_opendatasus_data(
@@ -329,79 +295,44 @@ def save_opendatasus_data(
     month = int(period[4:6])
     reference_date = date(year, month, 1)
 
-    # Build municipality lookup
-    municipalities = {m.ibge_code: m for m in db.query(Municipality).all()}
+    # Municipality lookup (7- and 6-digit codes) and CadÚnico families
+    municipalities = mapa_municipios(db)
+    cadunico_families = familias_cadunico(db)
 
-    # Also map 6-digit codes
-    for mun in list(municipalities.values()):
-        if len(mun.ibge_code) == 7:
-            municipalities[mun.ibge_code[:6]] = mun
-
-    records_created = 0
-    records_updated = 0
+    rows = []
     not_found = 0
 
     for ibge_code, mun_data in data.items():
         # Find municipality
-        municipality = municipalities.get(ibge_code)
-        if not municipality and len(ibge_code) == 7:
-            municipality = municipalities.get(ibge_code[:6])
-        if not municipality and len(ibge_code) == 6:
-            municipality = municipalities.get(ibge_code + "0")
-
-        if not municipality:
+        municipality_id = resolver_municipio(municipalities, ibge_code)
+        if municipality_id is None:
             not_found += 1
             continue
 
         beneficiaries = mun_data["beneficiaries"]
         value = beneficiaries * AVG_VALUE_PER_BENEFICIARY
 
-        # Get CadÚnico families for coverage calculation
-        cadunico = (
-            db.query(CadUnicoData)
-            .filter(CadUnicoData.municipality_id == municipality.id)
-            .order_by(CadUnicoData.reference_date.desc())
-            .first()
-        )
-
-        cadunico_families = cadunico.total_families if cadunico else 0
-        coverage = (
-            beneficiaries / cadunico_families
-            if cadunico_families > 0 else 0
-        )
-
-        # Check if record exists
-        existing = db.query(BeneficiaryData).filter(
-            BeneficiaryData.municipality_id == municipality.id,
-            BeneficiaryData.program_id == program_id,
-            BeneficiaryData.reference_date == reference_date
-        ).first()
-
-        if existing:
-            existing.total_beneficiaries = beneficiaries
-            existing.total_families = int(beneficiaries * 0.8)
-            existing.total_value_brl = Decimal(str(value))
-            existing.coverage_rate = Decimal(str(min(coverage, 1.0)))
-            existing.data_source = "OPENDATASUS"
-            existing.extra_data = {"source": "opendatasus.saude.gov.br", "period": period}
-            records_updated += 1
-        else:
-            beneficiary_data = BeneficiaryData(
-                municipality_id=municipality.id,
-                program_id=program_id,
-                reference_date=reference_date,
-                total_beneficiaries=beneficiaries,
-                total_families=int(beneficiaries * 0.8),
-                total_value_brl=Decimal(str(value)),
-                coverage_rate=Decimal(str(min(coverage, 1.0))),
-                data_source="OPENDATASUS",
-                extra_data={"source": "opendatasus.saude.gov.br", "period": period}
-            )
-            db.add(beneficiary_data)
-            records_created += 1
-
-    db.commit()
-    logger.info(f"Created {records_created}, updated {records_updated} records. {not_found} municipalities not found.")
+        # CadÚnico families for coverage calculation
+        families = cadunico_families.get(municipality_id, 0)
+        coverage = beneficiaries / families if families > 0 else 0
+
+        rows.append({
+            "municipality_id": municipality_id,
+            "program_id": program_id,
+            "reference_date": reference_date,
+            "total_beneficiaries": beneficiaries,
+            "total_families": int(beneficiaries * 0.8),
+            "total_value_brl": Decimal(str(value)),
+            "coverage_rate": Decimal(str(min(coverage, 1.0))),
+            "data_source": "OPENDATASUS",
+            "extra_data": {"source": "opendatasus.saude.gov.br", "period": period},
+        })
+
+    result = carregar_beneficiary_data(db, rows)
+    logger.info(
+        f"Created {result.inseridos}, updated {result.atualizados} records. "
+        f"{not_found} municipalities not found."
+    )
 
 
 async def ingest_farmacia_real(period: Optional[str] = None):
@@ -22,12 +22,20 @@ import httpx
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
-from app.models import Municipality, Program, BeneficiaryData
+from app.jobs.carga_em_lote import (
+    carregar_beneficiary_data,
+    id_programa,
+    mapa_municipios,
+    resolver_municipio,
+)
 from app.models.program import ProgramCode
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Metrics overwritten when the month is re-ingested
+UPDATE_COLUMNS = ("total_beneficiaries", "total_families", "total_value_brl")
+
 # Portal da Transparência URL
 DIRECT_URL = "https://dadosabertos-download.cgu.gov.br/PortalDaTransparencia/saida/garantia-safra"
 
@@ -184,31 +192,22 @@ def parse_garantia_safra_csv(zip_content: bytes, siafi_mapping: Dict[str, str])
 
 def save_garantia_safra_data(db: Session, data: Dict[str, Dict], reference_date: date):
     """Save Garantia-Safra data to database."""
-    municipalities = {m.ibge_code: m for m in db.query(Municipality).all()}
-    for mun in list(municipalities.values()):
-        if len(mun.ibge_code) == 7:
-            municipalities[mun.ibge_code[:6]] = mun
+    municipalities = mapa_municipios(db)
 
-    program = db.query(Program).filter(Program.code == ProgramCode.GARANTIA_SAFRA).first()
-    if not program:
+    program_id = id_programa(db, ProgramCode.GARANTIA_SAFRA)
+    if not program_id:
         logger.error("Garantia-Safra program not found in database. Run seed_programs first.")
         return 0, 0
 
-    records_created = 0
-    records_updated = 0
+    rows = []
     not_found = 0
 
     total_beneficiaries = 0
     total_value = 0.0
 
     for ibge_code, mun_data in data.items():
-        municipality = municipalities.get(ibge_code)
-        if not municipality and len(ibge_code) == 7:
-            municipality = municipalities.get(ibge_code[:6])
-        if not municipality and len(ibge_code) == 6:
-            municipality = municipalities.get(ibge_code + "0")
-
-        if not municipality:
+        municipality_id = resolver_municipio(municipalities, ibge_code)
+        if municipality_id is None:
             not_found += 1
             continue
 
@@ -216,33 +215,20 @@ def save_garantia_safra_data(db: Session, data: Dict[str, Dict], reference_date:
         total_beneficiaries += beneficiaries
         total_value += mun_data["total_value"]
 
-        existing = db.query(BeneficiaryData).filter(
-            BeneficiaryData.municipality_id == municipality.id,
-            BeneficiaryData.program_id == program.id,
-            BeneficiaryData.reference_date == reference_date
-        ).first()
-
-        if existing:
-            existing.total_beneficiaries = beneficiaries
-            existing.total_families = beneficiaries  # Individual benefit
-            existing.total_value_brl = Decimal(str(mun_data["total_value"]))
-            records_updated += 1
-        else:
-            beneficiary_data = BeneficiaryData(
-                municipality_id=municipality.id,
-                program_id=program.id,
-                reference_date=reference_date,
-                total_beneficiaries=beneficiaries,
-                total_families=beneficiaries,  # Individual benefit
-                total_value_brl=Decimal(str(mun_data["total_value"])),
-                coverage_rate=0.0,
-            )
-            db.add(beneficiary_data)
-            records_created += 1
-
-    db.commit()
-
-    logger.info(f"Created {records_created}, updated {records_updated} records")
+        rows.append({
+            "municipality_id": municipality_id,
+            "program_id": program_id,
+            "reference_date": reference_date,
+            "total_beneficiaries": beneficiaries,
+            "total_families": beneficiaries,  # Individual benefit
+            "total_value_brl": Decimal(str(mun_data["total_value"])),
+            "coverage_rate": 0.0,
+        })
+
+    # Coverage is only set on insert; update_coverage recalculates it
+    result = carregar_beneficiary_data(db, rows, atualizar=UPDATE_COLUMNS)
+
+    logger.info(f"Created {result.inseridos}, updated {result.atualizados} records")
     logger.info(f"Not found: {not_found} municipalities")
     logger.info(f"Total beneficiaries: {total_beneficiaries:,}")
     logger.info(f"Total value: R$ {total_value:,.2f}")
@@ -12,7 +12,7 @@ import io
 import zipfile
 from datetime import date
 from decimal import Decimal
-from typing import Dict
+from typing import Dict, Iterator
 from collections import defaultdict
 import logging
 
@@ -20,7 +20,12 @@ import httpx
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
-from app.models import Municipality, Program, BeneficiaryData
+from app.jobs.carga_em_lote import (
+    carregar_beneficiary_data,
+    id_programa,
+    mapa_municipios,
+    resolver_municipio,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,6 +38,11 @@ DIGNIDADE_MENSTRUAL_URL = "https://demas-dados-abertos.s3.amazonaws.com/csv/pfpb
 AVG_VALUE_FARMACIA = 30.0
 AVG_VALUE_DIGNIDADE = 24.0
 
+# Coverage is only set on insert; update_coverage recalculates it
+UPDATE_COLUMNS = (
+    "total_beneficiaries", "total_families", "total_value_brl", "data_source", "extra_data",
+)
+
 
 async def fetch_opendatasus_all_periods(url: str) -> Dict[str, Dict[str, Dict]]:
     """Fetch all periods from OpenDataSUS.
@@ -92,84 +102,66 @@ async def fetch_opendatasus_all_periods(url: str) -> Dict[str, Dict[str, Dict]]:
         return dict(all_periods)
 
 
-def save_historical_data(
-    db: Session,
+def historical_rows(
     all_periods: Dict[str, Dict[str, Dict]],
-    program_code: str,
+    municipalities: Dict[str, int],
+    program_id: int,
     avg_value: float,
-    data_source: str
-):
-    """Save all historical periods to database."""
-
-    program = db.query(Program).filter(Program.code == program_code).first()
-    if not program:
-        logger.error(f"Program {program_code} not found")
-        return
-
-    # Build municipality lookup
-    municipalities = {m.ibge_code: m for m in db.query(Municipality).all()}
-    for mun in list(municipalities.values()):
-        if len(mun.ibge_code) == 7:
-            municipalities[mun.ibge_code[:6]] = mun
-
-    total_created = 0
-    total_updated = 0
-
+    data_source: str,
+) -> Iterator[Dict]:
+    """Yield one beneficiary_data row per municipality and period."""
     for period, data in sorted(all_periods.items()):
         year = int(period[:4])
         month = int(period[4:6])
         reference_date = date(year, month, 1)
 
-        records_created = 0
-        records_updated = 0
-
         for ibge_code, mun_data in data.items():
-            municipality = municipalities.get(ibge_code)
-            if not municipality and len(ibge_code) == 7:
-                municipality = municipalities.get(ibge_code[:6])
-            if not municipality and len(ibge_code) == 6:
-                municipality = municipalities.get(ibge_code + "0")
-
-            if not municipality:
+            municipality_id = resolver_municipio(municipalities, ibge_code)
+            if municipality_id is None:
                 continue
 
             beneficiaries = mun_data["beneficiaries"]
             value = beneficiaries * avg_value
 
-            existing = db.query(BeneficiaryData).filter(
-                BeneficiaryData.municipality_id == municipality.id,
-                BeneficiaryData.program_id == program.id,
-                BeneficiaryData.reference_date == reference_date
-            ).first()
-
-            if existing:
-                existing.total_beneficiaries = beneficiaries
-                existing.total_families = int(beneficiaries * 0.8)
-                existing.total_value_brl = Decimal(str(value))
-                existing.data_source = data_source
-                existing.extra_data = {"source": "opendatasus.saude.gov.br", "period": period}
-                records_updated += 1
-            else:
-                beneficiary_data = BeneficiaryData(
-                    municipality_id=municipality.id,
-                    program_id=program.id,
-                    reference_date=reference_date,
-                    total_beneficiaries=beneficiaries,
-                    total_families=int(beneficiaries * 0.8),
-                    total_value_brl=Decimal(str(value)),
-                    coverage_rate=Decimal("0"),
-                    data_source=data_source,
-                    extra_data={"source": "opendatasus.saude.gov.br", "period": period}
-                )
-                db.add(beneficiary_data)
-                records_created += 1
-
-        db.commit()
-        total_created += records_created
-        total_updated += records_updated
-        logger.info(f"  {period}: created {records_created}, updated {records_updated}")
-
-    logger.info(f"Total: created {total_created}, updated {total_updated}")
+            yield {
+                "municipality_id": municipality_id,
+                "program_id": program_id,
+                "reference_date": reference_date,
+                "total_beneficiaries": beneficiaries,
+                "total_families": int(beneficiaries * 0.8),
+                "total_value_brl": Decimal(str(value)),
+                "coverage_rate": Decimal("0"),
+                "data_source": data_source,
+                "extra_data": {"source": "opendatasus.saude.gov.br", "period": period},
+            }
+
+
+def save_historical_data(
+    db: Session,
+    all_periods: Dict[str, Dict[str, Dict]],
+    program_code: str,
+    avg_value: float,
+    data_source: str
+):
+    """Save all historical periods to database in a single bulk load."""
+
+    program_id = id_programa(db, program_code)
+    if not program_id:
+        logger.error(f"Program {program_code} not found")
+        return
+
+    municipalities = mapa_municipios(db)
+
+    result = carregar_beneficiary_data(
+        db,
+        historical_rows(all_periods, municipalities, program_id, avg_value, data_source),
+        atualizar=UPDATE_COLUMNS,
+    )
+
+    logger.info(
+        f"Total: {len(all_periods)} periods, "
+        f"created {result.inseridos}, updated {result.atualizados}"
+    )
 
 
 async def ingest_farmacia_historical():
@@ -197,6 +197,10 @@ def insert_municipalities(
 
     logger.info("Municipalities inserted successfully")
 
+    # Rebuild the autocomplete index with the new names on next search
+    from app.services.municipality_search import invalidate_municipality_search_index
+    invalidate_municipality_search_index()
+
 
 async def ingest_ibge_data():
     """
@@ -19,12 +19,16 @@ import httpx
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
-from app.models import Municipality, Program, BeneficiaryData, State
+from app.jobs.carga_em_lote import carregar_beneficiary_data, id_programa
+from app.models import Municipality, State
 from app.models.program import ProgramCode
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Metrics overwritten when the year is re-ingested
+UPDATE_COLUMNS = ("total_beneficiaries", "total_families", "total_value_brl")
+
 # FNDE OData API endpoint
 ODATA_BASE_URL = "https://www.fnde.gov.br/olinda-ide/servico/PNAE_Recursos_Repassados_Pck_3/versao/v1/odata"
 
@@ -182,13 +186,12 @@ def aggregate_pnae_data(records: List[Dict]) -> Dict[str, Dict]:
 
 def save_pnae_data(db: Session, data: Dict[str, Dict], reference_date: date, name_mapping: Dict[str, Municipality]):
     """Save PNAE data to database."""
-    program = db.query(Program).filter(Program.code == ProgramCode.PNAE).first()
-    if not program:
+    program_id = id_programa(db, ProgramCode.PNAE)
+    if not program_id:
         logger.error("PNAE program not found in database. Run seed_programs first.")
         return 0, 0
 
-    records_created = 0
-    records_updated = 0
+    rows = []
     not_found = 0
     not_found_names = []
 
@@ -217,39 +220,25 @@ def save_pnae_data(db: Session, data: Dict[str, Dict], reference_date: date, nam
         # For a rough estimate, use average of R$ 0.50 x 200 school days = R$ 100/student/year
         estimated_students = int(valor / 100) if valor > 0 else 0
 
-        existing = db.query(BeneficiaryData).filter(
-            BeneficiaryData.municipality_id == municipality.id,
-            BeneficiaryData.program_id == program.id,
-            BeneficiaryData.reference_date == reference_date
-        ).first()
-
-        if existing:
-            existing.total_beneficiaries = estimated_students
-            existing.total_families = estimated_students  # Students, not families
-            existing.total_value_brl = Decimal(str(valor))
-            records_updated += 1
-        else:
-            beneficiary_data = BeneficiaryData(
-                municipality_id=municipality.id,
-                program_id=program.id,
-                reference_date=reference_date,
-                total_beneficiaries=estimated_students,
-                total_families=estimated_students,
-                total_value_brl=Decimal(str(valor)),
-                coverage_rate=0.0,  # Will be updated by coverage script
-            )
-            db.add(beneficiary_data)
-            records_created += 1
-
-    db.commit()
-
-    logger.info(f"Created {records_created}, updated {records_updated} records")
+        rows.append({
+            "municipality_id": municipality.id,
+            "program_id": program_id,
+            "reference_date": reference_date,
+            "total_beneficiaries": estimated_students,
+            "total_families": estimated_students,  # Students, not families
+            "total_value_brl": Decimal(str(valor)),
+            "coverage_rate": 0.0,  # Will be updated by coverage script
+        })
+
+    result = carregar_beneficiary_data(db, rows, atualizar=UPDATE_COLUMNS)
+
+    logger.info(f"Created {result.inseridos}, updated {result.atualizados} records")
     logger.info(f"Not found: {not_found} municipalities")
     if not_found_names:
         logger.info(f"Sample not found: {not_found_names[:10]}")
     logger.info(f"Total value: R$ {total_value:,.2f}")
 
-    return records_created + records_updated, total_value
+    return result.inseridos + result.atualizados, total_value
 
 
 async def ingest_pnae(year: int):
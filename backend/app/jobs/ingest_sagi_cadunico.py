@@ -7,6 +7,11 @@ It supports multiple methods:
 
 Source: https://aplicacoes.mds.gov.br/sagi/ri/relatorios/cidadania/
 
+Full runs use ``SagiScraper``: several municipalities are fetched
+concurrently, HTTP first with an optional browser fallback from a pool of
+Playwright contexts, with adaptive backoff. Progress is checkpointed in
+``scrape_checkpoints``, so an interrupted run resumes where it stopped.
+
 Usage:
     # Test with one municipality (HTTP method)
     python -m app.jobs.ingest_sagi_cadunico --test 3550308
@@ -17,23 +22,29 @@ Usage:
     # Run for a specific state
     python -m app.jobs.ingest_sagi_cadunico --state SP
 
-    # Use Playwright (browser automation) instead of HTTP
-    python -m app.jobs.ingest_sagi_cadunico --browser
+    # Retry empty HTTP pages with Playwright (browser automation)
+    python -m app.jobs.ingest_sagi_cadunico --browser --contexts 4
+
+    # 8 municipalities in flight; --restart ignores the checkpoints
+    python -m app.jobs.ingest_sagi_cadunico 2024-10-01 --concurrency 8 --restart
 """
 
+import argparse
 import asyncio
 import re
 import logging
-from datetime import date
-from typing import Optional
-from dataclasses import dataclass
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
 
 import httpx
 from bs4 import BeautifulSoup
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
-from app.models import Municipality, CadUnicoData
+from app.models import CadUnicoData, Municipality, ScrapeCheckpoint, ScrapeStatus, State
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -142,19 +153,20 @@ def parse_cadunico_html(html: str) -> CadUnicoExtract:
 async def fetch_cadunico_http(
     client: httpx.AsyncClient,
     ibge_code: str,
-    periodo: str = None
+    periodo: str = None,
+    base_url: str = RI_BASE_URL,
 ) -> Optional[CadUnicoExtract]:
     """Fetch CadÚnico data via HTTP POST.
 
     This method is faster but may return empty data if the server
     requires JavaScript rendering.
     """
-    url = RI_BASE_URL + CADUNICO_MODULE
+    url = base_url + CADUNICO_MODULE
 
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         'Content-Type': 'application/x-www-form-urlencoded',
-        'Referer': f'{RI_BASE_URL}?codigo={ibge_code}',
+        'Referer': f'{base_url}?codigo={ibge_code}',
         'X-Requested-With': 'XMLHttpRequest',
     }
 
@@ -189,7 +201,7 @@ async def fetch_cadunico_http(
 
     try:
         # First establish session
-        await client.get(f'{RI_BASE_URL}?codigo={ibge_code}', headers=headers)
+        await client.get(f'{base_url}?codigo={ibge_code}', headers=headers)
 
         # Then request module
         response = await client.post(url, data=data, headers=headers)
@@ -279,12 +291,15 @@ async def fetch_cadunico_browser(
     ibge_code: str,
     periodo: str = None,
     browser_manager: BrowserManager = None,
-    max_retries: int = 2
+    max_retries: int = 2,
+    base_url: str = RI_BASE_URL,
 ) -> Optional[CadUnicoExtract]:
     """Fetch CadÚnico data using Playwright browser automation.
 
     This method is slower but more reliable as it renders JavaScript.
-    Uses a shared browser instance for better performance.
+    Uses a shared browser instance for better performance. Anything with
+    an async ``get_page()`` works as ``browser_manager`` (e.g. a
+    ``BrowserSlot`` from ``BrowserPool``).
     """
     try:
         from playwright.async_api import async_playwright
@@ -301,7 +316,7 @@ async def fetch_cadunico_browser(
             page = await browser_manager.get_page()
 
             # Build URL
-            url = f'{RI_BASE_URL}?codigo={ibge_code}'
+            url = f'{base_url}?codigo={ibge_code}'
             if periodo:
                 url += f'&periodo={periodo}'
 
@@ -367,6 +382,62 @@ async def fetch_cadunico_browser(
     return None
 
 
+def reference_date_for(periodo: str = None) -> date:
+    """Reference month for a period ('2024-10-01' or '10-2024'; default: this month)."""
+    ref_date = date.today().replace(day=1)
+    if periodo:
+        parts = periodo.split('-')
+        if len(parts) >= 2:
+            if len(parts[0]) == 4:  # 2024-10-01
+                ref_date = date(int(parts[0]), int(parts[1]), 1)
+            else:  # 10-2024
+                ref_date = date(int(parts[1]), int(parts[0]), 1)
+    return ref_date
+
+
+def apply_cadunico_data(
+    db: Session,
+    municipality_id: int,
+    data: CadUnicoExtract,
+    reference_date: date
+) -> None:
+    """Insert or update the CadÚnico row in the session (no commit)."""
+    existing = db.query(CadUnicoData).filter(
+        CadUnicoData.municipality_id == municipality_id,
+        CadUnicoData.reference_date == reference_date
+    ).first()
+
+    if existing:
+        existing.total_families = data.total_families
+        existing.total_persons = data.total_persons
+        existing.families_extreme_poverty = data.families_extreme_poverty
+        existing.families_poverty = data.families_poverty
+        existing.families_low_income = data.families_low_income
+        existing.persons_0_5_years = data.persons_0_5
+        existing.persons_6_14_years = data.persons_6_14
+        existing.persons_15_17_years = data.persons_15_17
+        existing.persons_18_64_years = data.persons_18_64
+        existing.persons_65_plus = data.persons_65_plus
+        logger.debug(f"Updated CadÚnico for municipality {municipality_id}")
+    else:
+        cadunico = CadUnicoData(
+            municipality_id=municipality_id,
+            reference_date=reference_date,
+            total_families=data.total_families,
+            total_persons=data.total_persons,
+            families_extreme_poverty=data.families_extreme_poverty,
+            families_poverty=data.families_poverty,
+            families_low_income=data.families_low_income,
+            persons_0_5_years=data.persons_0_5,
+            persons_6_14_years=data.persons_6_14,
+            persons_15_17_years=data.persons_15_17,
+            persons_18_64_years=data.persons_18_64,
+            persons_65_plus=data.persons_65_plus,
+        )
+        db.add(cadunico)
+        logger.debug(f"Created CadÚnico for municipality {municipality_id}")
+
+
 def save_cadunico_data(
     db: Session,
     municipality_id: int,
@@ -375,42 +446,7 @@ def save_cadunico_data(
 ) -> bool:
     """Save extracted CadÚnico data to database."""
     try:
-        # Check if record exists
-        existing = db.query(CadUnicoData).filter(
-            CadUnicoData.municipality_id == municipality_id,
-            CadUnicoData.reference_date == reference_date
-        ).first()
-
-        if existing:
-            existing.total_families = data.total_families
-            existing.total_persons = data.total_persons
-            existing.families_extreme_poverty = data.families_extreme_poverty
-            existing.families_poverty = data.families_poverty
-            existing.families_low_income = data.families_low_income
-            existing.persons_0_5_years = data.persons_0_5
-            existing.persons_6_14_years = data.persons_6_14
-            existing.persons_15_17_years = data.persons_15_17
-            existing.persons_18_64_years = data.persons_18_64
-            existing.persons_65_plus = data.persons_65_plus
-            logger.debug(f"Updated CadÚnico for municipality {municipality_id}")
-        else:
-            cadunico = CadUnicoData(
-                municipality_id=municipality_id,
-                reference_date=reference_date,
-                total_families=data.total_families,
-                total_persons=data.total_persons,
-                families_extreme_poverty=data.families_extreme_poverty,
-                families_poverty=data.families_poverty,
-                families_low_income=data.families_low_income,
-                persons_0_5_years=data.persons_0_5,
-                persons_6_14_years=data.persons_6_14,
-                persons_15_17_years=data.persons_15_17,
-                persons_18_64_years=data.persons_18_64,
-                persons_65_plus=data.persons_65_plus,
-            )
-            db.add(cadunico)
-            logger.debug(f"Created CadÚnico for municipality {municipality_id}")
-
+        apply_cadunico_data(db, municipality_id, data, reference_date)
         db.commit()
         return True
 
@@ -425,157 +461,495 @@ def get_fresh_db_session():
     return SessionLocal()
 
 
-async def ingest_all_municipalities(
-    state_filter: str = None,
-    periodo: str = None,
-    use_browser: bool = False,
-    delay: float = REQUEST_DELAY,
-    batch_size: int = 50
-):
-    """Ingest CadÚnico data for all municipalities.
+# =============================================================================
+# Concurrent scraping engine
+# =============================================================================
 
-    Args:
-        state_filter: Filter by state abbreviation (e.g., 'SP')
-        periodo: Reference period (e.g., '2024-10-01')
-        use_browser: Use Playwright browser automation (required for SAGI)
-        delay: Delay between requests in seconds
-        batch_size: Number of municipalities to process before refreshing DB connection
+class AdaptiveThrottle:
+    """Global pacing of request starts shared by all workers.
+
+    Requests start at least ``delay`` seconds apart. Each failure doubles
+    the delay (up to ``max_delay``) so the whole pool backs off when SAGI
+    starts refusing; each success shrinks it back towards ``min_delay``.
     """
-    global _browser_manager
 
-    logger.info("=" * 60)
-    logger.info("SAGI CadÚnico Data Ingestion")
-    logger.info(f"Method: {'Browser (Playwright)' if use_browser else 'HTTP'}")
-    logger.info(f"Batch size: {batch_size}")
-    logger.info("=" * 60)
+    def __init__(self, min_delay: float, max_delay: float, step: float = 0.5):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.step = step
+        self.delay = min_delay
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
 
-    # Get municipalities list (quick query)
-    db = get_fresh_db_session()
-    try:
-        query = db.query(Municipality)
-        if state_filter:
-            from app.models import State
-            state = db.query(State).filter(State.abbreviation == state_filter.upper()).first()
-            if state:
-                query = query.filter(Municipality.state_id == state.id)
-                logger.info(f"Filtering by state: {state.name}")
-            else:
-                logger.error(f"State not found: {state_filter}")
+    async def wait(self):
+        """Sleep until this request may start."""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def success(self):
+        self.delay = max(self.min_delay, self.delay * 0.9)
+
+    def failure(self):
+        self.delay = min(self.max_delay, max(self.delay * 2, self.step))
+
+
+class BrowserSlot:
+    """One Playwright context of a ``BrowserPool``.
+
+    Has the ``get_page()`` of ``BrowserManager``, so it can be passed to
+    ``fetch_cadunico_browser``. The context is recreated after
+    ``max_requests`` pages to keep memory bounded.
+    """
+
+    def __init__(self, pool: "BrowserPool"):
+        self.pool = pool
+        self.context = None
+        self.request_count = 0
+
+    async def get_page(self):
+        if self.context is None or self.request_count >= self.pool.max_requests_per_context:
+            await self.close()
+            self.context = await self.pool.new_context()
+            self.request_count = 0
+        self.request_count += 1
+        return await self.context.new_page()
+
+    async def close(self):
+        if self.context:
+            try:
+                await self.context.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser context: {e}")
+        self.context = None
+
+
+class BrowserPool:
+    """Bounded pool of browser contexts sharing one Chromium process.
+
+    The browser is only launched when the first slot is requested, so runs
+    where the HTTP path succeeds never start Playwright.
+    """
+
+    def __init__(self, size: int = 2, max_requests_per_context: int = 50):
+        self.size = size
+        self.max_requests_per_context = max_requests_per_context
+        self.playwright = None
+        self.browser = None
+        self._slots: Optional[asyncio.Queue] = None
+        self._all_slots = []
+        self._lock = asyncio.Lock()
+
+    async def _ensure_started(self):
+        async with self._lock:
+            if self._slots is not None:
                 return
+            from playwright.async_api import async_playwright
+            self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(
+                headless=True,
+                args=['--disable-dev-shm-usage', '--no-sandbox']
+            )
+            self._all_slots = [BrowserSlot(self) for _ in range(self.size)]
+            self._slots = asyncio.Queue()
+            for slot in self._all_slots:
+                self._slots.put_nowait(slot)
+            logger.info(f"Browser pool started with {self.size} contexts")
+
+    async def new_context(self):
+        return await self.browser.new_context(
+            viewport={'width': 1280, 'height': 720},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        )
 
-        # Get list of (id, ibge_code, name) tuples to avoid keeping ORM objects
-        municipalities = [(m.id, m.ibge_code, m.name) for m in query.order_by(Municipality.ibge_code).all()]
-        total = len(municipalities)
-    finally:
-        db.close()
+    @asynccontextmanager
+    async def slot(self):
+        """Borrow a context; waits while all of them are busy."""
+        await self._ensure_started()
+        slot = await self._slots.get()
+        try:
+            yield slot
+        finally:
+            self._slots.put_nowait(slot)
 
-    logger.info(f"Processing {total} municipalities...")
-    if use_browser:
-        logger.info(f"Estimated time: {(total * 8) / 60:.1f} minutes (with shared browser)")
-    else:
-        logger.info(f"Estimated time: {(total * delay) / 60:.1f} minutes")
-    logger.info("=" * 60)
+    async def stop(self):
+        for slot in self._all_slots:
+            await slot.close()
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+        self.browser = None
+        self.playwright = None
+        self._slots = None
+        self._all_slots = []
 
-    success_count = 0
-    error_count = 0
-    empty_count = 0
 
-    # Initialize browser manager for browser mode
-    browser_manager = None
-    if use_browser:
-        browser_manager = BrowserManager()
-        await browser_manager.start()
+@dataclass
+class ScraperConfig:
+    """Settings of a ``SagiScraper`` run."""
+    concurrency: int = 4  # Municipalities in flight
+    browser_contexts: int = 2  # Playwright contexts for the fallback
+    use_browser: bool = False  # Retry empty HTTP pages in the browser
+    min_delay: float = 0.25  # Minimum interval between request starts
+    max_delay: float = 30.0  # Backoff ceiling
+    max_attempts: int = 3  # Per municipality, before marking it failed
+    http_timeout: float = 30.0
+    write_batch: int = 50  # Results per DB transaction
+    context_max_requests: int = 50  # Pages per browser context before recycling
+    base_url: str = RI_BASE_URL
+    restart: bool = False  # Ignore (and clear) checkpoints of this run
 
-    # Create HTTP client for non-browser mode
-    client = httpx.AsyncClient(timeout=30.0, follow_redirects=True) if not use_browser else None
 
-    try:
-        # Process in batches to avoid DB connection timeout
-        for batch_start in range(0, total, batch_size):
-            batch_end = min(batch_start + batch_size, total)
-            batch = municipalities[batch_start:batch_end]
+@dataclass
+class ScrapeStats:
+    """Counters of a scraper run."""
+    total: int = 0
+    skipped: int = 0  # Already checkpointed
+    done: int = 0
+    empty: int = 0
+    failed: int = 0
+    attempts: int = 0  # Fetch attempts, including retries
+    failures: int = 0  # Failed fetch attempts
+    http_pages: int = 0
+    browser_pages: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def finished(self) -> int:
+        return self.done + self.empty + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def pages_per_second(self) -> float:
+        elapsed = self.elapsed
+        return (self.http_pages + self.browser_pages) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.attempts if self.attempts else 0.0
+
+    def log(self, delay: float = None):
+        pending = self.total - self.skipped - self.finished
+        message = (
+            f"Progress: {self.finished}/{self.total - self.skipped} "
+            f"({self.done} saved, {self.empty} empty, {self.failed} failed, {pending} pending) | "
+            f"{self.pages_per_second:.2f} pages/s "
+            f"({self.http_pages} http, {self.browser_pages} browser) | "
+            f"failure rate {self.failure_rate:.1%}"
+        )
+        if delay is not None:
+            message += f" | delay {delay:.2f}s"
+        logger.info(message)
 
-            logger.info(f"Processing batch {batch_start + 1}-{batch_end} of {total}...")
 
-            # Get fresh DB connection for each batch
-            db = get_fresh_db_session()
+@dataclass
+class ScrapeResult:
+    """Final outcome of one municipality, queued for the writer."""
+    municipality_id: int
+    status: str
+    method: Optional[str]
+    attempts: int
+    data: Optional[CadUnicoExtract] = None
+    error: Optional[str] = None
+
+
+class SagiScraper:
+    """Concurrent, resumable CadÚnico scraper.
+
+    ``concurrency`` workers take municipalities from a queue and try the
+    cheap HTTP path first; when it returns an empty page and
+    ``use_browser`` is set, they retry in a context borrowed from a
+    ``BrowserPool``. A shared ``AdaptiveThrottle`` paces and backs off all
+    requests. Failed municipalities go back to the end of the queue until
+    ``max_attempts``.
+
+    A single writer saves results in batches, together with a
+    ``ScrapeCheckpoint`` per municipality, in one transaction per batch.
+    A new run with the same period skips municipalities already saved or
+    known to be empty.
+    """
 
-            try:
-                for i, (muni_id, ibge_code, name) in enumerate(batch, batch_start + 1):
-                    try:
-                        # Fetch data
-                        if use_browser:
-                            data = await fetch_cadunico_browser(ibge_code, periodo, browser_manager)
-                        else:
-                            data = await fetch_cadunico_http(client, ibge_code, periodo)
-
-                        if not data:
-                            logger.warning(f"No data for {name}")
-                            error_count += 1
-                            continue
-
-                        if data.total_families == 0 and data.total_persons == 0:
-                            logger.debug(f"Empty data for {name}")
-                            empty_count += 1
-                            continue
-
-                        # Determine reference date
-                        ref_date = date.today().replace(day=1)
-                        if periodo:
-                            parts = periodo.split('-')
-                            if len(parts) >= 2:
-                                if len(parts[0]) == 4:  # 2024-10-01
-                                    ref_date = date(int(parts[0]), int(parts[1]), 1)
-                                else:  # 10-2024
-                                    ref_date = date(int(parts[1]), int(parts[0]), 1)
-
-                        # Save
-                        if save_cadunico_data(db, muni_id, data, ref_date):
-                            success_count += 1
-                            logger.info(
-                                f"[{i}/{total}] {name}: "
-                                f"{data.total_families:,} families, "
-                                f"{data.total_persons:,} persons"
-                            )
-
-                        # Progress log
-                        if i % 100 == 0:
-                            logger.info(
-                                f"Progress: {i}/{total} "
-                                f"({success_count} success, {empty_count} empty, {error_count} errors)"
-                            )
-
-                        await asyncio.sleep(delay)
-
-                    except Exception as e:
-                        logger.error(f"Error processing {name}: {e}")
-                        error_count += 1
+    JOB = "sagi_cadunico"
+
+    def __init__(
+        self,
+        config: ScraperConfig = None,
+        periodo: str = None,
+        session_factory=SessionLocal,
+        log_every: int = 100,
+    ):
+        self.config = config or ScraperConfig()
+        self.periodo = periodo
+        self.reference_date = reference_date_for(periodo)
+        self.run_key = self.reference_date.isoformat()
+        self.session_factory = session_factory
+        self.log_every = log_every
+        self.stats = ScrapeStats()
+        self.throttle = AdaptiveThrottle(self.config.min_delay, self.config.max_delay)
+        self.browser_pool: Optional[BrowserPool] = None
+
+    # -- checkpoints -------------------------------------------------------
+
+    def _checkpoints(self, db: Session):
+        return db.query(ScrapeCheckpoint).filter(
+            ScrapeCheckpoint.job == self.JOB,
+            ScrapeCheckpoint.run_key == self.run_key,
+        )
 
-            finally:
-                # Close DB connection after each batch
+    def completed_ids(self) -> Set[int]:
+        """Municipalities of this run already saved or known to be empty."""
+        db = self.session_factory()
+        try:
+            if self.config.restart:
+                self._checkpoints(db).delete(synchronize_session=False)
+                db.commit()
+                return set()
+            rows = self._checkpoints(db).filter(
+                ScrapeCheckpoint.status.in_([ScrapeStatus.DONE, ScrapeStatus.EMPTY])
+            ).with_entities(ScrapeCheckpoint.municipality_id)
+            return {municipality_id for (municipality_id,) in rows}
+        finally:
+            db.close()
+
+    def write_results(self, results: List[ScrapeResult]) -> None:
+        """Save a batch of results and their checkpoints in one transaction."""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            for result in results:
+                if result.status == ScrapeStatus.DONE:
+                    apply_cadunico_data(db, result.municipality_id, result.data, self.reference_date)
+                db.merge(ScrapeCheckpoint(
+                    job=self.JOB,
+                    run_key=self.run_key,
+                    municipality_id=result.municipality_id,
+                    status=result.status,
+                    method=result.method,
+                    attempts=result.attempts,
+                    last_error=result.error,
+                    updated_at=now,
+                ))
+            db.commit()
+        except Exception as e:
+            # Not checkpointed: the next run retries these municipalities
+            logger.error(f"Error saving batch of {len(results)} results: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    # -- fetching ----------------------------------------------------------
+
+    async def _fetch(self, client: httpx.AsyncClient, ibge_code: str):
+        """HTTP first, browser fallback. Returns (data or None, method)."""
+        self.stats.attempts += 1
+        await self.throttle.wait()
+        data = await fetch_cadunico_http(client, ibge_code, self.periodo, base_url=self.config.base_url)
+        method = "http"
+        if data is not None:
+            self.stats.http_pages += 1
+
+        if data is not None and _is_empty(data) and self.config.use_browser:
+            await self.throttle.wait()
+            async with self.browser_pool.slot() as slot:
+                data = await fetch_cadunico_browser(
+                    ibge_code, self.periodo, slot, max_retries=0, base_url=self.config.base_url
+                )
+            method = "browser"
+            if data is not None:
+                self.stats.browser_pages += 1
+
+        return data, method
+
+    async def _worker(self, client, queue: asyncio.Queue, results: asyncio.Queue, attempts: Dict[int, int]):
+        while True:
+            muni_id, ibge_code, name = item = await queue.get()
+            try:
+                attempts[muni_id] = attempts.get(muni_id, 0) + 1
+                error = None
                 try:
-                    db.close()
+                    data, method = await self._fetch(client, ibge_code)
                 except Exception as e:
-                    logger.warning(f"Error closing DB: {e}")
-
-            # Small delay between batches
-            await asyncio.sleep(1)
+                    data, method, error = None, None, str(e)
+
+                if data is None:
+                    self.stats.failures += 1
+                    self.throttle.failure()
+                    if attempts[muni_id] < self.config.max_attempts:
+                        logger.debug(f"Retrying {name} later (attempt {attempts[muni_id]})")
+                        queue.put_nowait(item)
+                        continue
+                    logger.warning(f"Giving up on {name} after {attempts[muni_id]} attempts")
+                    self.stats.failed += 1
+                    await results.put(ScrapeResult(
+                        muni_id, ScrapeStatus.FAILED, method, attempts[muni_id],
+                        error=error or "no data returned",
+                    ))
+                else:
+                    self.throttle.success()
+                    if _is_empty(data):
+                        self.stats.empty += 1
+                        status = ScrapeStatus.EMPTY
+                    else:
+                        self.stats.done += 1
+                        status = ScrapeStatus.DONE
+                        logger.debug(
+                            f"{name}: {data.total_families:,} families, {data.total_persons:,} persons"
+                        )
+                    await results.put(ScrapeResult(muni_id, status, method, attempts[muni_id], data=data))
+
+                if self.log_every and self.stats.finished % self.log_every == 0:
+                    self.stats.log(self.throttle.delay)
+            finally:
+                queue.task_done()
 
+    async def _writer(self, results: asyncio.Queue):
+        batch: List[ScrapeResult] = []
+        while True:
+            try:
+                result = await asyncio.wait_for(results.get(), timeout=5.0)
+            except asyncio.TimeoutError:
+                result = ...  # Idle: flush what we have
+            if result is None or result is ...:
+                if batch:
+                    await asyncio.to_thread(self.write_results, batch)
+                    batch = []
+                if result is None:
+                    return
+                continue
+            batch.append(result)
+            if len(batch) >= self.config.write_batch:
+                await asyncio.to_thread(self.write_results, batch)
+                batch = []
+
+    # -- run ---------------------------------------------------------------
+
+    async def run(self, municipalities: List[Tuple[int, str, str]]) -> ScrapeStats:
+        """Scrape ``(id, ibge_code, name)`` tuples, skipping checkpointed ones."""
+        self.stats = ScrapeStats(total=len(municipalities))
+
+        completed = await asyncio.to_thread(self.completed_ids)
+        pending = [m for m in municipalities if m[0] not in completed]
+        self.stats.skipped = len(municipalities) - len(pending)
+        if self.stats.skipped:
+            logger.info(f"Resuming: {self.stats.skipped} municipalities already done for {self.run_key}")
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in pending:
+            queue.put_nowait(item)
+        results: asyncio.Queue = asyncio.Queue()
+        attempts: Dict[int, int] = {}
+
+        if self.config.use_browser:
+            self.browser_pool = BrowserPool(self.config.browser_contexts, self.config.context_max_requests)
+
+        limits = httpx.Limits(max_connections=self.config.concurrency)
+        writer = asyncio.create_task(self._writer(results))
+        workers = []
+        try:
+            async with httpx.AsyncClient(
+                timeout=self.config.http_timeout, follow_redirects=True, limits=limits
+            ) as client:
+                workers = [
+                    asyncio.create_task(self._worker(client, queue, results, attempts))
+                    for _ in range(max(1, self.config.concurrency))
+                ]
+                await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # Persist whatever finished, even when interrupted
+            await results.put(None)
+            await writer
+            if self.browser_pool:
+                await self.browser_pool.stop()
+                self.browser_pool = None
+
+        self.stats.log(self.throttle.delay)
+        return self.stats
+
+
+def _is_empty(data: CadUnicoExtract) -> bool:
+    return data.total_families == 0 and data.total_persons == 0
+
+
+def list_municipalities(state_filter: str = None) -> Optional[List[Tuple[int, str, str]]]:
+    """(id, ibge_code, name) of all municipalities, or of one state (None if unknown)."""
+    db = get_fresh_db_session()
+    try:
+        query = db.query(Municipality.id, Municipality.ibge_code, Municipality.name)
+        if state_filter:
+            state = db.query(State).filter(State.abbreviation == state_filter.upper()).first()
+            if not state:
+                logger.error(f"State not found: {state_filter}")
+                return None
+            query = query.filter(Municipality.state_id == state.id)
+            logger.info(f"Filtering by state: {state.name}")
+        return [tuple(row) for row in query.order_by(Municipality.ibge_code).all()]
     finally:
-        # Cleanup
-        if client:
-            await client.aclose()
+        db.close()
 
-        if browser_manager:
-            await browser_manager.stop()
-            _browser_manager = None
+
+async def ingest_all_municipalities(
+    state_filter: str = None,
+    periodo: str = None,
+    use_browser: bool = False,
+    delay: float = ScraperConfig.min_delay,
+    batch_size: int = ScraperConfig.write_batch,
+    concurrency: int = ScraperConfig.concurrency,
+    browser_contexts: int = ScraperConfig.browser_contexts,
+    restart: bool = False,
+) -> Optional[ScrapeStats]:
+    """Ingest CadÚnico data for all municipalities.
+
+    Args:
+        state_filter: Filter by state abbreviation (e.g., 'SP')
+        periodo: Reference period (e.g., '2024-10-01')
+        use_browser: Retry pages that come back empty over HTTP with Playwright
+        delay: Minimum interval between request starts, in seconds
+        batch_size: Results saved per database transaction
+        concurrency: Municipalities fetched in parallel
+        browser_contexts: Size of the Playwright context pool
+        restart: Ignore checkpoints and scrape every municipality again
+    """
+    logger.info("=" * 60)
+    logger.info("SAGI CadÚnico Data Ingestion")
+    logger.info(f"Method: {'HTTP with browser fallback' if use_browser else 'HTTP'}")
+    logger.info(f"Concurrency: {concurrency}, write batch: {batch_size}")
+    logger.info("=" * 60)
+
+    municipalities = list_municipalities(state_filter)
+    if municipalities is None:
+        return None
+    logger.info(f"Processing {len(municipalities)} municipalities...")
+
+    config = ScraperConfig(
+        concurrency=concurrency,
+        browser_contexts=browser_contexts,
+        use_browser=use_browser,
+        min_delay=delay,
+        write_batch=batch_size,
+        restart=restart,
+    )
+    stats = await SagiScraper(config, periodo).run(municipalities)
 
     logger.info("=" * 60)
     logger.info("INGESTION COMPLETE")
-    logger.info(f"Success: {success_count}")
-    logger.info(f"Empty (no data): {empty_count}")
-    logger.info(f"Errors: {error_count}")
+    logger.info(f"Success: {stats.done}")
+    logger.info(f"Empty (no data): {stats.empty}")
+    logger.info(f"Errors: {stats.failed}")
+    logger.info(f"Skipped (checkpoint): {stats.skipped}")
+    logger.info(f"Throughput: {stats.pages_per_second:.2f} pages/s, failure rate {stats.failure_rate:.1%}")
     logger.info("=" * 60)
+    return stats
 
 
 async def test_municipality(ibge_code: str, periodo: str = None, use_browser: bool = False):
@@ -620,28 +994,34 @@ def run_ingestion():
     asyncio.run(ingest_all_municipalities())
 
 
-if __name__ == "__main__":
-    import sys
-
-    use_browser = '--browser' in sys.argv
-
-    # Remove --browser from args for further processing
-    args = [a for a in sys.argv if a != '--browser']
+def main():
+    parser = argparse.ArgumentParser(description="Scrape CadÚnico data from SAGI RI")
+    parser.add_argument("periodo", nargs="?", help="Reference period (2024-10-01 or 10-2024)")
+    parser.add_argument("--test", metavar="IBGE", help="Only fetch and print one municipality")
+    parser.add_argument("--state", help="State abbreviation (default: all)")
+    parser.add_argument("--browser", action="store_true", help="Fall back to Playwright on empty pages")
+    parser.add_argument("--concurrency", type=int, default=ScraperConfig.concurrency)
+    parser.add_argument("--contexts", type=int, default=ScraperConfig.browser_contexts,
+                        help="Playwright contexts in the pool")
+    parser.add_argument("--delay", type=float, default=ScraperConfig.min_delay,
+                        help="Minimum seconds between request starts")
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoints of this period")
+    args = parser.parse_args()
+
+    if args.test:
+        asyncio.run(test_municipality(args.test, args.periodo, args.browser))
+        return
+
+    asyncio.run(ingest_all_municipalities(
+        state_filter=args.state,
+        periodo=args.periodo,
+        use_browser=args.browser,
+        delay=args.delay,
+        concurrency=args.concurrency,
+        browser_contexts=args.contexts,
+        restart=args.restart,
+    ))
 
-    if len(args) > 1:
-        if args[1] == "--test" and len(args) > 2:
-            ibge_code = args[2]
-            periodo = args[3] if len(args) > 3 else None
-            asyncio.run(test_municipality(ibge_code, periodo, use_browser))
 
-        elif args[1] == "--state" and len(args) > 2:
-            state = args[2]
-            periodo = args[3] if len(args) > 3 else None
-            asyncio.run(ingest_all_municipalities(state_filter=state, periodo=periodo, use_browser=use_browser))
-
-        elif args[1] == "--help":
-            print(__doc__)
-        else:
-            print("Unknown option. Use --help for usage info.")
-    else:
-        asyncio.run(ingest_all_municipalities(use_browser=use_browser))
+if __name__ == "__main__":
+    main()
@@ -21,7 +21,8 @@ from sqlalchemy.orm import Session
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.database import SessionLocal
-from app.models import State, Municipality, Program, BeneficiaryData
+from app.jobs.carga_em_lote import carregar_beneficiary_data
+from app.models import State, Municipality, Program
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -339,7 +340,7 @@ def distribute_to_municipalities(
             mun_by_state[mun.state_id] = []
         mun_by_state[mun.state_id].append(mun)
 
-    records_created = 0
+    rows = []
 
     for state_abbrev, data in state_data.items():
         state_id = state_id_map.get(state_abbrev)
@@ -375,53 +376,29 @@ def distribute_to_municipalities(
             # Calculate coverage rate (beneficiaries / population)
             coverage = beneficiaries / mun._temp_pop if mun._temp_pop > 0 else 0
 
-            # Check if record exists and update, otherwise create
-            existing = db.query(BeneficiaryData).filter(
-                BeneficiaryData.municipality_id == mun.id,
-                BeneficiaryData.program_id == program_id,
-                BeneficiaryData.reference_date == data["date"]
-            ).first()
-
-            if existing:
-                existing.total_beneficiaries = beneficiaries
-                existing.total_families = int(beneficiaries * 0.8)
-                existing.total_value_brl = value
-                existing.coverage_rate = Decimal(str(min(coverage, 1.0)))
-                existing.data_source = "ANEEL_SCS"
-                existing.extra_data = {
+            rows.append({
+                "municipality_id": mun.id,
+                "program_id": program_id,
+                "reference_date": data["date"],
+                "total_beneficiaries": beneficiaries,
+                "total_families": int(beneficiaries * 0.8),  # Estimate
+                "total_value_brl": value,
+                "coverage_rate": Decimal(str(min(coverage, 1.0))),
+                "data_source": "ANEEL_SCS",
+                "extra_data": {
                     "state_total_beneficiaries": data["total_beneficiaries"],
                     "distribution_method": "proportional_by_population",
                     "indigenous": int(data["indigenous"] * pop_ratio),
                     "quilombola": int(data["quilombola"] * pop_ratio),
                     "bpc": int(data["bpc"] * pop_ratio),
                     "low_income": int(data["low_income"] * pop_ratio),
-                }
-            else:
-                beneficiary_data = BeneficiaryData(
-                    municipality_id=mun.id,
-                    program_id=program_id,
-                    reference_date=data["date"],
-                    total_beneficiaries=beneficiaries,
-                    total_families=int(beneficiaries * 0.8),  # Estimate
-                    total_value_brl=value,
-                    coverage_rate=Decimal(str(min(coverage, 1.0))),
-                    data_source="ANEEL_SCS",
-                    extra_data={
-                        "state_total_beneficiaries": data["total_beneficiaries"],
-                        "distribution_method": "proportional_by_population",
-                        "indigenous": int(data["indigenous"] * pop_ratio),
-                        "quilombola": int(data["quilombola"] * pop_ratio),
-                        "bpc": int(data["bpc"] * pop_ratio),
-                        "low_income": int(data["low_income"] * pop_ratio),
-                    }
-                )
-                db.add(beneficiary_data)
-            records_created += 1
-
-        db.commit()
-        logger.info(f"Created {len(state_muns)} records for {state_abbrev}")
-
-    logger.info(f"Total records created: {records_created}")
+                },
+            })
+
+        logger.info(f"Distributed {len(state_muns)} records for {state_abbrev}")
+
+    result = carregar_beneficiary_data(db, rows)
+    logger.info(f"Total records created: {result.inseridos}, updated: {result.atualizados}")
 
 
 async def ingest_tsee_data():
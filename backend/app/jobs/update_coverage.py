@@ -1,93 +1,222 @@
 """Update coverage rates based on CadÚnico eligible families.
 
-This script recalculates coverage_rate for all beneficiary_data records
+This script recalculates coverage_rate for beneficiary_data records
 using the CadÚnico total families as the denominator.
 
 Coverage = program_beneficiaries / total_cadunico_families
 
 The script matches CadÚnico data by municipality and reference_date.
 If exact date not found, uses the closest available CadÚnico date.
+
+The recompute is a single SQL statement: each beneficiary row picks its
+nearest CadÚnico month with a LATERAL join on (municipality_id,
+reference_date), and only rows whose coverage actually changes are
+written. It can be scoped to what an ETL run touched:
+
+    python -m app.jobs.update_coverage                          # everything
+    python -m app.jobs.update_coverage --programa BPC --referencia 2024-05
+    python -m app.jobs.update_coverage --municipios 3550308 3304557
+    python -m app.jobs.update_coverage --desde 2024-06-01T00:00
 """
 
+import argparse
 import logging
-from decimal import Decimal
-from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Iterable, List, Optional
 
+from sqlalchemy import func, select, text
 from sqlalchemy.orm import Session
 
+from app.core.cache import bump_data_generation
 from app.database import SessionLocal
-from app.models import BeneficiaryData, CadUnicoData
+from app.jobs.atualizar_agregados import atualizar_agregados
+from app.models import BeneficiaryData, Municipality, Program
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Nearest CadÚnico month per row; ties go to the earlier month. For Bolsa
+# Família use families; for others use beneficiaries. Capped at 1.0 (100%).
+RECOMPUTE_SQL = """
+    WITH computed AS (
+        SELECT bd.id,
+               CASE WHEN c.total_families > 0 THEN
+                   ROUND(LEAST(
+                       COALESCE(NULLIF(bd.total_families, 0), bd.total_beneficiaries, 0)::numeric
+                       / c.total_families,
+                       1
+                   ), 4)
+               ELSE 0 END AS coverage,
+               COALESCE(c.total_families > 0, FALSE) AS has_cadunico
+        FROM beneficiary_data bd
+        LEFT JOIN LATERAL (
+            SELECT cd.total_families
+            FROM cadunico_data cd
+            WHERE cd.municipality_id = bd.municipality_id
+            ORDER BY abs(cd.reference_date - bd.reference_date), cd.reference_date
+            LIMIT 1
+        ) c ON TRUE
+        WHERE {scope}
+    ),
+    changed AS (
+        UPDATE beneficiary_data b
+        SET coverage_rate = computed.coverage
+        FROM computed
+        WHERE b.id = computed.id
+          AND b.coverage_rate IS DISTINCT FROM computed.coverage
+        RETURNING b.program_id, b.reference_date
+    )
+    SELECT
+        (SELECT count(*) FROM computed),
+        (SELECT count(*) FROM computed WHERE NOT has_cadunico),
+        (SELECT count(*) FROM changed),
+        (SELECT array_agg(DISTINCT program_id) FROM changed),
+        (SELECT array_agg(DISTINCT reference_date) FROM changed)
+"""
+
 
-def update_coverage_rates(db: Session):
-    """Update coverage rates for all beneficiary data records."""
+@dataclass
+class CoverageResult:
+    """Outcome of a coverage recompute."""
+    evaluated: int = 0
+    without_cadunico: int = 0
+    updated: int = 0
+    program_ids: List[int] = field(default_factory=list)
+    reference_dates: List[date] = field(default_factory=list)
+
+
+def scope_clause(
+    program_ids: Optional[Iterable[int]] = None,
+    reference_dates: Optional[Iterable[date]] = None,
+    municipality_ids: Optional[Iterable[int]] = None,
+    since: Optional[datetime] = None,
+):
+    """WHERE clause and parameters selecting the rows to recompute.
+
+    A load (programs and/or months) and the municipalities with new CadÚnico
+    data are alternatives: a row is recomputed if it matches any of them.
+    ``since`` selects rows loaded, or municipalities whose CadÚnico changed,
+    after that moment. No arguments means every row.
+    """
+    params = {}
+    scopes = []
+
+    load = []
+    if program_ids is not None:
+        params["program_ids"] = list(program_ids)
+        load.append("bd.program_id = ANY(:program_ids)")
+    if reference_dates is not None:
+        params["reference_dates"] = list(reference_dates)
+        load.append("bd.reference_date = ANY(:reference_dates)")
+    if load:
+        scopes.append(" AND ".join(load))
+
+    if municipality_ids is not None:
+        params["municipality_ids"] = list(municipality_ids)
+        scopes.append("bd.municipality_id = ANY(:municipality_ids)")
+
+    if since is not None:
+        params["since"] = since
+        scopes.append("bd.ingested_at >= :since")
+        scopes.append(
+            "bd.municipality_id IN "
+            "(SELECT municipality_id FROM cadunico_data WHERE ingested_at >= :since)"
+        )
+
+    if not scopes:
+        return "TRUE", params
+    return " OR ".join(f"({s})" for s in scopes), params
+
+
+def recompute_coverage(
+    db: Session,
+    program_ids: Optional[Iterable[int]] = None,
+    reference_dates: Optional[Iterable[date]] = None,
+    municipality_ids: Optional[Iterable[int]] = None,
+    since: Optional[datetime] = None,
+) -> CoverageResult:
+    """Recompute coverage_rate in SQL for the scoped rows and commit.
+
+    Returns:
+        CoverageResult with the programs and months whose coverage changed
+    """
+    scope, params = scope_clause(program_ids, reference_dates, municipality_ids, since)
+    try:
+        row = db.execute(text(RECOMPUTE_SQL.format(scope=scope)), params).one()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    evaluated, without_cadunico, updated, changed_programs, changed_dates = row
+    return CoverageResult(
+        evaluated=evaluated,
+        without_cadunico=without_cadunico,
+        updated=updated,
+        program_ids=sorted(changed_programs or []),
+        reference_dates=sorted(changed_dates or []),
+    )
+
+
+def update_coverage_rates(
+    db: Session,
+    program_ids: Optional[Iterable[int]] = None,
+    reference_dates: Optional[Iterable[date]] = None,
+    municipality_ids: Optional[Iterable[int]] = None,
+    since: Optional[datetime] = None,
+) -> CoverageResult:
+    """Update coverage rates (all rows, or the given scope).
+
+    When anything changed, refreshes the summary tables for the affected
+    programs and months and drops the response caches.
+    """
     logger.info("Updating coverage rates based on CadÚnico data")
 
-    # Build CadÚnico lookup: {municipality_id: {date: total_families}}
-    cadunico_data = db.query(CadUnicoData).all()
-    cadunico_by_mun = defaultdict(dict)
-    for c in cadunico_data:
-        cadunico_by_mun[c.municipality_id][c.reference_date] = c.total_families
-
-    logger.info(f"Loaded CadÚnico data for {len(cadunico_by_mun)} municipalities")
-
-    # Get all available CadÚnico dates sorted
-    all_dates = sorted(set(c.reference_date for c in cadunico_data))
-    logger.info(f"CadÚnico dates available: {all_dates[0]} to {all_dates[-1]}")
-
-    def find_closest_cadunico(mun_id, ref_date):
-        """Find CadÚnico data for municipality, matching by date or closest."""
-        mun_data = cadunico_by_mun.get(mun_id, {})
-        if not mun_data:
-            return None
-
-        # Exact match
-        if ref_date in mun_data:
-            return mun_data[ref_date]
-
-        # Find closest date
-        available = sorted(mun_data.keys())
-        closest = min(available, key=lambda d: abs((d - ref_date).days))
-        return mun_data[closest]
-
-    # Update beneficiary data
-    beneficiary_records = db.query(BeneficiaryData).all()
-    updated = 0
-    no_cadunico = 0
-
-    for record in beneficiary_records:
-        eligible = find_closest_cadunico(record.municipality_id, record.reference_date)
-
-        if eligible and eligible > 0:
-            # For Bolsa Família, use families; for others use beneficiaries
-            numerator = record.total_families or record.total_beneficiaries or 0
-            coverage = numerator / eligible
-            # Cap at 1.0 (100%)
-            coverage = min(coverage, 1.0)
-            record.coverage_rate = Decimal(str(round(coverage, 4)))
-            updated += 1
-        else:
-            record.coverage_rate = Decimal("0")
-            no_cadunico += 1
-
-    db.commit()
-    logger.info(f"Updated coverage for {updated} records")
-    logger.info(f"Records without CadÚnico data: {no_cadunico}")
+    result = recompute_coverage(db, program_ids, reference_dates, municipality_ids, since)
+
+    if result.updated:
+        atualizar_agregados(db, result.program_ids, result.reference_dates)
+        bump_data_generation()
+
+    logger.info(
+        f"Evaluated {result.evaluated} records, updated coverage for {result.updated}"
+    )
+    logger.info(f"Records without CadÚnico data: {result.without_cadunico}")
+    return result
 
 
 def main():
     """Main function to update coverage rates."""
+    parser = argparse.ArgumentParser(description="Recalculate coverage rates")
+    parser.add_argument("--programa", help="Program code of the load (default: all)")
+    parser.add_argument("--referencia", help="Reference month YYYY-MM (default: all)")
+    parser.add_argument("--municipios", nargs="*", help="IBGE codes with new CadÚnico data")
+    parser.add_argument("--desde", help="Only rows/CadÚnico ingested since (ISO timestamp)")
+    args = parser.parse_args()
+
     logger.info("Starting coverage rate update")
 
     db = SessionLocal()
     try:
-        update_coverage_rates(db)
+        program_ids = None
+        if args.programa:
+            program_ids = db.execute(
+                select(Program.id).where(Program.code == args.programa.upper())
+            ).scalars().all()
+        reference_dates = None
+        if args.referencia:
+            reference_dates = [datetime.strptime(args.referencia, "%Y-%m").date()]
+        municipality_ids = None
+        if args.municipios:
+            municipality_ids = db.execute(
+                select(Municipality.id).where(Municipality.ibge_code.in_(args.municipios))
+            ).scalars().all()
+        since = datetime.fromisoformat(args.desde) if args.desde else None
+
+        update_coverage_rates(db, program_ids, reference_dates, municipality_ids, since)
 
         # Print summary statistics
-        from sqlalchemy import func
         stats = db.query(
             func.count(BeneficiaryData.id),
             func.avg(BeneficiaryData.coverage_rate),
@@ -96,9 +225,9 @@ def main():
         ).first()
 
         logger.info(f"Total records: {stats[0]}")
-        logger.info(f"Avg coverage: {float(stats[1]):.2%}")
-        logger.info(f"Min coverage: {float(stats[2]):.2%}")
-        logger.info(f"Max coverage: {float(stats[3]):.2%}")
+        logger.info(f"Avg coverage: {float(stats[1] or 0):.2%}")
+        logger.info(f"Min coverage: {float(stats[2] or 0):.2%}")
+        logger.info(f"Max coverage: {float(stats[3] or 0):.2%}")
 
     finally:
         db.close()
@@ -70,6 +70,39 @@ async def lifespan(app: FastAPI):
     else:
         logger.info("etl_scheduler_skipped", reason="development environment")
 
+    # Warm the compiled benefit catalog used by eligibility checks
+    try:
+        from app.database import AsyncSessionLocal
+        from app.services.benefit_catalog import get_benefit_catalog
+        async with AsyncSessionLocal() as session:
+            catalog = await get_benefit_catalog(session)
+        logger.info("benefit_catalog_loaded", benefits=len(catalog))
+    except Exception as e:
+        logger.warning("benefit_catalog_warmup_failed", error=str(e))
+        # Loaded lazily on the first eligibility check instead
+
+    # Build the nearest CRAS / pharmacy spatial indexes
+    try:
+        import asyncio
+        from app.services.spatial_index import load_spatial_indexes
+        counts = await asyncio.to_thread(load_spatial_indexes)
+        logger.info("spatial_indexes_loaded", **counts)
+    except Exception as e:
+        logger.warning("spatial_indexes_warmup_failed", error=str(e))
+        # Built lazily on the first nearby lookup instead
+
+    # Build the municipality autocomplete index
+    try:
+        from app.services.municipality_search import aget_municipality_search_index
+        search_index = await aget_municipality_search_index()
+        logger.info("municipality_search_index_loaded", municipalities=len(search_index))
+    except Exception as e:
+        logger.warning("municipality_search_index_warmup_failed", error=str(e))
+
+    # Map the CPF membership filter built by the beneficiary indexer
+    from app.services.filtro_cpf import carregar_filtro
+    carregar_filtro()
+
     yield
 
     # Shutdown
@@ -90,6 +123,20 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error("etl_scheduler_stop_failed", error=str(e))
 
+    # Finish queued WhatsApp replies before closing their clients
+    from app.routers.webhook import parar_fila_whatsapp
+    await parar_fila_whatsapp()
+
+    from app.core.cache import close_async_redis
+    await close_async_redis()
+
+    from app.services.transparencia_service import fechar_cliente
+    await fechar_cliente()
+
+    from app.agent.context import session_manager
+    if hasattr(session_manager, "aclose"):
+        await session_manager.aclose()
+
     logger.info("application_shutting_down")
 
 
@@ -40,6 +40,49 @@ db_query_duration_seconds = Histogram(
     ["operation"],
 )
 
+# Session store metrics
+session_store_duration_seconds = Histogram(
+    "session_store_duration_seconds",
+    "Session store (Redis) operation duration in seconds",
+    ["operation"],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0],
+)
+
+# Beneficiary lookups by CPF (local index, Portal da Transparência API)
+beneficiario_lookups_total = Counter(
+    "beneficiario_lookups_total",
+    "CPF benefit lookups by answer source",
+    ["source"],
+)
+
+beneficiario_filter_entries = Gauge(
+    "beneficiario_filter_entries",
+    "CPF hashes in the loaded beneficiary membership filter",
+)
+
+beneficiario_filter_false_positive_rate = Gauge(
+    "beneficiario_filter_false_positive_rate",
+    "Estimated false-positive rate of the beneficiary membership filter",
+)
+
+# WhatsApp chat reply queue
+whatsapp_messages_total = Counter(
+    "whatsapp_messages_total",
+    "WhatsApp chat messages by outcome (queued, duplicate, rejected, forbidden, sent, failed)",
+    ["result"],
+)
+
+whatsapp_queue_depth = Gauge(
+    "whatsapp_queue_depth",
+    "WhatsApp chat messages waiting or being processed",
+)
+
+whatsapp_reply_latency_seconds = Histogram(
+    "whatsapp_reply_latency_seconds",
+    "Time from webhook receipt to the reply sent through the Twilio API",
+    buckets=[0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0],
+)
+
 
 class MetricsMiddleware(BaseHTTPMiddleware):
     """Middleware to collect Prometheus metrics."""
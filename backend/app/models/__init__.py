@@ -11,6 +11,8 @@ from app.models.benefit import Benefit, BenefitScope, BenefitStatus
 from app.models.partner import Partner, PartnerConversion, PartnerType, ConversionEvent
 from app.models.advisor import Advisor, Case, CaseNote, CaseStatus, CasePriority
 from app.models.cras_location import CrasLocation
+from app.models.aggregate_summary import BeneficiarySummary, MunicipalitySummary, SummaryLevel
+from app.models.scrape_checkpoint import ScrapeCheckpoint, ScrapeStatus
 
 __all__ = [
     "State",
@@ -38,4 +40,9 @@ __all__ = [
     "CaseStatus",
     "CasePriority",
     "CrasLocation",
+    "BeneficiarySummary",
+    "MunicipalitySummary",
+    "SummaryLevel",
+    "ScrapeCheckpoint",
+    "ScrapeStatus",
 ]
@@ -0,0 +1,92 @@
+"""Summary tables maintained from beneficiary_data by the ETL.
+
+Dashboards read these instead of re-aggregating every month of history.
+Coverage is stored as sum and count of non-null rates so averages over
+any combination of rows match ``AVG(coverage_rate)`` on the raw data.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    UniqueConstraint,
+)
+
+from app.database import Base
+
+
+class SummaryLevel:
+    """Levels stored in ``beneficiary_summary``."""
+
+    NATIONAL = "national"
+    REGION = "region"
+    STATE = "state"
+
+
+NATIONAL_CODE = "BR"
+
+
+class BeneficiarySummary(Base):
+    """Monthly program totals per national, region and state level.
+
+    ``code`` is ``"BR"``, the region code (``"NE"``) or the state
+    abbreviation (``"SP"``).
+    """
+
+    __tablename__ = "beneficiary_summary"
+
+    id = Column(Integer, primary_key=True)
+    level = Column(String(10), nullable=False)
+    code = Column(String(7), nullable=False)
+    program_id = Column(Integer, ForeignKey("programs.id"), nullable=False)
+    reference_date = Column(Date, nullable=False)
+
+    total_beneficiaries = Column(BigInteger)
+    total_families = Column(BigInteger)
+    total_value_brl = Column(Numeric(18, 2))
+    coverage_sum = Column(Numeric(14, 4))
+    coverage_count = Column(Integer)
+    municipality_count = Column(Integer)
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "level", "code", "program_id", "reference_date",
+            name="uq_beneficiary_summary_key",
+        ),
+        Index("ix_beneficiary_summary_level_date", "level", "reference_date"),
+    )
+
+    def __repr__(self):
+        return f"<BeneficiarySummary {self.level}:{self.code}/{self.program_id} @ {self.reference_date}>"
+
+
+class MunicipalitySummary(Base):
+    """All-history program totals per municipality (admin tables, export)."""
+
+    __tablename__ = "municipality_summary"
+
+    municipality_id = Column(Integer, ForeignKey("municipalities.id"), primary_key=True)
+    program_id = Column(Integer, ForeignKey("programs.id"), primary_key=True)
+
+    total_beneficiaries = Column(BigInteger)
+    total_families = Column(BigInteger)
+    total_value_brl = Column(Numeric(18, 2))
+    coverage_sum = Column(Numeric(14, 4))
+    coverage_count = Column(Integer)
+    months = Column(Integer)
+    last_reference_date = Column(Date)
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<MunicipalitySummary {self.municipality_id}/{self.program_id}>"
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Index, Numeric, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
@@ -32,12 +32,20 @@ class BeneficiaryData(Base):
 
     # Data quality
     data_source = Column(String(100))
-    ingested_at = Column(DateTime, default=datetime.utcnow)
+    ingested_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     # Relationships
     municipality = relationship("Municipality", back_populates="beneficiary_data")
     program = relationship("Program", back_populates="beneficiary_data")
 
+    # One row per municipality, program and month (upsert key of the loaders)
+    __table_args__ = (
+        UniqueConstraint(
+            "municipality_id", "program_id", "reference_date",
+            name="uq_beneficiary_data_key",
+        ),
+    )
+
     def __repr__(self):
         return f"<BeneficiaryData {self.municipality_id}/{self.program_id} @ {self.reference_date}>"
 
@@ -75,11 +83,16 @@ class CadUnicoData(Base):
     persons_65_plus = Column(Integer)
 
     # Timestamps
-    ingested_at = Column(DateTime, default=datetime.utcnow)
+    ingested_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     # Relationships
     municipality = relationship("Municipality", back_populates="cadunico_data")
 
+    # Nearest-month lookup of update_coverage
+    __table_args__ = (
+        Index("ix_cadunico_data_municipality_date", "municipality_id", "reference_date"),
+    )
+
     def __repr__(self):
         return f"<CadUnicoData {self.municipality_id} @ {self.reference_date}>"
 
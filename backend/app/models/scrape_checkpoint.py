@@ -0,0 +1,43 @@
+"""Progress of resumable scraping jobs.
+
+Each scraper run stores one row per municipality it finished, so a crashed
+or interrupted run can pick up where it stopped instead of starting over.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from app.database import Base
+
+
+class ScrapeStatus:
+    """Final states of a municipality within a run."""
+
+    DONE = "done"  # Data saved
+    EMPTY = "empty"  # Page loaded but had no data
+    FAILED = "failed"  # Gave up after the configured attempts
+
+
+class ScrapeCheckpoint(Base):
+    """Outcome of one municipality in one scraper run.
+
+    ``run_key`` identifies the run being resumed (for SAGI, the reference
+    month in ISO format), so scraping a new month starts from scratch.
+    """
+
+    __tablename__ = "scrape_checkpoints"
+
+    job = Column(String(50), primary_key=True)
+    run_key = Column(String(20), primary_key=True)
+    municipality_id = Column(Integer, primary_key=True)
+
+    status = Column(String(10), nullable=False)
+    method = Column(String(10))  # http, browser
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ScrapeCheckpoint {self.job}/{self.run_key}/{self.municipality_id}: {self.status}>"
@@ -17,11 +17,49 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, desc, asc, select
 
 from app.database import get_db
-from app.models import State, Municipality, Program, BeneficiaryData, CadUnicoData
+from app.models import (
+    State,
+    Municipality,
+    Program,
+    BeneficiaryData,
+    BeneficiarySummary,
+    CadUnicoData,
+    MunicipalitySummary,
+    SummaryLevel,
+)
 
 router = APIRouter()
 
 
+async def _municipality_totals(db: AsyncSession, program: Optional[str]):
+    """Per-municipality totals from ``municipality_summary``.
+
+    Returns:
+        ``(subquery, coverage_rate expression, program filter applied)``
+    """
+    stmt = select(
+        MunicipalitySummary.municipality_id,
+        func.sum(MunicipalitySummary.total_beneficiaries).label("total_beneficiaries"),
+        func.sum(MunicipalitySummary.total_families).label("total_families"),
+        func.sum(MunicipalitySummary.total_value_brl).label("total_value"),
+        func.sum(MunicipalitySummary.coverage_sum).label("coverage_sum"),
+        func.sum(MunicipalitySummary.coverage_count).label("coverage_count"),
+    ).group_by(MunicipalitySummary.municipality_id)
+
+    filtered = False
+    if program:
+        prog_stmt = select(Program).where(Program.code == program.upper())
+        prog_result = await db.execute(prog_stmt)
+        prog = prog_result.scalar_one_or_none()
+        if prog:
+            stmt = stmt.where(MunicipalitySummary.program_id == prog.id)
+            filtered = True
+
+    totals = stmt.subquery()
+    coverage = totals.c.coverage_sum / func.nullif(totals.c.coverage_count, 0)
+    return totals, coverage, filtered
+
+
 @router.get("/penetration")
 async def get_penetration_rates(
     state_code: Optional[str] = Query(None, description="Filter by state code (e.g., SP, RJ)"),
@@ -41,7 +79,9 @@ async def get_penetration_rates(
 
     Returns detailed coverage data for all municipalities, ideal for admin tables.
     """
-    # Base query with municipality data
+    totals, coverage, filtered = await _municipality_totals(db, program)
+
+    # Municipalities with their summarized program data
     stmt = (
         select(
             Municipality.ibge_code,
@@ -49,23 +89,16 @@ async def get_penetration_rates(
             State.abbreviation.label("state"),
             State.region,
             Municipality.population,
-            func.sum(BeneficiaryData.total_beneficiaries).label("total_beneficiaries"),
-            func.sum(BeneficiaryData.total_families).label("total_families"),
-            func.sum(BeneficiaryData.total_value_brl).label("total_value"),
-            func.avg(BeneficiaryData.coverage_rate).label("coverage_rate"),
+            totals.c.total_beneficiaries,
+            totals.c.total_families,
+            totals.c.total_value,
+            coverage.label("coverage_rate"),
         )
         .join(State, Municipality.state_id == State.id)
-        .outerjoin(BeneficiaryData, Municipality.id == BeneficiaryData.municipality_id)
+        # A program filter keeps only municipalities with data for it
+        .join(totals, Municipality.id == totals.c.municipality_id, isouter=not filtered)
     )
 
-    # Program filter
-    if program:
-        prog_stmt = select(Program).where(Program.code == program.upper())
-        prog_result = await db.execute(prog_stmt)
-        prog = prog_result.scalar_one_or_none()
-        if prog:
-            stmt = stmt.where(BeneficiaryData.program_id == prog.id)
-
     # State filter
     if state_code:
         stmt = stmt.where(State.abbreviation == state_code.upper())
@@ -76,29 +109,20 @@ async def get_penetration_rates(
     if max_population:
         stmt = stmt.where(Municipality.population <= max_population)
 
-    # Group by municipality
-    stmt = stmt.group_by(
-        Municipality.ibge_code,
-        Municipality.name,
-        State.abbreviation,
-        State.region,
-        Municipality.population,
-    )
-
-    # Coverage filters (applied after grouping via HAVING)
+    # Coverage filters
     if min_coverage is not None:
-        stmt = stmt.having(func.avg(BeneficiaryData.coverage_rate) >= min_coverage / 100)
+        stmt = stmt.where(coverage >= min_coverage / 100)
     if max_coverage is not None:
-        stmt = stmt.having(func.avg(BeneficiaryData.coverage_rate) <= max_coverage / 100)
+        stmt = stmt.where(coverage <= max_coverage / 100)
 
     # Ordering
     order_map = {
-        "coverage": func.avg(BeneficiaryData.coverage_rate),
-        "gap": Municipality.population - func.sum(BeneficiaryData.total_beneficiaries),
+        "coverage": coverage,
+        "gap": Municipality.population - totals.c.total_beneficiaries,
         "population": Municipality.population,
-        "value": func.sum(BeneficiaryData.total_value_brl),
+        "value": totals.c.total_value,
         "name": Municipality.name,
-        "beneficiaries": func.sum(BeneficiaryData.total_beneficiaries),
+        "beneficiaries": totals.c.total_beneficiaries,
     }
 
     order_col = order_map.get(order_by, order_map["coverage"])
@@ -302,6 +326,8 @@ async def export_data(
 
     Ideal for downloading data for external analysis.
     """
+    totals, coverage, filtered = await _municipality_totals(db, program)
+
     # Query all municipalities with data
     stmt = (
         select(
@@ -311,35 +337,19 @@ async def export_data(
             State.abbreviation.label("state"),
             State.region,
             Municipality.population,
-            func.sum(BeneficiaryData.total_beneficiaries).label("total_beneficiaries"),
-            func.sum(BeneficiaryData.total_families).label("total_families"),
-            func.sum(BeneficiaryData.total_value_brl).label("total_value"),
-            func.avg(BeneficiaryData.coverage_rate).label("coverage_rate"),
+            totals.c.total_beneficiaries,
+            totals.c.total_families,
+            totals.c.total_value,
+            coverage.label("coverage_rate"),
         )
         .join(State, Municipality.state_id == State.id)
-        .outerjoin(BeneficiaryData, Municipality.id == BeneficiaryData.municipality_id)
+        .join(totals, Municipality.id == totals.c.municipality_id, isouter=not filtered)
     )
 
-    # Apply filters
-    if program:
-        prog_stmt = select(Program).where(Program.code == program.upper())
-        prog_result = await db.execute(prog_stmt)
-        prog = prog_result.scalar_one_or_none()
-        if prog:
-            stmt = stmt.where(BeneficiaryData.program_id == prog.id)
-
     if scope == "state" and state_code:
         stmt = stmt.where(State.abbreviation == state_code.upper())
 
-    # Group by municipality
-    stmt = stmt.group_by(
-        Municipality.ibge_code,
-        Municipality.name,
-        State.name,
-        State.abbreviation,
-        State.region,
-        Municipality.population,
-    ).order_by(State.abbreviation, Municipality.name)
+    stmt = stmt.order_by(State.abbreviation, Municipality.name)
 
     result = await db.execute(stmt)
     results = result.all()
@@ -435,20 +445,18 @@ async def get_admin_summary(
     total_pop_result = await db.execute(total_pop_stmt)
     total_population = total_pop_result.scalar() or 0
 
-    # Total beneficiaries across all programs
-    total_ben_stmt = select(func.sum(BeneficiaryData.total_beneficiaries))
-    total_ben_result = await db.execute(total_ben_stmt)
-    total_beneficiaries = total_ben_result.scalar() or 0
-
-    # Total value
-    total_val_stmt = select(func.sum(BeneficiaryData.total_value_brl))
-    total_val_result = await db.execute(total_val_stmt)
-    total_value = total_val_result.scalar() or 0
-
-    # Average coverage
-    avg_cov_stmt = select(func.avg(BeneficiaryData.coverage_rate))
-    avg_cov_result = await db.execute(avg_cov_stmt)
-    avg_coverage = avg_cov_result.scalar() or 0
+    # Totals across all programs (national summary)
+    totals_stmt = select(
+        func.sum(BeneficiarySummary.total_beneficiaries),
+        func.sum(BeneficiarySummary.total_value_brl),
+        func.sum(BeneficiarySummary.coverage_sum),
+        func.sum(BeneficiarySummary.coverage_count),
+    ).where(BeneficiarySummary.level == SummaryLevel.NATIONAL)
+    totals_result = await db.execute(totals_stmt)
+    total_beneficiaries, total_value, coverage_sum, coverage_count = totals_result.first()
+    total_beneficiaries = total_beneficiaries or 0
+    total_value = total_value or 0
+    avg_coverage = (coverage_sum or 0) / coverage_count if coverage_count else 0
 
     # Critical municipalities (coverage < 20%) - simplified count
     critical_stmt = (
@@ -22,6 +22,7 @@ from app.services.advisor_service import (
     get_active_advisors,
     create_advisor,
     get_advisor_dashboard,
+    assign_queued_cases,
 )
 
 router = APIRouter()
@@ -50,6 +51,22 @@ async def create_new_case(
     }
 
 
+@router.post("/cases/assign-queued")
+async def assign_queued(
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+):
+    """Assign open cases waiting for an advisor, in priority order."""
+    assigned = await assign_queued_cases(db, limit=limit)
+    return {
+        "assigned": [
+            {"caseId": str(case.id), "advisorId": str(advisor.id)}
+            for case, advisor in assigned
+        ],
+        "total": len(assigned),
+    }
+
+
 @router.get("/cases/{case_id}")
 async def get_case_detail(
     case_id: UUID,
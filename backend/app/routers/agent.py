@@ -4,7 +4,6 @@ Inclui endpoints V1 (legado) e V2 (com orquestrador e A2UI).
 """
 
 import logging
-from typing import Dict
 from fastapi import APIRouter, HTTPException
 
 from app.schemas.agent import (
@@ -18,7 +17,9 @@ from app.schemas.agent import (
     UIComponentSchema,
     ActionSchema,
 )
-from app.agent.agent import TaNaMaoAgent, create_agent, GOOGLE_API_KEY
+from app.agent.agent import TaNaMaoAgent, GOOGLE_API_KEY
+from app.agent.agent_sessions import AgentSessionStore
+from app.config import settings
 from app.agent.orchestrator import get_orchestrator
 from app.agent.response_types import AgentResponse
 
@@ -26,11 +27,16 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Cache de sessões (em produção, usar Redis)
-sessions: Dict[str, TaNaMaoAgent] = {}
+# Histórico no Redis (compartilhado entre workers) + LRU limitado em memória
+sessions = AgentSessionStore(
+    max_agents=settings.AGENT_SESSION_MAX_LOCAL,
+    idle_seconds=settings.AGENT_SESSION_IDLE_SECONDS,
+    ttl_seconds=settings.AGENT_SESSION_TTL,
+    max_history=settings.AGENT_SESSION_MAX_HISTORY,
+)
 
 
-def get_or_create_agent(session_id: str = None) -> TaNaMaoAgent:
+async def get_or_create_agent(session_id: str = None) -> TaNaMaoAgent:
     """Obtém agente existente ou cria um novo.
 
     Args:
@@ -39,12 +45,7 @@ def get_or_create_agent(session_id: str = None) -> TaNaMaoAgent:
     Returns:
         TaNaMaoAgent: Instância do agente.
     """
-    if session_id and session_id in sessions:
-        return sessions[session_id]
-
-    agent = create_agent(session_id)
-    sessions[agent.session_id] = agent
-    return agent
+    return await sessions.get_or_create(session_id)
 
 
 @router.get(
@@ -76,7 +77,8 @@ async def start_conversation():
             detail="Agente não configurado. GOOGLE_API_KEY não definida."
         )
 
-    agent = get_or_create_agent()
+    agent = await get_or_create_agent()
+    await sessions.save(agent)
 
     return WelcomeResponse(
         message=agent.get_welcome_message(),
@@ -103,8 +105,9 @@ async def chat(request: ChatRequest):
         )
 
     try:
-        agent = get_or_create_agent(request.session_id)
-        response = agent.process_message(request.message)
+        agent = await get_or_create_agent(request.session_id)
+        response = await agent.process_message_async(request.message)
+        await sessions.save(agent)
 
         return ChatResponse(
             response=response,
@@ -127,14 +130,12 @@ async def chat(request: ChatRequest):
 )
 async def reset_conversation(session_id: str):
     """Reinicia uma conversa existente."""
-    if session_id not in sessions:
+    if not await sessions.reset(session_id):
         raise HTTPException(
             status_code=404,
             detail="Sessão não encontrada"
         )
 
-    sessions[session_id].reset()
-
     return {"message": "Conversa reiniciada", "session_id": session_id}
 
 
@@ -145,8 +146,7 @@ async def reset_conversation(session_id: str):
 )
 async def end_session(session_id: str):
     """Encerra uma sessão."""
-    if session_id in sessions:
-        del sessions[session_id]
+    await sessions.delete(session_id)
 
     return {"message": "Sessão encerrada", "session_id": session_id}
 
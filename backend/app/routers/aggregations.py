@@ -6,13 +6,57 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select
 
+from app.config import settings
+from app.core.cache import cached
 from app.database import get_db
-from app.models import State, Municipality, Program, BeneficiaryData
+from app.models import (
+    BeneficiarySummary,
+    Municipality,
+    MunicipalitySummary,
+    Program,
+    State,
+    SummaryLevel,
+)
 
 router = APIRouter()
 
+# Responses are cached in memory and Redis, keyed by the ETL data generation
+CACHE = dict(
+    ttl=settings.CACHE_TTL_AGGREGATIONS,
+    stale_ttl=settings.CACHE_STALE_TTL,
+    local_ttl=settings.CACHE_LOCAL_TTL,
+    versioned=True,
+)
+
+
+async def _program_id(db: AsyncSession, program: Optional[str]) -> Optional[int]:
+    """Program id for a code; None (no filter) when absent or unknown."""
+    if not program:
+        return None
+    result = await db.execute(select(Program.id).where(Program.code == program.upper()))
+    return result.scalar_one_or_none()
+
+
+def _summary_totals(table):
+    """Summed measures of a summary table, labelled like the raw queries."""
+    return (
+        func.sum(table.total_beneficiaries).label("total_beneficiaries"),
+        func.sum(table.total_families).label("total_families"),
+        func.sum(table.total_value_brl).label("total_value"),
+        func.sum(table.coverage_sum).label("coverage_sum"),
+        func.sum(table.coverage_count).label("coverage_count"),
+    )
+
+
+def _avg_coverage(row) -> float:
+    """Average coverage over the summarized rows (same as AVG(coverage_rate))."""
+    if not row.coverage_count:
+        return 0
+    return float(row.coverage_sum or 0) / row.coverage_count
+
 
 @router.get("/national")
+@cached("aggregations:national", **CACHE)
 async def get_national_aggregation(
     program: Optional[str] = Query(None, description="Filter by program code"),
     db: AsyncSession = Depends(get_db),
@@ -22,19 +66,13 @@ async def get_national_aggregation(
 
     Returns totals across all municipalities for all or a specific program.
     """
-    stmt = select(
-        func.sum(BeneficiaryData.total_beneficiaries).label("total_beneficiaries"),
-        func.sum(BeneficiaryData.total_families).label("total_families"),
-        func.sum(BeneficiaryData.total_value_brl).label("total_value"),
-        func.avg(BeneficiaryData.coverage_rate).label("avg_coverage"),
+    stmt = select(*_summary_totals(BeneficiarySummary)).where(
+        BeneficiarySummary.level == SummaryLevel.NATIONAL
     )
 
-    if program:
-        prog_stmt = select(Program).where(Program.code == program.upper())
-        prog_result = await db.execute(prog_stmt)
-        prog = prog_result.scalar_one_or_none()
-        if prog:
-            stmt = stmt.where(BeneficiaryData.program_id == prog.id)
+    program_id = await _program_id(db, program)
+    if program_id:
+        stmt = stmt.where(BeneficiarySummary.program_id == program_id)
 
     result = await db.execute(stmt)
     stats = result.first()
@@ -69,12 +107,13 @@ async def get_national_aggregation(
             "total_beneficiaries": stats.total_beneficiaries or 0,
             "total_families": stats.total_families or 0,
             "total_value_brl": float(stats.total_value or 0),
-            "avg_coverage_rate": float(stats.avg_coverage or 0),
+            "avg_coverage_rate": _avg_coverage(stats),
         },
     }
 
 
 @router.get("/states")
+@cached("aggregations:states", **CACHE)
 async def get_states_aggregation(
     program: Optional[str] = Query(None, description="Filter by program code"),
     db: AsyncSession = Depends(get_db),
@@ -86,8 +125,8 @@ async def get_states_aggregation(
     """
     from app.models import CadUnicoData
 
-    # Base query joining states with municipalities and beneficiary data
-    stmt = (
+    # States with population and municipality counts
+    states_stmt = (
         select(
             State.id,
             State.ibge_code,
@@ -95,30 +134,26 @@ async def get_states_aggregation(
             State.abbreviation,
             State.region,
             func.sum(Municipality.population).label("population"),
-            func.count(func.distinct(Municipality.id)).label("municipality_count"),
-            func.sum(BeneficiaryData.total_beneficiaries).label("total_beneficiaries"),
-            func.sum(BeneficiaryData.total_families).label("total_families"),
-            func.sum(BeneficiaryData.total_value_brl).label("total_value"),
-            func.avg(BeneficiaryData.coverage_rate).label("avg_coverage"),
+            func.count(Municipality.id).label("municipality_count"),
         )
         .select_from(State)
         .join(Municipality, State.id == Municipality.state_id)
-        .outerjoin(BeneficiaryData, Municipality.id == BeneficiaryData.municipality_id)
+        .group_by(State.id, State.ibge_code, State.name, State.abbreviation, State.region)
     )
+    states_result = await db.execute(states_stmt)
+    results = states_result.all()
 
-    if program:
-        prog_stmt = select(Program).where(Program.code == program.upper())
-        prog_result = await db.execute(prog_stmt)
-        prog = prog_result.scalar_one_or_none()
-        if prog:
-            stmt = stmt.where(BeneficiaryData.program_id == prog.id)
-
-    stmt = stmt.group_by(
-        State.id, State.ibge_code, State.name, State.abbreviation, State.region
+    # Program totals from the state-level summary
+    stmt = (
+        select(BeneficiarySummary.code, *_summary_totals(BeneficiarySummary))
+        .where(BeneficiarySummary.level == SummaryLevel.STATE)
+        .group_by(BeneficiarySummary.code)
     )
-
-    result = await db.execute(stmt)
-    results = result.all()
+    program_id = await _program_id(db, program)
+    if program_id:
+        stmt = stmt.where(BeneficiarySummary.program_id == program_id)
+    stats_result = await db.execute(stmt)
+    stats_by_state = {row.code: row for row in stats_result.all()}
 
     # Get CadÚnico families per state
     cadunico_by_state = {}
@@ -136,29 +171,32 @@ async def get_states_aggregation(
     for row in cadunico_result.all():
         cadunico_by_state[row.id] = row.cadunico_families or 0
 
+    states = []
+    for r in results:
+        stats = stats_by_state.get(r.abbreviation)
+        states.append({
+            "ibge_code": r.ibge_code,
+            "name": r.name,
+            "abbreviation": r.abbreviation,
+            "region": r.region,
+            "population": r.population or 0,
+            "municipality_count": r.municipality_count or 0,
+            "total_beneficiaries": (stats.total_beneficiaries or 0) if stats else 0,
+            "total_families": (stats.total_families or 0) if stats else 0,
+            "cadunico_families": cadunico_by_state.get(r.id, 0),
+            "total_value_brl": float(stats.total_value or 0) if stats else 0.0,
+            "avg_coverage_rate": _avg_coverage(stats) if stats else 0,
+        })
+
     return {
         "level": "states",
-        "count": len(results),
-        "states": [
-            {
-                "ibge_code": r.ibge_code,
-                "name": r.name,
-                "abbreviation": r.abbreviation,
-                "region": r.region,
-                "population": r.population or 0,
-                "municipality_count": r.municipality_count or 0,
-                "total_beneficiaries": r.total_beneficiaries or 0,
-                "total_families": r.total_families or 0,
-                "cadunico_families": cadunico_by_state.get(r.id, 0),
-                "total_value_brl": float(r.total_value or 0),
-                "avg_coverage_rate": float(r.avg_coverage or 0) if r.avg_coverage else 0,
-            }
-            for r in results
-        ],
+        "count": len(states),
+        "states": states,
     }
 
 
 @router.get("/states/{state_code}")
+@cached("aggregations:state", **CACHE)
 async def get_state_detail(
     state_code: str,
     program: Optional[str] = Query(None, description="Filter by program code"),
@@ -183,21 +221,16 @@ async def get_state_detail(
             Municipality.ibge_code,
             Municipality.name,
             Municipality.population,
-            func.sum(BeneficiaryData.total_beneficiaries).label("total_beneficiaries"),
-            func.sum(BeneficiaryData.total_families).label("total_families"),
-            func.avg(BeneficiaryData.coverage_rate).label("avg_coverage"),
+            *_summary_totals(MunicipalitySummary),
         )
         .select_from(Municipality)
-        .outerjoin(BeneficiaryData)
+        .outerjoin(MunicipalitySummary, Municipality.id == MunicipalitySummary.municipality_id)
         .where(Municipality.state_id == state.id)
     )
 
-    if program:
-        prog_stmt = select(Program).where(Program.code == program.upper())
-        prog_result = await db.execute(prog_stmt)
-        prog = prog_result.scalar_one_or_none()
-        if prog:
-            stmt = stmt.where(BeneficiaryData.program_id == prog.id)
+    program_id = await _program_id(db, program)
+    if program_id:
+        stmt = stmt.where(MunicipalitySummary.program_id == program_id)
 
     stmt = stmt.group_by(
         Municipality.ibge_code, Municipality.name, Municipality.population
@@ -222,7 +255,7 @@ async def get_state_detail(
                 "population": m.population or 0,
                 "total_beneficiaries": m.total_beneficiaries or 0,
                 "total_families": m.total_families or 0,
-                "avg_coverage_rate": float(m.avg_coverage or 0) if m.avg_coverage else 0,
+                "avg_coverage_rate": _avg_coverage(m),
             }
             for m in municipalities
         ],
@@ -230,6 +263,7 @@ async def get_state_detail(
 
 
 @router.get("/demographics")
+@cached("aggregations:demographics", **CACHE)
 async def get_demographics(
     state_code: Optional[str] = Query(None, description="Filter by state code"),
     db: AsyncSession = Depends(get_db),
@@ -287,6 +321,7 @@ async def get_demographics(
 
 
 @router.get("/time-series")
+@cached("aggregations:time_series", **CACHE)
 async def get_time_series(
     program: Optional[str] = Query(None, description="Filter by program code"),
     state_code: Optional[str] = Query(None, description="Filter by state code"),
@@ -297,32 +332,27 @@ async def get_time_series(
 
     Returns monthly totals for charting trends over time.
     """
-    stmt = (
-        select(
-            BeneficiaryData.reference_date,
-            func.sum(BeneficiaryData.total_beneficiaries).label("total_beneficiaries"),
-            func.sum(BeneficiaryData.total_families).label("total_families"),
-            func.sum(BeneficiaryData.total_value_brl).label("total_value"),
-            func.avg(BeneficiaryData.coverage_rate).label("avg_coverage"),
-        )
-        .select_from(BeneficiaryData)
-    )
+    stmt = select(BeneficiarySummary.reference_date, *_summary_totals(BeneficiarySummary))
 
-    if program:
-        prog_stmt = select(Program).where(Program.code == program.upper())
-        prog_result = await db.execute(prog_stmt)
-        prog = prog_result.scalar_one_or_none()
-        if prog:
-            stmt = stmt.where(BeneficiaryData.program_id == prog.id)
+    program_id = await _program_id(db, program)
+    if program_id:
+        stmt = stmt.where(BeneficiarySummary.program_id == program_id)
 
+    abbreviation = None
     if state_code:
-        state_stmt = select(State).where(State.abbreviation == state_code.upper())
+        state_stmt = select(State.abbreviation).where(State.abbreviation == state_code.upper())
         state_result = await db.execute(state_stmt)
-        state = state_result.scalar_one_or_none()
-        if state:
-            stmt = stmt.join(Municipality).where(Municipality.state_id == state.id)
+        abbreviation = state_result.scalar_one_or_none()
+
+    if abbreviation:
+        stmt = stmt.where(
+            BeneficiarySummary.level == SummaryLevel.STATE,
+            BeneficiarySummary.code == abbreviation,
+        )
+    else:
+        stmt = stmt.where(BeneficiarySummary.level == SummaryLevel.NATIONAL)
 
-    stmt = stmt.group_by(BeneficiaryData.reference_date).order_by(BeneficiaryData.reference_date)
+    stmt = stmt.group_by(BeneficiarySummary.reference_date).order_by(BeneficiarySummary.reference_date)
 
     db_result = await db.execute(stmt)
     results = db_result.all()
@@ -337,7 +367,7 @@ async def get_time_series(
                 "total_beneficiaries": r.total_beneficiaries or 0,
                 "total_families": r.total_families or 0,
                 "total_value_brl": float(r.total_value or 0),
-                "avg_coverage_rate": float(r.avg_coverage or 0) if r.avg_coverage else 0,
+                "avg_coverage_rate": _avg_coverage(r),
             }
             for r in results
         ],
@@ -345,6 +375,7 @@ async def get_time_series(
 
 
 @router.get("/regions")
+@cached("aggregations:regions", **CACHE)
 async def get_regions_aggregation(
     program: Optional[str] = Query(None, description="Filter by program code"),
     db: AsyncSession = Depends(get_db),
@@ -354,33 +385,30 @@ async def get_regions_aggregation(
 
     Returns data aggregated by Brazilian regions (Norte, Nordeste, Centro-Oeste, Sudeste, Sul).
     """
-    stmt = (
+    regions_stmt = (
         select(
             State.region,
             func.sum(Municipality.population).label("population"),
             func.count(func.distinct(State.id)).label("state_count"),
             func.count(Municipality.id).label("municipality_count"),
-            func.sum(BeneficiaryData.total_beneficiaries).label("total_beneficiaries"),
-            func.sum(BeneficiaryData.total_families).label("total_families"),
-            func.sum(BeneficiaryData.total_value_brl).label("total_value"),
-            func.avg(BeneficiaryData.coverage_rate).label("avg_coverage"),
         )
         .select_from(State)
         .join(Municipality, State.id == Municipality.state_id)
-        .outerjoin(BeneficiaryData, Municipality.id == BeneficiaryData.municipality_id)
+        .group_by(State.region)
     )
+    regions_result = await db.execute(regions_stmt)
+    results = regions_result.all()
 
-    if program:
-        prog_stmt = select(Program).where(Program.code == program.upper())
-        prog_result = await db.execute(prog_stmt)
-        prog = prog_result.scalar_one_or_none()
-        if prog:
-            stmt = stmt.where(BeneficiaryData.program_id == prog.id)
-
-    stmt = stmt.group_by(State.region)
-
-    db_result = await db.execute(stmt)
-    results = db_result.all()
+    stmt = (
+        select(BeneficiarySummary.code, *_summary_totals(BeneficiarySummary))
+        .where(BeneficiarySummary.level == SummaryLevel.REGION)
+        .group_by(BeneficiarySummary.code)
+    )
+    program_id = await _program_id(db, program)
+    if program_id:
+        stmt = stmt.where(BeneficiarySummary.program_id == program_id)
+    stats_result = await db.execute(stmt)
+    stats_by_region = {row.code: row for row in stats_result.all()}
 
     region_names = {
         "N": "Norte",
@@ -390,21 +418,23 @@ async def get_regions_aggregation(
         "S": "Sul",
     }
 
+    regions = []
+    for r in results:
+        stats = stats_by_region.get(r.region)
+        regions.append({
+            "code": r.region,
+            "name": region_names.get(r.region, r.region),
+            "population": r.population or 0,
+            "state_count": r.state_count or 0,
+            "municipality_count": r.municipality_count or 0,
+            "total_beneficiaries": (stats.total_beneficiaries or 0) if stats else 0,
+            "total_families": (stats.total_families or 0) if stats else 0,
+            "total_value_brl": float(stats.total_value or 0) if stats else 0.0,
+            "avg_coverage_rate": _avg_coverage(stats) if stats else 0,
+        })
+
     return {
         "level": "regions",
-        "count": len(results),
-        "regions": [
-            {
-                "code": r.region,
-                "name": region_names.get(r.region, r.region),
-                "population": r.population or 0,
-                "state_count": r.state_count or 0,
-                "municipality_count": r.municipality_count or 0,
-                "total_beneficiaries": r.total_beneficiaries or 0,
-                "total_families": r.total_families or 0,
-                "total_value_brl": float(r.total_value or 0),
-                "avg_coverage_rate": float(r.avg_coverage or 0) if r.avg_coverage else 0,
-            }
-            for r in results
-        ],
+        "count": len(regions),
+        "regions": regions,
     }
@@ -3,9 +3,13 @@ Benefits API v2 endpoints.
 Unified benefits catalog with eligibility evaluation.
 """
 
+import shutil
+import tempfile
+from itertools import chain
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
@@ -21,6 +25,14 @@ from app.schemas.benefit import (
     EligibilityResponse,
     EstimatedValue,
 )
+from app.services.batch_eligibility import (
+    BatchEligibilityEngine,
+    detect_format,
+    iter_ndjson,
+    normalize_profiles,
+    read_profile_chunks,
+)
+from app.services.benefit_catalog import get_benefit_catalog
 from app.services.eligibility_service import (
     evaluate_all_benefits,
     get_benefits_for_location,
@@ -291,6 +303,57 @@ async def check_eligibility(
     return response
 
 
+@router.post("/eligibility/batch")
+async def batch_eligibility_check(
+    file: UploadFile = File(..., description="Table of profiles (CSV, Parquet or Arrow)"),
+    format: Optional[str] = Query(None, description="csv, parquet or arrow (default: from file name)"),
+    scope: Optional[str] = Query(None, description="Only evaluate benefits of this scope"),
+    separator: str = Query(",", max_length=1, description="CSV column separator"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Evaluate eligibility for a whole cohort of families at once.
+
+    Receives a columnar table with one family per row, using the same
+    fields as CitizenProfile (camelCase or snake_case; `estado` required,
+    optional `familyId`). Rules are evaluated with vectorized column
+    operations and results are streamed back as NDJSON: one line per
+    family, then a final `{"aggregates": ...}` line.
+    """
+    try:
+        fmt = format or detect_format(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The upload is closed when this handler returns, so the streamed
+    # response reads from its own copy
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.file, spool)
+    spool.seek(0)
+
+    catalog = await get_benefit_catalog(db)
+    engine = BatchEligibilityEngine(catalog, scope=scope)
+
+    try:
+        chunks = read_profile_chunks(spool, fmt, separator=separator)
+        first = next(chunks, None)
+        if first is not None:
+            normalize_profiles(first.head(0))  # validate columns before streaming
+    except ValueError as e:
+        chunks.close()
+        spool.close()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def stream():
+        try:
+            yield from iter_ndjson(engine, chain([first] if first is not None else [], chunks))
+        finally:
+            chunks.close()
+            spool.close()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post("/eligibility/quick")
 async def quick_eligibility_check(
     estado: str = Query(..., description="UF code (e.g., SP)"),
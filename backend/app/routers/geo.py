@@ -1,19 +1,35 @@
 """GeoJSON API endpoints for map rendering."""
 
+import asyncio
 from typing import Optional
 import json
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select
 
+from app.config import settings
+from app.core.cache import cached
 from app.database import get_db
 from app.models import State, Municipality, BeneficiaryData, Program
+from app.services.geo_tiles import EncodedBody, ZOOM_TOLERANCES, get_tile_store, zoom_level
 
 router = APIRouter()
 
+# Geometry rarely changes; program data changes with each ETL generation
+CACHE = dict(
+    ttl=settings.CACHE_TTL_GEOJSON,
+    stale_ttl=settings.CACHE_STALE_TTL,
+    local_ttl=settings.CACHE_LOCAL_TTL,
+    versioned=True,
+)
+
+# Browser cache for pre-serialized maps (revalidated with the ETag)
+GEO_MAX_AGE = 3600
+
 
 @router.get("/states")
+@cached("geo:states", **CACHE)
 async def get_states_geojson(
     simplified: bool = Query(True, description="Use simplified geometry"),
     program: Optional[str] = Query(None, description="Include program data"),
@@ -100,20 +116,103 @@ async def get_states_geojson(
     }
 
 
+@cached("geo:overlay", **CACHE)
+async def _program_overlay(program: str, db: AsyncSession) -> dict:
+    """Latest program statistics by IBGE code, merged into map properties."""
+    stmt = (
+        select(
+            Municipality.ibge_code,
+            BeneficiaryData.total_beneficiaries,
+            BeneficiaryData.total_families,
+            BeneficiaryData.coverage_rate,
+        )
+        .join(Municipality, Municipality.id == BeneficiaryData.municipality_id)
+        .join(Program, Program.id == BeneficiaryData.program_id)
+        .where(Program.code == program)
+        .order_by(BeneficiaryData.reference_date)
+    )
+    result = await db.execute(stmt)
+
+    # Ordered by date: the latest reference wins
+    return {
+        row.ibge_code: {
+            "beneficiaries": row.total_beneficiaries or 0,
+            "families": row.total_families or 0,
+            "coverage": float(row.coverage_rate or 0),
+        }
+        for row in result.all()
+    }
+
+
+def _encoded_response(request: Request, encoded: EncodedBody) -> Response:
+    """Serve pre-serialized bytes with ETag revalidation and compression."""
+    # Each encoding is a different representation, with its own ETag
+    body, encoding = encoded.negotiate(request.headers.get("accept-encoding", ""))
+    etag = encoded.variant_etag(encoding)
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": f"public, max-age={GEO_MAX_AGE}",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/municipalities")
 async def get_municipalities_geojson(
+    request: Request,
     state_id: Optional[int] = Query(None, description="Filter by state ID"),
     state_code: Optional[str] = Query(None, description="Filter by state abbreviation"),
     simplified: bool = Query(True, description="Use simplified geometry"),
     program: Optional[str] = Query(None, description="Include program data"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Map zoom (selects simplification)"),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Get GeoJSON FeatureCollection of municipalities.
 
-    **Important**: For performance, always filter by state when rendering maps.
-    Loading all 5,570 municipalities at once is not recommended.
+    Served from the pre-serialized tiles built by ``app.jobs.gerar_geo_tiles``
+    (all 5,570 municipalities in one request, gzip/brotli, ETag). Falls back
+    to PostGIS, limited to 500 municipalities without a state filter, when
+    the tiles were not generated.
     """
+    level = zoom_level(zoom) if simplified else max(ZOOM_TOLERANCES)
+    store = get_tile_store()
+    if not store.available(level):
+        return await _municipalities_from_db(
+            state_id=state_id, state_code=state_code, simplified=simplified, program=program, db=db
+        )
+
+    overlay = await _program_overlay(program=program.upper(), db=db) if program else None
+    try:
+        # Serializing and compressing a state map or overlay takes tens of ms
+        encoded = await asyncio.to_thread(
+            store.render, level, state_id=state_id, state_code=state_code, overlay=overlay
+        )
+    except LookupError:
+        raise HTTPException(status_code=404, detail="State not found")
+    if encoded is None:
+        # Tiles removed or regenerated between available() and render()
+        return await _municipalities_from_db(
+            state_id=state_id, state_code=state_code, simplified=simplified, program=program, db=db
+        )
+    return _encoded_response(request, encoded)
+
+
+@cached("geo:municipalities", **CACHE)
+async def _municipalities_from_db(
+    state_id: Optional[int],
+    state_code: Optional[str],
+    simplified: bool,
+    program: Optional[str],
+    db: AsyncSession,
+) -> dict:
+    """Build the FeatureCollection with PostGIS (tiles not generated)."""
     # Resolve state filter
     state_filter = None
     if state_code:
@@ -156,33 +255,7 @@ async def get_municipalities_geojson(
     result = await db.execute(stmt)
     municipalities = result.all()
 
-    # Get program data if requested
-    program_data = {}
-    if program:
-        prog_stmt = select(Program).where(Program.code == program.upper())
-        prog_result = await db.execute(prog_stmt)
-        prog = prog_result.scalar_one_or_none()
-        if prog:
-            mun_ids = [m.id for m in municipalities]
-            stats_stmt = (
-                select(
-                    BeneficiaryData.municipality_id,
-                    BeneficiaryData.total_beneficiaries,
-                    BeneficiaryData.total_families,
-                    BeneficiaryData.coverage_rate,
-                )
-                .where(BeneficiaryData.program_id == prog.id)
-                .where(BeneficiaryData.municipality_id.in_(mun_ids))
-            )
-            stats_result = await db.execute(stats_stmt)
-            stats = stats_result.all()
-
-            for stat in stats:
-                program_data[stat.municipality_id] = {
-                    "beneficiaries": stat.total_beneficiaries or 0,
-                    "families": stat.total_families or 0,
-                    "coverage": float(stat.coverage_rate or 0),
-                }
+    overlay = await _program_overlay(program=program.upper(), db=db) if program else {}
 
     # Build GeoJSON
     features = []
@@ -194,8 +267,8 @@ async def get_municipalities_geojson(
             "population": mun.population,
         }
 
-        if mun.id in program_data:
-            properties.update(program_data[mun.id])
+        if mun.ibge_code in overlay:
+            properties.update(overlay[mun.ibge_code])
 
         feature = {
             "type": "Feature",
@@ -216,6 +289,7 @@ async def get_municipalities_geojson(
 
 
 @router.get("/municipalities/{ibge_code}")
+@cached("geo:municipality", **CACHE)
 async def get_municipality_geojson(
     ibge_code: str,
     simplified: bool = Query(False, description="Use simplified geometry"),
@@ -263,6 +337,7 @@ async def get_municipality_geojson(
 
 
 @router.get("/bounds")
+@cached("geo:bounds", **CACHE)
 async def get_bounds(
     state_code: Optional[str] = Query(None, description="Get bounds for specific state"),
     db: AsyncSession = Depends(get_db),
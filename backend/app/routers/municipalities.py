@@ -8,6 +8,7 @@ from sqlalchemy import select, func
 
 from app.database import get_db
 from app.models import Municipality, State
+from app.services.municipality_search import aget_municipality_search_index
 from app.schemas.municipality import (
     MunicipalityResponse,
     MunicipalityListResponse,
@@ -85,7 +86,22 @@ async def search_municipalities(
     Search municipalities by name.
 
     Returns municipalities matching the search query, ordered by relevance.
+    Accent-insensitive and typo-tolerant ("sao paolo" finds "São Paulo");
+    see ``app.services.municipality_search``.
     """
+    index = await aget_municipality_search_index()
+    if len(index):
+        return [
+            {
+                "ibge_code": m["ibge_code"],
+                "name": m["name"],
+                "state_id": m["state_id"],
+                "population": m["population"],
+            }
+            for m in index.search(q, limit)
+        ]
+
+    # Index not built (municipalities not loaded yet): plain name match
     stmt = (
         select(Municipality)
         .where(Municipality.name.ilike(f"%{q}%"))
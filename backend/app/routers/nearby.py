@@ -49,7 +49,8 @@ async def buscar_farmacias_proximas(
     cep: Optional[str] = Query(None, description="CEP do usuário (alternativa às coordenadas)"),
     programa: Optional[str] = Query("FARMACIA_POPULAR", description="Programa: FARMACIA_POPULAR ou DIGNIDADE_MENSTRUAL"),
     raio_metros: int = Query(3000, description="Raio de busca em metros"),
-    limite: int = Query(5, description="Número máximo de farmácias")
+    limite: int = Query(5, description="Número máximo de farmácias"),
+    enriquecer: bool = Query(False, description="Completar com status/avaliação do Google Maps")
 ):
     """
     Busca farmácias credenciadas próximas ao cidadão.
@@ -71,7 +72,9 @@ async def buscar_farmacias_proximas(
                 latitude=latitude,
                 longitude=longitude,
                 raio_metros=raio_metros,
-                limite=limite
+                limite=limite,
+                programa=programa,
+                enriquecer=enriquecer
             )
 
             if resultado.get("erro"):
@@ -107,6 +110,8 @@ async def buscar_farmacias_proximas(
                 horario=f.get("horario"),
                 aberto_agora=f.get("aberto_agora"),
                 delivery=f.get("delivery"),
+                latitude=f.get("latitude"),
+                longitude=f.get("longitude"),
                 links=f.get("links", {})
             )
             for f in farmacias
@@ -136,7 +141,8 @@ async def buscar_cras_proximos(
     longitude: Optional[float] = Query(None, description="Longitude do usuário"),
     cep: Optional[str] = Query(None, description="CEP do usuário (alternativa às coordenadas)"),
     raio_metros: int = Query(10000, description="Raio de busca em metros"),
-    limite: int = Query(3, description="Número máximo de CRAS")
+    limite: int = Query(3, description="Número máximo de CRAS"),
+    enriquecer: bool = Query(False, description="Completar com status do Google Places")
 ):
     """
     Busca CRAS (postos de assistência social) próximos ao cidadão.
@@ -156,7 +162,8 @@ async def buscar_cras_proximos(
                 latitude=latitude,
                 longitude=longitude,
                 raio_metros=raio_metros,
-                limite=limite
+                limite=limite,
+                enriquecer=enriquecer
             )
 
             if resultado.get("erro"):
@@ -6,6 +6,7 @@ Recebe callbacks de:
 """
 
 import re
+import asyncio
 import logging
 import httpx
 import base64
@@ -13,17 +14,25 @@ from typing import Optional
 
 from fastapi import APIRouter, Request, Form, Depends
 from fastapi.responses import Response
+from twilio.request_validator import RequestValidator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.database import get_db
 from app.models.pedido import Pedido, StatusPedido
+from app.middleware.metrics import whatsapp_messages_total
 from app.agent.tools.enviar_whatsapp import (
+    enviar_whatsapp,
     enviar_confirmacao_cidadao,
     enviar_pedido_recusado
 )
 from app.agent.orchestrator import get_orchestrator
-from app.agent.whatsapp_formatter import format_response_for_whatsapp
+from app.agent.whatsapp_formatter import escape_xml, format_response_text_only
+from app.agent.channels.whatsapp_fila import (
+    FilaPorSessao,
+    MensagemWhatsApp,
+    registrar_message_sid,
+)
 from app.agent.channels.whatsapp_flows import (
     get_whatsapp_flow_manager,
     formatar_menu_principal,
@@ -313,6 +322,178 @@ async def _fetch_media_base64(media_url: str) -> Optional[str]:
     return None
 
 
+def _twiml(texto: str) -> Response:
+    """Resposta TwiML com uma mensagem."""
+    return Response(
+        content=f"""<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Message>{escape_xml(texto)}</Message>
+</Response>""",
+        media_type="application/xml"
+    )
+
+
+_MENSAGEM_ERRO = "Ops, tive um probleminha. Tenta de novo em alguns segundos?"
+_MENSAGEM_OCUPADO = "Estou com muitas mensagens agora. Tenta de novo em alguns minutos?"
+
+
+async def _responder_chat(mensagem: MensagemWhatsApp) -> str:
+    """Processa a mensagem do cidadao e devolve o texto da resposta.
+
+    Geolocalizacao, imagem, menus numerados (WhatsApp Flows) e Orchestrator.
+    """
+    session_id = mensagem.session_id
+
+    # Obter orchestrator
+    orchestrator = get_orchestrator()
+
+    # Atualizar contexto com geolocalizacao se disponivel
+    if mensagem.latitude and mensagem.longitude:
+        try:
+            session = orchestrator.get_session(session_id)
+            if session:
+                session.citizen.update_from_geolocation(
+                    latitude=float(mensagem.latitude),
+                    longitude=float(mensagem.longitude)
+                )
+                logger.info(f"Geolocalizacao atualizada: {mensagem.latitude}, {mensagem.longitude}")
+        except Exception as e:
+            logger.warning(f"Erro ao atualizar geolocalizacao: {e}")
+
+    # Baixar imagem se houver
+    image_base64 = None
+    if mensagem.num_media > 0 and mensagem.media_url:
+        image_base64 = await _fetch_media_base64(mensagem.media_url)
+        if image_base64:
+            logger.info(f"Imagem baixada com sucesso: {mensagem.media_content_type}")
+
+    # Mensagem padrao se so enviou imagem
+    message = mensagem.body or "Enviando imagem..."
+
+    # Pre-processamento WhatsApp Flows (menus numerados)
+    flow_manager = get_whatsapp_flow_manager()
+    transformed_message, menu_response = flow_manager.pre_process_message(
+        message=message,
+        session_id=session_id,
+    )
+
+    # Se o flow manager retornou um menu direto (cidadao pediu menu)
+    if menu_response and transformed_message is None:
+        return menu_response
+
+    # Se houve mapeamento de opcao numerica, usar mensagem transformada
+    if transformed_message is not None:
+        message = transformed_message
+
+    # Processar mensagem com orchestrator
+    response = await orchestrator.process_message(
+        message=message,
+        session_id=session_id,
+        image_base64=image_base64
+    )
+
+    # Verificar se deve anexar menu de retorno
+    if flow_manager.should_show_return_menu(response.text):
+        response.text = response.text + "\n\n" + formatar_menu_retorno()
+
+    return format_response_text_only(response)
+
+
+async def _processar_e_enviar(mensagem: MensagemWhatsApp) -> None:
+    """Worker da fila: responde a mensagem pela API do Twilio."""
+    try:
+        texto = await _responder_chat(mensagem)
+    except Exception as e:
+        logger.error(f"Erro no WhatsApp Chat (fila): {e}", exc_info=True)
+        texto = _MENSAGEM_ERRO
+
+    resultado = await asyncio.to_thread(enviar_whatsapp, para=mensagem.telefone, mensagem=texto)
+    if resultado.get("enviado"):
+        whatsapp_messages_total.labels(result="sent").inc()
+        logger.info(f"Resposta enviada para {mensagem.telefone} (SID={resultado.get('sid')})")
+    else:
+        whatsapp_messages_total.labels(result="failed").inc()
+        logger.error(f"Falha ao enviar resposta para {mensagem.telefone}: {resultado.get('erro')}")
+
+
+_fila_whatsapp: Optional[FilaPorSessao] = None
+
+
+def get_fila_whatsapp() -> FilaPorSessao:
+    """Fila de respostas do WhatsApp Chat (criada no primeiro uso)."""
+    global _fila_whatsapp
+    if _fila_whatsapp is None:
+        from app.config import settings
+        _fila_whatsapp = FilaPorSessao(
+            _processar_e_enviar,
+            workers=settings.WHATSAPP_QUEUE_WORKERS,
+            max_pendentes=settings.WHATSAPP_QUEUE_MAX_PENDING,
+        )
+    return _fila_whatsapp
+
+
+async def parar_fila_whatsapp(timeout: float = 10.0) -> None:
+    """Termina as respostas pendentes (shutdown da aplicacao)."""
+    if _fila_whatsapp is not None:
+        await _fila_whatsapp.parar(timeout)
+
+
+def _fila_habilitada() -> bool:
+    """Fila ligada e credenciais para responder pela API do Twilio."""
+    from app.config import settings
+    return bool(
+        settings.WHATSAPP_QUEUE_ENABLED
+        and settings.TWILIO_ACCOUNT_SID
+        and settings.TWILIO_AUTH_TOKEN
+    )
+
+
+def _url_publica(request: Request) -> str:
+    """URL publica da requisicao, como o Twilio a chamou.
+
+    Usa ``WEBHOOK_BASE_URL`` mais o caminho do endpoint; sem ela, monta a
+    URL com ``X-Forwarded-Proto``/``X-Forwarded-Host`` (o proxy termina o
+    TLS, entao ``request.url`` chega como ``http://``).
+    """
+    from app.config import settings
+
+    caminho = request.url.path
+    if request.url.query:
+        caminho = f"{caminho}?{request.url.query}"
+    if settings.WEBHOOK_BASE_URL:
+        return settings.WEBHOOK_BASE_URL.rstrip("/") + caminho
+
+    esquema = request.headers.get("X-Forwarded-Proto", request.url.scheme).split(",")[0].strip()
+    host = request.headers.get("X-Forwarded-Host") or request.headers.get("Host") or request.url.netloc
+    return f"{esquema}://{host.split(',')[0].strip()}{caminho}"
+
+
+async def _assinatura_twilio_valida(request: Request) -> bool:
+    """Confere o header ``X-Twilio-Signature`` da requisicao.
+
+    A assinatura e calculada pelo Twilio sobre a URL publica do endpoint
+    (ver ``_url_publica``) e os campos do form, com o ``TWILIO_AUTH_TOKEN``
+    da conta. ``TWILIO_WEBHOOK_URL`` nao serve aqui: e a URL do webhook de
+    pedidos (``/webhook/whatsapp``). Sem token so o ambiente de
+    desenvolvimento aceita requisicoes sem assinatura.
+    """
+    from app.config import settings
+
+    if not settings.TWILIO_AUTH_TOKEN:
+        if settings.ENVIRONMENT == "development":
+            return True
+        logger.error("TWILIO_AUTH_TOKEN ausente; webhook de chat recusado")
+        return False
+
+    assinatura = request.headers.get("X-Twilio-Signature")
+    if not assinatura:
+        return False
+
+    form = await request.form()
+    validator = RequestValidator(settings.TWILIO_AUTH_TOKEN)
+    return validator.validate(_url_publica(request), dict(form), assinatura)
+
+
 @router.post("/whatsapp/chat")
 async def webhook_whatsapp_chat(
     request: Request,
@@ -332,6 +513,14 @@ async def webhook_whatsapp_chat(
     Este endpoint permite conversas completas com o agente Ta na Mao via WhatsApp.
     O numero de telefone e usado como identificador de sessao.
 
+    Com ``WHATSAPP_QUEUE_ENABLED`` (e credenciais Twilio), a mensagem vai
+    para a fila e o webhook responde 200 vazio na hora; a resposta do
+    agente sai pela API do Twilio (ver ``whatsapp_fila``). Sem isso, a
+    mensagem e processada na requisicao e a resposta volta em TwiML.
+    Reenvios do mesmo ``MessageSid`` sao ignorados nos dois modos.
+    Requisicoes sem ``X-Twilio-Signature`` valida recebem 403 antes de
+    qualquer processamento.
+
     Parametros Twilio:
         From: Numero do remetente (whatsapp:+5511999999999)
         To: Numero do destinatario (nosso numero)
@@ -344,8 +533,13 @@ async def webhook_whatsapp_chat(
         ProfileName: Nome do perfil WhatsApp
 
     Retorna:
-        TwiML com resposta do agente formatada para WhatsApp
+        200 vazio (fila) ou TwiML com resposta do agente formatada para WhatsApp
     """
+    if not await _assinatura_twilio_valida(request):
+        whatsapp_messages_total.labels(result="forbidden").inc()
+        logger.warning(f"Assinatura Twilio invalida no webhook de chat: SID={MessageSid}")
+        return Response(status_code=403)
+
     try:
         logger.info(
             f"WhatsApp Chat: From={From}, Body={Body[:50] if Body else 'N/A'}..., "
@@ -359,92 +553,47 @@ async def webhook_whatsapp_chat(
 
         if not Body and NumMedia == "0":
             logger.warning("Webhook chamado sem mensagem ou media")
-            return Response(
-                content="""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>Oi! Manda uma mensagem ou foto da receita que eu te ajudo!</Message>
-</Response>""",
-                media_type="application/xml"
-            )
+            return _twiml("Oi! Manda uma mensagem ou foto da receita que eu te ajudo!")
+
+        # Reenvio do Twilio (timeout ou erro na primeira entrega)
+        if not await registrar_message_sid(MessageSid):
+            whatsapp_messages_total.labels(result="duplicate").inc()
+            logger.info(f"Mensagem repetida ignorada: SID={MessageSid}")
+            return Response(status_code=200)
 
         # Normalizar telefone para usar como session_id
         phone = _normalize_phone(From)
-        session_id = f"whatsapp:{phone}"
-
-        # Obter orchestrator
-        orchestrator = get_orchestrator()
-
-        # Atualizar contexto com geolocalizacao se disponivel
-        if Latitude and Longitude:
-            try:
-                session = orchestrator.get_session(session_id)
-                if session:
-                    session.citizen.update_from_geolocation(
-                        latitude=float(Latitude),
-                        longitude=float(Longitude)
-                    )
-                    logger.info(f"Geolocalizacao atualizada: {Latitude}, {Longitude}")
-            except Exception as e:
-                logger.warning(f"Erro ao atualizar geolocalizacao: {e}")
-
-        # Baixar imagem se houver
-        image_base64 = None
-        if int(NumMedia) > 0 and MediaUrl0:
-            image_base64 = await _fetch_media_base64(MediaUrl0)
-            if image_base64:
-                logger.info(f"Imagem baixada com sucesso: {MediaContentType0}")
-
-        # Mensagem padrao se so enviou imagem
-        message = Body or "Enviando imagem..."
-
-        # Pre-processamento WhatsApp Flows (menus numerados)
-        flow_manager = get_whatsapp_flow_manager()
-        transformed_message, menu_response = flow_manager.pre_process_message(
-            message=message,
-            session_id=session_id,
+        mensagem = MensagemWhatsApp(
+            message_sid=MessageSid or "",
+            session_id=f"whatsapp:{phone}",
+            telefone=phone,
+            body=Body,
+            num_media=int(NumMedia or 0),
+            media_url=MediaUrl0,
+            media_content_type=MediaContentType0,
+            latitude=Latitude,
+            longitude=Longitude,
         )
 
-        # Se o flow manager retornou um menu direto (cidadao pediu menu)
-        if menu_response and transformed_message is None:
-            menu_twiml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>{menu_response}</Message>
-</Response>"""
-            return Response(content=menu_twiml, media_type="application/xml")
-
-        # Se houve mapeamento de opcao numerica, usar mensagem transformada
-        if transformed_message is not None:
-            message = transformed_message
-
-        # Processar mensagem com orchestrator
-        response = await orchestrator.process_message(
-            message=message,
-            session_id=session_id,
-            image_base64=image_base64
-        )
-
-        # Verificar se deve anexar menu de retorno
-        if flow_manager.should_show_return_menu(response.text):
-            response.text = response.text + "\n\n" + formatar_menu_retorno()
+        if _fila_habilitada():
+            if not get_fila_whatsapp().enfileirar(mensagem):
+                whatsapp_messages_total.labels(result="rejected").inc()
+                logger.warning("Fila do WhatsApp cheia; mensagem recusada")
+                return _twiml(_MENSAGEM_OCUPADO)
+            whatsapp_messages_total.labels(result="queued").inc()
+            return Response(status_code=200)
 
-        # Converter resposta A2UI para TwiML
-        twiml = format_response_for_whatsapp(response)
+        texto = await _responder_chat(mensagem)
 
         logger.info(f"Resposta enviada para {phone}")
 
-        return Response(content=twiml, media_type="application/xml")
+        return _twiml(texto)
 
     except Exception as e:
         logger.error(f"Erro no webhook WhatsApp Chat: {e}", exc_info=True)
 
         # Resposta de erro amigavel
-        return Response(
-            content="""<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Message>Ops, tive um probleminha. Tenta de novo em alguns segundos?</Message>
-</Response>""",
-            media_type="application/xml"
-        )
+        return _twiml(_MENSAGEM_ERRO)
 
 
 @router.get("/whatsapp/chat")
@@ -1,10 +1,11 @@
 """Service layer for Anjo Social advisory system."""
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from uuid import uuid4
 
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, and_, or_, case as sql_case
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -36,6 +37,74 @@ async def create_advisor(db: AsyncSession, data: dict) -> Advisor:
     return advisor
 
 
+# Status que contam como carga do assessor
+ACTIVE_CASE_STATUSES = [CaseStatus.ASSIGNED.value, CaseStatus.IN_PROGRESS.value]
+
+# Ordem de atendimento da fila (emergência primeiro)
+PRIORITY_ORDER = {
+    CasePriority.EMERGENCY.value: 0,
+    CasePriority.HIGH.value: 1,
+    CasePriority.MEDIUM.value: 2,
+    CasePriority.LOW.value: 3,
+}
+
+
+@dataclass
+class AdvisorLoad:
+    """Active advisor with its current number of active cases."""
+    advisor: Advisor
+    active_cases: int
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.active_cases < self.advisor.max_active_cases
+
+
+async def get_advisor_loads(db: AsyncSession) -> list[AdvisorLoad]:
+    """Active advisors with their active case counts, in a single query."""
+    load = (
+        select(Case.advisor_id, func.count(Case.id).label("active_cases"))
+        .where(Case.status.in_(ACTIVE_CASE_STATUSES))
+        .group_by(Case.advisor_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(Advisor, func.coalesce(load.c.active_cases, 0))
+        .outerjoin(load, load.c.advisor_id == Advisor.id)
+        .where(Advisor.is_active == True)
+    )
+    return [AdvisorLoad(advisor, active_cases) for advisor, active_cases in result.all()]
+
+
+def pick_advisor(
+    loads: list[AdvisorLoad],
+    benefits: list[str],
+    priority: str = "medium",
+) -> Optional[AdvisorLoad]:
+    """Choose the best advisor from a workload snapshot (no queries).
+
+    Prioriza: 1) especialidade compatível, 2) menor carga de casos ativos.
+    Sem capacidade livre, só casos de emergência são atribuídos (ao melhor
+    assessor mesmo acima do limite).
+    """
+    if not loads:
+        return None
+
+    available = [entry for entry in loads if entry.has_capacity]
+    if not available:
+        if priority != CasePriority.EMERGENCY.value:
+            return None
+        available = loads
+
+    wanted = set(benefits)
+
+    def score(entry: AdvisorLoad) -> tuple:
+        match_count = len(wanted.intersection(entry.advisor.specialties or []))
+        return (-match_count, entry.active_cases)
+
+    return min(available, key=score)
+
+
 async def find_best_advisor(
     db: AsyncSession,
     benefits: list[str],
@@ -45,50 +114,68 @@ async def find_best_advisor(
 
     Prioriza: 1) especialidade compatível, 2) menor carga de casos ativos.
     """
-    # Busca assessores ativos
-    result = await db.execute(
-        select(Advisor).where(Advisor.is_active == True)
-    )
-    advisors = list(result.scalars().all())
+    best = pick_advisor(await get_advisor_loads(db), benefits, priority)
+    return best.advisor if best else None
 
-    if not advisors:
-        return None
 
-    # Conta casos ativos por assessor
-    active_statuses = [CaseStatus.ASSIGNED.value, CaseStatus.IN_PROGRESS.value]
-    case_counts = {}
-    for advisor in advisors:
-        count_result = await db.execute(
-            select(func.count(Case.id))
-            .where(
-                Case.advisor_id == advisor.id,
-                Case.status.in_(active_statuses)
-            )
+def queued_cases_query(limit: Optional[int] = None):
+    """Open cases without an advisor, emergency first and oldest first.
+
+    The priority ordering happens in SQL so ``limit`` keeps the most urgent
+    cases, and the rows are locked with ``SKIP LOCKED`` so concurrent
+    assignment runs take disjoint slices of the queue.
+    """
+    priority_rank = sql_case(
+        *[(Case.priority == priority, rank) for priority, rank in PRIORITY_ORDER.items()],
+        else_=len(PRIORITY_ORDER),
+    )
+    query = (
+        select(Case)
+        .where(
+            Case.status == CaseStatus.OPEN.value,
+            Case.advisor_id.is_(None),
         )
-        case_counts[advisor.id] = count_result.scalar() or 0
+        .order_by(priority_rank, Case.created_at)
+        .with_for_update(skip_locked=True)
+    )
+    if limit:
+        query = query.limit(limit)
+    return query
 
-    # Filtra assessores com capacidade
-    available = [
-        a for a in advisors
-        if case_counts.get(a.id, 0) < a.max_active_cases
-    ]
 
-    if not available:
-        # Emergência: pega o com menos casos mesmo acima do limite
-        if priority == CasePriority.EMERGENCY.value:
-            available = advisors
-        else:
-            return None
+async def assign_queued_cases(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+) -> list[tuple[Case, Advisor]]:
+    """Assign open cases without an advisor in one pass.
+
+    Loads the queue (see ``queued_cases_query``) and the advisors' workload
+    once, then assigns cases in priority order (emergency first, oldest
+    first), updating the workload snapshot in memory as each case is
+    assigned. Cases no advisor can take stay open.
 
-    # Ordena por: match de especialidade (desc), carga (asc)
-    def score(advisor: Advisor) -> tuple:
-        specialties = advisor.specialties or []
-        match_count = sum(1 for b in benefits if b in specialties)
-        active_count = case_counts.get(advisor.id, 0)
-        return (-match_count, active_count)
+    Returns:
+        (case, advisor) pairs that were assigned
+    """
+    cases = list((await db.execute(queued_cases_query(limit))).scalars().all())
+    if not cases:
+        return []
 
-    available.sort(key=score)
-    return available[0]
+    loads = await get_advisor_loads(db)
+
+    now = datetime.utcnow()
+    assigned = []
+    for case in cases:
+        best = pick_advisor(loads, case.benefits or [], case.priority)
+        if best is None:
+            continue
+        case.advisor_id = best.advisor.id
+        case.status = CaseStatus.ASSIGNED.value
+        case.updated_at = now
+        best.active_cases += 1
+        assigned.append((case, best.advisor))
+
+    return assigned
 
 
 # --- Case Operations ---
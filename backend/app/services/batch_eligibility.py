@@ -0,0 +1,531 @@
+"""
+Vectorized batch eligibility for whole CadÚnico cohorts.
+
+Evaluates a columnar table of citizen profiles (CSV, Parquet or Arrow)
+against the compiled benefit catalog with pandas/NumPy column operations.
+Rows are grouped by location, so each group is only checked against the
+benefits available there. Statuses and estimated values follow the same
+rules as ``eligibility_service.evaluate_benefit``.
+"""
+
+import logging
+import typing
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from app.schemas.benefit import CitizenProfile
+from app.services.benefit_catalog import (
+    ALREADY_RECEIVING_FLAGS,
+    FIELD_MAPPING,
+    SECTOR_FLAGS,
+    BenefitCatalog,
+    CatalogBenefit,
+    CompiledRule,
+)
+
+try:
+    import pyarrow.ipc
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+SUPPORTED_FORMATS = ("csv", "parquet", "arrow")
+
+# Columns accepted as the family identifier, in order of preference
+FAMILY_ID_COLUMNS = ("familyId", "family_id", "cod_familiar_fam", "codigo_familiar", "id")
+
+_TRUE_VALUES = {"true", "1", "1.0", "sim", "s", "yes", "y", "t", "x"}
+_FALSE_VALUES = {"false", "0", "0.0", "nao", "não", "n", "no", "f"}
+
+# Status codes of the result matrix
+NOT_APPLICABLE = 0
+ALREADY_RECEIVING = 1
+ELIGIBLE = 2
+LIKELY_ELIGIBLE = 3
+MAYBE = 4
+NOT_ELIGIBLE = 5
+
+STATUS_NAMES = {
+    NOT_APPLICABLE: "not_applicable",
+    ALREADY_RECEIVING: "already_receiving",
+    ELIGIBLE: "eligible",
+    LIKELY_ELIGIBLE: "likely_eligible",
+    MAYBE: "maybe",
+    NOT_ELIGIBLE: "not_eligible",
+}
+
+# Per-family result keys (camelCase, like EligibilitySummary)
+_FAMILY_KEYS = {
+    ELIGIBLE: "eligible",
+    LIKELY_ELIGIBLE: "likelyEligible",
+    MAYBE: "maybe",
+    ALREADY_RECEIVING: "alreadyReceiving",
+}
+
+_VALUE_TYPES = (
+    ("monthly", "totalPotentialMonthly"),
+    ("annual", "totalPotentialAnnual"),
+    ("one_time", "totalPotentialOneTime"),
+)
+
+
+# =============================================================================
+# Input tables
+# =============================================================================
+
+def detect_format(filename: Optional[str]) -> str:
+    """Infer the table format from a file name."""
+    name = (filename or "").lower()
+    if name.endswith(".parquet") or name.endswith(".pq"):
+        return "parquet"
+    if name.endswith((".arrow", ".feather", ".ipc")):
+        return "arrow"
+    if name.endswith((".csv", ".txt")):
+        return "csv"
+    raise ValueError(f"Formato nao reconhecido: {filename}. Use {', '.join(SUPPORTED_FORMATS)}")
+
+
+def read_profile_chunks(
+    source: Any,
+    fmt: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    separator: str = ",",
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a profiles table in chunks.
+
+    Args:
+        source: Path or binary file object
+        fmt: csv, parquet or arrow
+        chunk_size: Rows per chunk
+        separator: CSV column separator
+
+    Yields:
+        Raw DataFrames (see ``normalize_profiles``)
+    """
+    if fmt == "csv":
+        with pd.read_csv(source, dtype=str, sep=separator, chunksize=chunk_size) as reader:
+            yield from reader
+        return
+
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Formato nao suportado: {fmt}")
+    if not PYARROW_AVAILABLE:
+        raise ValueError(f"Leitura de {fmt} requer o pacote pyarrow")
+
+    if fmt == "parquet":
+        batches = pyarrow.parquet.ParquetFile(source).iter_batches(batch_size=chunk_size)
+    else:
+        reader = pyarrow.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+    for batch in batches:
+        yield batch.to_pandas()
+
+
+def _field_kind(annotation: Any) -> type:
+    """Base python type of a CitizenProfile field (unwraps Optional)."""
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    return args[0] if args else annotation
+
+
+def _coerce(series: pd.Series, kind: type) -> pd.Series:
+    if kind is bool:
+        if pd.api.types.is_bool_dtype(series):
+            return series.astype("boolean")
+        text = series.astype("string").str.strip().str.lower()
+        result = pd.Series(pd.NA, index=series.index, dtype="boolean")
+        result[text.isin(_TRUE_VALUES).fillna(False)] = True
+        result[text.isin(_FALSE_VALUES).fillna(False)] = False
+        return result
+    if kind in (int, float):
+        return pd.to_numeric(series, errors="coerce").astype("Float64")
+    return series.astype("string").str.strip()
+
+
+def normalize_profiles(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Map a raw table to CitizenProfile attributes.
+
+    Accepts camelCase aliases or snake_case column names, coerces each
+    column to the profile field type and fills missing columns/values with
+    the profile defaults, so every row reads like a ``CitizenProfile``.
+    """
+    fields = CitizenProfile.model_fields
+    aliases = {info.alias: name for name, info in fields.items() if info.alias}
+    frame = frame.rename(columns=aliases)
+
+    if "estado" not in frame.columns:
+        raise ValueError("Coluna obrigatoria ausente: estado")
+
+    columns: Dict[str, pd.Series] = {}
+    for name, info in fields.items():
+        kind = _field_kind(info.annotation)
+        if name in frame.columns:
+            series = _coerce(frame[name], kind)
+        else:
+            series = _coerce(pd.Series(None, index=frame.index, dtype=object), kind)
+
+        default = info.get_default()
+        if default is not None and not info.is_required():
+            series = series.fillna(default)
+        columns[name] = series
+
+    columns["estado"] = columns["estado"].str.upper()
+    return pd.DataFrame(columns, index=frame.index)
+
+
+def _family_ids(frame: pd.DataFrame, offset: int) -> List[Any]:
+    for column in FAMILY_ID_COLUMNS:
+        if column in frame.columns:
+            return frame[column].astype(object).where(frame[column].notna(), None).tolist()
+    return list(range(offset, offset + len(frame)))
+
+
+# =============================================================================
+# Vectorized rule semantics
+# =============================================================================
+
+def _truthy(values: pd.Series) -> np.ndarray:
+    """Vectorized ``bool(value)``; missing values are falsy."""
+    if pd.api.types.is_bool_dtype(values):
+        result = values
+    elif pd.api.types.is_numeric_dtype(values):
+        result = values != 0
+    elif pd.api.types.is_string_dtype(values) and values.dtype != object:
+        result = values.str.len() > 0
+    else:
+        result = values.map(lambda v: bool(v) if v is not None and v is not pd.NA else False)
+    return result.fillna(False).to_numpy(dtype=bool)
+
+
+def _as_float(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return values.astype("Float64")
+    return pd.to_numeric(values.astype("string"), errors="coerce").astype("Float64")
+
+
+def _to_mask(result: Any, size: int) -> np.ndarray:
+    if isinstance(result, pd.Series):
+        return result.fillna(False).to_numpy(dtype=bool)
+    return np.full(size, bool(result))
+
+
+# Vectorized counterparts of benefit_catalog.COMPUTED_FIELDS
+VECTOR_COMPUTED_FIELDS = {
+    "rendaPerCapita": lambda frame: (
+        frame["renda_familiar_mensal"] / frame["pessoas_na_casa"].clip(lower=1)
+    ),
+}
+
+
+def field_values(frame: pd.DataFrame, field_name: str) -> pd.Series:
+    """Column holding a rule field (computed fields included)."""
+    if field_name in VECTOR_COMPUTED_FIELDS:
+        return VECTOR_COMPUTED_FIELDS[field_name](frame)
+
+    attr_name = FIELD_MAPPING.get(field_name, field_name)
+    if attr_name in frame.columns:
+        return frame[attr_name]
+    return pd.Series(None, index=frame.index, dtype=object)
+
+
+def _test_vector(operator: str, expected: Any, values: pd.Series) -> np.ndarray:
+    size = len(values)
+    none = np.zeros(size, dtype=bool)
+
+    if operator in ("eq", "neq"):
+        if isinstance(expected, (list, dict)):
+            matches = none
+        else:
+            try:
+                matches = _to_mask(values == expected, size)
+            except TypeError:
+                matches = none
+        return matches if operator == "eq" else ~matches
+
+    if operator in ("lt", "lte", "gt", "gte"):
+        bound = float(expected)
+        numbers = _as_float(values)
+        compare = {
+            "lt": numbers < bound,
+            "lte": numbers <= bound,
+            "gt": numbers > bound,
+            "gte": numbers >= bound,
+        }[operator]
+        return _to_mask(compare, size)
+
+    if operator in ("in", "not_in"):
+        if not isinstance(expected, list):
+            return none
+        members = _to_mask(values.isin(expected), size)
+        return members if operator == "in" else ~members
+
+    if operator == "has":
+        return _truthy(values)
+    if operator == "not_has":
+        return ~_truthy(values)
+
+    # Unknown operators never pass
+    return none
+
+
+def evaluate_rule_vector(
+    rule: CompiledRule,
+    frame: pd.DataFrame,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate a compiled rule over every row.
+
+    Returns:
+        (passed, inconclusive) boolean arrays
+    """
+    values = field_values(frame, rule.field)
+    inconclusive = values.isna().to_numpy(dtype=bool)
+    passed = _test_vector(rule.operator, rule.value, values) & ~inconclusive
+    return passed, inconclusive
+
+
+def estimated_values(benefit: CatalogBenefit, frame: pd.DataFrame) -> np.ndarray:
+    """Vectorized ``calculate_estimated_value`` (NaN when there is none)."""
+    size = len(frame)
+    if not benefit.estimated_value:
+        return np.full(size, np.nan)
+
+    min_val = benefit.estimated_value.get("min")
+    max_val = benefit.estimated_value.get("max")
+
+    if benefit.id == "federal-bolsa-familia":
+        filhos = frame["quantidade_filhos"].fillna(0).to_numpy(dtype=float)
+        valor = np.full(size, 142.0)  # Benefício de Renda de Cidadania
+        valor += np.where(_truthy(frame["tem_crianca_0_a_6"]), 150 * np.minimum(filhos, 3), 0)
+        valor += np.where(filhos > 0, 50 * filhos, 0)
+        valor += np.where(_truthy(frame["tem_gestante"]), 50, 0)
+        return np.minimum(valor, max_val or 900)
+
+    if benefit.id == "federal-abono-salarial":
+        value = max_val or 1412
+    elif min_val and max_val:
+        value = round((min_val + max_val) / 2)
+    else:
+        value = min_val or max_val
+
+    return np.full(size, np.nan if value is None else float(value))
+
+
+def evaluate_benefit_vector(
+    benefit: CatalogBenefit,
+    frame: pd.DataFrame,
+    geography: bool = True,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate one benefit for every row.
+
+    Args:
+        benefit: Compiled catalog benefit
+        frame: Normalized profiles
+        geography: Whether the benefit is available at the rows' location
+
+    Returns:
+        (status codes, estimated values) arrays
+    """
+    size = len(frame)
+    status = np.full(size, NOT_ELIGIBLE, dtype=np.int8)
+    values = np.full(size, np.nan)
+
+    flag = ALREADY_RECEIVING_FLAGS.get(benefit.id)
+    receiving = _truthy(frame[flag]) if flag else np.zeros(size, dtype=bool)
+
+    if not geography:
+        status[:] = NOT_APPLICABLE
+        status[receiving] = ALREADY_RECEIVING
+        return status, values
+
+    sector_flag = SECTOR_FLAGS.get(benefit.sector) if benefit.scope == "sectoral" else None
+    in_sector = _truthy(frame[sector_flag]) if sector_flag else np.ones(size, dtype=bool)
+
+    failed = np.zeros(size, dtype=np.int32)
+    inconclusive = np.zeros(size, dtype=np.int32)
+    for rule in benefit.rules:
+        rule_passed, rule_inconclusive = evaluate_rule_vector(rule, frame)
+        inconclusive += rule_inconclusive
+        failed += ~(rule_passed | rule_inconclusive)
+
+    status[:] = np.select(
+        [
+            receiving,
+            ~in_sector,
+            (failed == 0) & (inconclusive == 0),
+            (failed == 0) & (inconclusive > 0),
+            (failed <= 1) & (inconclusive > 0),
+        ],
+        [ALREADY_RECEIVING, NOT_APPLICABLE, ELIGIBLE, LIKELY_ELIGIBLE, MAYBE],
+        default=NOT_ELIGIBLE,
+    )
+
+    potential = (status == ELIGIBLE) | (status == LIKELY_ELIGIBLE)
+    if potential.any():
+        values = np.where(potential, estimated_values(benefit, frame), np.nan)
+
+    return status, values
+
+
+# =============================================================================
+# Batch engine
+# =============================================================================
+
+@dataclass
+class BatchAggregates:
+    """Running totals over every evaluated family."""
+
+    total_families: int = 0
+    families_with_benefits: int = 0
+    total_potential: Dict[str, float] = field(
+        default_factory=lambda: {key: 0.0 for _, key in _VALUE_TYPES}
+    )
+    by_benefit: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    by_state: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "totalFamilies": self.total_families,
+            "familiesWithBenefits": self.families_with_benefits,
+            **{key: round(value, 2) for key, value in self.total_potential.items()},
+            "byState": self.by_state,
+            "byBenefit": self.by_benefit,
+        }
+
+
+class BatchEligibilityEngine:
+    """
+    Evaluates tables of profiles against a compiled catalog.
+
+    Usage:
+        engine = BatchEligibilityEngine(catalog)
+        for chunk in read_profile_chunks(path, "csv"):
+            families = engine.evaluate(chunk)
+        engine.aggregates.to_dict()
+    """
+
+    def __init__(self, catalog: BenefitCatalog, scope: Optional[str] = None):
+        self.catalog = catalog
+        self.scope = scope
+        self.aggregates = BatchAggregates()
+        self._rows_seen = 0
+
+    def _benefits_for(self, state: Optional[str], ibge: Optional[str]):
+        candidates = self.catalog.for_location(state, ibge, self.scope)
+        in_location = set(candidates)
+        receivable = [
+            b for b in self.catalog.receivable
+            if b not in in_location and (not self.scope or b.scope == self.scope)
+        ]
+        return candidates, receivable
+
+    def evaluate(self, raw: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Evaluate a chunk and return one result dict per row, in input order."""
+        family_ids = _family_ids(raw, self._rows_seen)
+        self._rows_seen += len(raw)
+
+        frame = normalize_profiles(raw).reset_index(drop=True)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(frame)
+
+        groups = frame.groupby(["estado", "municipio_ibge"], dropna=False, sort=False).indices
+        for (state, ibge), positions in groups.items():
+            state = None if pd.isna(state) else state
+            ibge = None if pd.isna(ibge) else ibge
+            group = frame.iloc[positions]
+            for position, result in zip(positions, self._evaluate_group(group, state, ibge)):
+                results[position] = result
+
+        return [
+            {"familyId": family_id, **result}
+            for family_id, result in zip(family_ids, results)
+        ]
+
+    def _evaluate_group(
+        self,
+        group: pd.DataFrame,
+        state: Optional[str],
+        ibge: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        candidates, receivable = self._benefits_for(state, ibge)
+        benefits = candidates + receivable
+        size = len(group)
+
+        status = np.empty((size, len(benefits)), dtype=np.int8)
+        values = np.empty((size, len(benefits)))
+        for column, benefit in enumerate(benefits):
+            status[:, column], values[:, column] = evaluate_benefit_vector(
+                benefit, group, geography=column < len(candidates)
+            )
+
+        potential = (status == ELIGIBLE) | (status == LIKELY_ELIGIBLE)
+        counted = np.where(potential & (values != 0), values, 0.0)
+        counted = np.nan_to_num(counted)
+
+        totals = {}
+        for value_type, key in _VALUE_TYPES:
+            of_type = np.array([
+                bool(b.summary.estimated_value) and b.summary.estimated_value.type == value_type
+                for b in benefits
+            ], dtype=bool)
+            totals[key] = counted[:, of_type].sum(axis=1) if of_type.any() else np.zeros(size)
+
+        self._aggregate(benefits, status, potential, totals, state)
+
+        ids = np.array([b.id for b in benefits], dtype=object)
+        results = []
+        for row in range(size):
+            result = {key: ids[status[row] == code].tolist() for code, key in _FAMILY_KEYS.items()}
+            for _, key in _VALUE_TYPES:
+                result[key] = float(totals[key][row])
+            results.append(result)
+        return results
+
+    def _aggregate(self, benefits, status, potential, totals, state) -> None:
+        aggregates = self.aggregates
+        size = status.shape[0]
+
+        aggregates.total_families += size
+        aggregates.families_with_benefits += int(potential.any(axis=1).sum())
+        aggregates.by_state[state or ""] = aggregates.by_state.get(state or "", 0) + size
+        for _, key in _VALUE_TYPES:
+            aggregates.total_potential[key] += float(totals[key].sum())
+
+        for column, benefit in enumerate(benefits):
+            codes, counts = np.unique(status[:, column], return_counts=True)
+            entry = aggregates.by_benefit.setdefault(benefit.id, {})
+            for code, count in zip(codes, counts):
+                name = STATUS_NAMES[int(code)]
+                entry[name] = entry.get(name, 0) + int(count)
+
+
+def iter_ndjson(
+    engine: BatchEligibilityEngine,
+    chunks: Iterable[pd.DataFrame],
+) -> Iterator[bytes]:
+    """
+    Stream per-family results as NDJSON, followed by one aggregates line.
+
+    Each chunk is evaluated and flushed before the next one is read, so
+    memory stays bounded by the chunk size.
+    """
+    for chunk in chunks:
+        families = engine.evaluate(chunk)
+        yield b"".join(orjson.dumps(family) + b"\n" for family in families)
+
+    logger.info(
+        f"Lote de elegibilidade concluido: {engine.aggregates.total_families} familias"
+    )
+    yield orjson.dumps({"aggregates": engine.aggregates.to_dict()}) + b"\n"
@@ -0,0 +1,381 @@
+"""
+Consulta de beneficios por CPF com a base local primeiro.
+
+O job ``indexar_beneficiarios`` mantem a tabela ``beneficiarios`` (Bolsa
+Familia e BPC, chave ``cpf_hash``) com os dumps mensais do Portal da
+Transparencia. Esta consulta responde dessa base e so chama a API remota
+(``transparencia_service``) quando o CPF nao esta na base ou o dado local
+esta desatualizado (mais antigo que ``BENEFICIARIOS_MAX_IDADE_DIAS``).
+
+A base nao tem Auxilio Gas nem Seguro Defeso: numa resposta local esses
+programas vem do cache do CPF no Redis (ou, uma vez por mes, da API). A resposta lista os
+programas efetivamente consultados em ``programas_consultados`` e traz
+``parcial=True`` quando algum ficou de fora (API sem chave ou com erro).
+
+- Consultas concorrentes (WhatsApp, SMS, voz) sao agrupadas em uma unica
+  query ``cpf_hash IN (...)`` por ``ColetorConsultas``.
+- Com um filtro de hashes conhecidos (``definir_filtro``; no startup, o
+  filtro de Bloom de ``filtro_cpf``), CPFs que com certeza nao estao na
+  base pulam a query.
+- Se a base nao responder, a consulta vai direto para a API por
+  ``_BASE_RETRY_INTERVAL`` segundos.
+
+A resposta tem o mesmo formato de ``consultar_todos_beneficios``.
+
+SEGURANCA: CPF nunca eh logado nem gravado; so o hash.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.middleware.metrics import beneficiario_lookups_total
+from app.models.beneficiario import Beneficiario, hash_cpf
+from app.services import transparencia_service
+
+logger = logging.getLogger(__name__)
+
+# Tamanho maximo do IN (...) de uma query
+_LOTE_MAXIMO = 500
+
+# Tempo que o coletor espera por outras consultas antes da query
+_JANELA_SEGUNDOS = 0.002
+
+# Base fora do ar: tenta de novo depois deste intervalo
+_BASE_RETRY_INTERVAL = 30.0
+
+PROGRAMA_BOLSA_FAMILIA = "Bolsa Familia / Auxilio Brasil"
+PROGRAMA_BPC = "BPC - Beneficio de Prestacao Continuada"
+
+# Programas da resposta completa (``consultar_todos_beneficios``)
+PROGRAMAS = ("bolsa_familia", "bpc", "auxilio_gas", "seguro_defeso")
+
+# Programas fora dos dumps indexados, com o nome usado no aviso
+_PROGRAMAS_SO_API = {
+    "auxilio_gas": "Auxilio Gas",
+    "seguro_defeso": "Seguro Defeso",
+}
+
+
+# =============================================================================
+# Consulta em lote
+# =============================================================================
+
+async def buscar_por_hashes(db, cpf_hashes: Iterable[str]) -> Dict[str, Beneficiario]:
+    """Busca beneficiarios por hash do CPF, em queries de ate ``_LOTE_MAXIMO``.
+
+    Args:
+        db: Sessao async do SQLAlchemy
+        cpf_hashes: Hashes SHA256 (``hash_cpf``)
+
+    Returns:
+        dict cpf_hash -> Beneficiario (so os encontrados)
+    """
+    hashes = list(dict.fromkeys(cpf_hashes))
+    encontrados: Dict[str, Beneficiario] = {}
+    for inicio in range(0, len(hashes), _LOTE_MAXIMO):
+        lote = hashes[inicio:inicio + _LOTE_MAXIMO]
+        result = await db.execute(select(Beneficiario).where(Beneficiario.cpf_hash.in_(lote)))
+        for beneficiario in result.scalars():
+            encontrados[beneficiario.cpf_hash] = beneficiario
+    return encontrados
+
+
+class ColetorConsultas:
+    """
+    Agrupa consultas concorrentes por ``cpf_hash`` em uma unica query.
+
+    Cada ``buscar`` entra em uma fila; depois de ``janela`` segundos (ou ao
+    juntar ``max_lote`` hashes) uma tarefa faz a query e resolve todas as
+    consultas pendentes de uma vez.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        janela: float = _JANELA_SEGUNDOS,
+        max_lote: int = _LOTE_MAXIMO,
+    ):
+        """
+        Args:
+            session_factory: Cria sessoes async (padrao: ``AsyncSessionLocal``)
+            janela: Espera por outras consultas antes da query
+            max_lote: Hashes por query
+        """
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.janela = janela
+        self.max_lote = max_lote
+        self._pendentes: Dict[str, List[asyncio.Future]] = {}
+        self._cheio = asyncio.Event()
+        self._tarefa: Optional[asyncio.Task] = None
+        self.queries = 0
+
+    async def buscar(self, cpf_hash: str) -> Optional[Beneficiario]:
+        """Beneficiario do hash, ou None se nao estiver na base."""
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendentes.setdefault(cpf_hash, []).append(futuro)
+        if len(self._pendentes) >= self.max_lote:
+            self._cheio.set()
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+        return await futuro
+
+    async def _executar(self) -> None:
+        while self._pendentes:
+            try:
+                await asyncio.wait_for(self._cheio.wait(), timeout=self.janela)
+            except asyncio.TimeoutError:
+                pass
+            self._cheio.clear()
+
+            hashes = list(self._pendentes)[:self.max_lote]
+            futuros = {h: self._pendentes.pop(h) for h in hashes}
+            try:
+                async with self.session_factory() as db:
+                    encontrados = await buscar_por_hashes(db, hashes)
+                self.queries += 1
+            except Exception as e:
+                for lista in futuros.values():
+                    for futuro in lista:
+                        if not futuro.done():
+                            futuro.set_exception(e)
+                continue
+
+            for cpf_hash, lista in futuros.items():
+                for futuro in lista:
+                    if not futuro.done():
+                        futuro.set_result(encontrados.get(cpf_hash))
+
+
+_coletor: Optional[ColetorConsultas] = None
+_filtro = None
+_base_indisponivel_ate = 0.0
+
+
+def get_coletor() -> ColetorConsultas:
+    """Coletor compartilhado (criado na primeira consulta)."""
+    global _coletor
+    if _coletor is None:
+        _coletor = ColetorConsultas()
+    return _coletor
+
+
+def definir_filtro(filtro) -> None:
+    """Define o filtro de hashes conhecidos (qualquer objeto com ``in``).
+
+    O filtro pode ter falsos positivos (a query confirma), nunca falsos
+    negativos. ``None`` desativa.
+    """
+    global _filtro
+    _filtro = filtro
+
+
+def pode_estar_na_base(cpf_hash: str) -> bool:
+    """False se o filtro garante que o hash nao esta na base (sem filtro: True)."""
+    if _filtro is None:
+        return True
+    from app.services.filtro_cpf import recarregar_se_mudou
+    recarregar_se_mudou()
+    return cpf_hash in _filtro
+
+
+# =============================================================================
+# Resposta a partir da base local
+# =============================================================================
+
+def data_referencia(beneficiario: Beneficiario) -> Optional[date]:
+    """Mes mais recente dos dados do beneficiario na base local."""
+    datas = [d for d in (beneficiario.bf_data_referencia, beneficiario.bpc_data_referencia) if d]
+    if datas:
+        return max(datas)
+    if beneficiario.atualizado_em:
+        return beneficiario.atualizado_em.date()
+    return None
+
+
+def base_atualizada(beneficiario: Beneficiario, hoje: Optional[date] = None) -> bool:
+    """Dado local recente o bastante para responder sem a API."""
+    referencia = data_referencia(beneficiario)
+    if referencia is None:
+        return False
+    hoje = hoje or date.today()
+    return referencia >= hoje - timedelta(days=settings.BENEFICIARIOS_MAX_IDADE_DIAS)
+
+
+def resposta_local(beneficiario: Beneficiario, desatualizada: bool = False) -> dict[str, Any]:
+    """Monta a resposta no formato de ``consultar_todos_beneficios``.
+
+    So cobre Bolsa Familia e BPC (``parcial``); ``completar_com_api`` junta
+    os demais programas.
+    """
+    detalhes: Dict[str, dict] = {}
+    beneficios_ativos = []
+
+    if beneficiario.bf_ativo:
+        valor = float(beneficiario.bf_valor or 0)
+        detalhes["bolsa_familia"] = {
+            "beneficiario": True,
+            "programa": PROGRAMA_BOLSA_FAMILIA,
+            "valor_mensal": valor,
+            "ultima_parcela": {"mes_ano": beneficiario.bf_parcela_mes or "", "valor": valor},
+        }
+        beneficios_ativos.append({"programa": PROGRAMA_BOLSA_FAMILIA, "valor_mensal": valor})
+    else:
+        detalhes["bolsa_familia"] = {"beneficiario": False, "programa": PROGRAMA_BOLSA_FAMILIA}
+
+    if beneficiario.bpc_ativo:
+        valor = float(beneficiario.bpc_valor or 0)
+        detalhes["bpc"] = {
+            "beneficiario": True,
+            "programa": PROGRAMA_BPC,
+            "tipo": beneficiario.bpc_tipo or "",
+            "valor_mensal": valor,
+        }
+        beneficios_ativos.append({"programa": PROGRAMA_BPC, "valor_mensal": valor})
+    else:
+        detalhes["bpc"] = {"beneficiario": False, "programa": PROGRAMA_BPC}
+
+    referencia = data_referencia(beneficiario)
+    resposta = {
+        "cpf_consultado": True,
+        "beneficiario_algum_programa": len(beneficios_ativos) > 0,
+        "quantidade_beneficios": len(beneficios_ativos),
+        "beneficios_ativos": beneficios_ativos,
+        "total_mensal_estimado": sum(b["valor_mensal"] for b in beneficios_ativos),
+        "detalhes": detalhes,
+        "fonte": "Base local (Portal da Transparencia)",
+        "data_referencia": referencia.isoformat() if referencia else None,
+        "aviso": "Dados publicos. Para informacoes oficiais, consulte o CRAS ou Caixa Economica.",
+        "programas_consultados": ["bolsa_familia", "bpc"],
+    }
+    if desatualizada:
+        resposta["desatualizado"] = True
+        resposta["aviso"] = (
+            "Dados podem estar desatualizados. "
+            "Para informacoes oficiais, consulte o CRAS ou Caixa Economica."
+        )
+    return _marcar_cobertura(resposta)
+
+
+def _marcar_cobertura(resposta: dict[str, Any]) -> dict[str, Any]:
+    """Define ``parcial`` e avisa quais programas nao foram consultados."""
+    faltando = [p for p in PROGRAMAS if p not in resposta["programas_consultados"]]
+    resposta["parcial"] = bool(faltando)
+    if faltando:
+        nomes = [_PROGRAMAS_SO_API.get(p, p) for p in faltando]
+        resposta["aviso_parcial"] = f"Nao consultados: {', '.join(nomes)}."
+    else:
+        resposta.pop("aviso_parcial", None)
+    return resposta
+
+
+async def completar_com_api(cpf: str, resposta: dict[str, Any]) -> dict[str, Any]:
+    """Junta na resposta local os programas que so a API responde.
+
+    Auxilio Gas e Seguro Defeso vem de ``consultar_programas``, que usa o
+    cache do CPF no Redis (TTL ate a proxima publicacao mensal): a API so e
+    chamada na primeira consulta do CPF no mes. Sem chave da API, a
+    resposta fica ``parcial``; programas com erro ficam fora de
+    ``programas_consultados`` e dos totais.
+    """
+    if not transparencia_service.is_transparencia_configured():
+        return resposta
+
+    resultados = await transparencia_service.consultar_programas(cpf, list(_PROGRAMAS_SO_API))
+
+    for programa, resultado in resultados.items():
+        resposta["detalhes"][programa] = resultado
+        if "erro" in resultado:
+            continue
+        resposta["programas_consultados"].append(programa)
+        if resultado.get("beneficiario"):
+            valor = resultado.get("valor_mensal") or (resultado.get("ultima_parcela") or {}).get("valor", 0)
+            resposta["beneficios_ativos"].append({"programa": resultado.get("programa"), "valor_mensal": valor})
+            resposta["total_mensal_estimado"] += valor
+
+    resposta["quantidade_beneficios"] = len(resposta["beneficios_ativos"])
+    resposta["beneficiario_algum_programa"] = resposta["quantidade_beneficios"] > 0
+    return _marcar_cobertura(resposta)
+
+
+def _anotar_cobertura_remota(resultado: dict[str, Any]) -> dict[str, Any]:
+    """Preenche ``programas_consultados``/``parcial`` numa resposta da API (nao no mock)."""
+    detalhes = resultado.get("detalhes")
+    if detalhes is None or not transparencia_service.is_transparencia_configured():
+        return resultado
+    resultado = dict(resultado)
+    resultado["programas_consultados"] = [
+        p for p in PROGRAMAS if p in detalhes and "erro" not in detalhes[p]
+    ]
+    return _marcar_cobertura(resultado)
+
+
+def _remoto_falhou(resultado: dict[str, Any]) -> bool:
+    """Todas as consultas da API falharam (rate limit, timeout...)."""
+    detalhes = resultado.get("detalhes") or {}
+    return not detalhes or all("erro" in d for d in detalhes.values())
+
+
+# =============================================================================
+# Consulta unificada
+# =============================================================================
+
+async def buscar_local(cpf_hash: str) -> Optional[Beneficiario]:
+    """Beneficiario da base local, ou None (fora do filtro, ausente ou base fora)."""
+    global _base_indisponivel_ate
+
+    if not pode_estar_na_base(cpf_hash):
+        beneficiario_lookups_total.labels(source="filter_skip").inc()
+        return None
+    if time.monotonic() < _base_indisponivel_ate:
+        return None
+
+    try:
+        return await get_coletor().buscar(cpf_hash)
+    except Exception as e:
+        _base_indisponivel_ate = time.monotonic() + _BASE_RETRY_INTERVAL
+        logger.warning(f"Base de beneficiarios indisponivel: {e}")
+        return None
+
+
+async def consultar_beneficios(cpf: str) -> dict[str, Any]:
+    """Consulta beneficios de um CPF: base local primeiro, API se preciso.
+
+    Args:
+        cpf: CPF do cidadao (com ou sem formatacao)
+
+    Returns:
+        dict no formato de ``consultar_todos_beneficios``, com
+        ``programas_consultados`` e ``parcial``
+    """
+    cpf_limpo = "".join(c for c in cpf if c.isdigit())
+    cpf_hash = hash_cpf(cpf_limpo)
+    inicio = time.perf_counter()
+
+    beneficiario = await buscar_local(cpf_hash)
+    if beneficiario is not None and base_atualizada(beneficiario):
+        beneficiario_lookups_total.labels(source="local").inc()
+        logger.info(
+            f"Beneficios da base local para cpf_hash={cpf_hash[:12]} "
+            f"em {(time.perf_counter() - inicio) * 1000:.1f}ms"
+        )
+        return await completar_com_api(cpf_limpo, resposta_local(beneficiario))
+
+    # Sem API configurada, o dado local (mesmo antigo) vale mais que o mock
+    if beneficiario is not None and not transparencia_service.is_transparencia_configured():
+        beneficiario_lookups_total.labels(source="local_stale").inc()
+        return resposta_local(beneficiario, desatualizada=True)
+
+    resultado = await transparencia_service.consultar_beneficios_ou_mock(cpf_limpo)
+    if beneficiario is not None and _remoto_falhou(resultado):
+        beneficiario_lookups_total.labels(source="local_stale").inc()
+        return resposta_local(beneficiario, desatualizada=True)
+
+    beneficiario_lookups_total.labels(source="remote").inc()
+    return _anotar_cobertura_remota(resultado)
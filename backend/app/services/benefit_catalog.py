@@ -0,0 +1,447 @@
+"""
+Compiled, in-memory benefit catalog.
+
+Loads the active benefits once per process, precompiles their eligibility
+rules into plain callables and indexes them by scope/state/municipality/sector,
+so eligibility checks run without a database round-trip.
+
+The catalog is rebuilt only when the ``benefits`` table changes: ORM writes in
+this process invalidate it immediately, and other processes (uvicorn workers,
+scripts) are picked up by a cheap signature check (row count + last update)
+done at most once every ``BENEFIT_CATALOG_CHECK_INTERVAL`` seconds.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from operator import eq, ge, gt, le, lt, ne
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.benefit import Benefit
+from app.schemas.benefit import (
+    BenefitSummary,
+    CitizenProfile,
+    EstimatedValue,
+    RuleEvaluationResult,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Map camelCase rule fields to CitizenProfile snake_case attributes
+FIELD_MAPPING: Dict[str, str] = {
+    "pessoasNaCasa": "pessoas_na_casa",
+    "quantidadeFilhos": "quantidade_filhos",
+    "temIdoso65Mais": "tem_idoso_65_mais",
+    "temGestante": "tem_gestante",
+    "temPcd": "tem_pcd",
+    "temCrianca0a6": "tem_crianca_0_a_6",
+    "rendaFamiliarMensal": "renda_familiar_mensal",
+    "trabalhoFormal": "trabalho_formal",
+    "temCasaPropria": "tem_casa_propria",
+    "moradiaZonaRural": "moradia_zona_rural",
+    "cadastradoCadunico": "cadastrado_cadunico",
+    "recebeBolsaFamilia": "recebe_bolsa_familia",
+    "recebeBpc": "recebe_bpc",
+    "trabalhou1971_1988": "trabalhou_1971_1988",
+    "temCarteiraAssinada": "tem_carteira_assinada",
+    "tempoCarteiraAssinada": "tempo_carteira_assinada",
+    "fezSaqueFgts": "fez_saque_fgts",
+    "temMei": "tem_mei",
+    "trabalhaAplicativo": "trabalha_aplicativo",
+    "agricultorFamiliar": "agricultor_familiar",
+    "pescadorArtesanal": "pescador_artesanal",
+    "catadorReciclavel": "catador_reciclavel",
+    "mulherMenstruante": "mulher_menstruante",
+    "idadeMulher": "idade_mulher",
+    "redePublica": "rede_publica",
+    "municipioIbge": "municipio_ibge",
+}
+
+# Benefits the citizen may already receive -> profile flag that says so
+ALREADY_RECEIVING_FLAGS: Dict[str, str] = {
+    "federal-bolsa-familia": "recebe_bolsa_familia",
+    "federal-bpc-idoso": "recebe_bpc",
+    "federal-bpc-pcd": "recebe_bpc",
+}
+
+# Sector of a sectoral benefit -> profile flag that places the citizen in it
+SECTOR_FLAGS: Dict[str, str] = {
+    "pescador": "pescador_artesanal",
+    "agricultor": "agricultor_familiar",
+    "entregador": "trabalha_aplicativo",
+    "motorista_app": "trabalha_aplicativo",
+    "catador": "catador_reciclavel",
+    "mei": "tem_mei",
+    "autonomo": "tem_mei",
+    "pcd": "tem_pcd",
+}
+
+_NUMERIC_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "lt": lt,
+    "lte": le,
+    "gt": gt,
+    "gte": ge,
+}
+
+
+def calculate_renda_per_capita(profile: CitizenProfile) -> float:
+    """Calculate per capita income."""
+    pessoas = max(profile.pessoas_na_casa, 1)
+    return profile.renda_familiar_mensal / pessoas
+
+
+# Fields computed from other profile attributes
+COMPUTED_FIELDS: Dict[str, Callable[[CitizenProfile], Any]] = {
+    "rendaPerCapita": calculate_renda_per_capita,
+}
+
+
+def field_getter(field: str) -> Callable[[CitizenProfile], Any]:
+    """Build a getter that reads a rule field from a profile."""
+    if field in COMPUTED_FIELDS:
+        return COMPUTED_FIELDS[field]
+
+    attr_name = FIELD_MAPPING.get(field, field)
+    return lambda profile: getattr(profile, attr_name, None)
+
+
+def _compile_test(operator: str, expected: Any) -> Callable[[Any], bool]:
+    """Compile an operator + expected value into a one-argument predicate."""
+    if operator == "eq":
+        return lambda actual: eq(actual, expected)
+    if operator == "neq":
+        return lambda actual: ne(actual, expected)
+
+    if operator in _NUMERIC_OPERATORS:
+        compare = _NUMERIC_OPERATORS[operator]
+        try:
+            bound = float(expected)
+        except (TypeError, ValueError):
+            # Keep the original behaviour: fail when the rule is evaluated
+            return lambda actual: compare(float(actual), float(expected))
+        return lambda actual: compare(float(actual), bound)
+
+    if operator in ("in", "not_in"):
+        if not isinstance(expected, list):
+            return lambda actual: False
+        if operator == "in":
+            return lambda actual: actual in expected
+        return lambda actual: actual not in expected
+
+    if operator == "has":
+        return bool
+    if operator == "not_has":
+        return lambda actual: not actual
+
+    # Unknown operators never pass
+    return lambda actual: False
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """An eligibility rule precompiled into a getter and a predicate."""
+
+    field: str
+    operator: str
+    value: Any
+    description: str
+    getter: Callable[[CitizenProfile], Any]
+    test: Callable[[Any], bool]
+
+    def evaluate(self, profile: CitizenProfile) -> RuleEvaluationResult:
+        """Evaluate this rule against a profile."""
+        field_value = self.getter(profile)
+
+        # If the field is undefined/null, mark as inconclusive
+        if field_value is None:
+            return RuleEvaluationResult(
+                ruleDescription=self.description,
+                passed=False,
+                inconclusive=True,
+                field=self.field,
+                expectedValue=self.value,
+                actualValue=None,
+            )
+
+        return RuleEvaluationResult(
+            ruleDescription=self.description,
+            passed=self.test(field_value),
+            inconclusive=False,
+            field=self.field,
+            expectedValue=self.value,
+            actualValue=field_value,
+        )
+
+
+def compile_rule(rule: Dict[str, Any]) -> CompiledRule:
+    """Compile a JSON eligibility rule."""
+    field = rule.get("field", "")
+    operator = rule.get("operator", "eq")
+    expected_value = rule.get("value")
+
+    return CompiledRule(
+        field=field,
+        operator=operator,
+        value=expected_value,
+        description=rule.get("description", ""),
+        getter=field_getter(field),
+        test=_compile_test(operator, expected_value),
+    )
+
+
+def benefit_to_summary(benefit: Any) -> BenefitSummary:
+    """Convert a Benefit (model or catalog entry) to BenefitSummary schema."""
+    est_value = None
+    if benefit.estimated_value:
+        est_value = EstimatedValue(
+            type=benefit.estimated_value.get("type", "monthly"),
+            min=benefit.estimated_value.get("min"),
+            max=benefit.estimated_value.get("max"),
+            description=benefit.estimated_value.get("description"),
+        )
+
+    return BenefitSummary(
+        id=benefit.id,
+        name=benefit.name,
+        shortDescription=benefit.short_description,
+        scope=benefit.scope,
+        state=benefit.state,
+        municipalityIbge=benefit.municipality_ibge,
+        estimatedValue=est_value,
+        status=benefit.status,
+        icon=benefit.icon,
+        category=benefit.category,
+    )
+
+
+@dataclass(frozen=True, eq=False)
+class CatalogBenefit:
+    """
+    Detached, read-only snapshot of a Benefit row.
+
+    Exposes the same attributes as the Benefit model, plus the compiled
+    rules and the precomputed API summary.
+    """
+
+    benefit: Benefit
+    id: str
+    name: str
+    scope: str
+    state: Optional[str]
+    municipality_ibge: Optional[str]
+    sector: Optional[str]
+    status: str
+    estimated_value: Optional[Dict[str, Any]]
+    where_to_apply: str
+    documents_required: Tuple[str, ...]
+    rules: Tuple[CompiledRule, ...]
+    summary: BenefitSummary
+    requires_cadunico: bool
+
+    @classmethod
+    def from_model(cls, benefit: Benefit) -> "CatalogBenefit":
+        """Compile a Benefit model into a catalog entry."""
+        raw_rules = benefit.eligibility_rules or []
+        return cls(
+            benefit=benefit,
+            id=benefit.id,
+            name=benefit.name,
+            scope=benefit.scope,
+            state=benefit.state,
+            municipality_ibge=benefit.municipality_ibge,
+            sector=benefit.sector,
+            status=benefit.status,
+            estimated_value=benefit.estimated_value,
+            where_to_apply=benefit.where_to_apply,
+            documents_required=tuple(benefit.documents_required or ()),
+            rules=tuple(compile_rule(rule) for rule in raw_rules),
+            summary=benefit_to_summary(benefit),
+            requires_cadunico=any(
+                rule.get("field") == "cadastradoCadunico" for rule in raw_rules
+            ),
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        # Delegate the remaining model attributes (to_dict, icon, ...)
+        if name == "benefit":
+            raise AttributeError(name)
+        return getattr(self.benefit, name)
+
+
+class BenefitCatalog:
+    """Active benefits indexed for location/scope lookups."""
+
+    def __init__(
+        self,
+        benefits: List[CatalogBenefit],
+        signature: Optional[Tuple[Any, ...]] = None,
+        generation: int = 0,
+    ):
+        self.benefits = benefits
+        self.signature = signature
+        self.generation = generation
+        self.loaded_at = time.time()
+
+        self._position: Dict[str, int] = {}
+        self.by_id: Dict[str, CatalogBenefit] = {}
+        self.by_scope: Dict[str, List[CatalogBenefit]] = {}
+        self.by_state: Dict[Optional[str], List[CatalogBenefit]] = {}
+        self.by_municipality: Dict[Optional[str], List[CatalogBenefit]] = {}
+        self.by_sector: Dict[Optional[str], List[CatalogBenefit]] = {}
+        self.sectoral_by_state: Dict[Optional[str], List[CatalogBenefit]] = {}
+        self.sectoral_national: List[CatalogBenefit] = []
+        self.receivable: List[CatalogBenefit] = []
+
+        for position, benefit in enumerate(benefits):
+            self._position[benefit.id] = position
+            self.by_id[benefit.id] = benefit
+            self.by_scope.setdefault(benefit.scope, []).append(benefit)
+
+            if benefit.scope == "state":
+                self.by_state.setdefault(benefit.state, []).append(benefit)
+            elif benefit.scope == "municipal":
+                self.by_municipality.setdefault(benefit.municipality_ibge, []).append(benefit)
+            elif benefit.scope == "sectoral":
+                self.by_sector.setdefault(benefit.sector, []).append(benefit)
+                if benefit.state:
+                    self.sectoral_by_state.setdefault(benefit.state, []).append(benefit)
+                else:
+                    self.sectoral_national.append(benefit)
+
+            if benefit.id in ALREADY_RECEIVING_FLAGS:
+                self.receivable.append(benefit)
+
+    def __len__(self) -> int:
+        return len(self.benefits)
+
+    def get(self, benefit_id: str) -> Optional[CatalogBenefit]:
+        """Get a benefit by id."""
+        return self.by_id.get(benefit_id)
+
+    def all(self, scope: Optional[str] = None) -> List[CatalogBenefit]:
+        """All active benefits, optionally restricted to one scope."""
+        if scope:
+            return self.by_scope.get(scope, [])
+        return self.benefits
+
+    def for_location(
+        self,
+        state: Optional[str],
+        municipality_ibge: Optional[str] = None,
+        scope: Optional[str] = None,
+    ) -> List[CatalogBenefit]:
+        """
+        Benefits whose geography matches a location, in catalog order.
+
+        Same semantics as ``eligibility_service.matches_geography``.
+        """
+        groups: List[List[CatalogBenefit]] = []
+        if scope in (None, "federal"):
+            groups.append(self.by_scope.get("federal", []))
+        if scope in (None, "state"):
+            groups.append(self.by_state.get(state, []))
+        if scope in (None, "municipal"):
+            groups.append(self.by_municipality.get(municipality_ibge, []))
+        if scope in (None, "sectoral"):
+            groups.append(self.sectoral_national)
+            groups.append(self.sectoral_by_state.get(state, []))
+
+        return self.ordered(benefit for group in groups for benefit in group)
+
+    def ordered(self, benefits) -> List[CatalogBenefit]:
+        """Sort benefits back into catalog order."""
+        return sorted(benefits, key=lambda b: self._position[b.id])
+
+
+# =============================================================================
+# Process-wide catalog
+# =============================================================================
+
+_catalog: Optional[BenefitCatalog] = None
+_checked_at: float = 0.0
+_generation: int = 0
+_lock = asyncio.Lock()
+
+
+def invalidate_benefit_catalog() -> None:
+    """Mark the catalog as stale; it is rebuilt on the next access."""
+    global _generation
+    _generation += 1
+
+
+def get_loaded_catalog() -> Optional[BenefitCatalog]:
+    """Return the current catalog without touching the database."""
+    return _catalog
+
+
+def _is_fresh(now: float) -> bool:
+    return (
+        _catalog is not None
+        and _catalog.generation == _generation
+        and now - _checked_at < settings.BENEFIT_CATALOG_CHECK_INTERVAL
+    )
+
+
+async def _fetch_signature(db: AsyncSession) -> Tuple[Any, ...]:
+    """Cheap fingerprint of the benefits table (row count + last update)."""
+    stmt = select(func.count(Benefit.id), func.max(Benefit.updated_at))
+    result = await db.execute(stmt)
+    return tuple(result.one())
+
+
+async def load_benefit_catalog(db: AsyncSession) -> BenefitCatalog:
+    """Load and compile all active benefits from the database."""
+    generation = _generation
+    signature = await _fetch_signature(db)
+
+    stmt = select(Benefit).where(Benefit.status == "active")
+    result = await db.execute(stmt)
+    benefits = [CatalogBenefit.from_model(b) for b in result.scalars().all()]
+
+    # Detach rows so the snapshot never triggers lazy loads
+    for entry in benefits:
+        db.expunge(entry.benefit)
+
+    logger.info(f"Catalogo de beneficios carregado: {len(benefits)} ativos")
+    return BenefitCatalog(benefits, signature=signature, generation=generation)
+
+
+async def get_benefit_catalog(db: AsyncSession) -> BenefitCatalog:
+    """
+    Get the process-wide compiled catalog, rebuilding it if the table changed.
+
+    Between signature checks this returns the in-memory catalog without
+    any database access.
+    """
+    global _catalog, _checked_at
+
+    if _is_fresh(time.monotonic()):
+        return _catalog
+
+    async with _lock:
+        now = time.monotonic()
+        if _is_fresh(now):
+            return _catalog
+
+        if _catalog is None or _catalog.generation != _generation:
+            _catalog = await load_benefit_catalog(db)
+        else:
+            signature = await _fetch_signature(db)
+            if signature != _catalog.signature:
+                _catalog = await load_benefit_catalog(db)
+
+        _checked_at = now
+        return _catalog
+
+
+@event.listens_for(Benefit, "after_insert")
+@event.listens_for(Benefit, "after_update")
+@event.listens_for(Benefit, "after_delete")
+def _on_benefit_change(mapper, connection, target) -> None:
+    invalidate_benefit_catalog()
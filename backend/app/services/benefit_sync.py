@@ -0,0 +1,468 @@
+"""
+Incremental sync of the benefits table from the frontend JSON catalog.
+
+The catalog lives in ``frontend/src/data/benefits`` (``federal.json``,
+``sectoral.json``, ``states/*.json`` and one file per municipality, ~95 MB).
+Reloading all of it for every edit is slow, so the sync keeps a manifest
+of what was last applied:
+
+- per file: size, mtime and sha256 of the content
+- per benefit: hash of its canonical row, plus scope/state/municipality
+
+A sync then:
+
+1. stats every file and re-reads only those whose size or mtime changed;
+   files whose sha256 is unchanged (touched, not edited) are not parsed
+2. parses the changed files in parallel (process pool) when there are many
+3. diffs the benefit hashes against the manifest into inserts, updates and
+   deletes
+4. applies them with bulk statements in a single transaction
+5. saves the manifest and appends the changes to a JSONL change feed
+
+Without a manifest (first run, or ``full=True``) every file is parsed and
+diffed against the rows already in the database, so existing data is
+updated in place rather than deleted and re-inserted.
+
+The manifest lives on local disk, so before trusting it the sync checks
+that the table holds exactly the benefit ids it records (another database,
+a restored dump or rows removed by hand). On a mismatch it falls back to
+the full path.
+
+Every written row gets a new ``updated_at``, which changes the benefit
+catalog signature, so other processes rebuild their compiled catalog on the
+next check; the change feed tells cache consumers which scope, state or
+municipality each change affects.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIR = Path(__file__).resolve().parents[3] / "frontend" / "src" / "data" / "benefits"
+STATE_DIR = Path(__file__).resolve().parents[2] / "data" / "benefits_sync"
+MANIFEST_NAME = "manifest.json"
+FEED_NAME = "changes.jsonl"
+MANIFEST_VERSION = 1
+
+# Below this many changed files, parsing inline beats starting a pool
+PARALLEL_MIN_FILES = 64
+FILES_PER_TASK = 128
+
+# Rows per bulk statement
+BATCH_SIZE = 1000
+
+# Database and app imports are local to the functions that write, so the
+# parser processes start without loading the app
+
+# id -> (row hash, scope, state, municipality_ibge)
+BenefitState = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+
+def discover_source_files(source_dir: Path) -> List[str]:
+    """Catalog files relative to ``source_dir``, in load order.
+
+    Federal, sectoral, states, then municipalities; the audit reports that
+    share the directory are not benefit files.
+    """
+    files = [name for name in ("federal.json", "sectoral.json") if (source_dir / name).is_file()]
+    for subdir in ("states", "municipalities"):
+        if (source_dir / subdir).is_dir():
+            files.extend(f"{subdir}/{p.name}" for p in sorted((source_dir / subdir).glob("*.json")))
+    return files
+
+
+def parse_date(date_str: Optional[str]) -> date:
+    """Parse ISO date string to date object (today when missing or invalid)."""
+    if not date_str:
+        return date.today()
+    try:
+        return date.fromisoformat(date_str)
+    except ValueError:
+        return date.today()
+
+
+def benefit_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Frontend benefit JSON -> ``benefits`` column values.
+
+    ``last_updated`` stays the raw string (parsed when written) so the row
+    hash doesn't change from one day to the next for benefits without a date.
+    """
+    return {
+        "id": data["id"],
+        "name": data["name"],
+        "short_description": data.get("shortDescription", ""),
+        "scope": data.get("scope", "federal"),
+        "state": data.get("state"),
+        "municipality_ibge": data.get("municipalityIbge"),
+        "sector": data.get("sector"),
+        "estimated_value": data.get("estimatedValue"),
+        "eligibility_rules": data.get("eligibilityRules", []),
+        "where_to_apply": data.get("whereToApply", ""),
+        "documents_required": data.get("documentsRequired", []),
+        "how_to_apply": data.get("howToApply"),
+        "source_url": data.get("sourceUrl"),
+        "last_updated": data.get("lastUpdated"),
+        "status": data.get("status", "active"),
+        "icon": data.get("icon"),
+        "category": data.get("category"),
+    }
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    """Stable content hash of a benefit row."""
+    canonical = json.dumps(row, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _benefits_of(rel_path: str, data: Any) -> List[Dict[str, Any]]:
+    """Benefits of one file, with the location implied by its path filled in."""
+    if not isinstance(data, dict):
+        return []
+    benefits = data.get("benefits") or []
+    stem = Path(rel_path).stem
+
+    if rel_path.startswith("states/"):
+        for b in benefits:
+            if not b.get("state"):
+                b["state"] = stem.upper()
+    elif rel_path.startswith("municipalities/"):
+        for b in benefits:
+            if not b.get("municipalityIbge"):
+                b["municipalityIbge"] = stem
+            if not b.get("state") and data.get("state"):
+                b["state"] = data.get("state")
+    return benefits
+
+
+@dataclass
+class ParsedFile:
+    """One catalog file as read from disk."""
+
+    path: str
+    sha256: str
+    size: int
+    mtime_ns: int
+    # None when the content hash matched the manifest (not parsed)
+    rows: Optional[Dict[str, Dict[str, Any]]] = None
+    # Manifest entries of the rows: id -> [hash, scope, state, municipality_ibge]
+    benefits: Optional[Dict[str, List[Any]]] = None
+
+
+def parse_source_file(source_dir: str, rel_path: str, known_sha256: Optional[str] = None) -> ParsedFile:
+    """Read, hash and (when the content changed) parse one catalog file."""
+    path = Path(source_dir) / rel_path
+    stat = path.stat()
+    content = path.read_bytes()
+    digest = hashlib.sha256(content).hexdigest()
+    parsed = ParsedFile(path=rel_path, sha256=digest, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    if digest == known_sha256:
+        return parsed
+
+    parsed.rows, parsed.benefits = {}, {}
+    for data in _benefits_of(rel_path, json.loads(content)):
+        try:
+            row = benefit_row(data)
+        except KeyError as e:
+            logger.warning(f"Benefit without {e} in {rel_path}, skipped")
+            continue
+        parsed.rows[row["id"]] = row
+        parsed.benefits[row["id"]] = [row_hash(row), row["scope"], row["state"], row["municipality_ibge"]]
+    return parsed
+
+
+def _parse_batch(source_dir: str, jobs: Sequence[Tuple[str, Optional[str]]]) -> List[ParsedFile]:
+    return [parse_source_file(source_dir, rel, sha) for rel, sha in jobs]
+
+
+def _parse_files(
+    source_dir: Path,
+    jobs: List[Tuple[str, Optional[str]]],
+    workers: Optional[int] = None,
+) -> Iterator[ParsedFile]:
+    """Parse ``(path, known sha256)`` jobs, in a process pool when there are many."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) < PARALLEL_MIN_FILES:
+        yield from _parse_batch(str(source_dir), jobs)
+        return
+
+    batches = [jobs[i:i + FILES_PER_TASK] for i in range(0, len(jobs), FILES_PER_TASK)]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(batches)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        for parsed in executor.map(_parse_batch, [str(source_dir)] * len(batches), batches):
+            yield from parsed
+
+
+@dataclass
+class ChangeSet:
+    """Writes needed to bring the table in line with the JSON catalog."""
+
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    updates: List[Dict[str, Any]] = field(default_factory=list)
+    deletes: List[str] = field(default_factory=list)
+    # Change feed entries: op, id, scope, state, municipality_ibge
+    changes: List[Dict[str, Any]] = field(default_factory=list)
+    files_total: int = 0
+    files_parsed: int = 0
+    files_removed: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.inserts)} inserts, {len(self.updates)} updates, {len(self.deletes)} deletes "
+            f"({self.files_parsed} of {self.files_total} files parsed, {self.files_removed} removed)"
+        )
+
+
+def _merged_state(files: Dict[str, Dict[str, Any]], order: Sequence[str]) -> Dict[str, BenefitState]:
+    """id -> state over all files; an id found in two files keeps the first."""
+    merged: Dict[str, BenefitState] = {}
+    for rel in order:
+        for benefit_id, state in files[rel]["benefits"].items():
+            if benefit_id in merged:
+                logger.warning(f"Duplicate benefit id {benefit_id} in {rel}, ignored")
+                continue
+            merged[benefit_id] = tuple(state)
+    return merged
+
+
+def _feed_entry(op: str, benefit_id: str, state: BenefitState) -> Dict[str, Any]:
+    return {"op": op, "id": benefit_id, "scope": state[1], "state": state[2], "municipality_ibge": state[3]}
+
+
+def plan_sync(
+    source_dir: Path,
+    manifest: Dict[str, Any],
+    previous: Optional[Dict[str, BenefitState]] = None,
+    workers: Optional[int] = None,
+) -> Tuple[ChangeSet, Dict[str, Any]]:
+    """Work out the changes since ``manifest`` without touching the database.
+
+    Args:
+        source_dir: Catalog directory
+        manifest: Manifest of the last sync (empty to parse everything)
+        previous: Benefits currently in the table; defaults to the ones
+            recorded in ``manifest``
+        workers: Parser processes (default: CPU count)
+
+    Returns:
+        The change set and the manifest to save once it is applied
+    """
+    order = discover_source_files(source_dir)
+    old_files: Dict[str, Dict[str, Any]] = manifest.get("files", {})
+    new_files: Dict[str, Dict[str, Any]] = {}
+    jobs: List[Tuple[str, Optional[str]]] = []
+
+    for rel in order:
+        entry = old_files.get(rel)
+        stat = (source_dir / rel).stat()
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            new_files[rel] = entry
+        else:
+            jobs.append((rel, entry["sha256"] if entry else None))
+
+    changes = ChangeSet(files_total=len(order), files_removed=len(set(old_files) - set(order)))
+    rows: Dict[str, Dict[str, Any]] = {}
+    for parsed in _parse_files(source_dir, jobs, workers):
+        if parsed.rows is None:
+            new_files[parsed.path] = {**old_files[parsed.path], "size": parsed.size, "mtime_ns": parsed.mtime_ns}
+            continue
+        changes.files_parsed += 1
+        rows.update(parsed.rows)
+        new_files[parsed.path] = {
+            "sha256": parsed.sha256,
+            "size": parsed.size,
+            "mtime_ns": parsed.mtime_ns,
+            "benefits": parsed.benefits,
+        }
+
+    if previous is None:
+        previous = _merged_state(old_files, list(old_files))
+    current = _merged_state(new_files, order)
+
+    for benefit_id, state in current.items():
+        old = previous.get(benefit_id)
+        if old is not None and old[0] == state[0]:
+            continue
+        row = rows.get(benefit_id)
+        if row is None:
+            # Only possible when a duplicate id moved between files
+            logger.warning(f"Benefit {benefit_id} changed in an unparsed file, skipped")
+            continue
+        if old is None:
+            changes.inserts.append(row)
+            changes.changes.append(_feed_entry("insert", benefit_id, state))
+        else:
+            changes.updates.append(row)
+            changes.changes.append(_feed_entry("update", benefit_id, state))
+
+    for benefit_id, old in previous.items():
+        if benefit_id not in current:
+            changes.deletes.append(benefit_id)
+            changes.changes.append(_feed_entry("delete", benefit_id, old))
+
+    new_manifest = {"version": MANIFEST_VERSION, "files": {rel: new_files[rel] for rel in order}}
+    return changes, new_manifest
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    """Manifest of the last sync, or an empty one (missing, unreadable or old)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable benefit sync manifest {path}: {e}")
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def save_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    """Write the manifest atomically (never left half written)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def append_change_feed(path: Path, changes: ChangeSet, synced_at: Optional[datetime] = None) -> None:
+    """Append one JSON line per changed benefit to the change feed."""
+    if not changes.changes:
+        return
+    synced_at = (synced_at or datetime.utcnow()).isoformat(timespec="seconds")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for entry in changes.changes:
+            f.write(json.dumps({**entry, "synced_at": synced_at}, ensure_ascii=False) + "\n")
+
+
+def _chunks(items: Sequence[Any], size: int = BATCH_SIZE) -> Iterator[Sequence[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _db_values(row: Dict[str, Any], now: datetime, created: bool) -> Dict[str, Any]:
+    values = {**row, "last_updated": parse_date(row["last_updated"]), "updated_at": now}
+    if created:
+        values["created_at"] = now
+    return values
+
+
+async def load_database_state(session) -> Dict[str, BenefitState]:
+    """Hashes of the benefits currently in the table (first or full sync)."""
+    from sqlalchemy import select
+
+    from app.models.benefit import Benefit
+
+    result = await session.execute(select(Benefit))
+    state: Dict[str, BenefitState] = {}
+    for benefit in result.scalars():
+        row = benefit_row(benefit.to_dict())
+        state[benefit.id] = (row_hash(row), row["scope"], row["state"], row["municipality_ibge"])
+    session.expunge_all()
+    return state
+
+
+async def load_database_ids(session) -> Set[str]:
+    """Ids of the benefits currently in the table (manifest check)."""
+    from sqlalchemy import select
+
+    from app.models.benefit import Benefit
+
+    result = await session.execute(select(Benefit.id))
+    return set(result.scalars())
+
+
+def manifest_ids(manifest: Dict[str, Any]) -> Set[str]:
+    """Benefit ids the manifest says are in the table."""
+    files = manifest.get("files", {})
+    return set(_merged_state(files, list(files)))
+
+
+async def apply_changes(session, changes: ChangeSet) -> None:
+    """Run the change set as bulk statements; the caller commits."""
+    from sqlalchemy import delete, insert, update
+
+    from app.models.benefit import Benefit
+
+    now = datetime.utcnow()
+    for ids in _chunks(changes.deletes):
+        await session.execute(delete(Benefit).where(Benefit.id.in_(ids)))
+    for rows in _chunks(changes.inserts):
+        await session.execute(insert(Benefit), [_db_values(r, now, created=True) for r in rows])
+    for rows in _chunks(changes.updates):
+        await session.execute(update(Benefit), [_db_values(r, now, created=False) for r in rows])
+
+
+async def sync_benefits(
+    session,
+    source_dir: Path = SOURCE_DIR,
+    state_dir: Path = STATE_DIR,
+    full: bool = False,
+    dry_run: bool = False,
+    workers: Optional[int] = None,
+) -> ChangeSet:
+    """Bring the ``benefits`` table in line with the JSON catalog.
+
+    Args:
+        session: Async database session
+        source_dir: Catalog directory
+        state_dir: Where the manifest and change feed are kept
+        full: Ignore the manifest and diff every file against the table
+        dry_run: Only compute the changes
+        workers: Parser processes (default: CPU count)
+    """
+    manifest_path = Path(state_dir) / MANIFEST_NAME
+    manifest = {} if full else load_manifest(manifest_path)
+
+    if manifest.get("files"):
+        expected = manifest_ids(manifest)
+        in_database = await load_database_ids(session)
+        if in_database != expected:
+            logger.warning(
+                f"Benefit sync manifest does not match the database "
+                f"({len(in_database)} rows, manifest has {len(expected)}); running a full sync"
+            )
+            manifest = {}
+
+    previous = None
+    if not manifest.get("files"):
+        previous = await load_database_state(session)
+
+    changes, new_manifest = await asyncio.to_thread(plan_sync, Path(source_dir), manifest, previous, workers)
+    logger.info(f"Benefit sync: {changes.summary()}")
+    if dry_run:
+        return changes
+
+    if changes:
+        try:
+            await apply_changes(session, changes)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+    save_manifest(manifest_path, new_manifest)
+    if changes:
+        append_change_feed(Path(state_dir) / FEED_NAME, changes)
+        from app.services.benefit_catalog import invalidate_benefit_catalog
+
+        invalidate_benefit_catalog()
+    return changes
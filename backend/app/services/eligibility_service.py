@@ -6,67 +6,31 @@ Evaluates citizen profiles against benefit eligibility rules.
 from typing import List, Optional, Dict, Any, Set
 from datetime import datetime
 
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.benefit import Benefit
 from app.schemas.benefit import (
     CitizenProfile,
-    BenefitSummary,
     BenefitEligibilityResult,
     EligibilitySummary,
     EligibilityResponse,
     RuleEvaluationResult,
-    EstimatedValue,
 )
-
-
-def calculate_renda_per_capita(profile: CitizenProfile) -> float:
-    """Calculate per capita income."""
-    pessoas = max(profile.pessoas_na_casa, 1)
-    return profile.renda_familiar_mensal / pessoas
+from app.services.benefit_catalog import (
+    ALREADY_RECEIVING_FLAGS,
+    SECTOR_FLAGS,
+    CatalogBenefit,
+    benefit_to_summary,
+    calculate_renda_per_capita,
+    compile_rule,
+    field_getter,
+    get_benefit_catalog,
+)
 
 
 def get_field_value(profile: CitizenProfile, field: str) -> Any:
     """Get a field value from the profile, including computed fields."""
-    # Computed fields
-    if field == "rendaPerCapita":
-        return calculate_renda_per_capita(profile)
-
-    # Map camelCase fields to snake_case attributes
-    field_mapping = {
-        "pessoasNaCasa": "pessoas_na_casa",
-        "quantidadeFilhos": "quantidade_filhos",
-        "temIdoso65Mais": "tem_idoso_65_mais",
-        "temGestante": "tem_gestante",
-        "temPcd": "tem_pcd",
-        "temCrianca0a6": "tem_crianca_0_a_6",
-        "rendaFamiliarMensal": "renda_familiar_mensal",
-        "trabalhoFormal": "trabalho_formal",
-        "temCasaPropria": "tem_casa_propria",
-        "moradiaZonaRural": "moradia_zona_rural",
-        "cadastradoCadunico": "cadastrado_cadunico",
-        "recebeBolsaFamilia": "recebe_bolsa_familia",
-        "recebeBpc": "recebe_bpc",
-        "trabalhou1971_1988": "trabalhou_1971_1988",
-        "temCarteiraAssinada": "tem_carteira_assinada",
-        "tempoCarteiraAssinada": "tempo_carteira_assinada",
-        "fezSaqueFgts": "fez_saque_fgts",
-        "temMei": "tem_mei",
-        "trabalhaAplicativo": "trabalha_aplicativo",
-        "agricultorFamiliar": "agricultor_familiar",
-        "pescadorArtesanal": "pescador_artesanal",
-        "catadorReciclavel": "catador_reciclavel",
-        "mulherMenstruante": "mulher_menstruante",
-        "idadeMulher": "idade_mulher",
-        "redePublica": "rede_publica",
-        "municipioIbge": "municipio_ibge",
-    }
-
-    # Convert camelCase to snake_case if needed
-    attr_name = field_mapping.get(field, field)
-
-    return getattr(profile, attr_name, None)
+    return field_getter(field)(profile)
 
 
 def evaluate_rule(
@@ -74,55 +38,7 @@ def evaluate_rule(
     rule: Dict[str, Any]
 ) -> RuleEvaluationResult:
     """Evaluate a single rule against a profile."""
-    field = rule.get("field", "")
-    operator = rule.get("operator", "eq")
-    expected_value = rule.get("value")
-    description = rule.get("description", "")
-
-    field_value = get_field_value(profile, field)
-
-    # If the field is undefined/null, mark as inconclusive
-    if field_value is None:
-        return RuleEvaluationResult(
-            ruleDescription=description,
-            passed=False,
-            inconclusive=True,
-            field=field,
-            expectedValue=expected_value,
-            actualValue=None,
-        )
-
-    passed = False
-
-    if operator == "eq":
-        passed = field_value == expected_value
-    elif operator == "neq":
-        passed = field_value != expected_value
-    elif operator == "lt":
-        passed = float(field_value) < float(expected_value)
-    elif operator == "lte":
-        passed = float(field_value) <= float(expected_value)
-    elif operator == "gt":
-        passed = float(field_value) > float(expected_value)
-    elif operator == "gte":
-        passed = float(field_value) >= float(expected_value)
-    elif operator == "in":
-        passed = isinstance(expected_value, list) and field_value in expected_value
-    elif operator == "not_in":
-        passed = isinstance(expected_value, list) and field_value not in expected_value
-    elif operator == "has":
-        passed = bool(field_value)
-    elif operator == "not_has":
-        passed = not field_value
-
-    return RuleEvaluationResult(
-        ruleDescription=description,
-        passed=passed,
-        inconclusive=False,
-        field=field,
-        expectedValue=expected_value,
-        actualValue=field_value,
-    )
+    return compile_rule(rule).evaluate(profile)
 
 
 def matches_geography(profile: CitizenProfile, benefit: Benefit) -> bool:
@@ -155,18 +71,7 @@ def matches_sector(profile: CitizenProfile, benefit: Benefit) -> bool:
     if benefit.scope != "sectoral" or not benefit.sector:
         return True
 
-    sector_map = {
-        "pescador": "pescador_artesanal",
-        "agricultor": "agricultor_familiar",
-        "entregador": "trabalha_aplicativo",
-        "motorista_app": "trabalha_aplicativo",
-        "catador": "catador_reciclavel",
-        "mei": "tem_mei",
-        "autonomo": "tem_mei",
-        "pcd": "tem_pcd",
-    }
-
-    profile_field = sector_map.get(benefit.sector)
+    profile_field = SECTOR_FLAGS.get(benefit.sector)
     if not profile_field:
         return True
 
@@ -208,36 +113,8 @@ def calculate_estimated_value(
 
 def is_already_receiving(profile: CitizenProfile, benefit: Benefit) -> bool:
     """Check if citizen is already receiving this benefit."""
-    if benefit.id == "federal-bolsa-familia" and profile.recebe_bolsa_familia:
-        return True
-    if benefit.id in ("federal-bpc-idoso", "federal-bpc-pcd") and profile.recebe_bpc:
-        return True
-    return False
-
-
-def benefit_to_summary(benefit: Benefit) -> BenefitSummary:
-    """Convert Benefit model to BenefitSummary schema."""
-    est_value = None
-    if benefit.estimated_value:
-        est_value = EstimatedValue(
-            type=benefit.estimated_value.get("type", "monthly"),
-            min=benefit.estimated_value.get("min"),
-            max=benefit.estimated_value.get("max"),
-            description=benefit.estimated_value.get("description"),
-        )
-
-    return BenefitSummary(
-        id=benefit.id,
-        name=benefit.name,
-        shortDescription=benefit.short_description,
-        scope=benefit.scope,
-        state=benefit.state,
-        municipalityIbge=benefit.municipality_ibge,
-        estimatedValue=est_value,
-        status=benefit.status,
-        icon=benefit.icon,
-        category=benefit.category,
-    )
+    flag = ALREADY_RECEIVING_FLAGS.get(benefit.id)
+    return bool(flag and getattr(profile, flag, False))
 
 
 def evaluate_benefit(
@@ -245,7 +122,12 @@ def evaluate_benefit(
     benefit: Benefit
 ) -> BenefitEligibilityResult:
     """Evaluate a single benefit against a citizen profile."""
-    benefit_summary = benefit_to_summary(benefit)
+    if isinstance(benefit, CatalogBenefit):
+        benefit_summary = benefit.summary
+        rules = benefit.rules
+    else:
+        benefit_summary = benefit_to_summary(benefit)
+        rules = tuple(compile_rule(rule) for rule in benefit.eligibility_rules or [])
 
     # Check if already receiving
     if is_already_receiving(profile, benefit):
@@ -286,9 +168,8 @@ def evaluate_benefit(
     inconclusive_rules: List[str] = []
     rule_details: List[RuleEvaluationResult] = []
 
-    rules = benefit.eligibility_rules or []
     for rule in rules:
-        result = evaluate_rule(profile, rule)
+        result = rule.evaluate(profile)
         rule_details.append(result)
 
         if result.inconclusive:
@@ -334,21 +215,32 @@ async def evaluate_all_benefits(
     scope: Optional[str] = None,
     include_not_applicable: bool = False,
 ) -> EligibilityResponse:
-    """Evaluate all benefits against a citizen profile."""
-    # Query benefits from database
-    stmt = select(Benefit).where(Benefit.status == "active")
+    """
+    Evaluate all benefits against a citizen profile.
 
-    if scope:
-        stmt = stmt.where(Benefit.scope == scope)
+    Uses the compiled in-memory catalog: only benefits whose geography matches
+    the profile are evaluated, unless not-applicable results were requested.
+    """
+    catalog = await get_benefit_catalog(db)
+    analyzed = catalog.all(scope)
 
-    result = await db.execute(stmt)
-    benefits = result.scalars().all()
+    if include_not_applicable:
+        benefits = analyzed
+    else:
+        # Everything outside the location is "not_applicable" and would be
+        # dropped from the response, except benefits already being received.
+        candidates = catalog.for_location(profile.estado, profile.municipio_ibge, scope)
+        benefits = candidates
+        receiving = [
+            b for b in catalog.receivable
+            if (not scope or b.scope == scope) and is_already_receiving(profile, b)
+        ]
+        if receiving:
+            benefits = catalog.ordered(set(candidates) | set(receiving))
 
     # Evaluate each benefit
-    results: List[BenefitEligibilityResult] = []
-    for benefit in benefits:
-        eval_result = evaluate_benefit(profile, benefit)
-        results.append(eval_result)
+    evaluated = [(benefit, evaluate_benefit(profile, benefit)) for benefit in benefits]
+    results: List[BenefitEligibilityResult] = [r for _, r in evaluated]
 
     # Group results by status
     eligible = [r for r in results if r.status == "eligible"]
@@ -373,38 +265,31 @@ async def evaluate_all_benefits(
     total_annual = calculate_total(eligible_and_likely, "annual")
     total_one_time = calculate_total(eligible_and_likely, "one_time")
 
+    eligible_benefits = [
+        benefit for benefit, r in evaluated
+        if r.status in ("eligible", "likely_eligible")
+    ]
+
     # Collect required documents
     documents_needed: Set[str] = set()
-    for r in eligible_and_likely:
-        # Get documents from the benefit (need to re-query for full info)
-        for benefit in benefits:
-            if benefit.id == r.benefit.id:
-                for doc in benefit.documents_required or []:
-                    documents_needed.add(doc)
-                break
+    for benefit in eligible_benefits:
+        documents_needed.update(benefit.documents_required or [])
 
     # Generate priority steps
     priority_steps: List[str] = []
 
     # Check if CadUnico is needed
-    needs_cadunico = any(
-        any(rule.get("field") == "cadastradoCadunico" for rule in (b.eligibility_rules or []))
-        for b in benefits
-        if any(r.benefit.id == b.id for r in eligible_and_likely)
-    )
+    needs_cadunico = any(benefit.requires_cadunico for benefit in eligible_benefits)
 
     if not profile.cadastrado_cadunico and needs_cadunico:
         priority_steps.append("Faça ou atualize seu Cadastro Único no CRAS")
 
     if eligible:
         top_benefit = eligible[0]
-        # Find the full benefit to get whereToApply
-        for benefit in benefits:
-            if benefit.id == top_benefit.benefit.id:
-                priority_steps.append(
-                    f"Solicite o {top_benefit.benefit.name} - {benefit.where_to_apply}"
-                )
-                break
+        benefit = catalog.get(top_benefit.benefit.id)
+        priority_steps.append(
+            f"Solicite o {top_benefit.benefit.name} - {benefit.where_to_apply}"
+        )
 
     if likely_eligible:
         priority_steps.append("Vá ao CRAS para verificar outros benefícios possíveis")
@@ -417,7 +302,7 @@ async def evaluate_all_benefits(
         notEligible=not_eligible if include_not_applicable else [],
         notApplicable=not_applicable if include_not_applicable else [],
         alreadyReceiving=already_receiving,
-        totalAnalyzed=len(results),
+        totalAnalyzed=len(analyzed),
         totalPotentialMonthly=total_monthly,
         totalPotentialAnnual=total_annual,
         totalPotentialOneTime=total_one_time,
@@ -446,27 +331,13 @@ async def get_benefits_for_location(
     db: AsyncSession,
     state_code: str,
     ibge_code: Optional[str] = None,
-) -> List[Benefit]:
+) -> List[CatalogBenefit]:
     """Get all applicable benefits for a location."""
-    # Start with federal benefits
-    stmt = select(Benefit).where(
-        Benefit.status == "active",
-    )
+    catalog = await get_benefit_catalog(db)
+    applicable = catalog.for_location(state_code, ibge_code)
 
-    result = await db.execute(stmt)
-    all_benefits = result.scalars().all()
-
-    # Filter by location
-    applicable = []
-    for benefit in all_benefits:
-        if benefit.scope == "federal":
-            applicable.append(benefit)
-        elif benefit.scope == "state" and benefit.state == state_code:
-            applicable.append(benefit)
-        elif benefit.scope == "municipal" and ibge_code and benefit.municipality_ibge == ibge_code:
-            applicable.append(benefit)
-        elif benefit.scope == "sectoral":
-            if not benefit.state or benefit.state == state_code:
-                applicable.append(benefit)
+    # Municipal benefits only apply when a municipality was given
+    if not ibge_code:
+        applicable = [b for b in applicable if b.scope != "municipal"]
 
     return applicable
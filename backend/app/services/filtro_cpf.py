@@ -0,0 +1,286 @@
+"""
+Filtro de Bloom dos CPFs indexados na tabela ``beneficiarios``.
+
+A maioria dos cidadaos que consulta nao esta no Bolsa Familia nem no BPC.
+O filtro responde "com certeza nao esta" sem tocar no PostgreSQL; um
+"talvez esteja" (inclusive os falsos positivos, ~0,1% por padrao) segue
+para a query normal.
+
+- Construido pelo job ``indexar_beneficiarios`` a cada carga, lendo todos
+  os ``cpf_hash`` da tabela (ou com ``python -m app.jobs.indexar_beneficiarios filtro``).
+- Gravado em um arquivo (cabecalho + bits), trocado de forma atomica, e
+  aberto com ``mmap`` no startup: o sistema operacional compartilha as
+  paginas entre os workers.
+- Cerca de 1,8 byte por beneficiario com taxa de 0,1% (≈ 55 MB para 30
+  milhoes de CPFs).
+
+Como ``cpf_hash`` ja e um SHA256, as posicoes saem direto dos primeiros 32
+caracteres do hash (double hashing), sem calcular outro hash.
+"""
+
+import logging
+import math
+import mmap
+import os
+import secrets
+import struct
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+FILTRO_PATH = os.environ.get(
+    "BENEFICIARIOS_FILTRO_PATH",
+    os.path.join(DATA_DIR, "beneficiarios.bloom"),
+)
+
+TAXA_PADRAO = 0.001
+
+MAGIC = b"TNMBLOOM"
+VERSAO = 1
+# magic, versao, k, n, m (bits), taxa estimada
+_CABECALHO = struct.Struct("<8sHHQQd")
+_TAMANHO_CABECALHO = 64
+
+_MASCARA_64 = (1 << 64) - 1
+_LOTE = 200_000
+
+# Intervalo entre verificacoes de um arquivo novo gravado pelo job
+_VERIFICAR_A_CADA = 60.0
+
+_carregado_mtime: Optional[float] = None
+_verificado_em = 0.0
+
+
+def dimensionar(n: int, taxa: float = TAXA_PADRAO) -> tuple[int, int]:
+    """Bits (multiplo de 64) e numero de hashes para ``n`` entradas e a taxa."""
+    n = max(n, 1)
+    m = math.ceil(-n * math.log(taxa) / (math.log(2) ** 2))
+    m = max(64, (m + 63) // 64 * 64)
+    k = max(1, min(16, round(m / n * math.log(2))))
+    return m, k
+
+
+def taxa_teorica(n: int, m: int, k: int) -> float:
+    """Taxa de falsos positivos esperada para ``n`` entradas."""
+    return (1 - math.exp(-k * n / m)) ** k
+
+
+def _posicoes_base(cpf_hash: str) -> tuple[int, int]:
+    return int(cpf_hash[:16], 16), int(cpf_hash[16:32], 16) | 1
+
+
+class FiltroBloom:
+    """Filtro de Bloom sobre hashes SHA256 (hex) de CPF."""
+
+    def __init__(self, bits, m: int, k: int, n: int, taxa_estimada: float, arquivo=None):
+        self._bits = bits
+        self.m = m
+        self.k = k
+        self.n = n
+        self.taxa_estimada = taxa_estimada
+        self._arquivo = arquivo
+
+    # ------------------------------------------------------------------
+    # Construcao
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def construir(cls, cpf_hashes: Iterable[str], n: int, taxa: float = TAXA_PADRAO) -> "FiltroBloom":
+        """Constroi o filtro em memoria.
+
+        Args:
+            cpf_hashes: Hashes SHA256 em hexadecimal (``hash_cpf``)
+            n: Quantidade esperada de hashes (dimensiona o filtro)
+            taxa: Taxa de falsos positivos desejada
+        """
+        m, k = dimensionar(n, taxa)
+        bits = np.zeros(m // 8, dtype=np.uint8)
+        m64 = np.uint64(m)
+        total = 0
+
+        lote = []
+        for cpf_hash in cpf_hashes:
+            lote.append(cpf_hash[:32])
+            if len(lote) >= _LOTE:
+                total += cls._marcar(bits, lote, m64, k)
+                lote = []
+        if lote:
+            total += cls._marcar(bits, lote, m64, k)
+
+        uns = int(np.unpackbits(bits).sum())
+        return cls(bits, m, k, total, (uns / m) ** k)
+
+    @staticmethod
+    def _marcar(bits: np.ndarray, lote: list, m64: np.uint64, k: int) -> int:
+        pares = np.frombuffer(bytes.fromhex("".join(lote)), dtype=">u8").astype(np.uint64).reshape(-1, 2)
+        h1 = pares[:, 0]
+        h2 = pares[:, 1] | np.uint64(1)
+        for i in range(k):
+            pos = (h1 + np.uint64(i) * h2) % m64
+            np.bitwise_or.at(bits, pos >> np.uint64(3), np.left_shift(1, pos & np.uint64(7)).astype(np.uint8))
+        return len(lote)
+
+    # ------------------------------------------------------------------
+    # Arquivo
+    # ------------------------------------------------------------------
+
+    def salvar(self, path: str = FILTRO_PATH) -> None:
+        """Grava o filtro (arquivo temporario + rename, atomico)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporario = f"{path}.tmp"
+        with open(temporario, "wb") as f:
+            cabecalho = _CABECALHO.pack(MAGIC, VERSAO, self.k, self.n, self.m, self.taxa_estimada)
+            f.write(cabecalho.ljust(_TAMANHO_CABECALHO, b"\0"))
+            f.write(memoryview(self._bits).cast("B"))
+        os.replace(temporario, path)
+
+    @classmethod
+    def abrir(cls, path: str = FILTRO_PATH) -> "FiltroBloom":
+        """Abre o filtro gravado com ``mmap`` (somente leitura).
+
+        Raises:
+            ValueError: Arquivo nao e um filtro valido
+        """
+        with open(path, "rb") as f:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapa) < _TAMANHO_CABECALHO:
+            mapa.close()
+            raise ValueError(f"Filtro invalido: {path}")
+        magic, versao, k, n, m, taxa = _CABECALHO.unpack_from(mapa)
+        if magic != MAGIC or versao != VERSAO or len(mapa) != _TAMANHO_CABECALHO + m // 8:
+            mapa.close()
+            raise ValueError(f"Filtro invalido ou de outra versao: {path}")
+        bits = memoryview(mapa)[_TAMANHO_CABECALHO:]
+        return cls(bits, m, k, n, taxa, arquivo=mapa)
+
+    def fechar(self) -> None:
+        """Libera o ``mmap`` (filtros abertos de arquivo)."""
+        if self._arquivo is not None:
+            self._bits.release()
+            self._arquivo.close()
+            self._arquivo = None
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def __contains__(self, cpf_hash: str) -> bool:
+        try:
+            h1, h2 = _posicoes_base(cpf_hash)
+        except (TypeError, ValueError):
+            return False
+        bits = self._bits
+        for i in range(self.k):
+            pos = ((h1 + i * h2) & _MASCARA_64) % self.m
+            if not bits[pos >> 3] >> (pos & 7) & 1:
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def tamanho_bytes(self) -> int:
+        return self.m // 8
+
+    def medir_falsos_positivos(self, amostras: int = 100_000) -> float:
+        """Taxa de falsos positivos medida com hashes aleatorios."""
+        positivos = sum(1 for _ in range(amostras) if secrets.token_hex(32) in self)
+        return positivos / amostras
+
+    def estatisticas(self) -> dict:
+        """Resumo para logs e monitoramento."""
+        return {
+            "entradas": self.n,
+            "bytes": self.tamanho_bytes,
+            "bytes_por_entrada": round(self.tamanho_bytes / self.n, 2) if self.n else None,
+            "hashes": self.k,
+            "taxa_falsos_positivos": self.taxa_estimada,
+            "taxa_teorica": taxa_teorica(self.n, self.m, self.k),
+        }
+
+
+# =============================================================================
+# Construcao a partir da tabela e carga no startup
+# =============================================================================
+
+def construir_filtro_beneficiarios(db, path: str = FILTRO_PATH, taxa: float = TAXA_PADRAO) -> FiltroBloom:
+    """Le todos os ``cpf_hash`` de ``beneficiarios``, constroi e grava o filtro.
+
+    Args:
+        db: Sessao sync do SQLAlchemy
+        path: Arquivo de destino
+        taxa: Taxa de falsos positivos desejada
+    """
+    from sqlalchemy import func, select
+
+    from app.models.beneficiario import Beneficiario
+
+    n = db.execute(select(func.count()).select_from(Beneficiario)).scalar() or 0
+    hashes = db.execute(
+        select(Beneficiario.cpf_hash).execution_options(yield_per=_LOTE)
+    ).scalars()
+    filtro = FiltroBloom.construir(hashes, n, taxa)
+    filtro.salvar(path)
+
+    stats = filtro.estatisticas()
+    logger.info(
+        f"Filtro de CPFs gravado em {path}: {stats['entradas']:,} entradas, "
+        f"{stats['bytes'] / 1024 / 1024:.1f} MB ({stats['bytes_por_entrada']} bytes/entrada), "
+        f"falsos positivos estimados {stats['taxa_falsos_positivos']:.4%}, "
+        f"medidos {filtro.medir_falsos_positivos():.4%}"
+    )
+    return filtro
+
+
+def carregar_filtro(path: str = FILTRO_PATH) -> Optional[FiltroBloom]:
+    """Abre o filtro gravado e ativa na consulta de beneficios.
+
+    Sem arquivo (ou arquivo invalido), a consulta segue sem filtro.
+    """
+    from app.middleware.metrics import beneficiario_filter_entries, beneficiario_filter_false_positive_rate
+    from app.services.beneficiarios_service import definir_filtro
+
+    global _carregado_mtime, _verificado_em
+
+    _verificado_em = time.monotonic()
+    if not os.path.exists(path):
+        logger.info(f"Filtro de CPFs nao encontrado em {path}; consultas sem filtro")
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+        filtro = FiltroBloom.abrir(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Filtro de CPFs ignorado: {e}")
+        return None
+
+    definir_filtro(filtro)
+    _carregado_mtime = mtime
+    beneficiario_filter_entries.set(filtro.n)
+    beneficiario_filter_false_positive_rate.set(filtro.taxa_estimada)
+    logger.info(f"Filtro de CPFs carregado: {filtro.estatisticas()}")
+    return filtro
+
+
+def recarregar_se_mudou(path: str = FILTRO_PATH) -> None:
+    """Troca o filtro em uso quando o job gravou um arquivo novo.
+
+    Verifica no maximo a cada ``_VERIFICAR_A_CADA`` segundos, e so depois
+    de um ``carregar_filtro`` bem-sucedido. Ate a troca, CPFs novos na
+    tabela podem ser dados como ausentes (e vao para a API).
+    """
+    global _verificado_em
+
+    if _carregado_mtime is None or time.monotonic() - _verificado_em < _VERIFICAR_A_CADA:
+        return
+    _verificado_em = time.monotonic()
+    try:
+        mudou = os.path.getmtime(path) != _carregado_mtime
+    except OSError:
+        return
+    if mudou:
+        carregar_filtro(path)
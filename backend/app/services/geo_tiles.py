@@ -0,0 +1,358 @@
+"""Pre-serialized GeoJSON for the municipality map.
+
+``app.jobs.gerar_geo_tiles`` renders every municipality once per zoom level
+(geometry simplified in PostGIS) and stores each feature as two ready-made
+JSON fragments: its base properties and its geometry. Serving a map is then
+byte concatenation: no ``ST_AsGeoJSON`` per request, and geometry is never
+parsed back into Python objects. Program overlays are spliced into the
+properties fragment only.
+
+Files in ``TILES_DIR``:
+    - ``municipios_z{level}.tsv``: one feature per line,
+      ``ibge_code\\tstate\\tstate_id\\tproperties\\tgeometry``
+    - ``brasil_z{level}.geojson[.gz|.br]``: national map, pre-compressed
+    - ``manifest.json``: levels, feature counts and generation time
+
+Rendered bodies are kept compressed with their ETag in a bounded LRU.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from app.core.cache import LocalCache
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+TILES_DIR = os.environ.get("GEO_TILES_DIR", os.path.join(DATA_DIR, "geo_tiles"))
+MANIFEST = "manifest.json"
+
+# Zoom level -> ST_SimplifyPreserveTopology tolerance in degrees (0 = full)
+ZOOM_TOLERANCES = {4: 0.02, 6: 0.005, 8: 0.001, 11: 0.0}
+DEFAULT_ZOOM = 6
+COORD_DECIMALS = 5
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+# On-demand renders (state maps, overlays): a few % larger, many times faster
+RENDER_BROTLI_QUALITY = 5
+
+# Rendered bodies (state maps, program overlays)
+RENDER_CACHE_ENTRIES = 256
+RENDER_CACHE_BYTES = 256 * 1024 * 1024
+
+Fragment = Tuple[str, str, int, bytes, bytes]  # ibge, state, state_id, props, geometry
+
+
+def zoom_level(zoom: Optional[int]) -> int:
+    """Pre-generated level to use for a map zoom (largest level <= zoom)."""
+    if zoom is None:
+        return DEFAULT_ZOOM
+    levels = sorted(ZOOM_TOLERANCES)
+    return max([level for level in levels if level <= zoom] or [levels[0]])
+
+
+@dataclass
+class EncodedBody:
+    """A response body with its compressed variants and strong ETag.
+
+    ``etag`` identifies the uncompressed body; use ``variant_etag`` for the
+    representation actually sent.
+    """
+
+    body: bytes
+    etag: str
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+    @classmethod
+    def encode(cls, body: bytes, brotli_quality: int = BROTLI_QUALITY) -> "EncodedBody":
+        return cls(
+            body=body,
+            etag=f'"{hashlib.sha1(body).hexdigest()}"',
+            gzip=gzip.compress(body, compresslevel=GZIP_LEVEL),
+            br=brotli.compress(body, quality=brotli_quality) if BROTLI_AVAILABLE else None,
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip or b"") + len(self.br or b"")
+
+    def negotiate(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """Pick the smallest variant the client accepts."""
+        accepted = {
+            part.split(";")[0].strip().lower()
+            for part in (accept_encoding or "").split(",")
+        }
+        if self.br is not None and "br" in accepted:
+            return self.br, "br"
+        if self.gzip is not None and "gzip" in accepted:
+            return self.gzip, "gzip"
+        return self.body, None
+
+    def variant_etag(self, encoding: Optional[str]) -> str:
+        """Strong ETag of one encoded variant (each encoding is different bytes)."""
+        if not encoding:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+
+# =============================================================================
+# Serialization
+# =============================================================================
+
+def base_properties(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ibge_code": row["ibge_code"],
+        "name": row["name"],
+        "state_id": row["state_id"],
+        "population": row["population"],
+    }
+
+
+def fragment_line(row: Dict[str, Any]) -> bytes:
+    """One TSV line for a municipality row (geometry already GeoJSON text)."""
+    geometry = row["geometry"] or "null"
+    if isinstance(geometry, str):
+        geometry = geometry.encode()
+    return b"\t".join([
+        row["ibge_code"].encode(),
+        (row["state"] or "").encode(),
+        str(row["state_id"]).encode(),
+        orjson.dumps(base_properties(row)),
+        geometry,
+    ]) + b"\n"
+
+
+def parse_fragment_line(line: bytes) -> Fragment:
+    """Split a TSV line without decoding the JSON fragments."""
+    ibge, state, state_id, props, geometry = line.rstrip(b"\n").split(b"\t", 4)
+    return ibge.decode(), state.decode(), int(state_id), props, geometry
+
+
+def feature_collection(
+    fragments: Iterable[Fragment],
+    overlay: Optional[Dict[str, Dict[str, Any]]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> bytes:
+    """Assemble a FeatureCollection from fragments.
+
+    ``overlay`` maps IBGE code to extra properties; only those features'
+    property fragments are re-encoded.
+    """
+    features = []
+    for ibge, _, _, props, geometry in fragments:
+        extra = overlay.get(ibge) if overlay else None
+        if extra:
+            props = props[:-1] + b"," + orjson.dumps(extra)[1:]
+        features.append(
+            b'{"type":"Feature","properties":' + props + b',"geometry":' + geometry + b"}"
+        )
+
+    meta = dict(metadata or {})
+    meta["count"] = len(features)
+    return b"".join([
+        b'{"type":"FeatureCollection","features":[',
+        b",".join(features),
+        b'],"metadata":',
+        orjson.dumps(meta),
+        b"}",
+    ])
+
+
+# =============================================================================
+# Storage
+# =============================================================================
+
+def tileset_path(level: int, directory: str = TILES_DIR) -> str:
+    return os.path.join(directory, f"municipios_z{level}.tsv")
+
+
+def national_path(level: int, directory: str = TILES_DIR) -> str:
+    return os.path.join(directory, f"brasil_z{level}.geojson")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_tileset(level: int, rows: Iterable[Dict[str, Any]], directory: str = TILES_DIR) -> int:
+    """Write one zoom level: fragments plus the pre-compressed national map.
+
+    Returns:
+        Number of features written
+    """
+    os.makedirs(directory, exist_ok=True)
+    lines = [fragment_line(row) for row in rows]
+    _write_atomic(tileset_path(level, directory), b"".join(lines))
+
+    national = EncodedBody.encode(feature_collection(
+        (parse_fragment_line(line) for line in lines),
+        metadata={"state_id": None, "simplified": ZOOM_TOLERANCES[level] > 0, "zoom": level},
+    ))
+    path = national_path(level, directory)
+    _write_atomic(path, national.body)
+    _write_atomic(f"{path}.gz", national.gzip)
+    if national.br is not None:
+        _write_atomic(f"{path}.br", national.br)
+    return len(lines)
+
+
+def write_manifest(counts: Dict[int, int], directory: str = TILES_DIR) -> None:
+    manifest = {
+        "generated_at": datetime.now().isoformat(),
+        "levels": {str(level): count for level, count in counts.items()},
+        "coord_decimals": COORD_DECIMALS,
+    }
+    _write_atomic(os.path.join(directory, MANIFEST), orjson.dumps(manifest))
+
+
+class GeoTileStore:
+    """Loads pre-generated levels lazily and renders encoded bodies.
+
+    Files are re-read when the manifest changes on disk, so every worker
+    picks up a new generation without a restart.
+    """
+
+    def __init__(self, directory: str = TILES_DIR):
+        self.directory = directory
+        self._manifest_mtime: Optional[int] = None
+        self._levels: Dict[int, List[Fragment]] = {}
+        self._national: Dict[int, EncodedBody] = {}
+        self._rendered = LocalCache(RENDER_CACHE_ENTRIES, RENDER_CACHE_BYTES)
+        self._lock = threading.Lock()
+
+    def _check_manifest(self) -> bool:
+        """Drop loaded data if the manifest changed; False if no tiles exist."""
+        try:
+            mtime = os.stat(os.path.join(self.directory, MANIFEST)).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime != self._manifest_mtime:
+            with self._lock:
+                if mtime != self._manifest_mtime:
+                    self._levels.clear()
+                    self._national.clear()
+                    self._rendered.clear()
+                    self._manifest_mtime = mtime
+        return True
+
+    def available(self, level: int) -> bool:
+        return self._check_manifest() and os.path.exists(tileset_path(level, self.directory))
+
+    def fragments(self, level: int) -> List[Fragment]:
+        fragments = self._levels.get(level)
+        if fragments is None:
+            with self._lock:
+                fragments = self._levels.get(level)
+                if fragments is None:
+                    with open(tileset_path(level, self.directory), "rb") as f:
+                        fragments = [parse_fragment_line(line) for line in f if line.strip()]
+                    self._levels[level] = fragments
+                    logger.info(f"Geo tiles z{level} loaded: {len(fragments)} municipalities")
+        return fragments
+
+    def national(self, level: int) -> EncodedBody:
+        """The pre-compressed national map, read from disk once."""
+        encoded = self._national.get(level)
+        if encoded is None:
+            path = national_path(level, self.directory)
+            with open(path, "rb") as f:
+                body = f.read()
+            with open(f"{path}.gz", "rb") as f:
+                gz = f.read()
+            br = None
+            if os.path.exists(f"{path}.br"):
+                with open(f"{path}.br", "rb") as f:
+                    br = f.read()
+            encoded = EncodedBody(
+                body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"', gzip=gz, br=br
+            )
+            self._national[level] = encoded
+        return encoded
+
+    def render(
+        self,
+        level: int,
+        state_id: Optional[int] = None,
+        state_code: Optional[str] = None,
+        overlay: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> Optional[EncodedBody]:
+        """Encoded FeatureCollection for Brazil or one state.
+
+        CPU-bound on a cache miss (serialization and compression): async
+        callers should run it in a thread.
+
+        Args:
+            level: Pre-generated zoom level
+            state_id: Only municipalities of this state
+            state_code: Same, by abbreviation (e.g. ``"SP"``)
+            overlay: Extra properties by IBGE code (e.g. program statistics)
+
+        Returns:
+            None when the level was not generated
+
+        Raises:
+            LookupError: Unknown ``state_code``
+        """
+        if not self.available(level):
+            return None
+        state_code = state_code.upper() if state_code else None
+        if state_id is None and state_code is None and overlay is None:
+            return self.national(level)
+
+        overlay_digest = ""
+        if overlay is not None:
+            overlay_digest = hashlib.sha1(
+                orjson.dumps(overlay, option=orjson.OPT_SORT_KEYS)
+            ).hexdigest()
+        key = f"{level}:{state_id}:{state_code}:{overlay_digest}"
+        found, encoded = self._rendered.get(key)
+        if found:
+            return encoded
+
+        fragments = self.fragments(level)
+        if state_code is not None:
+            fragments = [f for f in fragments if f[1] == state_code]
+            if not fragments:
+                raise LookupError(state_code)
+            state_id = fragments[0][2]
+        elif state_id is not None:
+            fragments = [f for f in fragments if f[2] == state_id]
+        encoded = EncodedBody.encode(
+            feature_collection(
+                fragments,
+                overlay=overlay,
+                metadata={"state_id": state_id, "simplified": ZOOM_TOLERANCES[level] > 0, "zoom": level},
+            ),
+            brotli_quality=RENDER_BROTLI_QUALITY,
+        )
+        self._rendered.set(key, encoded, ttl=float("inf"), size=encoded.size)
+        return encoded
+
+
+_store: Optional[GeoTileStore] = None
+
+
+def get_tile_store() -> GeoTileStore:
+    global _store
+    if _store is None:
+        _store = GeoTileStore()
+    return _store
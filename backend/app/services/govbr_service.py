@@ -301,7 +301,7 @@ async def auto_preencher_dados(cpf: str) -> Dict[str, Any]:
     Returns:
         dict com dados auto-preenchidos disponiveis
     """
-    from app.services import serpro_service, transparencia_service
+    from app.services import beneficiarios_service, serpro_service
 
     cpf_limpo = _limpar_cpf(cpf)
     cpf_hash = _hash_cpf(cpf_limpo)
@@ -328,12 +328,14 @@ async def auto_preencher_dados(cpf: str) -> Dict[str, Any]:
         dados["fontes"].append("Auto-declaracao (SERPRO nao habilitado)")
 
     # 2. Beneficios via Portal da Transparencia (gratuito)
-    beneficios = await transparencia_service.consultar_beneficios_ou_mock(cpf_limpo)
+    beneficios = await beneficiarios_service.consultar_beneficios(cpf_limpo)
     if beneficios.get("cpf_consultado"):
         dados["beneficios"] = {
             "eh_beneficiario": beneficios.get("beneficiario_algum_programa", False),
             "programas": beneficios.get("beneficios_ativos", []),
             "total_mensal": beneficios.get("total_mensal_estimado", 0),
+            "programas_consultados": beneficios.get("programas_consultados"),
+            "parcial": beneficios.get("parcial", False),
         }
         if "Mock" not in beneficios.get("fonte", ""):
             dados["fontes"].append("Portal da Transparencia")
@@ -0,0 +1,218 @@
+"""In-process search index for municipality autocomplete.
+
+All ~5,570 municipalities are loaded once and searched in memory with
+accent- and case-folded names ("sao paulo" finds "São Paulo"):
+
+1. Prefix matches, found by binary search over every word suffix of every
+   name: the whole name ("campinas" -> "Campinas"), then the start of the
+   name ("campi" -> "Campina Grande"), then the start of a later word
+   ("paulo" -> "São Paulo").
+2. When prefixes don't fill the page, typo-tolerant matches by shared
+   trigrams (like ``pg_trgm``'s ``word_similarity``): the share of the
+   query's trigrams found in the name, counted for all names at once with
+   ``numpy.bincount`` over the trigram posting lists.
+
+Within each group, larger municipalities come first. A query answers in
+tens of microseconds without touching the database.
+
+The index is built lazily on first use (or at startup) and rebuilt after
+``invalidate_municipality_search_index`` is called, e.g. by the IBGE
+ingestion job.
+"""
+
+import asyncio
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Share of the query trigrams a name must contain to count as a typo match
+MIN_SIMILARITY = 0.5
+
+# Seconds before an empty index is rebuilt
+EMPTY_RETRY_INTERVAL = 60.0
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+# Prefix match groups, best first
+_EXACT, _NAME_PREFIX, _WORD_PREFIX = 0, 1, 2
+
+
+def fold(text: str) -> str:
+    """Lowercase, strip accents and turn punctuation into single spaces.
+
+    ``"Santa Bárbara d'Oeste"`` -> ``"santa barbara d oeste"``
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return _NON_ALNUM.sub(" ", ascii_text).strip()
+
+
+def trigrams(folded: str, complete: bool = True) -> List[str]:
+    """Distinct trigrams of a folded string, padded like ``pg_trgm``.
+
+    Args:
+        folded: Output of ``fold``
+        complete: Pad the end too (False for a query still being typed)
+    """
+    padded = f"  {folded} " if complete else f"  {folded}"
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+
+class MunicipalitySearchIndex:
+    """Prefix + trigram index over municipality names.
+
+    Records are plain dicts with at least ``name`` (and usually
+    ``ibge_code``, ``state_id`` and ``population``); search returns the
+    dicts as-is.
+    """
+
+    def __init__(self, records: Sequence[Dict[str, Any]]):
+        self.records = tuple(r for r in records if r.get("name"))
+        self.folded = [fold(r["name"]) for r in self.records]
+        self.population = np.array([r.get("population") or 0 for r in self.records], dtype=np.int64)
+        self._lengths = np.array([len(name) for name in self.folded], dtype=np.int32)
+
+        # Every word suffix ("sao paulo", "paulo") -> record, sorted for bisect
+        suffixes = []
+        for i, name in enumerate(self.folded):
+            starts = [0] + [m.end() for m in re.finditer(" ", name)]
+            for start in starts:
+                suffixes.append((name[start:], i, _NAME_PREFIX if start == 0 else _WORD_PREFIX))
+        suffixes.sort()
+        self._suffix_keys = [s[0] for s in suffixes]
+        self._suffix_ids = np.array([s[1] for s in suffixes], dtype=np.int32)
+        self._suffix_groups = np.array([s[2] for s in suffixes], dtype=np.int8)
+
+        postings: Dict[str, List[int]] = {}
+        gram_counts = []
+        for i, name in enumerate(self.folded):
+            grams = trigrams(name)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+        self._gram_counts = np.array(gram_counts, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Ranked municipalities for an autocomplete query."""
+        q = fold(query)
+        if not q or not self.records:
+            return []
+
+        ranked = self._prefix_matches(q)
+        if len(ranked) < limit:
+            seen = set(ranked)
+            ranked += [i for i in self._trigram_matches(q) if i not in seen]
+
+        return [self.records[i] for i in ranked[:limit]]
+
+    def _prefix_matches(self, q: str) -> List[int]:
+        """Names or words starting with ``q``: exact, name prefix, word prefix."""
+        lo = bisect.bisect_left(self._suffix_keys, q)
+        hi = bisect.bisect_left(self._suffix_keys, q + "\x7f", lo)
+        if lo == hi:
+            return []
+
+        ids = self._suffix_ids[lo:hi]
+        groups = self._suffix_groups[lo:hi].copy()
+        groups[(groups == _NAME_PREFIX) & (self._lengths[ids] == len(q))] = _EXACT
+
+        # Best group, then population, then shorter name
+        order = np.lexsort((self._lengths[ids], -self.population[ids], groups))
+        return list(dict.fromkeys(ids[order].tolist()))
+
+    def _trigram_matches(self, q: str) -> List[int]:
+        """Names sharing most of the query trigrams (typos)."""
+        grams = trigrams(q, complete=False)
+        lists = [self._postings[g] for g in grams if g in self._postings]
+        if not lists:
+            return []
+
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.records))
+        candidates = np.nonzero((shared >= 2) & (shared >= MIN_SIMILARITY * len(grams)))[0]
+        if not len(candidates):
+            return []
+
+        # Share of the query found, then closeness of the whole name
+        # (``pg_trgm`` similarity), then population
+        found = shared[candidates]
+        similarity = found / (len(grams) + self._gram_counts[candidates] - found)
+        order = np.lexsort((-self.population[candidates], -similarity, -found))
+        return candidates[order].tolist()
+
+
+def _records_from_db() -> List[Dict[str, Any]]:
+    """Municipalities from the ``municipalities`` table."""
+    try:
+        from app.database import SessionLocal
+        from app.models.municipality import Municipality
+
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                Municipality.ibge_code,
+                Municipality.name,
+                Municipality.state_id,
+                Municipality.population,
+            ).all()
+        finally:
+            db.close()
+    except Exception as e:
+        logger.warning(f"Could not load municipalities for the search index: {e}")
+        return []
+
+    return [
+        {"ibge_code": row[0], "name": row[1], "state_id": row[2], "population": row[3]}
+        for row in rows
+    ]
+
+
+_index: Optional[MunicipalitySearchIndex] = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def _is_current(index: Optional[MunicipalitySearchIndex]) -> bool:
+    # An empty index (database down or not ingested yet) is retried
+    return index is not None and (len(index) > 0 or time.monotonic() - _built_at < EMPTY_RETRY_INTERVAL)
+
+
+def get_municipality_search_index() -> MunicipalitySearchIndex:
+    """Return the search index, building it once from the database."""
+    global _index, _built_at
+    index = _index
+    if not _is_current(index):
+        with _lock:
+            index = _index
+            if not _is_current(index):
+                index = MunicipalitySearchIndex(_records_from_db())
+                _index = index
+                _built_at = time.monotonic()
+                logger.info(f"Municipality search index loaded with {len(index)} municipalities")
+    return index
+
+
+async def aget_municipality_search_index() -> MunicipalitySearchIndex:
+    """Async variant: builds the index (database read) in a worker thread."""
+    index = _index
+    if _is_current(index):
+        return index
+    return await asyncio.to_thread(get_municipality_search_index)
+
+
+def invalidate_municipality_search_index() -> None:
+    """Drop the index so it is rebuilt on next use."""
+    global _index
+    with _lock:
+        _index = None
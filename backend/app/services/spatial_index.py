@@ -0,0 +1,398 @@
+"""In-process spatial index for nearest CRAS / pharmacy lookups.
+
+All ingested points are loaded once into a uniform lat/lon grid backed by
+NumPy arrays. A "k nearest within radius" query only touches the grid cells
+covering the radius' bounding box and computes Haversine distances for
+those candidates in one vectorized pass, so it answers in well under a
+millisecond without any external API call.
+
+Sources:
+    - CRAS: ``cras_locations`` table (falls back to ``data/cras_exemplo.json``)
+    - Pharmacies: ``data/farmacias_exemplo.json``
+
+Indexes built from the example JSON files are flagged ``sample``: they
+only hold a handful of points, so callers must not treat "nothing near"
+or "something near" in them as an answer and should query the external
+APIs first, keeping the index as the offline fallback.
+
+Indexes are built lazily on first use (or at startup) and rebuilt after
+``invalidate_spatial_index`` is called, e.g. by the CRAS ingestion job.
+A CRAS fallback index (database down or table empty) expires and is
+rebuilt in a background thread, so a transient failure at startup does not
+pin the example data for the life of the process.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6_371_000
+METERS_PER_DEGREE = 111_320
+
+# ~28 km cells: a 10 km radius touches at most 3x3 cells
+DEFAULT_CELL_SIZE = 0.25
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data")
+CRAS_JSON_PATH = os.path.join(DATA_DIR, "cras_exemplo.json")
+FARMACIAS_JSON_PATH = os.path.join(DATA_DIR, "farmacias_exemplo.json")
+
+CRAS = "cras"
+FARMACIAS = "farmacias"
+
+# Retry the CRAS table after a database error / while it is empty
+DB_ERROR_RETRY_INTERVAL = 60.0
+EMPTY_RETRY_INTERVAL = 600.0
+
+
+def haversine_m(
+    latitude: float,
+    longitude: float,
+    lats: np.ndarray,
+    lons: np.ndarray,
+) -> np.ndarray:
+    """Vectorized Haversine distance in meters from one point to many.
+
+    Args:
+        latitude: Origin latitude in degrees
+        longitude: Origin longitude in degrees
+        lats: Target latitudes in radians
+        lons: Target longitudes in radians
+    """
+    lat1 = math.radians(latitude)
+    lon1 = math.radians(longitude)
+    a = (
+        np.sin((lats - lat1) / 2) ** 2
+        + math.cos(lat1) * np.cos(lats) * np.sin((lons - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class SpatialIndex:
+    """Grid index answering k-nearest-within-radius queries.
+
+    Points are plain dicts with ``latitude`` and ``longitude`` keys; the
+    dicts are returned as-is with their distance. Points without valid
+    coordinates are skipped. Longitudes are not wrapped at the
+    antimeridian (all data is in Brazil). ``sample`` marks an index built
+    from example data instead of an ingested source; ``expires_at``
+    (``time.monotonic()``) makes ``get_spatial_index`` rebuild it.
+    """
+
+    def __init__(
+        self,
+        points: Sequence[Dict[str, Any]],
+        cell_size: float = DEFAULT_CELL_SIZE,
+        sample: bool = False,
+        expires_at: Optional[float] = None,
+    ):
+        self.cell_size = cell_size
+        self.sample = sample
+        self.expires_at = expires_at
+        valid = [p for p in points if _has_coordinates(p)]
+        self.points: Tuple[Dict[str, Any], ...] = tuple(valid)
+
+        lat_deg = np.array([float(p["latitude"]) for p in valid], dtype=np.float64)
+        lon_deg = np.array([float(p["longitude"]) for p in valid], dtype=np.float64)
+        self._lats = np.radians(lat_deg)
+        self._lons = np.radians(lon_deg)
+
+        cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        rows = np.floor(lat_deg / cell_size).astype(np.int64)
+        cols = np.floor(lon_deg / cell_size).astype(np.int64)
+        for i, (row, col) in enumerate(zip(rows.tolist(), cols.tolist())):
+            cells[(row, col)].append(i)
+        self._cells = {key: np.array(idx, dtype=np.int64) for key, idx in cells.items()}
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _candidates(self, latitude: float, longitude: float, radius_m: float) -> np.ndarray:
+        """Indices of points in the cells covering the radius' bounding box."""
+        dlat = radius_m / METERS_PER_DEGREE
+        dlon = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+
+        row_min = math.floor((latitude - dlat) / self.cell_size)
+        row_max = math.floor((latitude + dlat) / self.cell_size)
+        col_min = math.floor((longitude - dlon) / self.cell_size)
+        col_max = math.floor((longitude + dlon) / self.cell_size)
+
+        # Radius larger than the data: scanning the cells costs more than a full pass
+        if (row_max - row_min + 1) * (col_max - col_min + 1) >= len(self._cells):
+            return np.arange(len(self.points))
+
+        found = [
+            self._cells[(row, col)]
+            for row in range(row_min, row_max + 1)
+            for col in range(col_min, col_max + 1)
+            if (row, col) in self._cells
+        ]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 5,
+        radius_m: Optional[float] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Return up to ``k`` points closest to a location.
+
+        Args:
+            latitude: Query latitude in degrees
+            longitude: Query longitude in degrees
+            k: Maximum number of results
+            radius_m: Only return points within this distance (meters)
+            where: Optional filter applied to the points in range
+
+        Returns:
+            List of ``(point, distance_m)`` ordered by distance
+        """
+        if not self.points or k <= 0:
+            return []
+
+        if radius_m is None:
+            candidates = np.arange(len(self.points))
+        else:
+            candidates = self._candidates(latitude, longitude, radius_m)
+            if candidates.size == 0:
+                return []
+
+        distances = haversine_m(
+            latitude, longitude, self._lats[candidates], self._lons[candidates]
+        )
+        if radius_m is not None:
+            within = distances <= radius_m
+            candidates = candidates[within]
+            distances = distances[within]
+
+        if where is not None:
+            keep = np.array([bool(where(self.points[i])) for i in candidates.tolist()], dtype=bool)
+            candidates = candidates[keep]
+            distances = distances[keep]
+
+        if candidates.size > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            candidates = candidates[top]
+            distances = distances[top]
+
+        order = np.argsort(distances, kind="stable")
+        return [
+            (self.points[int(candidates[i])], float(distances[i]))
+            for i in order
+        ]
+
+
+def merge_by_proximity(
+    local: List[Dict[str, Any]],
+    external: List[Dict[str, Any]],
+    fields: Sequence[str],
+    max_distance_m: float = 150,
+) -> List[Dict[str, Any]]:
+    """Enrich local results with fields from the closest external match.
+
+    A local point takes ``fields`` (when not empty) from the nearest external
+    point within ``max_distance_m``. Local order and distances are kept.
+    """
+    matchable = [e for e in external if _has_coordinates(e)]
+    if not matchable:
+        return local
+
+    lats = np.radians([float(e["latitude"]) for e in matchable])
+    lons = np.radians([float(e["longitude"]) for e in matchable])
+
+    for point in local:
+        if not _has_coordinates(point):
+            continue
+        distances = haversine_m(float(point["latitude"]), float(point["longitude"]), lats, lons)
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance_m:
+            continue
+        for field in fields:
+            value = matchable[best].get(field)
+            if value not in (None, "", [], {}):
+                point[field] = value
+    return local
+
+
+def _has_coordinates(point: Dict[str, Any]) -> bool:
+    lat = point.get("latitude")
+    lon = point.get("longitude")
+    if lat is None or lon is None:
+        return False
+    try:
+        return -90 <= float(lat) <= 90 and -180 <= float(lon) <= 180
+    except (TypeError, ValueError):
+        return False
+
+
+# =============================================================================
+# Point sources
+# =============================================================================
+
+def _load_json(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"Arquivo não encontrado: {path}")
+        return {}
+
+
+def _from_json_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten the ``coordenadas`` object used by the example JSON files."""
+    point = {k: v for k, v in record.items() if k != "coordenadas"}
+    coords = record.get("coordenadas") or {}
+    point["latitude"] = coords.get("lat")
+    point["longitude"] = coords.get("lng")
+    return point
+
+
+def _cras_points_from_db() -> Optional[List[Dict[str, Any]]]:
+    """CRAS with coordinates from the ``cras_locations`` table (None on a database error)."""
+    try:
+        from app.database import SessionLocal
+        from app.models.cras_location import CrasLocation
+        from app.models.municipality import Municipality
+
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(
+                    CrasLocation.nome,
+                    CrasLocation.endereco,
+                    CrasLocation.bairro,
+                    CrasLocation.ibge_code,
+                    CrasLocation.telefone,
+                    CrasLocation.horario_funcionamento,
+                    CrasLocation.servicos,
+                    CrasLocation.latitude,
+                    CrasLocation.longitude,
+                    Municipality.name,
+                )
+                .outerjoin(Municipality, Municipality.ibge_code == CrasLocation.ibge_code)
+                .filter(CrasLocation.latitude.isnot(None), CrasLocation.longitude.isnot(None))
+                .all()
+            )
+        finally:
+            db.close()
+    except Exception as e:
+        logger.warning(f"Erro ao carregar CRAS do banco para o índice espacial: {e}")
+        return None
+
+    return [
+        {
+            "nome": row[0],
+            "endereco": row[1] or "",
+            "bairro": row[2] or "",
+            "ibge_code": row[3],
+            "telefone": row[4] or "",
+            "horario": row[5] or "Seg-Sex 8h-17h",
+            "servicos": row[6] or ["CadUnico", "BolsaFamilia", "BPC"],
+            "latitude": row[7],
+            "longitude": row[8],
+            "cidade": row[9] or "",
+        }
+        for row in rows
+    ]
+
+
+def build_cras_index() -> SpatialIndex:
+    """Index of all CRAS.
+
+    Falls back to the example JSON (``sample``) when the table is empty or
+    the database fails; that index expires so the table is tried again
+    (sooner after an error).
+    """
+    points = _cras_points_from_db()
+    if points:
+        return SpatialIndex(points)
+    retry = DB_ERROR_RETRY_INTERVAL if points is None else EMPTY_RETRY_INTERVAL
+    cras = _load_json(CRAS_JSON_PATH).get("cras", [])
+    return SpatialIndex(
+        [_from_json_record(c) for c in cras], sample=True, expires_at=time.monotonic() + retry
+    )
+
+
+def build_farmacia_index() -> SpatialIndex:
+    """Index of the example pharmacies (``sample``: there is no ingested source yet)."""
+    farmacias = _load_json(FARMACIAS_JSON_PATH).get("farmacias", [])
+    return SpatialIndex([_from_json_record(f) for f in farmacias], sample=True)
+
+
+_BUILDERS = {
+    CRAS: build_cras_index,
+    FARMACIAS: build_farmacia_index,
+}
+
+_indexes: Dict[str, SpatialIndex] = {}
+_refreshing: set = set()
+_lock = threading.Lock()
+
+
+def _build(kind: str) -> SpatialIndex:
+    index = _BUILDERS[kind]()
+    logger.info(
+        f"Índice espacial '{kind}' carregado com {len(index)} pontos"
+        + (" (dados de exemplo)" if index.sample else "")
+    )
+    return index
+
+
+def _refresh(kind: str, expired: SpatialIndex) -> None:
+    """Rebuild an expired index; the old one keeps serving meanwhile."""
+    try:
+        index = _build(kind)
+        with _lock:
+            # Not replaced by an invalidate/rebuild in the meantime
+            if _indexes.get(kind) is expired:
+                _indexes[kind] = index
+    finally:
+        with _lock:
+            _refreshing.discard(kind)
+
+
+def get_spatial_index(kind: str) -> SpatialIndex:
+    """Return the index for ``kind`` (``"cras"`` or ``"farmacias"``), building it once.
+
+    An expired index is returned as-is while a background thread rebuilds it.
+    """
+    index = _indexes.get(kind)
+    if index is None:
+        with _lock:
+            index = _indexes.get(kind)
+            if index is None:
+                index = _build(kind)
+                _indexes[kind] = index
+    elif index.expires_at is not None and time.monotonic() >= index.expires_at:
+        with _lock:
+            if kind in _refreshing:
+                return index
+            _refreshing.add(kind)
+        threading.Thread(target=_refresh, args=(kind, index), daemon=True).start()
+    return index
+
+
+def invalidate_spatial_index(kind: Optional[str] = None) -> None:
+    """Drop one (or every) index so it is rebuilt on next use."""
+    with _lock:
+        if kind is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(kind, None)
+
+
+def load_spatial_indexes() -> Dict[str, int]:
+    """Build every index; returns the number of points per index."""
+    return {kind: len(get_spatial_index(kind)) for kind in _BUILDERS}
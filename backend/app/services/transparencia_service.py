@@ -14,16 +14,27 @@ Rate limits:
 - 00h-06h: 300 req/min
 
 SEGURANCA: CPF nunca eh logado diretamente. Usa hash para logs.
+
+Desempenho:
+- Um unico ``httpx.AsyncClient`` (HTTP/2 quando o pacote ``h2`` estiver
+  instalado) e reaproveitado por todas as consultas, mantendo as conexoes
+  abertas; ``fechar_cliente`` eh chamado no shutdown da aplicacao.
+- O resultado consolidado fica no Redis, com chave pelo hash do CPF, ate a
+  proxima publicacao mensal do Portal. Consultas com erro nao sao guardadas.
 """
 
 import asyncio
 import hashlib
+import importlib.util
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Optional
 
 import httpx
 
+from app.config import settings
+from app.core.cache import aget_cache, aset_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,6 +46,22 @@ TRANSPARENCIA_BASE_URL = "https://api.portaldatransparencia.gov.br/api-de-dados"
 
 _HTTP_TIMEOUT = 15.0
 
+# HTTP/2 exige o extra httpx[http2]; sem ele, HTTP/1.1 com keep-alive
+_HTTP2_DISPONIVEL = importlib.util.find_spec("h2") is not None
+
+_HTTP_LIMITES = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=60.0,
+)
+
+# Cache do resultado consolidado (chave: hash completo do CPF)
+_CACHE_PREFIXO = "tanamao:transparencia:"
+
+# Dia do mes em que consideramos publicados os dados do mes anterior
+_DIA_PUBLICACAO = 10
+_CACHE_TTL_MINIMO = 3600
+
 # Endpoints disponiveis
 ENDPOINTS = {
     "bolsa_familia": "/bolsa-familia-disponivel-por-cpf-ou-nis",
@@ -48,9 +75,9 @@ ENDPOINTS = {
 # Helpers
 # =============================================================================
 
-def _hash_cpf(cpf: str) -> str:
-    """Gera hash do CPF para logs seguros."""
-    return hashlib.sha256(cpf.encode()).hexdigest()[:12]
+def _hash_cpf(cpf: str, tamanho: int = 12) -> str:
+    """Gera hash do CPF para logs seguros (``tamanho=64``: hash completo)."""
+    return hashlib.sha256(cpf.encode()).hexdigest()[:tamanho]
 
 
 def _limpar_cpf(cpf: str) -> str:
@@ -78,10 +105,50 @@ def _is_horario_noturno() -> bool:
     return hora < 6
 
 
+def _ttl_ate_publicacao(agora: Optional[datetime] = None) -> int:
+    """Segundos ate a proxima publicacao mensal (minimo ``_CACHE_TTL_MINIMO``)."""
+    agora = agora or datetime.now()
+    publicacao = agora.replace(day=_DIA_PUBLICACAO, hour=0, minute=0, second=0, microsecond=0)
+    if publicacao <= agora:
+        proximo_mes = (publicacao.replace(day=1) + timedelta(days=32)).replace(day=1)
+        publicacao = proximo_mes.replace(day=_DIA_PUBLICACAO)
+    return max(int((publicacao - agora).total_seconds()), _CACHE_TTL_MINIMO)
+
+
+def _chave_cache(cpf_limpo: str) -> str:
+    """Chave do Redis para o resultado de um CPF (nunca o CPF em claro)."""
+    return f"{_CACHE_PREFIXO}{_hash_cpf(cpf_limpo, tamanho=64)}"
+
+
 # =============================================================================
 # Cliente HTTP
 # =============================================================================
 
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Cliente HTTP compartilhado (criado na primeira consulta)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=TRANSPARENCIA_BASE_URL,
+            timeout=_HTTP_TIMEOUT,
+            limits=_HTTP_LIMITES,
+            http2=_HTTP2_DISPONIVEL,
+            headers={"Accept": "application/json"},
+        )
+    return _client
+
+
+async def fechar_cliente() -> None:
+    """Fecha o cliente HTTP compartilhado (shutdown da aplicacao)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 async def _fazer_requisicao(
     endpoint: str,
     cpf: str,
@@ -105,11 +172,7 @@ async def _fazer_requisicao(
         logger.warning("Portal da Transparencia nao configurado (TRANSPARENCIA_API_KEY vazio)")
         return None
 
-    url = f"{TRANSPARENCIA_BASE_URL}{endpoint}"
-    headers = {
-        "Accept": "application/json",
-        "chave-api-dados": api_key,
-    }
+    headers = {"chave-api-dados": api_key}
     params = {
         "cpfNisBeneficiario": cpf_limpo,
         "pagina": pagina,
@@ -118,8 +181,7 @@ async def _fazer_requisicao(
     try:
         logger.info(f"Transparencia API: endpoint={endpoint}, cpf_hash={cpf_hash}")
 
-        async with httpx.AsyncClient(timeout=_HTTP_TIMEOUT) as client:
-            response = await client.get(url, headers=headers, params=params)
+        response = await _get_client().get(endpoint, headers=headers, params=params)
 
         if response.status_code == 200:
             data = response.json()
@@ -363,11 +425,12 @@ async def consultar_seguro_defeso(cpf: str) -> dict[str, Any]:
 # Consulta Consolidada
 # =============================================================================
 
-async def consultar_todos_beneficios(cpf: str) -> dict[str, Any]:
+async def consultar_todos_beneficios(cpf: str, usar_cache: bool = True) -> dict[str, Any]:
     """Consulta todos os beneficios de um CPF em paralelo.
 
     Args:
         cpf: CPF do cidadao
+        usar_cache: Usa (e grava) o resultado guardado no Redis
 
     Returns:
         dict com resumo de todos os beneficios:
@@ -378,6 +441,15 @@ async def consultar_todos_beneficios(cpf: str) -> dict[str, Any]:
     cpf_limpo = _limpar_cpf(cpf)
     cpf_hash = _hash_cpf(cpf_limpo)
 
+    chave = _chave_cache(cpf_limpo)
+    usar_cache = usar_cache and settings.CACHE_ENABLED
+
+    if usar_cache:
+        guardado = await aget_cache(chave)
+        if guardado is not None:
+            logger.info(f"Beneficios do cache para cpf_hash={cpf_hash}")
+            return guardado
+
     logger.info(f"Consultando todos beneficios para cpf_hash={cpf_hash}")
 
     # Executar todas as consultas em paralelo
@@ -418,7 +490,7 @@ async def consultar_todos_beneficios(cpf: str) -> dict[str, Any]:
             elif resultado.get("ultima_parcela"):
                 total_mensal += resultado["ultima_parcela"].get("valor", 0)
 
-    return {
+    resposta = {
         "cpf_consultado": True,
         "beneficiario_algum_programa": len(beneficios_ativos) > 0,
         "quantidade_beneficios": len(beneficios_ativos),
@@ -429,6 +501,76 @@ async def consultar_todos_beneficios(cpf: str) -> dict[str, Any]:
         "aviso": "Dados publicos. Para informacoes oficiais, consulte o CRAS ou Caixa Economica.",
     }
 
+    # Erros (rate limit, timeout) nao vao para o cache
+    if usar_cache and not any("erro" in d for d in detalhes.values()):
+        await aset_cache(chave, resposta, ttl=_ttl_ate_publicacao())
+
+    return resposta
+
+
+# Consulta de cada programa (resolvida na chamada)
+_CONSULTAS_POR_PROGRAMA = {
+    "bolsa_familia": "consultar_bolsa_familia",
+    "bpc": "consultar_bpc",
+    "auxilio_gas": "consultar_auxilio_gas",
+    "seguro_defeso": "consultar_seguro_defeso",
+}
+
+
+async def consultar_programas(
+    cpf: str,
+    programas: list[str],
+    usar_cache: bool = True,
+) -> dict[str, dict[str, Any]]:
+    """Consulta so alguns programas de um CPF, com o cache do CPF.
+
+    Reaproveita os detalhes de ``consultar_todos_beneficios`` ja guardados
+    para o CPF e, por programa, ``<chave do CPF>:<programa>``, com o mesmo
+    TTL ate a proxima publicacao mensal. So os programas sem cache vao para
+    a API (em paralelo); erros nao sao guardados.
+
+    Args:
+        cpf: CPF do cidadao
+        programas: Chaves de ``detalhes`` (ex: ``"auxilio_gas"``)
+        usar_cache: Usa (e grava) os resultados guardados no Redis
+
+    Returns:
+        dict programa -> resultado no formato de ``detalhes``
+    """
+    cpf_limpo = _limpar_cpf(cpf)
+    chave = _chave_cache(cpf_limpo)
+    usar_cache = usar_cache and settings.CACHE_ENABLED
+    resultados: dict[str, dict[str, Any]] = {}
+
+    if usar_cache:
+        completo, *guardados = await asyncio.gather(
+            aget_cache(chave), *(aget_cache(f"{chave}:{p}") for p in programas)
+        )
+        detalhes = (completo or {}).get("detalhes") or {}
+        for programa, guardado in zip(programas, guardados):
+            resultado = detalhes.get(programa) or guardado
+            if resultado is not None and "erro" not in resultado:
+                resultados[programa] = resultado
+
+    faltando = [p for p in programas if p not in resultados]
+    if not faltando:
+        return resultados
+
+    respostas = await asyncio.gather(
+        *(globals()[_CONSULTAS_POR_PROGRAMA[p]](cpf_limpo) for p in faltando),
+        return_exceptions=True,
+    )
+    ttl = _ttl_ate_publicacao()
+    for programa, resposta in zip(faltando, respostas):
+        if isinstance(resposta, Exception):
+            logger.error(f"Erro ao consultar {programa}: {resposta}")
+            resultados[programa] = {"erro": str(resposta)}
+            continue
+        resultados[programa] = resposta
+        if usar_cache and "erro" not in resposta:
+            await aset_cache(f"{chave}:{programa}", resposta, ttl=ttl)
+    return resultados
+
 
 # =============================================================================
 # Mock para Desenvolvimento
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the incremental benefit catalog sync.
+
+Copies ``frontend/src/data/benefits`` to a temporary directory and times
+the planning step of ``app.services.benefit_sync`` (everything before the
+database writes):
+
+- the previous migration's load: read and convert every file
+- a first sync without manifest (every file parsed, in parallel)
+- a sync after editing one benefit of one municipality
+- a sync after touching files without changing them
+
+Usage:
+    cd backend
+    python scripts/bench_benefit_sync.py
+    python scripts/bench_benefit_sync.py --workers 4 --edits 20
+
+Prerequisites:
+    - None (reads the frontend catalog, no database needed)
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the backend app to the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Import after path setup
+from app.services.benefit_sync import SOURCE_DIR, benefit_row, discover_source_files, plan_sync
+
+
+def legacy_load(source_dir):
+    """Previous migration: read every file and convert every benefit."""
+    rows = []
+    for rel in discover_source_files(source_dir):
+        with open(source_dir / rel, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rows.extend(benefit_row(b) for b in data.get("benefits", []))
+    return rows
+
+
+def edit_one_benefit(path, counter):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data["benefits"][0]["name"] = f"{data['benefits'][0]['name']} ({counter})"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental benefit sync")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--edits", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = Path(tmp) / "benefits"
+        shutil.copytree(SOURCE_DIR, source_dir)
+        files = discover_source_files(source_dir)
+        print(f"Catalog: {len(files)} files")
+
+        rows, legacy_seconds = timed(legacy_load, source_dir)
+        print(f"  legacy full load        {legacy_seconds * 1000:8.0f} ms  ({len(rows)} benefits, then delete + insert all)")
+
+        (changes, manifest), full_seconds = timed(plan_sync, source_dir, {}, {}, args.workers)
+        print(f"  first sync (no manifest) {full_seconds * 1000:7.0f} ms  ({changes.summary()})")
+
+        municipal = [rel for rel in files if rel.startswith("municipalities/")]
+        edit_times = []
+        for i in range(args.edits):
+            edit_one_benefit(source_dir / rng.choice(municipal), i)
+            (changes, manifest), seconds = timed(plan_sync, source_dir, manifest, None, args.workers)
+            assert len(changes.updates) == 1, changes.summary()
+            edit_times.append(seconds)
+        edit_times.sort()
+        print(f"  one-benefit edit         {edit_times[len(edit_times) // 2] * 1000:7.0f} ms  median of {args.edits}"
+              f" (max {edit_times[-1] * 1000:.0f} ms)")
+
+        for rel in rng.sample(municipal, min(100, len(municipal))):
+            os.utime(source_dir / rel)
+        (changes, manifest), seconds = timed(plan_sync, source_dir, manifest, None, args.workers)
+        print(f"  100 files touched        {seconds * 1000:7.0f} ms  ({changes.summary()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the agent's message routing checks.
+
+Replays a corpus of citizen messages through the checks the orchestrator
+runs on every message (greeting, thanks, help, restart, urgency, intent)
+and compares:
+
+- the previous classifier: one ``in`` scan per keyword and one regex
+  search per pattern, repeated for each check
+- ``IntentClassifier.analyze``: one pass of the combined keyword matcher
+  over the accent-normalized text, plus the patterns compiled for that
+  text (case-sensitive, so each search jumps to its literal prefix)
+
+Reports per-message latency and how often both pick the same category.
+
+Usage:
+    cd backend
+    python scripts/bench_intent_classifier.py
+    python scripts/bench_intent_classifier.py --corpus mensagens.txt --repeat 20
+
+Prerequisites:
+    - None (pure CPU; ``--corpus`` is a text file with one message per line)
+"""
+
+import argparse
+import logging
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the backend app to the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Import after path setup
+from app.agent.intent_classifier import IntentCategory, IntentClassifier
+from app.agent.tools.rede_protecao import _KEYWORDS_URGENCIA, keywords_urgencia, resultado_urgencia
+
+
+CORPUS = [
+    "oi",
+    "Bom dia, tudo bem?",
+    "quero pedir meus remédios da farmácia popular",
+    "preciso de remedio pra pressão, tenho a receita",
+    "Minha receita de losartana venceu, e agora?",
+    "qual o status do pedido PED-12345?",
+    "tenho direito a bolsa família?",
+    "quanto eu recebo de BPC? meu cpf é 529.982.247-25",
+    "meu auxílio gás não caiu esse mês",
+    "quero saber dos meus benefícios",
+    "quais documentos eu preciso pra fazer o cadastro único?",
+    "onde fica o CRAS mais perto de casa",
+    "como faz o cadastro no cadunico",
+    "fui demitido sem justa causa, quanto recebo de rescisão?",
+    "trabalhei sem carteira por 2 anos, tenho direito a seguro desemprego?",
+    "meu patrão não assina minha carteira",
+    "meu marido me bate e eu tenho medo de ir pra casa",
+    "não aguento mais, quero morrer",
+    "estou passando fome com meus filhos",
+    "to morando na rua desde semana passada",
+    "obrigada pela ajuda!",
+    "valeu",
+    "o que você faz?",
+    "como funciona isso aqui",
+    "voltar ao menu principal",
+    "quero começar de novo",
+    "minha mãe é idosa e tem deficiência, ela pode receber o BPC?",
+    "Tarifa social de energia, como consigo desconto na conta de luz?",
+    "meu filho precisa de insulina e fralda geriátrica pro meu pai",
+    "olá, gostaria de saber sobre o pé-de-meia",
+    "Boa noite. Recebi uma carta do INSS pedindo revisão do benefício",
+    "ele me agride quando bebe",
+    "preciso de ajuda urgente, minha vizinha está sendo espancada",
+    "é verdade que o bolsa família vai aumentar?",
+    "posso ter direito a minha casa minha vida?",
+    "quero saber o saldo do meu fgts",
+    "sabe me dizer que horas abre o posto de saúde?",
+    "ok",
+    "blz",
+    "Pode me explicar o que é o CadÚnico e quem precisa ter?",
+]
+
+
+class LegacyClassifier:
+    """Previous implementation: one scan per keyword and per pattern."""
+
+    GREETINGS = IntentClassifier.GREETINGS
+    SPECIAL_KEYWORDS = IntentClassifier.SPECIAL_KEYWORDS
+
+    def __init__(self):
+        self.keywords = IntentClassifier.KEYWORDS
+        self.weights = IntentClassifier.WEIGHTS
+        self.patterns = {
+            category: [re.compile(p, re.IGNORECASE) for p in patterns]
+            for category, patterns in IntentClassifier.PATTERNS.items()
+        }
+
+    def classify(self, message):
+        message_lower = message.lower()
+        scores = {}
+        for category in [IntentCategory.FARMACIA, IntentCategory.BENEFICIO, IntentCategory.DOCUMENTACAO,
+                         IntentCategory.PROTECAO, IntentCategory.TRABALHISTA]:
+            total_score = 0.0
+            for keyword_type, keyword_list in self.keywords.get(category, {}).items():
+                weight = self.weights.get(keyword_type, 0.5)
+                for keyword in keyword_list:
+                    if keyword in message_lower:
+                        total_score += weight
+                        if f" {keyword} " in f" {message_lower} ":
+                            total_score += 0.1
+            if total_score > 0:
+                scores[category] = total_score
+        for category, patterns in self.patterns.items():
+            for pattern in patterns:
+                if pattern.search(message):
+                    scores[category] = scores.get(category, 0) + self.weights["pattern"]
+        if not scores:
+            return IntentCategory.GERAL
+        return max(scores.items(), key=lambda x: x[1])[0]
+
+    def is_greeting(self, message):
+        message_lower = message.lower().strip()
+        return any(g == message_lower or message_lower.startswith(g + " ") for g in self.GREETINGS)
+
+    def has_special(self, message, name):
+        message_lower = message.lower()
+        return any(k in message_lower for k in self.SPECIAL_KEYWORDS[name])
+
+    def urgency(self, message):
+        message_lower = message.lower()
+        return [
+            categoria for categoria, config in _KEYWORDS_URGENCIA.items()
+            if any(kw in message_lower for kw in config["keywords"])
+        ]
+
+
+def legacy_route(legacy: LegacyClassifier, message: str):
+    """Every check the orchestrator used to run, each with its own scan."""
+    legacy.is_greeting(message)
+    legacy.has_special(message, "thanks")
+    legacy.has_special(message, "help")
+    legacy.has_special(message, "restart")
+    legacy.urgency(message)
+    return legacy.classify(message)
+
+
+def new_route(classifier: IntentClassifier, message: str):
+    analysis = classifier.analyze(message)
+    resultado_urgencia(analysis.urgency)
+    return analysis.intent.category
+
+
+def measure(route, messages, repeat):
+    """Per-message latencies in microseconds (best of ``repeat`` per message)."""
+    latencies = []
+    for message in messages:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            route(message)
+            best = min(best, time.perf_counter() - start)
+        latencies.append(best * 1e6)
+    return latencies
+
+
+def report(name, latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name:<22} mean {statistics.mean(ordered):7.1f} us"
+          f"  p50 {statistics.median(ordered):7.1f} us  p99 {p99:7.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark intent classification")
+    parser.add_argument("--corpus", type=Path, help="Text file with one message per line")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per message (best is kept)")
+    args = parser.parse_args()
+
+    # resultado_urgencia logs a warning for every urgent message
+    logging.disable(logging.WARNING)
+
+    if args.corpus:
+        messages = [line.strip() for line in args.corpus.read_text(encoding="utf-8").splitlines() if line.strip()]
+    else:
+        messages = CORPUS
+
+    legacy = LegacyClassifier()
+    classifier = IntentClassifier(use_llm_fallback=False, urgency_keywords=keywords_urgencia())
+
+    print(f"Replaying {len(messages)} messages ({args.repeat} runs each)\n")
+    legacy_us = measure(lambda m: legacy_route(legacy, m), messages, args.repeat)
+    new_us = measure(lambda m: new_route(classifier, m), messages, args.repeat)
+    print("Routing checks per message")
+    report("previous (per keyword)", legacy_us)
+    report("analyze (one pass)", new_us)
+    print(f"  speedup: {statistics.mean(legacy_us) / statistics.mean(new_us):.1f}x")
+
+    differ = [
+        (m, old, new)
+        for m in messages
+        for old, new in [(legacy_route(legacy, m), new_route(classifier, m))]
+        if old != new
+    ]
+    print(f"\nSame category: {len(messages) - len(differ)}/{len(messages)}")
+    for message, old, new in differ[:20]:
+        print(f"  {old.value:>12} -> {new.value:<12} {message[:60]}")
+
+
+if __name__ == "__main__":
+    main()
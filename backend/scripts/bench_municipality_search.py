@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark of municipality autocomplete search.
+
+Builds ``MunicipalitySearchIndex`` over the 5,5xx municipality names in
+``data/siafi_ibge_mapping.csv`` and replays generated queries:
+
+- prefixes of 3 to 8 characters (what an autocomplete box sends)
+- full names typed with accents ("São Paulo" against "SAO PAULO")
+- full names with one typo (deleted, swapped or replaced letter)
+
+Each query is compared against the previous search (``name ILIKE
+'%q%' ORDER BY name``), emulated in memory, so its time is a lower bound
+of the database query it replaced. Reports hit@1 / hit@5 (the intended
+municipality among the first results) and per-query latency.
+
+Usage:
+    cd backend
+    python scripts/bench_municipality_search.py
+    python scripts/bench_municipality_search.py --queries 2000 --seed 7
+
+Prerequisites:
+    - None (reads the CSV shipped in data/)
+"""
+
+import argparse
+import csv
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the backend app to the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Import after path setup
+from app.services.municipality_search import MunicipalitySearchIndex, fold
+
+
+CSV_PATH = Path(__file__).parent.parent / "data" / "siafi_ibge_mapping.csv"
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+ACCENTS = {"a": "ã", "e": "é", "o": "ô", "i": "í", "u": "ú", "c": "ç"}
+
+
+def load_municipalities():
+    with open(CSV_PATH, encoding="latin-1") as f:
+        return [
+            {"ibge_code": row[4].strip(), "name": row[2].strip().title(), "state_id": row[3], "population": 0}
+            for row in csv.reader(f, delimiter=";")
+            if len(row) >= 5
+        ]
+
+
+def legacy_search(names, query, limit):
+    """Previous search: case-insensitive substring, alphabetical."""
+    q = query.lower()
+    return sorted((n for n in names if q in n.lower()), key=str.lower)[:limit]
+
+
+def with_typo(name, rng):
+    i = rng.randrange(1, len(name) - 1)
+    kind = rng.choice(["delete", "swap", "replace"])
+    if kind == "delete":
+        return name[:i] + name[i + 1:]
+    if kind == "swap":
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + rng.choice(LETTERS) + name[i + 1:]
+
+
+def with_accents(name, rng):
+    return "".join(ACCENTS[c] if c in ACCENTS and rng.random() < 0.5 else c for c in name.lower())
+
+
+def build_queries(records, count, rng):
+    """(kind, query, expected folded name)"""
+    queries = []
+    candidates = [r["name"] for r in records if len(r["name"]) >= 6]
+    for _ in range(count):
+        name = rng.choice(candidates)
+        kind = rng.choice(["prefix", "accents", "typo"])
+        if kind == "prefix":
+            query = name[:rng.randint(3, 8)]
+        elif kind == "accents":
+            query = with_accents(name, rng)
+        else:
+            query = with_typo(name, rng)
+        queries.append((kind, query, fold(name)))
+    return queries
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1e6
+
+
+def report_latency(name, latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name:<16} mean {statistics.mean(ordered):8.1f} us"
+          f"  p50 {statistics.median(ordered):8.1f} us  p99 {p99:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark municipality search")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    records = load_municipalities()
+    start = time.perf_counter()
+    index = MunicipalitySearchIndex(records)
+    print(f"Index of {len(index)} municipalities built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    names = [r["name"] for r in records]
+    queries = build_queries(records, args.queries, random.Random(args.seed))
+    index.search("warm up", args.limit)
+
+    stats = {
+        engine: {kind: {"hit1": 0, "hit5": 0, "total": 0} for kind in ("prefix", "accents", "typo")}
+        for engine in ("legacy", "index")
+    }
+    latencies = {"legacy": [], "index": []}
+
+    for kind, query, expected in queries:
+        legacy, legacy_us = timed(legacy_search, names, query, args.limit)
+        found, index_us = timed(index.search, query, args.limit)
+        latencies["legacy"].append(legacy_us)
+        latencies["index"].append(index_us)
+
+        for engine, results in (("legacy", [fold(n) for n in legacy]), ("index", [fold(r["name"]) for r in found])):
+            entry = stats[engine][kind]
+            entry["total"] += 1
+            # Prefix queries: any name sharing the prefix is a valid first hit
+            if kind == "prefix":
+                hits = [n.startswith(fold(query)) for n in results]
+                entry["hit1"] += bool(hits[:1] and hits[0])
+                entry["hit5"] += expected in results[:5]
+            else:
+                entry["hit1"] += results[:1] == [expected]
+                entry["hit5"] += expected in results[:5]
+
+    print(f"\n{len(queries)} queries (limit {args.limit})")
+    report_latency("ILIKE (memory)", latencies["legacy"])
+    report_latency("search index", latencies["index"])
+
+    print("\nhit@1 / hit@5 by query kind")
+    for kind in ("prefix", "accents", "typo"):
+        line = f"  {kind:<8}"
+        for engine in ("legacy", "index"):
+            entry = stats[engine][kind]
+            total = entry["total"] or 1
+            line += f"  {engine}: {entry['hit1'] / total:6.1%} / {entry['hit5'] / total:6.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
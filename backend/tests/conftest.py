@@ -53,6 +53,13 @@ def mock_twilio_credentials(monkeypatch):
     monkeypatch.setenv("TWILIO_WHATSAPP_FROM", "whatsapp:+14155238886")
 
 
+@pytest.fixture(autouse=True)
+def disable_response_cache(monkeypatch):
+    """Desativa o cache Redis das rotas (cada teste usa seu proprio banco)."""
+    from app.config import settings
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+
+
 # Database fixtures for testing (async)
 @pytest.fixture(scope="function")
 async def test_db():
@@ -176,6 +183,8 @@ def mock_redis(monkeypatch):
     mock_redis_client.setex.return_value = True
     mock_redis_client.delete.return_value = True
     mock_redis_client.keys.return_value = []
+    mock_redis_client.scan_iter.return_value = iter([])
+    mock_redis_client.unlink.return_value = 0
     monkeypatch.setattr(cache, "get_redis_client", lambda: mock_redis_client)
     return mock_redis_client
 
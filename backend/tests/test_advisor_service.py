@@ -0,0 +1,150 @@
+"""Testes da atribuição de casos do Anjo Social."""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+
+from app.models.advisor import CasePriority, CaseStatus
+from app.services import advisor_service as service
+from app.services.advisor_service import AdvisorLoad, pick_advisor
+
+
+def _advisor(nome, specialties=(), max_active=10):
+    return SimpleNamespace(id=uuid4(), name=nome, specialties=list(specialties), max_active_cases=max_active)
+
+
+def _case(benefits, priority="medium"):
+    return SimpleNamespace(
+        id=uuid4(), benefits=list(benefits), priority=priority,
+        status=CaseStatus.OPEN.value, advisor_id=None, updated_at=None,
+    )
+
+
+def _db(*results):
+    """Sessao fake: cada execute devolve o proximo resultado."""
+    db = MagicMock()
+    db.execute = AsyncMock(side_effect=list(results))
+    return db
+
+
+def _rows(pairs):
+    result = MagicMock()
+    result.all.return_value = pairs
+    return result
+
+
+def _scalars(items):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = items
+    return result
+
+
+class TestEscolha:
+    def test_especialidade_antes_da_carga(self):
+        bpc = _advisor("BPC", ["BPC"])
+        livre = _advisor("Livre")
+        loads = [AdvisorLoad(livre, 0), AdvisorLoad(bpc, 5)]
+
+        assert pick_advisor(loads, ["BPC"]).advisor is bpc
+
+    def test_menor_carga_no_empate(self):
+        a, b = _advisor("A", ["BPC"]), _advisor("B", ["BPC"])
+        loads = [AdvisorLoad(a, 3), AdvisorLoad(b, 1)]
+
+        assert pick_advisor(loads, ["BPC"]).advisor is b
+
+    def test_sem_capacidade(self):
+        cheio = _advisor("Cheio", ["BPC"], max_active=2)
+        loads = [AdvisorLoad(cheio, 2)]
+
+        assert pick_advisor(loads, ["BPC"]) is None
+        assert pick_advisor(loads, ["BPC"], CasePriority.EMERGENCY.value).advisor is cheio
+
+    def test_sem_assessores(self):
+        assert pick_advisor([], ["BPC"]) is None
+
+
+class TestConsultas:
+    async def test_find_best_advisor_usa_uma_consulta(self):
+        bpc = _advisor("BPC", ["BPC"])
+        outros = [_advisor(f"A{i}") for i in range(300)]
+        db = _db(_rows([(a, 0) for a in outros] + [(bpc, 4)]))
+
+        assert await service.find_best_advisor(db, ["BPC"]) is bpc
+        assert db.execute.await_count == 1
+
+    async def test_atribui_fila_em_uma_passada(self):
+        bpc = _advisor("BPC", ["BPC"], max_active=2)
+        geral = _advisor("Geral", [], max_active=1)
+        # Fila ja na ordem do banco: emergencia primeiro, depois os mais antigos
+        casos = [
+            _case(["BPC"], priority=CasePriority.EMERGENCY.value),
+            _case(["BPC"]),
+            _case(["BPC"]),
+            _case(["Bolsa Família"]),
+        ]
+        db = _db(_scalars(casos), _rows([(bpc, 0), (geral, 0)]))
+
+        assigned = await service.assign_queued_cases(db)
+
+        assert db.execute.await_count == 2
+        # A carga e atualizada a cada atribuicao
+        assert [advisor.name for _, advisor in assigned] == ["BPC", "BPC", "Geral"]
+        assert assigned[0][0] is casos[0]
+        # BPC lotou: o terceiro caso BPC vai para o geral e o ultimo fica na fila
+        assert assigned[2][0] is casos[2]
+        assert casos[3].advisor_id is None
+        assert casos[3].status == CaseStatus.OPEN.value
+        assert all(case.status == CaseStatus.ASSIGNED.value for case, _ in assigned)
+
+    async def test_fila_vazia_nao_consulta_assessores(self):
+        db = _db(_scalars([]))
+
+        assert await service.assign_queued_cases(db) == []
+        assert db.execute.await_count == 1
+
+
+class TestConsultaDaFila:
+    def test_ordena_e_trava_no_banco(self):
+        sql = str(service.queued_cases_query(limit=5).compile(dialect=postgresql.dialect()))
+
+        assert "ORDER BY CASE WHEN" in sql
+        assert sql.index("ORDER BY") < sql.index("LIMIT")
+        assert sql.rstrip().endswith("FOR UPDATE SKIP LOCKED")
+
+    def test_limite_pega_emergencia_mais_nova(self):
+        """Com limite, a emergencia criada por ultimo entra antes dos antigos."""
+        engine = create_engine("sqlite://")
+        agora = datetime(2026, 1, 1, 12, 0)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE cases (id CHAR(32) PRIMARY KEY, advisor_id CHAR(32), "
+                "status VARCHAR(20), priority VARCHAR(20), created_at DATETIME)"
+            ))
+            for i, priority in enumerate(["low", "medium", "high", "medium", "emergency"]):
+                conn.execute(
+                    text("INSERT INTO cases VALUES (:id, NULL, 'open', :priority, :created_at)"),
+                    {"id": uuid4().hex, "priority": priority,
+                     "created_at": agora + timedelta(minutes=i)},
+                )
+
+            query = service.queued_cases_query(limit=2).with_only_columns(
+                service.Case.priority, service.Case.created_at
+            )
+            linhas = conn.execute(query).all()
+
+        assert [priority for priority, _ in linhas] == ["emergency", "high"]
+        engine.dispose()
+
+
+@pytest.mark.parametrize("priority, ordem", [
+    (CasePriority.EMERGENCY.value, 0),
+    (CasePriority.LOW.value, 3),
+])
+def test_ordem_de_prioridade(priority, ordem):
+    assert service.PRIORITY_ORDER[priority] == ordem
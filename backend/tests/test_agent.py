@@ -4,7 +4,7 @@ NOTE: Tests that require PostgreSQL features are skipped in SQLite test mode.
 """
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi import status
 
 from tests.conftest import requires_postgres
@@ -33,7 +33,7 @@ async def test_agent_chat(mock_get_agent, client):
     mock_agent = MagicMock()
     mock_agent.session_id = "test-session-123"
     mock_agent.tools_used = []
-    mock_agent.process_message.return_value = "Olá! Como posso ajudar?"
+    mock_agent.process_message_async = AsyncMock(return_value="Olá! Como posso ajudar?")
     mock_get_agent.return_value = mock_agent
 
     response = await client.post(
@@ -68,3 +68,112 @@ async def test_agent_status(client):
 
 
 
+
+
+# =============================================================================
+# Loop assíncrono do agente
+# =============================================================================
+
+def _response(*parts):
+    """Resposta fake do Gemini com as parts informadas."""
+    from types import SimpleNamespace
+    content = SimpleNamespace(parts=list(parts))
+    return SimpleNamespace(candidates=[SimpleNamespace(content=content)])
+
+
+def _call(name, **args):
+    from types import SimpleNamespace
+    return SimpleNamespace(function_call=SimpleNamespace(name=name, args=args))
+
+
+def _text(text):
+    from types import SimpleNamespace
+    return SimpleNamespace(text=text, function_call=SimpleNamespace(name=""))
+
+
+def _make_agent(*responses):
+    """Cria um TaNaMaoAgent sem modelo real, respondendo na ordem dada."""
+    import asyncio
+    from app.agent.agent import TaNaMaoAgent
+
+    agent = TaNaMaoAgent.__new__(TaNaMaoAgent)
+    agent.session_id = "test-session"
+    agent.api_base_url = "http://test"
+    agent.tools_used = []
+    agent._lock = asyncio.Lock()
+    agent.chat = MagicMock()
+    agent.chat.send_message_async = AsyncMock(side_effect=list(responses))
+    return agent
+
+
+@pytest.mark.agent
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_process_message_async_tools_concorrentes(monkeypatch):
+    """Function calls do mesmo turno rodam em paralelo, fora do event loop."""
+    import threading
+    from app.agent import agent as agent_module
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def tool_lenta(valor):
+        barrier.wait()  # só passa se as duas tools estiverem rodando juntas
+        return {"valor": valor}
+
+    monkeypatch.setitem(agent_module.TOOL_FUNCTIONS, "tool_a", tool_lenta)
+    monkeypatch.setitem(agent_module.TOOL_FUNCTIONS, "tool_b", tool_lenta)
+    monkeypatch.setattr(agent_module.genai.protos, "Part", lambda **kw: kw)
+    monkeypatch.setattr(agent_module.genai.protos, "FunctionResponse", lambda **kw: kw)
+
+    agent = _make_agent(
+        _response(_call("tool_a", valor=1), _call("tool_b", valor=2)),
+        _response(_text("Pronto")),
+    )
+    result = await agent.process_message_async("oi")
+
+    assert result == "Pronto"
+    assert sorted(agent.tools_used) == ["tool_a", "tool_b"]
+    sent = agent.chat.send_message_async.await_args_list[1].args[0]
+    assert [p["function_response"]["response"]["result"] for p in sent] == [
+        {"valor": 1}, {"valor": 2}
+    ]
+
+
+@pytest.mark.agent
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_execute_function_async_timeout(monkeypatch):
+    """Tool que estoura o timeout vira erro sem derrubar o turno."""
+    import asyncio
+    from app.agent import agent as agent_module
+
+    async def tool_travada():
+        await asyncio.sleep(10)
+
+    monkeypatch.setitem(agent_module.ASYNC_TOOL_FUNCTIONS, "tool_travada", tool_travada)
+    monkeypatch.setitem(agent_module.TOOL_TIMEOUTS, "tool_travada", 0.05)
+
+    agent = _make_agent()
+    result = await agent._execute_function_async(_call("tool_travada").function_call)
+
+    assert "Tempo esgotado" in result["error"]
+    assert agent.tools_used == []
+
+
+@pytest.mark.agent
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_execute_function_async_tool_nativa(monkeypatch):
+    """Tools async são aguardadas diretamente, sem o pool de threads."""
+    from app.agent import agent as agent_module
+
+    tool = AsyncMock(return_value={"cep": "01001000"})
+    monkeypatch.setitem(agent_module.ASYNC_TOOL_FUNCTIONS, "buscar_cep", tool)
+    monkeypatch.setattr(agent_module, "get_tool_executor", MagicMock(side_effect=AssertionError))
+
+    agent = _make_agent()
+    result = await agent._execute_function_async(_call("buscar_cep", cep="01001000").function_call)
+
+    assert result == {"cep": "01001000"}
+    tool.assert_awaited_once_with(cep="01001000")
+    assert agent.tools_used == ["buscar_cep"]
@@ -0,0 +1,269 @@
+"""Testes das sessões do agente V1 compartilhadas via Redis."""
+
+import pytest
+
+import google.generativeai as genai
+
+from app.agent import agent_sessions as modulo
+from app.agent.agent_sessions import (
+    AgentSessionStore,
+    history_from_dicts,
+    history_to_dicts,
+    trim_history,
+)
+
+
+class FakeChat:
+    def __init__(self, history):
+        self.history = list(history)
+
+
+class FakeAgent:
+    def __init__(self, session_id=None, history=None, tools_used=None):
+        self.session_id = session_id or "gerado"
+        self.chat = FakeChat(history or [])
+        self.tools_used = list(tools_used or [])
+
+    def falar(self, texto):
+        self.chat.history.append(genai.protos.Content(role="user", parts=[genai.protos.Part(text=texto)]))
+        self.chat.history.append(genai.protos.Content(role="model", parts=[genai.protos.Part(text="ok")]))
+
+    def reset(self):
+        self.chat = FakeChat([])
+        self.tools_used = []
+
+
+class FakePipeline:
+    """Pipeline com só ``incr`` e ``expire``, sobre o dict do ``redis_fake``."""
+
+    def __init__(self, dados):
+        self.dados = dados
+        self.comandos = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def incr(self, key):
+        self.comandos.append(("incr", key))
+
+    def expire(self, key, ttl):
+        self.comandos.append(("expire", key))
+
+    async def execute(self):
+        resultados = []
+        for comando, key in self.comandos:
+            if comando == "incr":
+                self.dados[key] = self.dados.get(key, 0) + 1
+                resultados.append(self.dados[key])
+            else:
+                resultados.append(True)
+        return resultados
+
+
+class FakeRedis:
+    def __init__(self, dados):
+        self.dados = dados
+
+    async def get(self, key):
+        self.dados.setdefault("_leituras", []).append(key)
+        return self.dados.get(key)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.dados)
+
+
+@pytest.fixture
+def redis_fake(monkeypatch):
+    """Redis compartilhado entre "workers" (dict em memória)."""
+    dados = {}
+    monkeypatch.setattr(modulo, "get_async_redis", lambda: FakeRedis(dados))
+
+    async def aget(key):
+        dados.setdefault("_leituras", []).append(key)
+        return dados.get(key)
+
+    async def aset(key, value, ttl=3600):
+        # Ida e volta pelo encoder, como no Redis de verdade
+        from app.core.cache import dumps, loads
+        dados[key] = loads(dumps(value))
+        return True
+
+    async def adelete(key):
+        dados.pop(key, None)
+        return True
+
+    monkeypatch.setattr(modulo, "aget_cache", aget)
+    monkeypatch.setattr(modulo, "aset_cache", aset)
+    monkeypatch.setattr(modulo, "adelete_cache", adelete)
+    return dados
+
+
+def _store(**kwargs):
+    return AgentSessionStore(factory=FakeAgent, **kwargs)
+
+
+class TestHistorico:
+    def test_ida_e_volta_com_function_call(self):
+        contents = [
+            genai.protos.Content(role="user", parts=[genai.protos.Part(text="meu cpf")]),
+            genai.protos.Content(role="model", parts=[genai.protos.Part(
+                function_call=genai.protos.FunctionCall(name="validar_cpf", args={"cpf": "52998224725"})
+            )]),
+            genai.protos.Content(role="user", parts=[genai.protos.Part(
+                function_response=genai.protos.FunctionResponse(name="validar_cpf", response={"valido": True})
+            )]),
+        ]
+
+        restored = history_from_dicts(history_to_dicts(contents))
+
+        assert restored == contents
+        assert restored[1].parts[0].function_call.args["cpf"] == "52998224725"
+
+    def test_corte_comeca_em_mensagem_do_usuario(self):
+        history = [
+            {"role": "user", "parts": [{"text": "oi"}]},
+            {"role": "model", "parts": [{"function_call": {"name": "f"}}]},
+            {"role": "user", "parts": [{"function_response": {"name": "f"}}]},
+            {"role": "model", "parts": [{"text": "pronto"}]},
+            {"role": "user", "parts": [{"text": "e agora?"}]},
+            {"role": "model", "parts": [{"text": "agora isso"}]},
+        ]
+
+        assert trim_history(history, 10) == history
+        # As 4 ultimas comecariam no function_response: corta ate "e agora?"
+        assert trim_history(history, 4) == history[4:]
+
+
+class TestStore:
+    async def test_outro_worker_reconstroi_o_chat(self, redis_fake):
+        worker_a, worker_b = _store(), _store()
+
+        agent = await worker_a.get_or_create("s1")
+        agent.falar("quero o bolsa familia")
+        agent.tools_used.append("consultar_beneficio")
+        await worker_a.save(agent)
+
+        outro = await worker_b.get_or_create("s1")
+
+        assert outro is not agent
+        assert [c.parts[0].text for c in outro.chat.history] == ["quero o bolsa familia", "ok"]
+        assert outro.tools_used == ["consultar_beneficio"]
+        assert worker_b.rebuilds == 1
+
+    async def test_reaproveita_agente_local_na_mesma_versao(self, redis_fake):
+        store = _store()
+        agent = await store.get_or_create("s1")
+        agent.falar("oi")
+        await store.save(agent)
+
+        assert await store.get_or_create("s1") is agent
+        assert store.rebuilds == 0
+
+    async def test_agente_local_le_so_o_contador(self, redis_fake):
+        """Na mesma versao, o historico gravado nao e buscado."""
+        store = _store()
+        agent = await store.get_or_create("s1")
+        agent.falar("oi")
+        await store.save(agent)
+        redis_fake["_leituras"] = []
+
+        assert await store.get("s1") is agent
+        assert redis_fake["_leituras"] == ["tanamao:agent:s1:v"]
+
+    async def test_versao_mais_nova_em_outro_worker_invalida_local(self, redis_fake):
+        worker_a, worker_b = _store(), _store()
+        agent_a = await worker_a.get_or_create("s1")
+        agent_a.falar("primeira")
+        await worker_a.save(agent_a)
+
+        agent_b = await worker_b.get_or_create("s1")
+        agent_b.falar("segunda")
+        await worker_b.save(agent_b)
+
+        atual = await worker_a.get_or_create("s1")
+        assert atual is not agent_a
+        assert len(atual.chat.history) == 4
+
+    async def test_gravacoes_concorrentes_nao_repetem_versao(self, redis_fake):
+        """Dois workers gravando a partir da mesma versao geram versoes distintas."""
+        worker_a, worker_b = _store(), _store()
+        inicial = await worker_a.get_or_create("s1")
+        inicial.falar("primeira")
+        await worker_a.save(inicial)
+        agent_b = await worker_b.get_or_create("s1")
+
+        # Os dois partem da versao 1 e gravam sem ver a gravacao do outro
+        inicial.falar("segunda em A")
+        await worker_a.save(inicial)
+        agent_b.falar("segunda em B")
+        await worker_b.save(agent_b)
+
+        assert redis_fake["tanamao:agent:s1:v"] == 3
+        assert redis_fake["tanamao:agent:s1"]["version"] == 3
+        # A gravou a versao 2, o Redis tem a 3 (de B): A reconstroi
+        atual = await worker_a.get_or_create("s1")
+        assert atual is not inicial
+        assert [c.parts[0].text for c in atual.chat.history][-2] == "segunda em B"
+        assert await worker_b.get_or_create("s1") is agent_b
+
+    async def test_lru_limita_agentes_em_memoria(self, redis_fake):
+        store = _store(max_agents=2)
+        for session_id in ("a", "b", "c"):
+            await store.save(await store.get_or_create(session_id))
+
+        assert len(store) == 2
+        assert "a" not in store
+        # O historico continua no Redis: a sessao volta sob demanda
+        assert (await store.get("a")).session_id == "a"
+        assert store.rebuilds == 1
+
+    async def test_ociosos_saem_da_memoria(self, redis_fake, monkeypatch):
+        store = _store(idle_seconds=60)
+        agora = [1000.0]
+        monkeypatch.setattr(modulo.time, "monotonic", lambda: agora[0])
+
+        await store.save(await store.get_or_create("velha"))
+        agora[0] += 120
+        await store.save(await store.get_or_create("nova"))
+
+        assert "velha" not in store
+        assert "nova" in store
+
+    async def test_sessao_desconhecida(self, redis_fake):
+        store = _store()
+
+        assert await store.get("nao-existe") is None
+        assert not await store.reset("nao-existe")
+        assert (await store.get_or_create("nao-existe")).session_id == "nao-existe"
+
+    async def test_reset_e_delete(self, redis_fake):
+        store = _store()
+        agent = await store.get_or_create("s1")
+        agent.falar("oi")
+        await store.save(agent)
+
+        assert await store.reset("s1")
+        assert redis_fake["tanamao:agent:s1"]["history"] == []
+
+        await store.delete("s1")
+        assert "s1" not in store
+        assert "tanamao:agent:s1" not in redis_fake
+        # O contador continua: uma sessao nova nao repete versoes antigas
+        assert redis_fake["tanamao:agent:s1:v"] == 2
+
+    async def test_redis_fora_mantem_agente_local(self, monkeypatch):
+        async def fora(*args, **kwargs):
+            return None
+
+        monkeypatch.setattr(modulo, "aget_cache", fora)
+        monkeypatch.setattr(modulo, "aset_cache", fora)
+        monkeypatch.setattr(modulo, "get_async_redis", lambda: None)
+        store = _store()
+
+        agent = await store.get_or_create("s1")
+        await store.save(agent)
+
+        assert await store.get_or_create("s1") is agent
@@ -0,0 +1,98 @@
+"""Testes das tabelas de resumo dos dashboards."""
+
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.jobs import atualizar_agregados as job
+from app.models import SummaryLevel
+from app.routers.aggregations import _avg_coverage
+
+
+def compilar(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class TestConsultas:
+    def test_nivel_nacional_sem_join(self):
+        sql = compilar(job._consulta_nivel(SummaryLevel.NATIONAL, None))
+        assert "JOIN" not in sql
+        assert "GROUP BY beneficiary_data.program_id, beneficiary_data.reference_date" in sql
+
+    def test_nivel_estadual_agrupa_por_sigla(self):
+        sql = compilar(job._consulta_nivel(SummaryLevel.STATE, None))
+        assert "JOIN states" in sql
+        assert "GROUP BY states.abbreviation" in sql
+
+    def test_escopo_da_carga(self):
+        stmt = job._no_escopo(
+            job._consulta_nivel(SummaryLevel.REGION, None), [1], [date(2024, 5, 1)]
+        )
+        sql = compilar(stmt)
+        assert "beneficiary_data.program_id IN" in sql
+        assert "beneficiary_data.reference_date IN" in sql
+
+
+class TestAtualizacao:
+    def test_escopo_repassado_e_commit(self):
+        db = MagicMock()
+        db.execute.return_value.rowcount = 2
+
+        resultado = job.atualizar_agregados(db, [3], [date(2024, 5, 1)])
+
+        # 1 delete + 3 niveis mensais, 1 delete + 1 insert municipal
+        assert db.execute.call_count == 6
+        assert resultado == {"beneficiary_summary": 6, "municipality_summary": 2}
+        db.commit.assert_called_once()
+
+    def test_rollback_em_erro(self):
+        db = MagicMock()
+        db.execute.side_effect = RuntimeError("falha")
+
+        with pytest.raises(RuntimeError):
+            job.atualizar_agregados(db)
+
+        db.rollback.assert_called_once()
+        db.commit.assert_not_called()
+
+    def test_programa_desconhecido_nao_atualiza(self):
+        db = MagicMock()
+        db.execute.return_value.scalars.return_value.all.return_value = []
+
+        with patch.object(job, "SessionLocal", return_value=db), \
+             patch.object(job, "atualizar_agregados") as atualizar, \
+             patch.object(job, "bump_data_generation") as bump:
+            resultado = job.atualizar_apos_carga("INEXISTENTE")
+
+        atualizar.assert_not_called()
+        bump.assert_not_called()
+        assert resultado == {"beneficiary_summary": 0, "municipality_summary": 0}
+        db.close.assert_called_once()
+
+    def test_carga_invalida_cache(self):
+        db = MagicMock()
+        db.execute.return_value.scalars.return_value.all.return_value = [7]
+
+        with patch.object(job, "SessionLocal", return_value=db), \
+             patch("app.jobs.update_coverage.recompute_coverage") as cobertura, \
+             patch.object(job, "atualizar_agregados", return_value={}) as atualizar, \
+             patch.object(job, "bump_data_generation") as bump:
+            job.atualizar_apos_carga("bpc", date(2024, 5, 1))
+
+        cobertura.assert_called_once_with(db, [7], [date(2024, 5, 1)])
+        atualizar.assert_called_once_with(db, [7], [date(2024, 5, 1)])
+        bump.assert_called_once()
+
+
+class TestMediaCobertura:
+    def test_media_igual_avg(self):
+        # AVG(0.5, 0.7, 0.9) sobre tres meses resumidos
+        row = SimpleNamespace(coverage_sum=2.1, coverage_count=3)
+        assert _avg_coverage(row) == pytest.approx(0.7)
+
+    def test_sem_cobertura(self):
+        assert _avg_coverage(SimpleNamespace(coverage_sum=None, coverage_count=0)) == 0
+        assert _avg_coverage(SimpleNamespace(coverage_sum=None, coverage_count=None)) == 0
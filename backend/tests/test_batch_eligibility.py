@@ -0,0 +1,260 @@
+"""Testes para a elegibilidade vetorizada em lote."""
+
+import io
+import random
+from unittest.mock import AsyncMock, patch
+
+import orjson
+import pandas as pd
+import pytest
+from fastapi import status
+
+from app.schemas.benefit import CitizenProfile
+from app.services.batch_eligibility import (
+    BatchEligibilityEngine,
+    detect_format,
+    iter_ndjson,
+    normalize_profiles,
+    read_profile_chunks,
+)
+from app.services.eligibility_service import evaluate_benefit
+from tests.test_benefit_catalog import (
+    CADUNICO_RULE,
+    RENDA_RULE,
+    make_benefit,
+    make_catalog,
+)
+
+
+BENEFITS = [
+    make_benefit(
+        "federal-bolsa-familia",
+        estimated_value={"type": "monthly", "min": 142, "max": 900},
+        eligibility_rules=[RENDA_RULE, CADUNICO_RULE],
+    ),
+    make_benefit(
+        "federal-bpc-idoso",
+        estimated_value={"type": "monthly", "min": 1412, "max": 1412},
+        eligibility_rules=[
+            {"field": "temIdoso65Mais", "operator": "eq", "value": True, "description": "Idoso"},
+            {"field": "rendaPerCapita", "operator": "lt", "value": 353, "description": "Renda"},
+        ],
+    ),
+    make_benefit(
+        "sp-estadual",
+        scope="state",
+        state="SP",
+        estimated_value={"type": "annual", "min": 100, "max": 301},
+        eligibility_rules=[
+            {"field": "temCarteiraAssinada", "operator": "eq", "value": True, "description": "CLT"},
+            {"field": "quantidadeFilhos", "operator": "gte", "value": 1, "description": "Filhos"},
+        ],
+    ),
+    make_benefit(
+        "rj-estadual",
+        scope="state",
+        state="RJ",
+        eligibility_rules=[
+            {"field": "idadeMulher", "operator": "in", "value": [20, 30], "description": "Idade"},
+        ],
+    ),
+    make_benefit(
+        "sp-capital",
+        scope="municipal",
+        municipality_ibge="3550308",
+        estimated_value={"type": "one_time", "min": 500},
+        eligibility_rules=[
+            {"field": "temPcd", "operator": "has", "description": "PcD"},
+            {"field": "fezSaqueFgts", "operator": "neq", "value": True, "description": "FGTS"},
+        ],
+    ),
+    make_benefit(
+        "setorial-pescador",
+        scope="sectoral",
+        sector="pescador",
+        eligibility_rules=[
+            {"field": "moradiaZonaRural", "operator": "not_has", "description": "Urbano"},
+        ],
+    ),
+]
+
+
+def random_rows(count, seed=42):
+    rng = random.Random(seed)
+    maybe_bool = [True, False, None]
+    rows = []
+    for i in range(count):
+        estado = rng.choice(["SP", "RJ", "MG"])
+        rows.append({
+            "familyId": f"F{i}",
+            "estado": estado,
+            "municipioIbge": rng.choice(["3550308", "3304557", None]),
+            "pessoasNaCasa": rng.randint(1, 7),
+            "rendaFamiliarMensal": rng.choice([0, 300, 800, 1500, 4000]),
+            "quantidadeFilhos": rng.randint(0, 4),
+            "temIdoso65Mais": rng.choice([True, False]),
+            "temGestante": rng.choice([True, False]),
+            "temCrianca0a6": rng.choice([True, False]),
+            "temPcd": rng.choice([True, False]),
+            "cadastradoCadunico": rng.choice([True, False]),
+            "recebeBolsaFamilia": rng.random() < 0.2,
+            "recebeBpc": rng.random() < 0.1,
+            "temCarteiraAssinada": rng.choice(maybe_bool),
+            "fezSaqueFgts": rng.choice(maybe_bool),
+            "pescadorArtesanal": rng.choice([True, False]),
+            "moradiaZonaRural": rng.choice([True, False]),
+            "idadeMulher": rng.choice([20, 25, 30, None]),
+        })
+    return rows
+
+
+def to_csv(rows):
+    return pd.DataFrame(rows).to_csv(index=False)
+
+
+def scalar_result(catalog, row):
+    """Resultado esperado usando o caminho escalar (evaluate_benefit)."""
+    profile = CitizenProfile(**{k: v for k, v in row.items() if v is not None})
+    benefits = catalog.for_location(profile.estado, profile.municipio_ibge)
+    benefits += [b for b in catalog.receivable if b not in benefits]
+
+    expected = {"eligible": [], "likelyEligible": [], "maybe": [], "alreadyReceiving": []}
+    keys = {
+        "eligible": "eligible",
+        "likely_eligible": "likelyEligible",
+        "maybe": "maybe",
+        "already_receiving": "alreadyReceiving",
+    }
+    monthly = 0.0
+    for benefit in catalog.ordered(benefits):
+        result = evaluate_benefit(profile, benefit)
+        if result.status in keys:
+            expected[keys[result.status]].append(benefit.id)
+        if (
+            result.status in ("eligible", "likely_eligible")
+            and result.estimated_value
+            and result.benefit.estimated_value.type == "monthly"
+        ):
+            monthly += result.estimated_value
+    return expected, monthly
+
+
+# =============================================================================
+# Leitura e normalizacao
+# =============================================================================
+
+class TestNormalizacao:
+    def test_aceita_alias_e_snake_case(self):
+        raw = pd.DataFrame({"estado": ["sp"], "pessoas_na_casa": ["3"], "temPcd": ["sim"]})
+        frame = normalize_profiles(raw)
+        assert frame.loc[0, "estado"] == "SP"
+        assert frame.loc[0, "pessoas_na_casa"] == 3
+        assert bool(frame.loc[0, "tem_pcd"]) is True
+
+    def test_preenche_padroes_do_perfil(self):
+        frame = normalize_profiles(pd.DataFrame({"estado": ["SP"]}))
+        assert frame.loc[0, "pessoas_na_casa"] == 1
+        assert bool(frame.loc[0, "tem_gestante"]) is False
+        assert pd.isna(frame.loc[0, "tem_carteira_assinada"])
+
+    def test_estado_obrigatorio(self):
+        with pytest.raises(ValueError):
+            normalize_profiles(pd.DataFrame({"pessoasNaCasa": [1]}))
+
+    def test_detect_format(self):
+        assert detect_format("familias.csv") == "csv"
+        assert detect_format("familias.parquet") == "parquet"
+        assert detect_format("familias.arrow") == "arrow"
+        with pytest.raises(ValueError):
+            detect_format("familias.xlsx")
+
+
+# =============================================================================
+# Equivalencia com o caminho escalar
+# =============================================================================
+
+class TestEquivalenciaEscalar:
+    def test_mesmos_resultados_que_evaluate_benefit(self):
+        catalog = make_catalog(*BENEFITS)
+        rows = random_rows(300)
+        engine = BatchEligibilityEngine(catalog)
+
+        families = []
+        for chunk in read_profile_chunks(io.StringIO(to_csv(rows)), "csv", chunk_size=70):
+            families.extend(engine.evaluate(chunk))
+
+        assert [f["familyId"] for f in families] == [r["familyId"] for r in rows]
+        for row, family in zip(rows, families):
+            expected, monthly = scalar_result(catalog, row)
+            for key, ids in expected.items():
+                assert family[key] == ids, (row, key)
+            assert family["totalPotentialMonthly"] == pytest.approx(monthly)
+
+    def test_agregados(self):
+        catalog = make_catalog(*BENEFITS)
+        rows = random_rows(50)
+        engine = BatchEligibilityEngine(catalog)
+
+        lines = list(iter_ndjson(engine, read_profile_chunks(io.StringIO(to_csv(rows)), "csv")))
+        payload = b"".join(lines).splitlines()
+        families = [orjson.loads(line) for line in payload[:-1]]
+        aggregates = orjson.loads(payload[-1])["aggregates"]
+
+        assert len(families) == 50
+        assert aggregates["totalFamilies"] == 50
+        assert aggregates["totalPotentialMonthly"] == pytest.approx(
+            sum(f["totalPotentialMonthly"] for f in families)
+        )
+        eligible_bf = sum("federal-bolsa-familia" in f["eligible"] for f in families)
+        assert aggregates["byBenefit"]["federal-bolsa-familia"].get("eligible", 0) == eligible_bf
+
+
+# =============================================================================
+# Endpoint
+# =============================================================================
+
+@pytest.fixture
+async def api_client():
+    """Cliente da API sem banco (o catalogo e mockado)."""
+    from httpx import AsyncClient
+    from app.main import app
+    from app.database import get_db
+
+    async def override_get_db():
+        yield None
+
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(app=app, base_url="http://test") as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+class TestBatchEndpoint:
+    async def test_stream_ndjson(self, api_client):
+        catalog = make_catalog(*BENEFITS)
+        rows = random_rows(20)
+        with patch(
+            "app.routers.benefits_v2.get_benefit_catalog",
+            AsyncMock(return_value=catalog),
+        ):
+            response = await api_client.post(
+                "/api/v2/benefits/eligibility/batch",
+                files={"file": ("familias.csv", to_csv(rows).encode(), "text/csv")},
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        lines = response.content.splitlines()
+        assert len(lines) == 21
+        assert orjson.loads(lines[-1])["aggregates"]["totalFamilies"] == 20
+
+    async def test_colunas_invalidas(self, api_client):
+        with patch(
+            "app.routers.benefits_v2.get_benefit_catalog",
+            AsyncMock(return_value=make_catalog(*BENEFITS)),
+        ):
+            response = await api_client.post(
+                "/api/v2/benefits/eligibility/batch",
+                files={"file": ("familias.csv", b"nome\nMaria\n", "text/csv")},
+            )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,343 @@
+"""
+Testes da consulta de beneficios por CPF com a base local primeiro.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models.beneficiario import Beneficiario, hash_cpf
+from app.services import beneficiarios_service
+from app.services.beneficiarios_service import (
+    ColetorConsultas,
+    base_atualizada,
+    buscar_por_hashes,
+    consultar_beneficios,
+    resposta_local,
+)
+
+CPF_MARIA = "52998224725"
+CPF_JOSE = "11144477735"
+
+
+def _beneficiario(cpf: str, referencia: date, **campos) -> Beneficiario:
+    dados = {
+        "cpf_hash": hash_cpf(cpf),
+        "cpf_masked": "***982.247-**",
+        "nome": "MARIA DA SILVA",
+        "uf": "SP",
+        "bf_ativo": True,
+        "bf_valor": Decimal("600.00"),
+        "bf_parcela_mes": referencia.strftime("%Y-%m"),
+        "bf_data_referencia": referencia,
+        "bpc_ativo": False,
+    }
+    dados.update(campos)
+    return Beneficiario(**dados)
+
+
+@pytest.fixture
+async def test_db(tmp_path):
+    """Banco SQLite so com a tabela beneficiarios."""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'beneficiarios.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Beneficiario.__table__.create)
+
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.fixture
+def coletor(test_db):
+    """Coletor usando a sessao de teste."""
+
+    @asynccontextmanager
+    async def fabrica():
+        yield test_db
+
+    coletor = ColetorConsultas(session_factory=fabrica)
+    with patch.object(beneficiarios_service, "_coletor", coletor), \
+            patch.object(beneficiarios_service, "_filtro", None), \
+            patch.object(beneficiarios_service, "_base_indisponivel_ate", 0.0):
+        yield coletor
+
+
+@pytest.fixture
+def cache_fake():
+    """Cache do Redis em memoria para o transparencia_service."""
+    dados = {}
+
+    async def aget(key):
+        return dados.get(key)
+
+    async def aset(key, value, ttl=3600):
+        dados[key] = value
+        return True
+
+    with patch("app.services.transparencia_service.aget_cache", aget), \
+            patch("app.services.transparencia_service.aset_cache", aset), \
+            patch("app.services.transparencia_service.settings.CACHE_ENABLED", True):
+        yield dados
+
+
+def _mes_atual() -> date:
+    return date.today().replace(day=1)
+
+
+class TestBuscaEmLote:
+    """Testes da busca por varios hashes."""
+
+    @pytest.mark.asyncio
+    async def test_busca_varios_hashes(self, test_db):
+        """Deve retornar so os hashes encontrados."""
+        test_db.add(_beneficiario(CPF_MARIA, _mes_atual()))
+        await test_db.flush()
+
+        encontrados = await buscar_por_hashes(
+            test_db, [hash_cpf(CPF_MARIA), hash_cpf(CPF_JOSE), hash_cpf(CPF_MARIA)]
+        )
+
+        assert list(encontrados) == [hash_cpf(CPF_MARIA)]
+
+    @pytest.mark.asyncio
+    async def test_coletor_agrupa_consultas(self, test_db, coletor):
+        """Consultas concorrentes devem virar uma unica query."""
+        test_db.add(_beneficiario(CPF_MARIA, _mes_atual()))
+        test_db.add(_beneficiario(CPF_JOSE, _mes_atual(), nome="JOSE"))
+        await test_db.flush()
+
+        resultados = await asyncio.gather(
+            coletor.buscar(hash_cpf(CPF_MARIA)),
+            coletor.buscar(hash_cpf(CPF_JOSE)),
+            coletor.buscar(hash_cpf("39053344705")),
+            coletor.buscar(hash_cpf(CPF_MARIA)),
+        )
+
+        assert coletor.queries == 1
+        assert resultados[0].nome == "MARIA DA SILVA"
+        assert resultados[1].nome == "JOSE"
+        assert resultados[2] is None
+        assert resultados[3] is resultados[0]
+
+
+class TestFrescor:
+    """Testes da idade do dado local."""
+
+    def test_base_recente(self):
+        """Mes atual deve estar atualizado."""
+        assert base_atualizada(_beneficiario(CPF_MARIA, _mes_atual())) is True
+
+    def test_base_antiga(self):
+        """Dado de meses atras deve estar desatualizado."""
+        antigo = date.today() - timedelta(days=200)
+        assert base_atualizada(_beneficiario(CPF_MARIA, antigo)) is False
+
+    def test_usa_referencia_mais_recente(self):
+        """Vale o mes mais recente entre Bolsa Familia e BPC."""
+        antigo = date.today() - timedelta(days=200)
+        beneficiario = _beneficiario(CPF_MARIA, antigo, bpc_ativo=True, bpc_data_referencia=_mes_atual())
+        assert base_atualizada(beneficiario) is True
+
+    def test_resposta_no_formato_da_api(self):
+        """Resposta local deve ter o formato de consultar_todos_beneficios."""
+        beneficiario = _beneficiario(
+            CPF_MARIA, _mes_atual(), bpc_ativo=True, bpc_valor=Decimal("1412.00"), bpc_tipo="IDOSO",
+        )
+        resposta = resposta_local(beneficiario)
+
+        assert resposta["beneficiario_algum_programa"] is True
+        assert resposta["quantidade_beneficios"] == 2
+        assert resposta["total_mensal_estimado"] == 2012.0
+        assert resposta["detalhes"]["bpc"]["tipo"] == "IDOSO"
+        assert "Mock" not in resposta["fonte"]
+        # A base so tem Bolsa Familia e BPC
+        assert resposta["programas_consultados"] == ["bolsa_familia", "bpc"]
+        assert resposta["parcial"] is True
+        assert "Auxilio Gas" in resposta["aviso_parcial"]
+
+
+class TestConsultaUnificada:
+    """Testes da consulta base local -> API."""
+
+    @pytest.mark.asyncio
+    async def test_responde_da_base_local(self, test_db, coletor):
+        """CPF na base atualizada nao deve chamar a API."""
+        test_db.add(_beneficiario(CPF_MARIA, _mes_atual()))
+        await test_db.flush()
+
+        remoto = AsyncMock()
+        with patch("app.services.transparencia_service.consultar_beneficios_ou_mock", remoto):
+            resposta = await consultar_beneficios("529.982.247-25")
+
+        remoto.assert_not_awaited()
+        assert resposta["fonte"].startswith("Base local")
+        assert resposta["total_mensal_estimado"] == 600.0
+        assert resposta["parcial"] is True
+
+    @pytest.mark.asyncio
+    async def test_base_local_completa_com_a_api(self, test_db, coletor, cache_fake):
+        """Auxilio Gas e Seguro Defeso vem da API e entram nos totais."""
+        test_db.add(_beneficiario(CPF_MARIA, _mes_atual()))
+        await test_db.flush()
+
+        gas = AsyncMock(return_value={
+            "beneficiario": True, "programa": "Auxilio Gas",
+            "ultima_parcela": {"mes_ano": "2026-08", "valor": 104.0},
+        })
+        defeso = AsyncMock(return_value={"beneficiario": False, "programa": "Seguro Defeso"})
+        todos = AsyncMock()
+        with patch("app.services.transparencia_service.is_transparencia_configured", return_value=True), \
+                patch("app.services.transparencia_service.consultar_auxilio_gas", gas), \
+                patch("app.services.transparencia_service.consultar_seguro_defeso", defeso), \
+                patch("app.services.transparencia_service.consultar_beneficios_ou_mock", todos):
+            resposta = await consultar_beneficios(CPF_MARIA)
+
+        todos.assert_not_awaited()
+        gas.assert_awaited_once_with(CPF_MARIA)
+        assert resposta["programas_consultados"] == ["bolsa_familia", "bpc", "auxilio_gas", "seguro_defeso"]
+        assert resposta["parcial"] is False
+        assert "aviso_parcial" not in resposta
+        assert resposta["quantidade_beneficios"] == 2
+        assert resposta["total_mensal_estimado"] == 704.0
+
+    @pytest.mark.asyncio
+    async def test_complemento_vem_do_cache_no_mes(self, test_db, coletor, cache_fake):
+        """So a primeira consulta do CPF chama a API para os outros programas."""
+        test_db.add(_beneficiario(CPF_MARIA, _mes_atual()))
+        await test_db.flush()
+
+        gas = AsyncMock(return_value={"beneficiario": False, "programa": "Auxilio Gas"})
+        defeso = AsyncMock(return_value={"beneficiario": False, "programa": "Seguro Defeso"})
+        with patch("app.services.transparencia_service.is_transparencia_configured", return_value=True), \
+                patch("app.services.transparencia_service.consultar_auxilio_gas", gas), \
+                patch("app.services.transparencia_service.consultar_seguro_defeso", defeso):
+            primeira = await consultar_beneficios(CPF_MARIA)
+            segunda = await consultar_beneficios(CPF_MARIA)
+
+        assert gas.await_count == 1 and defeso.await_count == 1
+        assert primeira["parcial"] is False and segunda["parcial"] is False
+        assert segunda["programas_consultados"] == primeira["programas_consultados"]
+
+    @pytest.mark.asyncio
+    async def test_complemento_usa_consulta_completa_em_cache(self, test_db, coletor, cache_fake):
+        """Detalhes da consulta completa ja guardada evitam a API."""
+        from app.services.transparencia_service import _chave_cache
+
+        test_db.add(_beneficiario(CPF_MARIA, _mes_atual()))
+        await test_db.flush()
+        cache_fake[_chave_cache(CPF_MARIA)] = {"detalhes": {
+            "auxilio_gas": {"beneficiario": True, "programa": "Auxilio Gas", "valor_mensal": 104.0},
+            "seguro_defeso": {"beneficiario": False, "programa": "Seguro Defeso"},
+        }}
+
+        api = AsyncMock(side_effect=AssertionError("API nao deveria ser chamada"))
+        with patch("app.services.transparencia_service.is_transparencia_configured", return_value=True), \
+                patch("app.services.transparencia_service.consultar_auxilio_gas", api), \
+                patch("app.services.transparencia_service.consultar_seguro_defeso", api):
+            resposta = await consultar_beneficios(CPF_MARIA)
+
+        assert resposta["total_mensal_estimado"] == 704.0
+        assert resposta["parcial"] is False
+
+    @pytest.mark.asyncio
+    async def test_erro_na_api_deixa_resposta_parcial(self, test_db, coletor, cache_fake):
+        """Programa com erro na API fica fora dos consultados."""
+        test_db.add(_beneficiario(CPF_MARIA, _mes_atual()))
+        await test_db.flush()
+
+        gas = AsyncMock(return_value={"beneficiario": False, "erro": "Limite", "programa": "Auxilio Gas"})
+        defeso = AsyncMock(side_effect=TimeoutError("timeout"))
+        with patch("app.services.transparencia_service.is_transparencia_configured", return_value=True), \
+                patch("app.services.transparencia_service.consultar_auxilio_gas", gas), \
+                patch("app.services.transparencia_service.consultar_seguro_defeso", defeso):
+            resposta = await consultar_beneficios(CPF_MARIA)
+
+        assert resposta["programas_consultados"] == ["bolsa_familia", "bpc"]
+        assert resposta["parcial"] is True
+        assert resposta["total_mensal_estimado"] == 600.0
+
+    @pytest.mark.asyncio
+    async def test_cpf_ausente_consulta_api(self, coletor):
+        """CPF fora da base deve ir para a API."""
+        remoto = AsyncMock(return_value={"cpf_consultado": True, "fonte": "Portal da Transparencia"})
+        with patch("app.services.transparencia_service.consultar_beneficios_ou_mock", remoto):
+            resposta = await consultar_beneficios(CPF_JOSE)
+
+        remoto.assert_awaited_once_with(CPF_JOSE)
+        assert resposta["fonte"] == "Portal da Transparencia"
+
+    @pytest.mark.asyncio
+    async def test_base_antiga_consulta_api(self, test_db, coletor):
+        """Dado local antigo deve ser atualizado pela API."""
+        test_db.add(_beneficiario(CPF_MARIA, date.today() - timedelta(days=200)))
+        await test_db.flush()
+
+        remoto = AsyncMock(return_value={
+            "cpf_consultado": True,
+            "detalhes": {"bolsa_familia": {"beneficiario": False}},
+            "fonte": "Portal da Transparencia",
+        })
+        with patch("app.services.transparencia_service.is_transparencia_configured", return_value=True), \
+                patch("app.services.transparencia_service.consultar_beneficios_ou_mock", remoto):
+            resposta = await consultar_beneficios(CPF_MARIA)
+
+        remoto.assert_awaited_once()
+        assert resposta["fonte"] == "Portal da Transparencia"
+
+    @pytest.mark.asyncio
+    async def test_api_fora_usa_base_antiga(self, test_db, coletor):
+        """Se a API falhar, o dado local antigo e devolvido com aviso."""
+        test_db.add(_beneficiario(CPF_MARIA, date.today() - timedelta(days=200)))
+        await test_db.flush()
+
+        remoto = AsyncMock(return_value={
+            "cpf_consultado": True,
+            "detalhes": {"bolsa_familia": {"erro": "Limite"}, "bpc": {"erro": "Limite"}},
+        })
+        with patch("app.services.transparencia_service.is_transparencia_configured", return_value=True), \
+                patch("app.services.transparencia_service.consultar_beneficios_ou_mock", remoto):
+            resposta = await consultar_beneficios(CPF_MARIA)
+
+        assert resposta["desatualizado"] is True
+        assert resposta["total_mensal_estimado"] == 600.0
+
+    @pytest.mark.asyncio
+    async def test_filtro_pula_a_base(self, coletor):
+        """Hash fora do filtro nao deve consultar a base."""
+        remoto = AsyncMock(return_value={"cpf_consultado": True})
+        with patch.object(beneficiarios_service, "_filtro", set()), \
+                patch("app.services.transparencia_service.consultar_beneficios_ou_mock", remoto):
+            await consultar_beneficios(CPF_MARIA)
+
+        assert coletor.queries == 0
+        remoto.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_base_fora_do_ar_vai_para_api(self):
+        """Erro na base deve cair para a API e pular a base por um tempo."""
+
+        @asynccontextmanager
+        async def fabrica_quebrada():
+            raise OSError("connection refused")
+            yield
+
+        coletor = ColetorConsultas(session_factory=fabrica_quebrada)
+        remoto = AsyncMock(return_value={"cpf_consultado": True})
+        with patch.object(beneficiarios_service, "_coletor", coletor), \
+                patch.object(beneficiarios_service, "_filtro", None), \
+                patch.object(beneficiarios_service, "_base_indisponivel_ate", 0.0), \
+                patch("app.services.transparencia_service.consultar_beneficios_ou_mock", remoto):
+            await consultar_beneficios(CPF_MARIA)
+            assert beneficiarios_service._base_indisponivel_ate > 0
+            await consultar_beneficios(CPF_JOSE)
+
+        assert remoto.await_count == 2
+        assert coletor.queries == 0
@@ -0,0 +1,236 @@
+"""Testes para o catalogo compilado de beneficios e a elegibilidade."""
+
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models.benefit import Benefit
+from app.schemas.benefit import CitizenProfile
+from app.services import benefit_catalog
+from app.services.benefit_catalog import (
+    BenefitCatalog,
+    CatalogBenefit,
+    compile_rule,
+    invalidate_benefit_catalog,
+)
+from app.services.eligibility_service import (
+    evaluate_all_benefits,
+    evaluate_benefit,
+    evaluate_rule,
+)
+
+
+def make_benefit(benefit_id, scope="federal", **kwargs):
+    return Benefit(
+        id=benefit_id,
+        name=kwargs.pop("name", benefit_id),
+        short_description="",
+        scope=scope,
+        where_to_apply=kwargs.pop("where_to_apply", "CRAS"),
+        documents_required=kwargs.pop("documents_required", []),
+        eligibility_rules=kwargs.pop("eligibility_rules", []),
+        last_updated=date(2026, 1, 1),
+        status="active",
+        **kwargs,
+    )
+
+
+def make_catalog(*benefits):
+    return BenefitCatalog([CatalogBenefit.from_model(b) for b in benefits])
+
+
+def make_profile(**kwargs):
+    data = {"estado": "SP", "pessoasNaCasa": 4, "rendaFamiliarMensal": 600}
+    data.update(kwargs)
+    return CitizenProfile(**data)
+
+
+RENDA_RULE = {
+    "field": "rendaPerCapita",
+    "operator": "lte",
+    "value": 218,
+    "description": "Renda per capita ate R$ 218",
+}
+CADUNICO_RULE = {
+    "field": "cadastradoCadunico",
+    "operator": "eq",
+    "value": True,
+    "description": "Inscrito no CadUnico",
+}
+
+
+# =============================================================================
+# Regras compiladas
+# =============================================================================
+
+class TestCompileRule:
+    @pytest.mark.parametrize("operator,value,expected", [
+        ("eq", 4, True),
+        ("neq", 4, False),
+        ("lt", 5, True),
+        ("lte", 4, True),
+        ("gt", 4, False),
+        ("gte", "4", True),
+        ("in", [3, 4], True),
+        ("not_in", [3, 4], False),
+        ("in", 4, False),
+        ("has", None, True),
+        ("not_has", None, False),
+        ("unknown", 4, False),
+    ])
+    def test_operadores(self, operator, value, expected):
+        rule = {"field": "pessoasNaCasa", "operator": operator, "value": value}
+        result = compile_rule(rule).evaluate(make_profile())
+        assert result.passed is expected
+        assert result.inconclusive is False
+
+    def test_campo_calculado(self):
+        result = compile_rule(RENDA_RULE).evaluate(make_profile())
+        assert result.actual_value == 150
+        assert result.passed is True
+
+    def test_campo_ausente_inconclusivo(self):
+        rule = {"field": "temCarteiraAssinada", "operator": "eq", "value": True}
+        result = compile_rule(rule).evaluate(make_profile())
+        assert result.inconclusive is True
+        assert result.passed is False
+
+    def test_evaluate_rule_usa_mesma_semantica(self):
+        profile = make_profile()
+        assert evaluate_rule(profile, RENDA_RULE) == compile_rule(RENDA_RULE).evaluate(profile)
+
+
+# =============================================================================
+# Indices do catalogo
+# =============================================================================
+
+class TestBenefitCatalog:
+    def setup_method(self):
+        self.catalog = make_catalog(
+            make_benefit("federal-a"),
+            make_benefit("sp-estadual", scope="state", state="SP"),
+            make_benefit("rj-estadual", scope="state", state="RJ"),
+            make_benefit("sp-capital", scope="municipal", state="SP", municipality_ibge="3550308"),
+            make_benefit("setorial-pescador", scope="sectoral", sector="pescador"),
+            make_benefit("setorial-rj", scope="sectoral", state="RJ", sector="agricultor"),
+        )
+
+    def test_for_location_estado(self):
+        ids = [b.id for b in self.catalog.for_location("SP")]
+        assert ids == ["federal-a", "sp-estadual", "setorial-pescador"]
+
+    def test_for_location_municipio(self):
+        ids = [b.id for b in self.catalog.for_location("SP", "3550308")]
+        assert ids == ["federal-a", "sp-estadual", "sp-capital", "setorial-pescador"]
+
+    def test_for_location_scope(self):
+        ids = [b.id for b in self.catalog.for_location("RJ", scope="sectoral")]
+        assert ids == ["setorial-pescador", "setorial-rj"]
+
+    def test_all_por_scope(self):
+        assert len(self.catalog.all()) == 6
+        assert len(self.catalog.all("state")) == 2
+
+    def test_delega_atributos_do_modelo(self):
+        benefit = self.catalog.get("federal-a")
+        assert benefit.to_dict()["id"] == "federal-a"
+        assert benefit.where_to_apply == "CRAS"
+
+
+# =============================================================================
+# Elegibilidade usando o catalogo
+# =============================================================================
+
+class TestEvaluateAllBenefits:
+    def setup_method(self):
+        self.benefits = [
+            make_benefit(
+                "federal-bolsa-familia",
+                estimated_value={"type": "monthly", "min": 142, "max": 900},
+                eligibility_rules=[RENDA_RULE, CADUNICO_RULE],
+                documents_required=["CPF", "Comprovante de residencia"],
+            ),
+            make_benefit("sp-estadual", scope="state", state="SP", documents_required=["RG"]),
+            make_benefit("rj-estadual", scope="state", state="RJ"),
+        ]
+        self.catalog = make_catalog(*self.benefits)
+
+    async def evaluate(self, profile, **kwargs):
+        with patch(
+            "app.services.eligibility_service.get_benefit_catalog",
+            AsyncMock(return_value=self.catalog),
+        ):
+            return await evaluate_all_benefits(None, profile, **kwargs)
+
+    async def test_resultados_iguais_ao_caminho_escalar(self):
+        profile = make_profile(cadastradoCadunico=True)
+        response = await self.evaluate(profile, include_not_applicable=True)
+
+        scalar = {b.id: evaluate_benefit(profile, b).status for b in self.benefits}
+        statuses = {
+            r.benefit.id: r.status
+            for group in (
+                response.summary.eligible,
+                response.summary.not_applicable,
+            )
+            for r in group
+        }
+        assert statuses == scalar
+        assert response.summary.total_analyzed == 3
+
+    async def test_documentos_e_passos(self):
+        response = await self.evaluate(make_profile(cadastradoCadunico=True))
+        summary = response.summary
+
+        assert [r.benefit.id for r in summary.eligible] == ["federal-bolsa-familia", "sp-estadual"]
+        assert summary.total_analyzed == 3
+        assert set(summary.documents_needed) == {"RG", "CPF", "Comprovante de residencia"}
+        assert summary.priority_steps[0] == "Solicite o federal-bolsa-familia - CRAS"
+
+    async def test_nao_elegivel_fora_da_resposta(self):
+        response = await self.evaluate(make_profile())
+        summary = response.summary
+
+        assert [r.benefit.id for r in summary.eligible] == ["sp-estadual"]
+        assert summary.not_eligible == []
+        assert summary.not_applicable == []
+
+    async def test_ja_recebe(self):
+        response = await self.evaluate(make_profile(recebeBolsaFamilia=True))
+        ids = [r.benefit.id for r in response.summary.already_receiving]
+        assert ids == ["federal-bolsa-familia"]
+
+
+# =============================================================================
+# Cache do processo
+# =============================================================================
+
+class TestCatalogoProcesso:
+    async def test_nao_recarrega_quando_fresco(self, monkeypatch):
+        catalog = make_catalog(make_benefit("federal-a"))
+        load = AsyncMock(return_value=catalog)
+        monkeypatch.setattr(benefit_catalog, "load_benefit_catalog", load)
+        monkeypatch.setattr(benefit_catalog, "_catalog", None)
+        monkeypatch.setattr(benefit_catalog, "_generation", 0)
+
+        first = await benefit_catalog.get_benefit_catalog(None)
+        second = await benefit_catalog.get_benefit_catalog(None)
+
+        assert first is second is catalog
+        load.assert_awaited_once()
+
+    async def test_invalidate_recarrega(self, monkeypatch):
+        old = make_catalog(make_benefit("federal-a"))
+        new = make_catalog(make_benefit("federal-b"))
+        load = AsyncMock(side_effect=[old, new])
+        monkeypatch.setattr(benefit_catalog, "load_benefit_catalog", load)
+        monkeypatch.setattr(benefit_catalog, "_catalog", None)
+        monkeypatch.setattr(benefit_catalog, "_generation", 0)
+
+        await benefit_catalog.get_benefit_catalog(None)
+        invalidate_benefit_catalog()
+        result = await benefit_catalog.get_benefit_catalog(None)
+
+        assert result is new
+        assert load.await_count == 2
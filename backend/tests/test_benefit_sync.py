@@ -0,0 +1,223 @@
+"""Testes da sincronizacao incremental do catalogo de beneficios."""
+
+import json
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services import benefit_sync
+from app.services.benefit_sync import (
+    FEED_NAME,
+    MANIFEST_NAME,
+    apply_changes,
+    discover_source_files,
+    load_manifest,
+    plan_sync,
+    sync_benefits,
+)
+
+
+def _beneficio(benefit_id, **extra):
+    return {"id": benefit_id, "name": benefit_id.title(), "eligibilityRules": [], **extra}
+
+
+def _gravar(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+@pytest.fixture
+def catalogo(tmp_path):
+    """Catalogo pequeno no formato do frontend."""
+    raiz = tmp_path / "benefits"
+    _gravar(raiz / "federal.json", {"benefits": [_beneficio("federal-a"), _beneficio("federal-b")]})
+    _gravar(raiz / "sectoral.json", {"benefits": [_beneficio("setor-a", scope="sectoral", sector="pescador")]})
+    _gravar(raiz / "states" / "sp.json", {"benefits": [_beneficio("sp-a", scope="state")]})
+    _gravar(raiz / "municipalities" / "3550308.json", {
+        "state": "SP",
+        "benefits": [_beneficio("sp-capital-a", scope="municipal"), _beneficio("sp-capital-b", scope="municipal")],
+    })
+    _gravar(raiz / "audit-report.json", {"benefits": {"total": 6}})
+    return raiz
+
+
+def _editar(path, alterar):
+    data = json.loads(path.read_text(encoding="utf-8"))
+    alterar(data)
+    _gravar(path, data)
+    # Garante mtime diferente mesmo em sistemas de arquivo com resolucao baixa
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestPlanejamento:
+    """Testes do diff entre o catalogo e o manifest."""
+
+    def test_primeira_carga_insere_tudo(self, catalogo):
+        """Sem manifest e com a tabela vazia, tudo vira insert."""
+        mudancas, manifest = plan_sync(catalogo, {}, previous={})
+
+        assert sorted(r["id"] for r in mudancas.inserts) == [
+            "federal-a", "federal-b", "setor-a", "sp-a", "sp-capital-a", "sp-capital-b",
+        ]
+        assert not mudancas.updates and not mudancas.deletes
+        assert mudancas.files_parsed == 4
+        assert "audit-report.json" not in manifest["files"]
+
+    def test_local_vem_do_nome_do_arquivo(self, catalogo):
+        """Estado e municipio ausentes sao preenchidos pelo arquivo."""
+        mudancas, _ = plan_sync(catalogo, {}, previous={})
+        por_id = {r["id"]: r for r in mudancas.inserts}
+
+        assert por_id["sp-a"]["state"] == "SP"
+        assert por_id["sp-capital-a"]["municipality_ibge"] == "3550308"
+        assert por_id["sp-capital-a"]["state"] == "SP"
+
+    def test_sem_mudanca_nao_le_arquivos(self, catalogo):
+        """Com o manifest em dia, nenhum arquivo e parseado."""
+        _, manifest = plan_sync(catalogo, {}, previous={})
+        mudancas, _ = plan_sync(catalogo, manifest)
+
+        assert not mudancas
+        assert mudancas.files_parsed == 0
+
+    def test_edicao_de_um_beneficio(self, catalogo):
+        """Editar um beneficio gera um update e parseia so aquele arquivo."""
+        _, manifest = plan_sync(catalogo, {}, previous={})
+        _editar(catalogo / "municipalities" / "3550308.json",
+                lambda d: d["benefits"][0].update(name="Novo nome"))
+
+        mudancas, _ = plan_sync(catalogo, manifest)
+
+        assert [r["id"] for r in mudancas.updates] == ["sp-capital-a"]
+        assert mudancas.updates[0]["name"] == "Novo nome"
+        assert not mudancas.inserts and not mudancas.deletes
+        assert mudancas.files_parsed == 1
+        assert mudancas.changes == [{
+            "op": "update", "id": "sp-capital-a", "scope": "municipal",
+            "state": "SP", "municipality_ibge": "3550308",
+        }]
+
+    def test_arquivo_tocado_sem_mudanca(self, catalogo):
+        """mtime novo com o mesmo conteudo nao gera mudancas nem parse."""
+        _, manifest = plan_sync(catalogo, {}, previous={})
+        _editar(catalogo / "federal.json", lambda d: None)
+
+        mudancas, novo = plan_sync(catalogo, manifest)
+
+        assert not mudancas
+        assert mudancas.files_parsed == 0
+        assert novo["files"]["federal.json"]["mtime_ns"] != manifest["files"]["federal.json"]["mtime_ns"]
+
+    def test_remocoes(self, catalogo):
+        """Beneficio removido e arquivo apagado viram deletes."""
+        _, manifest = plan_sync(catalogo, {}, previous={})
+        _editar(catalogo / "federal.json", lambda d: d["benefits"].pop())
+        (catalogo / "states" / "sp.json").unlink()
+
+        mudancas, novo = plan_sync(catalogo, manifest)
+
+        assert sorted(mudancas.deletes) == ["federal-b", "sp-a"]
+        assert mudancas.files_removed == 1
+        assert "states/sp.json" not in novo["files"]
+        assert {"op": "delete", "id": "sp-a", "scope": "state", "state": "SP",
+                "municipality_ibge": None} in mudancas.changes
+
+    def test_diff_contra_o_banco(self, catalogo):
+        """Sem manifest, o diff e feito contra o que ja esta na tabela."""
+        _, manifest = plan_sync(catalogo, {}, previous={})
+        no_banco = benefit_sync._merged_state(manifest["files"], list(manifest["files"]))
+        no_banco["antigo"] = ("x", "federal", None, None)
+        no_banco["federal-a"] = ("hash-velho",) + no_banco["federal-a"][1:]
+
+        mudancas, _ = plan_sync(catalogo, {}, previous=no_banco)
+
+        assert [r["id"] for r in mudancas.updates] == ["federal-a"]
+        assert mudancas.deletes == ["antigo"]
+        assert not mudancas.inserts
+
+    def test_arquivos_do_catalogo(self, catalogo):
+        """Relatorios de auditoria na mesma pasta sao ignorados."""
+        assert discover_source_files(catalogo) == [
+            "federal.json", "sectoral.json", "states/sp.json", "municipalities/3550308.json",
+        ]
+
+
+class TestAplicacao:
+    """Testes da escrita no banco e do change feed."""
+
+    @pytest.mark.asyncio
+    async def test_statements_em_lote(self, catalogo):
+        """Inserts, updates e deletes saem em statements em lote."""
+        mudancas, _ = plan_sync(catalogo, {}, previous={"removido": ("x", "federal", None, None)})
+        session = MagicMock()
+        session.execute = AsyncMock()
+
+        await apply_changes(session, mudancas)
+
+        assert session.execute.await_count == 2
+        delete_stmt = session.execute.await_args_list[0].args[0]
+        assert delete_stmt.is_delete
+        linhas = session.execute.await_args_list[1].args[1]
+        assert len(linhas) == 6
+        assert all(linha["updated_at"] == linha["created_at"] for linha in linhas)
+
+    @pytest.mark.asyncio
+    async def test_sync_grava_manifest_e_feed(self, catalogo, tmp_path):
+        """Sync aplica, faz commit, salva o manifest e escreve o feed."""
+        estado = tmp_path / "sync"
+        session = MagicMock()
+        session.execute = AsyncMock()
+        session.commit = AsyncMock()
+
+        ids = {"federal-a", "federal-b", "setor-a", "sp-a", "sp-capital-a", "sp-capital-b"}
+        with patch.object(benefit_sync, "load_database_state", AsyncMock(return_value={})), \
+                patch.object(benefit_sync, "load_database_ids", AsyncMock(return_value=ids)), \
+                patch("app.services.benefit_catalog.invalidate_benefit_catalog") as invalidar:
+            primeira = await sync_benefits(session, source_dir=catalogo, state_dir=estado, workers=1)
+            segunda = await sync_benefits(session, source_dir=catalogo, state_dir=estado, workers=1)
+
+        assert len(primeira.inserts) == 6
+        assert not segunda
+        assert session.commit.await_count == 1
+        assert invalidar.call_count == 1
+        assert load_manifest(estado / MANIFEST_NAME)["files"]
+        feed = [json.loads(linha) for linha in (estado / FEED_NAME).read_text().splitlines()]
+        assert len(feed) == 6
+        assert {entrada["op"] for entrada in feed} == {"insert"}
+
+    @pytest.mark.asyncio
+    async def test_manifest_de_outro_banco(self, catalogo, tmp_path):
+        """Manifest que nao bate com os ids da tabela cai no caminho completo."""
+        estado = tmp_path / "sync"
+        session = MagicMock()
+        session.execute = AsyncMock()
+        session.commit = AsyncMock()
+        estado_banco = AsyncMock(return_value={})
+
+        with patch.object(benefit_sync, "load_database_state", estado_banco), \
+                patch.object(benefit_sync, "load_database_ids", AsyncMock(return_value=set())), \
+                patch("app.services.benefit_catalog.invalidate_benefit_catalog"):
+            await sync_benefits(session, source_dir=catalogo, state_dir=estado, workers=1)
+            # Banco novo (vazio) com o manifest da sync anterior
+            mudancas = await sync_benefits(session, source_dir=catalogo, state_dir=estado, workers=1)
+
+        assert estado_banco.await_count == 2
+        assert len(mudancas.inserts) == 6
+        assert mudancas.files_parsed == 4
+
+    @pytest.mark.asyncio
+    async def test_dry_run_nao_escreve(self, catalogo, tmp_path):
+        """Dry run so calcula as mudancas."""
+        session = MagicMock()
+        session.execute = AsyncMock()
+        session.commit = AsyncMock()
+
+        with patch.object(benefit_sync, "load_database_state", AsyncMock(return_value={})):
+            mudancas = await sync_benefits(session, source_dir=catalogo, state_dir=tmp_path / "sync",
+                                           dry_run=True, workers=1)
+
+        assert len(mudancas.inserts) == 6
+        session.execute.assert_not_awaited()
+        assert not (tmp_path / "sync" / MANIFEST_NAME).exists()
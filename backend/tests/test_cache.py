@@ -2,6 +2,8 @@
 Testes para o modulo de cache Redis.
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import patch, MagicMock
 
@@ -104,8 +106,8 @@ class TestCacheModule:
         """Deve limpar chaves por padrao."""
         from app.core import cache
 
-        mock_redis.keys.return_value = ["prefix:1", "prefix:2"]
-        mock_redis.delete.return_value = 2
+        mock_redis.scan_iter.return_value = iter(["prefix:1", "prefix:2"])
+        mock_redis.unlink.return_value = 2
 
         with patch.object(cache, "get_redis_client", return_value=mock_redis):
             result = cache.clear_cache_pattern("prefix:*")
@@ -113,6 +115,257 @@ class TestCacheModule:
         assert result == 2
 
 
+class FakeAsyncRedis:
+    """Redis assincrono em memoria (get/set/delete/unlink/scan_iter)."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    async def unlink(self, *keys):
+        return await self.delete(*keys)
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    async def scan_iter(self, match=None, count=None):
+        import fnmatch
+        for key in list(self.data):
+            if match is None or fnmatch.fnmatch(key, match):
+                yield key
+
+
+@pytest.fixture
+def async_redis(monkeypatch):
+    """Cache assincrono habilitado sobre um Redis em memoria."""
+    from app.config import settings
+    from app.core import cache
+
+    fake = FakeAsyncRedis()
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "get_async_redis", lambda: fake)
+    monkeypatch.setattr(cache, "_inflight", {})
+    monkeypatch.setattr(cache, "_generation", 0)
+    monkeypatch.setattr(cache, "_generation_checked", float("-inf"))
+    monkeypatch.setattr(settings, "CACHE_GENERATION_CHECK_INTERVAL", 0)
+    cache.local_cache.clear()
+    yield fake
+    cache.local_cache.clear()
+
+
+class TestAsyncCache:
+    """Testes para a API assincrona e o decorator ``cached``."""
+
+    async def test_single_flight(self, async_redis):
+        """Chamadas concorrentes para a mesma chave executam a funcao uma vez."""
+        from app.core.cache import cached
+
+        calls = 0
+
+        @cached("teste:sf", ttl=60)
+        async def lento(program=None):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"program": program, "total": 10}
+
+        results = await asyncio.gather(*[lento(program="BF") for _ in range(50)])
+
+        assert calls == 1
+        assert all(r == {"program": "BF", "total": 10} for r in results)
+        assert await lento(program="BF") == {"program": "BF", "total": 10}
+        assert calls == 1
+
+    async def test_chave_ignora_argumentos_complexos(self, async_redis):
+        """Sessoes e objetos nao entram na chave."""
+        from app.core.cache import build_cache_key
+
+        async def rota(program=None, db=None):
+            return None
+
+        key = build_cache_key("agg", rota, (), {"program": "BF", "db": object()})
+        assert key == 'agg:{"program":"BF"}'
+        assert build_cache_key("agg", rota, (), {"db": object()}) == "agg"
+
+    async def test_stale_while_revalidate(self, async_redis):
+        """Valor expirado e servido enquanto um refresh roda em segundo plano."""
+        from app.core import cache
+
+        versao = 0
+
+        @cache.cached("teste:swr", ttl=60, stale_ttl=600)
+        async def dados():
+            nonlocal versao
+            versao += 1
+            return {"versao": versao}
+
+        assert await dados() == {"versao": 1}
+
+        # Envelhece a entrada alem do TTL, ainda dentro da janela stale
+        entry = cache.loads(async_redis.data["teste:swr"])
+        entry["t"] -= 120
+        async_redis.data["teste:swr"] = cache.dumps(entry)
+
+        assert await dados() == {"versao": 1}
+        await asyncio.gather(*cache._background)
+        assert await dados() == {"versao": 2}
+
+    async def test_aclear_cache_pattern(self, async_redis):
+        """Invalidacao por padrao usa SCAN + UNLINK."""
+        from app.core import cache
+
+        await cache.aset_cache("aggregations:states", {"a": 1})
+        await cache.aset_cache("aggregations:national", {"b": 2})
+        await cache.aset_cache("geo:brasil", {"c": 3})
+
+        assert await cache.aclear_cache_pattern("aggregations:*") == 2
+        assert list(async_redis.data) == ["geo:brasil"]
+
+    async def test_redis_indisponivel(self, monkeypatch):
+        """Sem Redis a funcao e chamada diretamente."""
+        from app.config import settings
+        from app.core import cache
+
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        monkeypatch.setattr(cache, "get_async_redis", lambda: None)
+
+        @cache.cached("teste:down", ttl=60)
+        async def dados():
+            return {"ok": True}
+
+        assert await dados() == {"ok": True}
+
+    async def test_erro_de_conexao_abre_circuito(self, monkeypatch):
+        """Erro de conexao faz o cache ignorar o Redis por um tempo."""
+        import redis
+        from unittest.mock import AsyncMock
+        from app.core import cache
+
+        client = MagicMock()
+        client.get = AsyncMock(side_effect=redis.ConnectionError("down"))
+        monkeypatch.setattr(cache, "_async_client", client)
+        monkeypatch.setattr(cache, "_async_down_until", 0.0)
+
+        assert await cache.aget_cache("x") is None
+        assert cache.get_async_redis() is None
+
+
+class TestLocalCache:
+    """Testes para o LRU em processo."""
+
+    def test_evicta_por_quantidade(self):
+        from app.core.cache import LocalCache
+
+        lru = LocalCache(max_entries=2, max_bytes=1000)
+        lru.set("a", 1, ttl=60, size=1)
+        lru.set("b", 2, ttl=60, size=1)
+        lru.get("a")
+        lru.set("c", 3, ttl=60, size=1)
+
+        assert lru.get("a") == (True, 1)
+        assert lru.get("b") == (False, None)
+        assert len(lru) == 2
+
+    def test_evicta_por_bytes(self):
+        from app.core.cache import LocalCache
+
+        lru = LocalCache(max_entries=10, max_bytes=100)
+        lru.set("a", "x", ttl=60, size=60)
+        lru.set("b", "y", ttl=60, size=60)
+        lru.set("grande", "z", ttl=60, size=101)
+
+        assert lru.get("a") == (False, None)
+        assert lru.get("b") == (True, "y")
+        assert lru.get("grande") == (False, None)
+        assert lru.bytes == 60
+
+    def test_expira_por_ttl(self, monkeypatch):
+        from app.core import cache
+
+        agora = [1000.0]
+        monkeypatch.setattr(cache.time, "monotonic", lambda: agora[0])
+        lru = cache.LocalCache(max_entries=10, max_bytes=100)
+        lru.set("a", 1, ttl=5, size=1)
+
+        agora[0] += 6
+        assert lru.get("a") == (False, None)
+        assert lru.bytes == 0
+
+
+class TestCacheDuasCamadas:
+    """Testes para o cache em memoria + Redis versionado por geracao."""
+
+    async def test_memoria_antes_do_redis(self, async_redis):
+        from app.core import cache
+
+        calls = 0
+
+        @cache.cached("teste:local", ttl=60, local_ttl=30)
+        async def dados():
+            nonlocal calls
+            calls += 1
+            return {"total": 1}
+
+        assert await dados() == {"total": 1}
+        async_redis.data.clear()
+        assert await dados() == {"total": 1}
+        assert calls == 1
+
+    async def test_bump_invalida_tudo(self, async_redis):
+        from app.core import cache
+
+        versao = 0
+
+        @cache.cached("teste:gen", ttl=3600, local_ttl=600, versioned=True)
+        async def dados(program=None):
+            nonlocal versao
+            versao += 1
+            return {"versao": versao}
+
+        assert await dados(program="BF") == {"versao": 1}
+        assert await dados(program="BF") == {"versao": 1}
+
+        assert await cache.abump_data_generation() == 1
+        assert await dados(program="BF") == {"versao": 2}
+        assert any(":g1:" in key for key in async_redis.data)
+
+    async def test_geracao_de_outro_processo(self, async_redis):
+        """Outro processo (o ETL) incrementa o contador direto no Redis."""
+        from app.core import cache
+
+        versao = 0
+
+        @cache.cached("teste:etl", ttl=3600, local_ttl=600, versioned=True)
+        async def dados():
+            nonlocal versao
+            versao += 1
+            return {"versao": versao}
+
+        await dados()
+        await async_redis.incr(cache.DATA_GENERATION_KEY)
+        assert await dados() == {"versao": 2}
+
+    def test_bump_sincrono(self, mock_redis):
+        from app.core import cache
+
+        mock_redis.incr.return_value = 7
+        cache.local_cache.set("x", 1, ttl=60, size=1)
+
+        assert cache.bump_data_generation() == 7
+        mock_redis.incr.assert_called_once_with(cache.DATA_GENERATION_KEY)
+        assert len(cache.local_cache) == 0
+
+
 class TestIntentClassifier:
     """Testes para o classificador de intencoes."""
 
@@ -0,0 +1,161 @@
+"""Testes para a carga set-based de beneficiary_data."""
+
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+
+from app.jobs import carga_em_lote as carga
+from app.jobs.dados_abertos import carregador as carregador_mod
+from app.jobs.dados_abertos.carregador import CarregadorDados
+from app.jobs.dados_abertos.transformador import RegistroTransformado, ResultadoTransformacao
+
+
+def linha(municipio_id, **metricas):
+    return {
+        "municipality_id": municipio_id,
+        "program_id": 3,
+        "reference_date": date(2024, 5, 1),
+        **metricas,
+    }
+
+
+def db_falso(inseridos=0, atualizados=0):
+    """Sessao que captura o texto enviado ao COPY."""
+    db = MagicMock()
+    db.copiado = []
+    cursor = db.connection.return_value.connection.cursor.return_value
+    cursor.copy_expert.side_effect = lambda sql, stream: db.copiado.append(stream.read())
+    db.execute.return_value.one.return_value = (inseridos, atualizados)
+    return db
+
+
+class TestStagingRows:
+    def test_colunas_ausentes_viram_null(self):
+        rows = list(carga.staging_rows([
+            linha(1, total_beneficiaries=10, extra_data={"fonte": "SIMULAÇÃO"}),
+        ]))
+
+        assert len(rows[0]) == len(carga.STAGING_COLUMNS)
+        assert rows[0][:4] == (1, 3, date(2024, 5, 1), 10)
+        assert rows[0][6] is None  # coverage_rate
+        assert json.loads(rows[0][7]) == {"fonte": "SIMULAÇÃO"}
+
+    def test_aceita_dataframe(self):
+        df = pd.DataFrame([
+            linha(1, total_beneficiaries=10, coverage_rate=0.5),
+            linha(2, total_beneficiaries=20),
+        ])
+
+        rows = list(carga.staging_rows(df))
+
+        assert [r[0] for r in rows] == [1, 2]
+        assert rows[1][6] is None  # NaN do pandas
+
+    def test_csv_do_copy(self):
+        stream = carga.CopyStream.from_rows(
+            carga.staging_rows([linha(i, data_source='A "B", C') for i in range(7)]),
+            block_rows=3,
+        )
+
+        rows = list(csv.reader(io.StringIO(stream.read())))
+
+        assert stream.rows_read == 7
+        assert rows[0][:3] == ["0", "3", "2024-05-01"]
+        assert rows[0][3] == ""
+        assert rows[6][-1] == 'A "B", C'
+
+
+class TestMergeSql:
+    def test_atualiza_so_colunas_pedidas(self):
+        sql = carga.merge_sql(("total_beneficiaries", "total_value_brl"))
+
+        assert "ON CONFLICT (municipality_id, program_id, reference_date)" in sql
+        assert "total_value_brl = EXCLUDED.total_value_brl" in sql
+        assert "ingested_at = EXCLUDED.ingested_at" in sql
+        assert "coverage_rate = EXCLUDED" not in sql
+        assert "s.ordem DESC" in sql
+
+
+class TestCarregar:
+    def test_copy_e_merge_em_uma_transacao(self):
+        db = db_falso(inseridos=2, atualizados=1)
+
+        resultado = carga.carregar_beneficiary_data(
+            db, (linha(i, total_beneficiaries=i) for i in (1, 2, 3, 3))
+        )
+
+        assert (resultado.inseridos, resultado.atualizados) == (2, 1)
+        assert resultado.linhas == 4
+        assert resultado.duplicadas == 1
+        assert len(db.copiado[0].splitlines()) == 4
+        db.commit.assert_called_once()
+
+    def test_rollback_em_erro(self):
+        db = db_falso()
+        db.execute.return_value.one.side_effect = RuntimeError("conflito")
+
+        with pytest.raises(RuntimeError):
+            carga.carregar_beneficiary_data(db, [linha(1)])
+
+        db.rollback.assert_called_once()
+        db.commit.assert_not_called()
+
+    def test_coluna_desconhecida(self):
+        with pytest.raises(ValueError):
+            carga.carregar_beneficiary_data(MagicMock(), [], atualizar=("populacao",))
+
+
+class TestLookups:
+    def test_resolver_municipio(self):
+        mapa = {"3550308": 1, "355030": 1, "1100015": 2}
+
+        assert carga.resolver_municipio(mapa, "3550308") == 1
+        assert carga.resolver_municipio(mapa, "355030") == 1
+        assert carga.resolver_municipio(mapa, "1234567") is None
+        assert carga.resolver_municipio({"1100010": 5}, "110001") == 5
+
+
+class TestCarregadorBanco:
+    def transformacao(self):
+        registros = [
+            RegistroTransformado("3550308", "Sao Paulo", "SP", "BPC", "2024-05", 100, 141200.0),
+            RegistroTransformado("9999999", "Inexistente", "XX", "BPC", "2024-05", 1, 1.0),
+        ]
+        return ResultadoTransformacao(
+            programa="BPC", referencia="2024-05", registros=registros, total_validos=2
+        )
+
+    def test_upsert_em_lote(self):
+        lote = carga.ResultadoLote(inseridos=1, linhas=1)
+        with patch.object(carregador_mod, "SessionLocal"), \
+             patch.object(carregador_mod, "id_programa", return_value=3), \
+             patch.object(carregador_mod, "mapa_municipios", return_value={"3550308": 1}), \
+             patch.object(carregador_mod, "carregar_beneficiary_data", return_value=lote) as carregar:
+            resultado = CarregadorDados(modo_mock=False).carregar(self.transformacao())
+
+        linhas = carregar.call_args.args[1]
+        assert linhas == [{
+            "municipality_id": 1,
+            "program_id": 3,
+            "reference_date": date(2024, 5, 1),
+            "total_beneficiaries": 100,
+            "total_value_brl": Decimal("141200.0"),
+            "data_source": "DADOS_ABERTOS",
+        }]
+        assert resultado.modo == "banco"
+        assert resultado.sucesso
+        assert (resultado.inseridos, resultado.erros) == (1, 1)
+
+    def test_programa_nao_cadastrado(self):
+        with patch.object(carregador_mod, "SessionLocal"), \
+             patch.object(carregador_mod, "id_programa", return_value=None):
+            resultado = CarregadorDados(modo_mock=False).carregar(self.transformacao())
+
+        assert not resultado.sucesso
+        assert resultado.modo == "banco"
@@ -1,5 +1,7 @@
 """Testes para pipeline ETL de dados abertos."""
 
+from datetime import date
+
 import pytest
 from app.jobs.dados_abertos.extrator import (
     ExtratorDadosAbertos,
@@ -266,6 +268,53 @@ class TestOrquestrador:
         orq.executar_pipeline("BPC", 1, 2026, dry_run=True)
         assert len(orq.historico) == 2
 
+    def test_carga_no_banco_atualiza_agregados(self, monkeypatch):
+        from unittest.mock import MagicMock
+        from app.jobs.dados_abertos import orquestrador
+
+        atualizar = MagicMock()
+        monkeypatch.setattr(orquestrador, "atualizar_apos_carga", atualizar)
+        orq = OrquestradorETL(modo_mock=True)
+        monkeypatch.setattr(
+            orq.carregador,
+            "carregar",
+            lambda t: ResultadoCarga(
+                programa=t.programa, referencia=t.referencia, inseridos=10, modo="banco"
+            ),
+        )
+
+        orq.executar_pipeline("BOLSA_FAMILIA", 1, 2026)
+        atualizar.assert_called_once_with("BOLSA_FAMILIA", date(2026, 1, 1))
+
+        atualizar.reset_mock()
+        orq.executar_pipeline("BOLSA_FAMILIA", 1, 2026, dry_run=True)
+        atualizar.assert_not_called()
+
+    async def test_jobs_agendados_fora_do_event_loop(self, monkeypatch):
+        """Recalculo dos agregados nao roda na thread do event loop."""
+        import threading
+        from unittest.mock import AsyncMock
+        from app.jobs.dados_abertos import orquestrador
+
+        threads = []
+        monkeypatch.setattr(
+            orquestrador, "atualizar_apos_carga",
+            lambda *args: threads.append(threading.current_thread()),
+        )
+        monkeypatch.setattr(
+            "app.jobs.ingest_farmacia_real.ingest_farmacia_real", AsyncMock()
+        )
+        monkeypatch.setattr(
+            OrquestradorETL, "executar_pipeline",
+            lambda self, *args, **kwargs: orquestrador.atualizar_apos_carga(*args),
+        )
+
+        await orquestrador._run_farmacia_ingestion()
+        await orquestrador._run_programa_etl("BPC")
+
+        assert len(threads) == 2
+        assert all(t is not threading.current_thread() for t in threads)
+
     def test_agenda_programas(self):
         assert "BOLSA_FAMILIA" in AGENDA_PROGRAMAS
         assert "BPC" in AGENDA_PROGRAMAS
@@ -0,0 +1,150 @@
+"""
+Testes do filtro de Bloom dos CPFs indexados.
+"""
+
+import hashlib
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.models.beneficiario import Beneficiario, hash_cpf
+from app.services import beneficiarios_service, filtro_cpf
+from app.services.filtro_cpf import (
+    FiltroBloom,
+    carregar_filtro,
+    construir_filtro_beneficiarios,
+    dimensionar,
+    recarregar_se_mudou,
+)
+
+
+def _hashes(n: int, inicio: int = 0) -> list:
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(inicio, inicio + n)]
+
+
+@pytest.fixture
+def sem_filtro():
+    """Isola o filtro global da consulta de beneficios."""
+    with patch.object(beneficiarios_service, "_filtro", None), \
+            patch.object(filtro_cpf, "_carregado_mtime", None), \
+            patch.object(filtro_cpf, "_verificado_em", 0.0):
+        yield
+
+
+class TestFiltroBloom:
+    """Testes da estrutura do filtro."""
+
+    def test_sem_falsos_negativos(self):
+        """Todo hash inserido deve ser encontrado."""
+        hashes = _hashes(20_000)
+        filtro = FiltroBloom.construir(hashes, len(hashes))
+        assert all(h in filtro for h in hashes)
+        assert len(filtro) == 20_000
+
+    def test_taxa_de_falsos_positivos(self):
+        """Taxa medida deve ficar perto da configurada."""
+        filtro = FiltroBloom.construir(_hashes(50_000), 50_000, taxa=0.01)
+        ausentes = _hashes(50_000, inicio=1_000_000)
+        taxa = sum(1 for h in ausentes if h in filtro) / len(ausentes)
+        assert taxa < 0.02
+        assert filtro.taxa_estimada == pytest.approx(0.01, rel=0.3)
+
+    def test_cerca_de_dois_bytes_por_entrada(self):
+        """Com 0,1% o filtro deve usar menos de 2 bytes por CPF."""
+        m, k = dimensionar(30_000_000, 0.001)
+        assert m // 8 / 30_000_000 < 2
+        assert k == 10
+
+    def test_hash_invalido(self):
+        """Valor que nao e hash hex nao deve quebrar a consulta."""
+        filtro = FiltroBloom.construir(_hashes(10), 10)
+        assert "nao-e-hash" not in filtro
+
+    def test_salvar_e_abrir_com_mmap(self, tmp_path):
+        """Arquivo gravado deve responder igual ao filtro em memoria."""
+        hashes = _hashes(5_000)
+        original = FiltroBloom.construir(hashes, len(hashes))
+        path = str(tmp_path / "beneficiarios.bloom")
+        original.salvar(path)
+
+        aberto = FiltroBloom.abrir(path)
+        try:
+            assert (aberto.m, aberto.k, aberto.n) == (original.m, original.k, original.n)
+            assert all(h in aberto for h in hashes)
+            ausentes = _hashes(2_000, inicio=10_000)
+            assert [h in aberto for h in ausentes] == [h in original for h in ausentes]
+        finally:
+            aberto.fechar()
+        assert not os.path.exists(f"{path}.tmp")
+
+    def test_arquivo_invalido(self, tmp_path):
+        """Arquivo que nao e filtro deve ser recusado."""
+        path = tmp_path / "lixo.bloom"
+        path.write_bytes(b"x" * 100)
+        with pytest.raises(ValueError):
+            FiltroBloom.abrir(str(path))
+
+
+class TestCargaDoFiltro:
+    """Testes da construcao pela tabela e da carga no startup."""
+
+    def test_construir_da_tabela(self, tmp_path):
+        """Job deve gravar um filtro com todos os cpf_hash da tabela."""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'beneficiarios.db'}")
+        Beneficiario.__table__.create(engine)
+        cpfs = ["52998224725", "11144477735", "39053344705"]
+        with Session(engine) as db:
+            db.add_all(Beneficiario(cpf_hash=hash_cpf(cpf)) for cpf in cpfs)
+            db.commit()
+
+            path = str(tmp_path / "beneficiarios.bloom")
+            construir_filtro_beneficiarios(db, path)
+
+        filtro = FiltroBloom.abrir(path)
+        try:
+            assert len(filtro) == 3
+            assert all(hash_cpf(cpf) in filtro for cpf in cpfs)
+        finally:
+            filtro.fechar()
+
+    def test_carregar_ativa_na_consulta(self, tmp_path, sem_filtro):
+        """Filtro carregado deve descartar CPFs fora da base."""
+        path = str(tmp_path / "beneficiarios.bloom")
+        FiltroBloom.construir([hash_cpf("52998224725")], 1).salvar(path)
+
+        assert carregar_filtro(path) is not None
+        assert beneficiarios_service.pode_estar_na_base(hash_cpf("52998224725")) is True
+        assert beneficiarios_service.pode_estar_na_base(hash_cpf("11144477735")) is False
+
+    def test_sem_arquivo_segue_sem_filtro(self, tmp_path, sem_filtro):
+        """Sem arquivo, todo CPF pode estar na base."""
+        assert carregar_filtro(str(tmp_path / "nao-existe.bloom")) is None
+        assert beneficiarios_service.pode_estar_na_base(hash_cpf("11144477735")) is True
+
+    def test_recarrega_arquivo_novo(self, tmp_path, sem_filtro):
+        """Arquivo regravado pelo job deve substituir o filtro em uso."""
+        path = str(tmp_path / "beneficiarios.bloom")
+        FiltroBloom.construir([hash_cpf("52998224725")], 1).salvar(path)
+        carregar_filtro(path)
+
+        FiltroBloom.construir([hash_cpf("11144477735")], 1).salvar(path)
+        os.utime(path, (0, 0))
+        with patch.object(filtro_cpf, "_verificado_em", 0.0), \
+                patch.object(filtro_cpf, "_VERIFICAR_A_CADA", 0.0):
+            recarregar_se_mudou(path)
+
+        assert hash_cpf("11144477735") in beneficiarios_service._filtro
+
+    def test_identificar_por_cpf_nao_vai_ao_banco(self, sem_filtro):
+        """CPF fora do filtro deve ser respondido sem abrir sessao."""
+        from app.agent.tools.identificar_cidadao import identificar_por_cpf
+
+        beneficiarios_service.definir_filtro(FiltroBloom.construir(_hashes(100), 100))
+        with patch("app.agent.tools.identificar_cidadao.SessionLocal", side_effect=AssertionError):
+            resultado = identificar_por_cpf("529.982.247-25")
+
+        assert resultado.data["identificado"] is False
@@ -0,0 +1,243 @@
+"""Testes para o GeoJSON pre-serializado dos municipios."""
+
+import gzip
+import json
+import os
+import threading
+from unittest.mock import AsyncMock
+
+import orjson
+import pytest
+from fastapi import status
+
+from app.services import geo_tiles
+from app.services.geo_tiles import (
+    EncodedBody,
+    GeoTileStore,
+    feature_collection,
+    fragment_line,
+    parse_fragment_line,
+    write_manifest,
+    write_tileset,
+    zoom_level,
+)
+
+
+def municipio(ibge, state, state_id, lon=-46.6):
+    geometry = {
+        "type": "MultiPolygon",
+        "coordinates": [[[[lon, -23.5], [lon + 0.1, -23.5], [lon, -23.4], [lon, -23.5]]]],
+    }
+    return {
+        "ibge_code": ibge,
+        "name": f"Municipio {ibge}",
+        "state": state,
+        "state_id": state_id,
+        "population": 1000,
+        "geometry": json.dumps(geometry, separators=(",", ":")),
+    }
+
+
+ROWS = [
+    municipio("3550308", "SP", 35),
+    municipio("3509502", "SP", 35, lon=-47.0),
+    municipio("3304557", "RJ", 33, lon=-43.2),
+]
+
+
+@pytest.fixture
+def tiles_dir(tmp_path):
+    """Diretorio com o nivel 6 gerado."""
+    directory = str(tmp_path)
+    counts = {6: write_tileset(6, ROWS, directory)}
+    write_manifest(counts, directory)
+    return directory
+
+
+class TestSerializacao:
+    def test_fragmentos_equivalem_ao_geojson(self):
+        fragments = [parse_fragment_line(fragment_line(row)) for row in ROWS]
+        data = orjson.loads(feature_collection(fragments, metadata={"zoom": 6}))
+
+        assert data["type"] == "FeatureCollection"
+        assert data["metadata"] == {"zoom": 6, "count": 3}
+        first = data["features"][0]
+        assert first["properties"] == {
+            "ibge_code": "3550308", "name": "Municipio 3550308", "state_id": 35, "population": 1000,
+        }
+        assert first["geometry"] == json.loads(ROWS[0]["geometry"])
+
+    def test_overlay_mescla_propriedades(self):
+        fragments = [parse_fragment_line(fragment_line(row)) for row in ROWS]
+        overlay = {"3304557": {"beneficiaries": 10, "coverage": 0.5}}
+        data = orjson.loads(feature_collection(fragments, overlay=overlay))
+
+        props = {f["properties"]["ibge_code"]: f["properties"] for f in data["features"]}
+        assert props["3304557"]["beneficiaries"] == 10
+        assert props["3304557"]["name"] == "Municipio 3304557"
+        assert "beneficiaries" not in props["3550308"]
+
+    def test_geometria_nula(self):
+        row = dict(ROWS[0], geometry=None)
+        data = orjson.loads(feature_collection([parse_fragment_line(fragment_line(row))]))
+        assert data["features"][0]["geometry"] is None
+
+    @pytest.mark.parametrize("zoom,level", [(None, 6), (0, 4), (5, 4), (6, 6), (9, 8), (18, 11)])
+    def test_zoom_level(self, zoom, level):
+        assert zoom_level(zoom) == level
+
+    def test_negociacao_de_encoding(self):
+        encoded = EncodedBody.encode(b'{"a":1}' * 100)
+        body, encoding = encoded.negotiate("gzip, deflate")
+        assert encoding == "gzip"
+        assert gzip.decompress(body) == encoded.body
+        assert encoded.negotiate("") == (encoded.body, None)
+
+
+class TestGeoTileStore:
+    def test_nacional_pre_comprimido(self, tiles_dir):
+        store = GeoTileStore(tiles_dir)
+        encoded = store.render(6)
+
+        assert encoded.body == open(os.path.join(tiles_dir, "brasil_z6.geojson"), "rb").read()
+        assert orjson.loads(gzip.decompress(encoded.gzip))["metadata"]["count"] == 3
+
+    def test_filtro_por_estado(self, tiles_dir):
+        store = GeoTileStore(tiles_dir)
+
+        by_code = orjson.loads(store.render(6, state_code="sp").body)
+        by_id = orjson.loads(store.render(6, state_id=33).body)
+
+        assert by_code["metadata"]["count"] == 2
+        assert by_code["metadata"]["state_id"] == 35
+        assert [f["properties"]["ibge_code"] for f in by_id["features"]] == ["3304557"]
+        with pytest.raises(LookupError):
+            store.render(6, state_code="XX")
+
+    def test_render_usa_brotli_mais_rapido(self, tiles_dir, monkeypatch):
+        qualidades = []
+        monkeypatch.setattr(
+            EncodedBody, "encode",
+            classmethod(lambda cls, body, brotli_quality=geo_tiles.BROTLI_QUALITY:
+                        qualidades.append(brotli_quality) or cls(body=body, etag='"x"')),
+        )
+
+        GeoTileStore(tiles_dir).render(6, state_code="SP")
+
+        assert qualidades == [geo_tiles.RENDER_BROTLI_QUALITY]
+
+    def test_nivel_nao_gerado(self, tiles_dir):
+        assert GeoTileStore(tiles_dir).render(8) is None
+        assert GeoTileStore(tiles_dir + "/vazio").render(6) is None
+
+    def test_recarrega_quando_manifesto_muda(self, tiles_dir):
+        store = GeoTileStore(tiles_dir)
+        assert orjson.loads(store.render(6, state_code="RJ").body)["metadata"]["count"] == 1
+
+        write_tileset(6, ROWS + [municipio("3303302", "RJ", 33)], tiles_dir)
+        write_manifest({6: 4}, tiles_dir)
+        os.utime(os.path.join(tiles_dir, "manifest.json"), ns=(1, 1))
+
+        assert orjson.loads(store.render(6, state_code="RJ").body)["metadata"]["count"] == 2
+
+
+@pytest.fixture
+async def api_client(tiles_dir, monkeypatch):
+    """Cliente da API servindo os tiles do diretorio temporario."""
+    from httpx import AsyncClient
+    from app.main import app
+    from app.database import get_db
+
+    async def override_get_db():
+        yield None
+
+    monkeypatch.setattr(geo_tiles, "_store", GeoTileStore(tiles_dir))
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(app=app, base_url="http://test") as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+class TestEndpoint:
+    async def test_mapa_nacional_completo(self, api_client):
+        response = await api_client.get(
+            "/api/v1/geo/municipalities", headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["metadata"]["count"] == 3
+
+    async def test_etag_retorna_304(self, api_client):
+        first = await api_client.get("/api/v1/geo/municipalities", params={"state_code": "SP"})
+        etag = first.headers["etag"]
+
+        second = await api_client.get(
+            "/api/v1/geo/municipalities",
+            params={"state_code": "SP"},
+            headers={"If-None-Match": etag},
+        )
+
+        assert second.status_code == status.HTTP_304_NOT_MODIFIED
+        assert second.headers["etag"] == etag
+
+    async def test_etag_por_encoding(self, api_client):
+        params = {"state_code": "SP"}
+        identidade = await api_client.get(
+            "/api/v1/geo/municipalities", params=params, headers={"Accept-Encoding": "identity"}
+        )
+        comprimida = await api_client.get(
+            "/api/v1/geo/municipalities", params=params, headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert comprimida.headers["content-encoding"] == "gzip"
+        assert identidade.headers["etag"] != comprimida.headers["etag"]
+        # A ETag da versao sem compressao nao revalida a comprimida
+        revalidada = await api_client.get(
+            "/api/v1/geo/municipalities",
+            params=params,
+            headers={"Accept-Encoding": "gzip", "If-None-Match": identidade.headers["etag"]},
+        )
+        assert revalidada.status_code == status.HTTP_200_OK
+
+    async def test_tiles_removidos_durante_render_usam_banco(self, api_client, monkeypatch):
+        monkeypatch.setattr(geo_tiles._store, "render", lambda *args, **kwargs: None)
+        from_db = AsyncMock(return_value={"type": "FeatureCollection", "features": []})
+        monkeypatch.setattr("app.routers.geo._municipalities_from_db", from_db)
+
+        response = await api_client.get("/api/v1/geo/municipalities", params={"state_code": "SP"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["features"] == []
+        assert from_db.await_args.kwargs["state_code"] == "SP"
+
+    async def test_overlay_de_programa(self, api_client, monkeypatch):
+        overlay = AsyncMock(return_value={"3550308": {"beneficiaries": 42}})
+        monkeypatch.setattr("app.routers.geo._program_overlay", overlay)
+
+        response = await api_client.get(
+            "/api/v1/geo/municipalities", params={"program": "bolsa_familia"}
+        )
+
+        props = {f["properties"]["ibge_code"]: f["properties"] for f in response.json()["features"]}
+        assert props["3550308"]["beneficiaries"] == 42
+        assert overlay.await_args.kwargs["program"] == "BOLSA_FAMILIA"
+
+    async def test_render_fora_do_event_loop(self, api_client, monkeypatch):
+        threads = []
+        render = geo_tiles._store.render
+
+        def render_registrando(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return render(*args, **kwargs)
+
+        monkeypatch.setattr(geo_tiles._store, "render", render_registrando)
+
+        response = await api_client.get("/api/v1/geo/municipalities", params={"state_code": "SP"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert threads and threads[0] is not threading.main_thread()
+
+    async def test_estado_inexistente(self, api_client):
+        response = await api_client.get("/api/v1/geo/municipalities", params={"state_code": "XX"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,180 @@
+"""Testes para o indexador de beneficiarios em streaming."""
+
+import csv
+import io
+import zipfile
+
+import httpx
+
+from app.jobs import indexar_beneficiarios as job
+from app.models.beneficiario import hash_cpf
+
+
+BF_HEADER = (
+    "MES REFERENCIA;MES COMPETENCIA;UF;CODIGO MUNICIPIO SIAFI;NOME MUNICIPIO;"
+    "CPF FAVORECIDO;NIS FAVORECIDO;NOME FAVORECIDO;VALOR PARCELA"
+)
+
+
+def make_zip(path, lines):
+    content = "\n".join(lines).encode("latin-1")
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("202410_NovoBolsaFamilia.csv", content)
+    return str(path)
+
+
+class TestDownloadToFile:
+    async def test_retoma_download_interrompido(self, tmp_path):
+        data = bytes(range(256)) * 40
+        half = len(data) // 2
+        ranges = []
+
+        def handler(request):
+            ranges.append(request.headers.get("range"))
+            if "range" not in request.headers:
+                # Conexao cai no meio: so metade do corpo chega
+                return httpx.Response(
+                    200, content=data[:half], headers={"content-length": str(len(data))}
+                )
+            start = int(request.headers["range"].split("=")[1].rstrip("-"))
+            return httpx.Response(
+                206,
+                content=data[start:],
+                headers={"content-range": f"bytes {start}-{len(data) - 1}/{len(data)}"},
+            )
+
+        dest = tmp_path / "arquivo.zip"
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            result = await job.download_to_file("https://x/arquivo.zip", str(dest), client=client)
+
+        assert result == str(dest)
+        assert dest.read_bytes() == data
+        assert ranges == [None, f"bytes={half}-"]
+        assert not (tmp_path / "arquivo.zip.part").exists()
+
+    async def test_reaproveita_arquivo_baixado(self, tmp_path):
+        dest = tmp_path / "arquivo.zip"
+        dest.write_bytes(b"ok")
+
+        def handler(request):
+            raise AssertionError("nao deveria baixar de novo")
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            assert await job.download_to_file("https://x", str(dest), client=client) == str(dest)
+
+    async def test_erro_http(self, tmp_path):
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(404))
+        ) as client:
+            assert await job.download_to_file("https://x", str(tmp_path / "a.zip"), client=client) is None
+
+
+class TestParseStreaming:
+    def test_bolsa_familia_do_disco(self, tmp_path):
+        path = make_zip(tmp_path / "bf.zip", [
+            BF_HEADER,
+            "202410;202410;SP;7107;SAO PAULO;***.456.789-**;12345678901;JOSÉ DA SILVA;600,00",
+            "202410;202410;SP;7107;SAO PAULO;;12345678902;SEM CPF;600,00",
+            "202410;202410;RJ;6001;RIO;123.456.789-01;12345678903;MARIA;1.250,50",
+        ])
+
+        rows = list(job.parse_bolsa_familia_csv(path, {"7107": "3550308"}))
+
+        assert [r["nome"] for r in rows] == ["MARIA"]
+        assert rows[0]["bf_valor"] == 1250.5
+        assert rows[0]["bf_parcela_mes"] == "2024-10"
+        assert rows[0]["cpf"] == "12345678901"
+
+    def test_aceita_bytes(self, tmp_path):
+        path = make_zip(tmp_path / "bf.zip", [
+            BF_HEADER,
+            "202410;202410;SP;7107;SAO PAULO;12345678901;1;JOSÉ;10,00",
+        ])
+        with open(path, "rb") as f:
+            rows = list(job.parse_bolsa_familia_csv(f.read(), {"7107": "3550308"}))
+
+        assert rows[0]["ibge_code"] == "3550308"
+        assert rows[0]["nome"] == "JOSÉ"
+
+
+class TestCopyStream:
+    def test_gera_csv_em_blocos(self):
+        beneficiarios = [
+            {"cpf": f"{i:011d}", "nome": 'Ana "Bia", Souza', "programa": "BOLSA_FAMILIA",
+             "bf_valor": 600.0, "bf_parcela_mes": "2024-10", "uf": None}
+            for i in range(25)
+        ]
+        stream = job.CopyStream.from_rows(job.staging_rows(beneficiarios), block_rows=4)
+
+        chunks = []
+        while True:
+            chunk = stream.read(37)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+        rows = list(csv.reader(io.StringIO("".join(chunks))))
+        assert stream.rows_read == 25
+        assert len(rows) == 25
+        assert rows[3][0] == hash_cpf("00000000003")
+        assert rows[0][3] == 'Ana "Bia", Souza'
+        assert rows[0][4] == ""  # NULL no COPY csv
+        assert len(rows[0]) == len(job.STAGING_COLUMNS)
+
+    def test_merge_sql_por_programa(self):
+        bf = job._merge_sql("BOLSA_FAMILIA")
+        bpc = job._merge_sql("BPC")
+
+        assert "bf_parcela_mes = EXCLUDED.bf_parcela_mes" in bf
+        assert "bpc_" not in bf
+        assert "bpc_tipo = EXCLUDED.bpc_tipo" in bpc
+        assert "DISTINCT ON (s.cpf_hash)" in bpc
+
+
+class TestModoParalelo:
+    def make_csv_zip(self, tmp_path, count=3000):
+        lines = [BF_HEADER]
+        for i in range(count):
+            cpf = f"{i + 10_000_000_000:011d}"
+            siafi = "7107" if i % 3 else "9999"
+            lines.append(f"202410;202410;SP;{siafi};SAO PAULO;{cpf};{i};NOME {i};{i},50")
+        lines.append("202410;202410;SP;7107;SAO PAULO;;0;SEM CPF;1,00")
+        return make_zip(tmp_path / "bf.zip", lines)
+
+    def test_faixas_alinhadas_em_linhas(self, tmp_path):
+        path = tmp_path / "a.csv"
+        path.write_bytes(b"h1;h2\n" + b"".join(b"%d;linha\n" % i for i in range(1000)))
+        header, start = job.read_csv_header(str(path))
+
+        ranges = job.split_line_ranges(str(path), start, chunk_bytes=100)
+
+        assert header == ["h1", "h2"]
+        assert ranges[0][0] == start
+        assert ranges[-1][1] == path.stat().st_size
+        data = path.read_bytes()
+        for (a, b), (c, _) in zip(ranges, ranges[1:]):
+            assert b == c
+            assert data[b - 1:b] == b"\n"
+
+    def test_mesmo_resultado_que_o_serial(self, tmp_path):
+        zip_path = self.make_csv_zip(tmp_path)
+        siafi = {"7107": "3550308"}
+        csv_path = job.extract_csv_member(zip_path, str(tmp_path))
+        stats = job.PipelineStats(workers=2)
+
+        blocks = list(job.parallel_staging_blocks(
+            csv_path, "BOLSA_FAMILIA", siafi, stats, chunk_bytes=16 * 1024
+        ))
+        paralelo = list(csv.reader(io.StringIO("".join(text for text, _ in blocks))))
+
+        serial_stream = job.CopyStream.from_rows(
+            job.staging_rows(job.parse_bolsa_familia_csv(zip_path, siafi))
+        )
+        serial = list(csv.reader(io.StringIO(serial_stream.read())))
+
+        assert paralelo == serial
+        assert stats.rows_parsed == 3001
+        assert stats.rows_valid == sum(count for _, count in blocks) == 3000
+        assert stats.chunks > 2
+        assert stats.parsed_per_second > 0
+        assert stats.hashed_per_second > 0
@@ -0,0 +1,121 @@
+"""
+Testes do classificador de intencao em uma passada.
+"""
+
+import random
+
+import pytest
+
+from app.agent.intent_classifier import IntentCategory, IntentClassifier
+from app.agent.keyword_matcher import KeywordMatcher, normalizar
+from app.agent.tools.rede_protecao import (
+    NivelUrgencia,
+    detectar_urgencia,
+    keywords_urgencia,
+    resultado_urgencia,
+)
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier(use_llm_fallback=False, urgency_keywords=keywords_urgencia())
+
+
+class TestKeywordMatcher:
+    """Testes do matcher de varias keywords."""
+
+    def test_equivale_a_in(self):
+        """Deve achar exatamente as keywords que ``in`` acharia."""
+        keywords = ["farmacia", "farmacia popular", "pop", "remedio", "remedios", "medio", "a", "ac"]
+        matcher = KeywordMatcher(keywords)
+        rng = random.Random(7)
+        alfabeto = "farmciopulesd "
+        for _ in range(2000):
+            texto = "".join(rng.choice(alfabeto) for _ in range(rng.randint(0, 40)))
+            assert matcher.find(texto) == {k for k in keywords if k in texto}
+
+    def test_keywords_sobrepostas(self):
+        """Keyword dentro de outra e prefixo de outra devem aparecer juntas."""
+        matcher = KeywordMatcher(["farmacia", "farmacia popular", "popular", "ular"])
+        assert matcher.find("quero a farmacia popular") == {"farmacia", "farmacia popular", "popular", "ular"}
+
+    def test_sem_keywords(self):
+        """Matcher vazio nao acha nada."""
+        assert KeywordMatcher([]).find("qualquer coisa") == set()
+
+    def test_normalizar(self):
+        """Deve tirar acento e maiusculas."""
+        assert normalizar("Farmácia POPULAR, Pé-de-Meia") == "farmacia popular, pe-de-meia"
+
+
+class TestAnalise:
+    """Testes de ``analyze``."""
+
+    def test_ignora_acento(self, classifier):
+        """Mensagem com ou sem acento deve ter a mesma intencao."""
+        com = classifier.classify("quero meus remédios da farmácia")
+        sem = classifier.classify("quero meus remedios da farmacia")
+        assert com.category == sem.category == IntentCategory.FARMACIA
+        assert com.confidence == sem.confidence
+
+    def test_padrao_no_texto_normalizado(self, classifier):
+        """Padroes devem casar sem acento e sem diferenciar maiusculas."""
+        assert classifier.classify("status do PED-123").category == IntentCategory.FARMACIA
+        assert classifier.classify("NÃO AGUENTO MAIS").category == IntentCategory.PROTECAO
+
+    def test_mensagens_especiais(self, classifier):
+        """Saudacao, agradecimento, ajuda e reinicio em uma analise."""
+        assert classifier.analyze("Olá").greeting is True
+        assert classifier.analyze("olá, preciso de ajuda").help is True
+        assert classifier.analyze("muito obrigada!").thanks is True
+        assert classifier.analyze("quero começar de novo").restart is True
+
+        analise = classifier.analyze("quero pedir remédio")
+        assert not (analise.greeting or analise.thanks or analise.help or analise.restart)
+
+    def test_saudacao_so_no_inicio(self, classifier):
+        """Saudacao no meio da frase nao conta."""
+        assert classifier.is_greeting("oi tudo bem") is True
+        assert classifier.is_greeting("oitenta reais") is False
+        assert classifier.is_greeting("eu disse oi") is False
+
+    def test_wrappers_iguais_a_analise(self, classifier):
+        """is_thanks/is_help/is_restart devem concordar com analyze."""
+        for mensagem in ["valeu", "como funciona", "menu", "bolsa familia"]:
+            analise = classifier.analyze(mensagem)
+            assert classifier.is_thanks(mensagem) == analise.thanks
+            assert classifier.is_help(mensagem) == analise.help
+            assert classifier.is_restart(mensagem) == analise.restart
+
+    def test_urgencia_na_mesma_passada(self, classifier):
+        """Urgencia da analise deve dar o mesmo resultado de detectar_urgencia."""
+        for mensagem in [
+            "meu marido me bate e tenho medo de ir pra casa",
+            "não quero mais viver",
+            "estou passando fome",
+            "quero pedir remédio",
+        ]:
+            analise = classifier.analyze(mensagem)
+            assert resultado_urgencia(analise.urgency) == detectar_urgencia(mensagem)
+
+    def test_sem_urgency_keywords(self):
+        """Sem keywords de urgencia, a analise nao informa urgencia."""
+        analise = IntentClassifier(use_llm_fallback=False).analyze("estou passando fome")
+        assert analise.urgency == {}
+
+
+class TestUrgenciaNormalizada:
+    """Testes da deteccao de urgencia sem acento."""
+
+    def test_keyword_com_e_sem_acento(self):
+        """Acento na mensagem nao deve mudar o resultado."""
+        com = detectar_urgencia("sofro violência doméstica")
+        sem = detectar_urgencia("sofro violencia domestica")
+        assert com == sem
+        assert com["nivel"] == NivelUrgencia.ALTA
+
+    def test_keywords_sem_repeticao(self):
+        """Keyword com e sem acento deve aparecer uma vez so."""
+        violencia = keywords_urgencia()["violencia"]
+        assert violencia.count("violencia") == 1
+        assert "violência" not in violencia
@@ -0,0 +1,110 @@
+"""Testes para o indice de busca de municipios."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.services import municipality_search
+from app.services.municipality_search import (
+    MunicipalitySearchIndex,
+    fold,
+    get_municipality_search_index,
+    invalidate_municipality_search_index,
+)
+
+
+MUNICIPIOS = [
+    {"ibge_code": "3550308", "name": "São Paulo", "state_id": 35, "population": 11451245},
+    {"ibge_code": "4318804", "name": "São Paulo das Missões", "state_id": 43, "population": 6025},
+    {"ibge_code": "3509502", "name": "Campinas", "state_id": 35, "population": 1139047},
+    {"ibge_code": "2504009", "name": "Campina Grande", "state_id": 25, "population": 419379},
+    {"ibge_code": "3509700", "name": "Campina do Monte Alegre", "state_id": 35, "population": 5567},
+    {"ibge_code": "2927408", "name": "Salvador", "state_id": 29, "population": 2418005},
+    {"ibge_code": "3304557", "name": "Rio de Janeiro", "state_id": 33, "population": 6211223},
+    {"ibge_code": "3545803", "name": "Santa Bárbara d'Oeste", "state_id": 35, "population": 183347},
+    {"ibge_code": "3530607", "name": "Mogi das Cruzes", "state_id": 35, "population": 451505},
+    {"ibge_code": "1100106", "name": "Guajará-Mirim", "state_id": 11, "population": 39386},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return MunicipalitySearchIndex(MUNICIPIOS)
+
+
+def nomes(resultados):
+    return [r["name"] for r in resultados]
+
+
+class TestFold:
+    """Testes da normalizacao de nomes."""
+
+    def test_remove_acentos_e_pontuacao(self):
+        """Acentos, maiusculas, hifen e apostrofo nao importam."""
+        assert fold("Santa Bárbara d'Oeste") == "santa barbara d oeste"
+        assert fold("GUAJARÁ-MIRIM") == "guajara mirim"
+        assert fold("  São   Paulo ") == "sao paulo"
+
+
+class TestBusca:
+    """Testes da busca por prefixo e por trigramas."""
+
+    def test_sem_acento(self, index):
+        """'sao paulo' deve achar 'São Paulo' primeiro."""
+        assert nomes(index.search("sao paulo"))[:2] == ["São Paulo", "São Paulo das Missões"]
+
+    def test_prefixo_ordena_por_populacao(self, index):
+        """Prefixo do nome: municipios maiores primeiro."""
+        assert nomes(index.search("campin"))[:3] == ["Campinas", "Campina Grande", "Campina do Monte Alegre"]
+
+    def test_nome_exato_antes_de_prefixo(self, index):
+        """Nome completo vem antes de nomes que so comecam igual."""
+        menor = MUNICIPIOS + [{"ibge_code": "0000001", "name": "Campina", "state_id": 1, "population": 10}]
+        assert nomes(MunicipalitySearchIndex(menor).search("campina"))[0] == "Campina"
+
+    def test_prefixo_de_outra_palavra(self, index):
+        """'janeiro' e 'paulo' devem achar pelo meio do nome."""
+        assert nomes(index.search("janeiro"))[0] == "Rio de Janeiro"
+        assert "São Paulo" in nomes(index.search("paulo"))
+
+    def test_erro_de_digitacao(self, index):
+        """Uma letra trocada, faltando ou invertida ainda acha o municipio."""
+        assert nomes(index.search("slavador"))[0] == "Salvador"
+        assert nomes(index.search("rio de janiero"))[0] == "Rio de Janeiro"
+        assert nomes(index.search("campinsa"))[0] == "Campinas"
+        assert nomes(index.search("sao paolo"))[0] == "São Paulo"
+
+    def test_pontuacao_na_consulta(self, index):
+        """Hifen e apostrofo na consulta sao ignorados."""
+        assert nomes(index.search("guajara mirim"))[0] == "Guajará-Mirim"
+        assert nomes(index.search("santa barbara doeste"))[0] == "Santa Bárbara d'Oeste"
+
+    def test_limite_e_sem_resultado(self, index):
+        """Respeita o limite e nao inventa resultados."""
+        assert len(index.search("sa", limit=2)) == 2
+        assert index.search("xyzw") == []
+        assert index.search("  ") == []
+
+
+class TestCarga:
+    """Testes da carga do indice do processo."""
+
+    def test_carrega_uma_vez_e_invalida(self, monkeypatch):
+        """Indice e montado uma vez e refeito depois de invalidado."""
+        monkeypatch.setattr(municipality_search, "_index", None)
+        with patch.object(municipality_search, "_records_from_db", return_value=MUNICIPIOS) as carga:
+            primeiro = get_municipality_search_index()
+            assert get_municipality_search_index() is primeiro
+            invalidate_municipality_search_index()
+            assert get_municipality_search_index() is not primeiro
+
+        assert carga.call_count == 2
+        assert len(primeiro) == len(MUNICIPIOS)
+
+    def test_indice_vazio_tenta_de_novo(self, monkeypatch):
+        """Sem municipios no banco, o indice e refeito depois do intervalo."""
+        monkeypatch.setattr(municipality_search, "_index", None)
+        monkeypatch.setattr(municipality_search, "EMPTY_RETRY_INTERVAL", 0.0)
+        with patch.object(municipality_search, "_records_from_db", side_effect=[[], MUNICIPIOS]):
+            assert len(get_municipality_search_index()) == 0
+            assert len(get_municipality_search_index()) == len(MUNICIPIOS)
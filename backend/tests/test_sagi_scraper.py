@@ -0,0 +1,309 @@
+"""Testes do scraper concorrente do CadÚnico (SAGI) contra um servidor local."""
+
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.jobs import ingest_sagi_cadunico as job
+from app.models import CadUnicoData, ScrapeCheckpoint, ScrapeStatus
+
+
+# Trecho gravado do modulo cadastro-unico.php do RI
+SAGI_HTML = """
+<div class="dvOMR">
+  <div id="cadastrounico">
+    <div class="container_prog">
+      <span class="titulo_textoc">Famílias cadastradas</span>
+      <span class="ref_textoc">Cadastro Único - out/2024</span>
+      <span class="dado_textoc">{familias}</span>
+    </div>
+    <div class="container_prog">
+      <span class="titulo_textoc">Pessoas cadastradas</span>
+      <span class="ref_textoc">Cadastro Único - out/2024</span>
+      <span class="dado_textoc">{pessoas}</span>
+    </div>
+    <div class="container_prog">
+      <span class="titulo_textoc">Famílias</span>
+      <span class="ref_textoc">em situação de pobreza</span>
+      <span class="dado_textoc">{pobreza}</span>
+    </div>
+  </div>
+</div>
+"""
+
+EMPTY_HTML = '<div class="container_prog"><span class="dado_textoc">-</span></div>'
+
+
+class StubSagi:
+    """Servidor HTTP local que responde como o RI do SAGI.
+
+    ``falhas[codigo]`` respostas 503 antes da pagina real; codigos em
+    ``vazios`` devolvem a pagina sem dados (como quando o RI depende de JS).
+    """
+
+    def __init__(self):
+        self.falhas = {}
+        self.vazios = set()
+        self.posts = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, corpo):
+                dados = corpo.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_GET(self):
+                self._responder(200, "<html></html>")
+
+            def do_POST(self):
+                tamanho = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(tamanho).decode())
+                codigo = form["codigo"][0]
+                stub.posts.append(codigo)
+                if stub.falhas.get(codigo, 0) > 0:
+                    stub.falhas[codigo] -= 1
+                    self._responder(503, "indisponivel")
+                elif codigo in stub.vazios:
+                    self._responder(200, EMPTY_HTML)
+                else:
+                    n = int(codigo[-3:])
+                    self._responder(200, SAGI_HTML.format(
+                        familias=f"{n * 1000:,}".replace(",", "."),
+                        pessoas=f"{n * 2500:,}".replace(",", "."),
+                        pobreza=f"{n * 300:,}".replace(",", "."),
+                    ))
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/ri/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def sagi():
+    with StubSagi() as stub:
+        yield stub
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'sagi.db'}", connect_args={"check_same_thread": False}
+    )
+    CadUnicoData.__table__.create(engine)
+    ScrapeCheckpoint.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+MUNICIPIOS = [(i, f"3550{i:03d}", f"Municipio {i}") for i in range(1, 9)]
+
+
+def _config(sagi, **kwargs):
+    defaults = dict(concurrency=4, min_delay=0, max_delay=0.02, base_url=sagi.base_url, write_batch=3)
+    defaults.update(kwargs)
+    return job.ScraperConfig(**defaults)
+
+
+def _scraper(sagi, session_factory, **kwargs):
+    return job.SagiScraper(_config(sagi, **kwargs), "2024-10-01", session_factory=session_factory)
+
+
+class TestThrottle:
+    def test_falha_dobra_e_sucesso_reduz(self):
+        throttle = job.AdaptiveThrottle(min_delay=0.1, max_delay=1.0, step=0.1)
+
+        throttle.failure()
+        throttle.failure()
+        assert throttle.delay == pytest.approx(0.4)
+        for _ in range(5):
+            throttle.failure()
+        assert throttle.delay == 1.0
+
+        for _ in range(100):
+            throttle.success()
+        assert throttle.delay == 0.1
+
+    def test_backoff_parte_do_passo_com_delay_zero(self):
+        throttle = job.AdaptiveThrottle(min_delay=0, max_delay=10, step=0.5)
+        throttle.failure()
+        assert throttle.delay == 0.5
+
+
+class TestReferencia:
+    @pytest.mark.parametrize("periodo, esperado", [
+        ("2024-10-01", date(2024, 10, 1)),
+        ("10-2024", date(2024, 10, 1)),
+    ])
+    def test_formatos(self, periodo, esperado):
+        assert job.reference_date_for(periodo) == esperado
+
+    def test_padrao_mes_atual(self):
+        assert job.reference_date_for(None) == date.today().replace(day=1)
+
+
+class TestScraper:
+    async def test_coleta_todos_e_grava_checkpoints(self, sagi, session_factory):
+        stats = await _scraper(sagi, session_factory).run(MUNICIPIOS)
+
+        assert (stats.done, stats.empty, stats.failed, stats.skipped) == (8, 0, 0, 0)
+        assert stats.http_pages == 8
+        assert stats.failure_rate == 0
+        assert stats.pages_per_second > 0
+
+        db = session_factory()
+        try:
+            linhas = {c.municipality_id: c for c in db.query(CadUnicoData)}
+            assert len(linhas) == 8
+            assert linhas[3].total_families == 3000
+            assert linhas[3].total_persons == 7500
+            assert linhas[3].families_poverty == 900
+            assert linhas[3].reference_date == date(2024, 10, 1)
+
+            checkpoints = db.query(ScrapeCheckpoint).all()
+            assert {c.status for c in checkpoints} == {ScrapeStatus.DONE}
+            assert {c.run_key for c in checkpoints} == {"2024-10-01"}
+            assert {c.method for c in checkpoints} == {"http"}
+        finally:
+            db.close()
+
+    async def test_retoma_de_onde_parou(self, sagi, session_factory):
+        await _scraper(sagi, session_factory).run(MUNICIPIOS[:5])
+        sagi.posts.clear()
+
+        stats = await _scraper(sagi, session_factory).run(MUNICIPIOS)
+
+        assert stats.skipped == 5
+        assert stats.done == 3
+        assert sorted(sagi.posts) == ["3550006", "3550007", "3550008"]
+
+    async def test_restart_ignora_checkpoints(self, sagi, session_factory):
+        await _scraper(sagi, session_factory).run(MUNICIPIOS[:2])
+        sagi.posts.clear()
+
+        stats = await _scraper(sagi, session_factory, restart=True).run(MUNICIPIOS[:2])
+
+        assert stats.skipped == 0
+        assert len(sagi.posts) == 2
+
+    async def test_outro_periodo_nao_reaproveita(self, sagi, session_factory):
+        await _scraper(sagi, session_factory).run(MUNICIPIOS[:2])
+
+        scraper = job.SagiScraper(_config(sagi), "2024-11-01", session_factory=session_factory)
+        stats = await scraper.run(MUNICIPIOS[:2])
+
+        assert stats.skipped == 0
+
+    async def test_falha_temporaria_e_refeita(self, sagi, session_factory):
+        sagi.falhas["3550002"] = 2
+
+        stats = await _scraper(sagi, session_factory).run(MUNICIPIOS[:3])
+
+        assert stats.done == 3
+        assert stats.failures == 2
+        assert stats.attempts == 5
+        assert stats.failure_rate == pytest.approx(0.4)
+
+        db = session_factory()
+        try:
+            checkpoint = db.get(ScrapeCheckpoint, ("sagi_cadunico", "2024-10-01", 2))
+            assert checkpoint.attempts == 3
+        finally:
+            db.close()
+
+    async def test_desiste_apos_max_tentativas(self, sagi, session_factory):
+        sagi.falhas["3550001"] = 10
+
+        stats = await _scraper(sagi, session_factory, max_attempts=2).run(MUNICIPIOS[:2])
+
+        assert (stats.done, stats.failed) == (1, 1)
+        assert sagi.posts.count("3550001") == 2
+
+        db = session_factory()
+        try:
+            checkpoint = db.get(ScrapeCheckpoint, ("sagi_cadunico", "2024-10-01", 1))
+            assert checkpoint.status == ScrapeStatus.FAILED
+            assert checkpoint.last_error
+        finally:
+            db.close()
+
+        # Falhas nao contam como concluidas: a proxima execucao tenta de novo
+        sagi.falhas.clear()
+        stats = await _scraper(sagi, session_factory).run(MUNICIPIOS[:2])
+        assert (stats.skipped, stats.done) == (1, 1)
+
+    async def test_pagina_vazia_sem_navegador(self, sagi, session_factory):
+        sagi.vazios.add("3550001")
+
+        stats = await _scraper(sagi, session_factory).run(MUNICIPIOS[:2])
+
+        assert (stats.done, stats.empty) == (1, 1)
+        db = session_factory()
+        try:
+            assert db.query(CadUnicoData).count() == 1
+        finally:
+            db.close()
+
+    async def test_fallback_para_navegador(self, sagi, session_factory, monkeypatch):
+        sagi.vazios.add("3550001")
+        chamadas = []
+
+        class FakePool:
+            def __init__(self, size, max_requests):
+                self.size = size
+
+            def slot(self):
+                pool = self
+
+                class Slot:
+                    async def __aenter__(self):
+                        return pool
+
+                    async def __aexit__(self, *exc):
+                        return False
+
+                return Slot()
+
+            async def stop(self):
+                pass
+
+        async def fake_browser(ibge_code, periodo, browser_manager, max_retries, base_url):
+            chamadas.append((ibge_code, browser_manager.size, base_url))
+            return job.CadUnicoExtract(total_families=42, total_persons=99)
+
+        monkeypatch.setattr(job, "BrowserPool", FakePool)
+        monkeypatch.setattr(job, "fetch_cadunico_browser", fake_browser)
+
+        stats = await _scraper(
+            sagi, session_factory, use_browser=True, browser_contexts=3
+        ).run(MUNICIPIOS[:2])
+
+        assert chamadas == [("3550001", 3, sagi.base_url)]
+        assert (stats.done, stats.http_pages, stats.browser_pages) == (2, 2, 1)
+        db = session_factory()
+        try:
+            checkpoint = db.get(ScrapeCheckpoint, ("sagi_cadunico", "2024-10-01", 1))
+            assert checkpoint.method == "browser"
+            cadunico = db.query(CadUnicoData).filter_by(municipality_id=1).one()
+            assert cadunico.total_families == 42
+        finally:
+            db.close()
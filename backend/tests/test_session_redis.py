@@ -84,3 +84,222 @@ class TestSessionRedisHelpers:
         deserialized = json.loads(serialized)
         
         assert deserialized["session_id"] == "test123"
+
+
+class FakeRedis:
+    """Redis em memória com os comandos usados pelo gerenciador."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+        self.zsets = {}
+        self.commands = []
+        self.round_trips = 0
+
+    def getex(self, key, ex=None):
+        if key in self.data and ex:
+            self.ttl[key] = ex
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttl[key] = ex
+        return True
+
+    def delete(self, key):
+        return 1 if self.data.pop(key, None) is not None else 0
+
+    def zadd(self, key, mapping, xx=False):
+        zset = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            if xx and member not in zset:
+                continue
+            zset[member] = score
+        return len(mapping)
+
+    def zrem(self, key, member):
+        return 1 if self.zsets.get(key, {}).pop(member, None) is not None else 0
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        expired = [m for m, score in zset.items() if score <= high]
+        for member in expired:
+            del zset[member]
+        return len(expired)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def keys(self, pattern):
+        raise AssertionError("KEYS nao deve ser usado")
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.queued.append((name, args, kwargs))
+            return self
+        return queue
+
+    def _run(self):
+        self.redis.round_trips += 1
+        self.redis.commands.extend(name for name, _, _ in self.queued)
+        results = [getattr(self.redis, name)(*a, **kw) for name, a, kw in self.queued]
+        self.queued = []
+        return results
+
+    def execute(self):
+        return self._run()
+
+
+class FakeAsyncPipeline(FakePipeline):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self):
+        return self._run()
+
+
+class FakeAsyncRedis:
+    def __init__(self, redis):
+        self.redis = redis
+
+    def pipeline(self, transaction=True):
+        return FakeAsyncPipeline(self.redis)
+
+
+@pytest.fixture
+def manager():
+    from app.agent.session_redis import RedisSessionManager
+
+    with patch("app.agent.session_redis.redis.from_url") as from_url:
+        fake = FakeRedis()
+        from_url.return_value = MagicMock()
+        manager = RedisSessionManager(redis_url="redis://fake", ttl_seconds=600, prefix="t:")
+    manager._redis = fake
+    manager._async_redis = FakeAsyncRedis(fake)
+    manager.fake = fake
+    return manager
+
+
+class TestCodificacao:
+    def test_ida_e_volta_com_historico_limitado(self):
+        from app.agent.context import ConversationContext, FlowType, MessageRole
+        from app.agent.session_redis import decode_context, encode_context
+
+        context = ConversationContext(session_id="abc", active_flow=FlowType.FARMACIA)
+        context.citizen.cpf = "52998224725"
+        for i in range(15):
+            context.add_message(MessageRole.USER, f"mensagem {i} " + "x" * 80)
+
+        data = encode_context(context, max_history=10)
+        restored = decode_context(data)
+
+        assert restored.session_id == "abc"
+        assert restored.active_flow == FlowType.FARMACIA
+        assert restored.citizen.cpf == "52998224725"
+        assert len(restored.history) == 10
+        assert restored.history[-1].content.startswith("mensagem 14")
+        # O contexto em memoria nao e alterado
+        assert len(context.history) == 15
+
+    def test_payload_grande_e_comprimido(self):
+        from app.agent.context import ConversationContext, MessageRole
+        from app.agent.session_redis import FORMAT_RAW, encode_context
+
+        context = ConversationContext()
+        for i in range(10):
+            context.add_message(MessageRole.USER, "quero pedir remedios " * 20)
+
+        data = encode_context(context)
+
+        assert data[:1] != FORMAT_RAW
+        assert len(data) < len(context.model_dump_json()) / 3
+
+    def test_le_sessoes_antigas_em_json(self):
+        from app.agent.context import ConversationContext
+        from app.agent.session_redis import decode_context
+
+        legado = ConversationContext(session_id="antiga").model_dump_json()
+
+        assert decode_context(legado).session_id == "antiga"
+
+
+class TestOperacoes:
+    def test_get_usa_getex_em_um_round_trip(self, manager):
+        context = manager.get_or_create("s1")
+        manager.fake.commands.clear()
+        manager.fake.round_trips = 0
+
+        loaded = manager.get("s1")
+
+        assert loaded.session_id == context.session_id
+        assert manager.fake.round_trips == 1
+        assert "getex" in manager.fake.commands
+        assert "expire" not in manager.fake.commands
+        assert manager.fake.ttl["t:s1"] == 600
+
+    def test_contagem_pelo_indice(self, manager):
+        for session_id in ("a", "b", "c"):
+            manager.get_or_create(session_id)
+        manager.delete("b")
+        # Sessao expirada continua no indice ate a contagem
+        manager.fake.zsets["t:index"]["velha"] = 1.0
+
+        assert manager.count_sessions() == 2
+        assert "velha" not in manager.fake.zsets["t:index"]
+
+    async def test_api_async(self, manager):
+        from app.agent.context import MessageRole
+
+        context = await manager.aget_or_create("s2")
+        context.add_message(MessageRole.USER, "oi")
+        await manager.asave(context)
+
+        loaded = await manager.aget("s2")
+        assert [m.content for m in loaded.history] == ["oi"]
+        assert await manager.acount_sessions() == 1
+
+        assert await manager.areset("s2")
+        assert (await manager.aget("s2")).history == []
+
+        assert await manager.adelete("s2")
+        assert await manager.aget("s2") is None
+
+    async def test_latencia_registrada(self, manager):
+        from prometheus_client import REGISTRY
+
+        def observacoes():
+            return REGISTRY.get_sample_value(
+                "session_store_duration_seconds_count", {"operation": "get"}
+            ) or 0
+
+        antes = observacoes()
+        await manager.aget("inexistente")
+
+        assert observacoes() == antes + 1
+
+    async def test_erro_de_conexao_usa_fallback(self, manager):
+        import redis
+
+        class Quebrado:
+            def pipeline(self, transaction=True):
+                raise redis.ConnectionError("down")
+
+        manager._async_redis = Quebrado()
+        context = await manager.aget_or_create("s3")
+
+        assert manager._fallback_sessions["s3"] is context
+        # Redis marcado como indisponivel: nem tenta o cliente
+        assert manager._get_async() is None
+        assert (await manager.aget("s3")) is context
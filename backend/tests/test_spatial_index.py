@@ -0,0 +1,274 @@
+"""Testes para o indice espacial de CRAS e farmacias."""
+
+import importlib
+import random
+import threading
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.agent.tools.google_places import _calculate_distance
+from app.services import spatial_index
+from app.services.spatial_index import (
+    CRAS,
+    FARMACIAS,
+    SpatialIndex,
+    get_spatial_index,
+    invalidate_spatial_index,
+    merge_by_proximity,
+)
+
+
+def random_points(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "nome": f"P{i}",
+            "latitude": rng.uniform(-33.7, 5.2),
+            "longitude": rng.uniform(-73.9, -34.8),
+            "programas": ["FARMACIA_POPULAR"] if i % 2 else [],
+        }
+        for i in range(count)
+    ]
+
+
+def brute_force(points, latitude, longitude, k, radius_m, where=None):
+    dists = [
+        (p, _calculate_distance(latitude, longitude, p["latitude"], p["longitude"]))
+        for p in points
+        if where is None or where(p)
+    ]
+    dists = [d for d in dists if radius_m is None or d[1] <= radius_m]
+    return sorted(dists, key=lambda d: d[1])[:k]
+
+
+@pytest.fixture
+def indexes(monkeypatch):
+    """Indices do processo isolados por teste."""
+    monkeypatch.setattr(spatial_index, "_indexes", {})
+    monkeypatch.setattr(spatial_index, "_refreshing", set())
+    return spatial_index._indexes
+
+
+class TestSpatialIndex:
+    @pytest.mark.parametrize("radius_m", [500, 5_000, 50_000, 300_000, None])
+    def test_igual_a_busca_exaustiva(self, radius_m):
+        points = random_points(5_000)
+        index = SpatialIndex(points)
+        rng = random.Random(radius_m or 0)
+
+        for _ in range(50):
+            lat, lon = rng.uniform(-30, 0), rng.uniform(-60, -38)
+            result = index.nearest(lat, lon, k=5, radius_m=radius_m)
+            expected = brute_force(points, lat, lon, 5, radius_m)
+
+            assert [p["nome"] for p, _ in result] == [p["nome"] for p, _ in expected]
+            for (_, got), (_, want) in zip(result, expected):
+                assert got == pytest.approx(want, rel=1e-6)
+
+    def test_filtro_where(self):
+        points = random_points(2_000)
+        index = SpatialIndex(points)
+
+        def where(p):
+            return "FARMACIA_POPULAR" in p["programas"]
+
+        result = index.nearest(-23.55, -46.63, k=10, radius_m=400_000, where=where)
+        expected = brute_force(points, -23.55, -46.63, 10, 400_000, where)
+        assert [p["nome"] for p, _ in result] == [p["nome"] for p, _ in expected]
+
+    def test_ignora_pontos_sem_coordenadas(self):
+        index = SpatialIndex([
+            {"nome": "a", "latitude": None, "longitude": -46.6},
+            {"nome": "b", "latitude": "x", "longitude": -46.6},
+            {"nome": "c", "latitude": -23.5, "longitude": -46.6},
+        ])
+        assert len(index) == 1
+        assert index.nearest(-23.5, -46.6)[0][0]["nome"] == "c"
+
+    def test_vazio(self):
+        assert SpatialIndex([]).nearest(-23.5, -46.6, radius_m=1000) == []
+
+    def test_fora_do_raio(self):
+        index = SpatialIndex([{"nome": "rio", "latitude": -22.9, "longitude": -43.2}])
+        assert index.nearest(-23.55, -46.63, radius_m=10_000) == []
+
+
+class TestMergeByProximity:
+    def test_enriquece_apenas_correspondencia_proxima(self):
+        local = [
+            {"nome": "CRAS A", "latitude": -23.5500, "longitude": -46.6300, "aberto_agora": None},
+            {"nome": "CRAS B", "latitude": -23.6000, "longitude": -46.7000, "aberto_agora": None},
+        ]
+        external = [
+            {"nome": "CRAS A (Google)", "latitude": -23.5505, "longitude": -46.6302, "aberto_agora": True},
+        ]
+
+        merged = merge_by_proximity(local, external, fields=("aberto_agora",))
+
+        assert merged[0]["aberto_agora"] is True
+        assert merged[0]["nome"] == "CRAS A"
+        assert merged[1]["aberto_agora"] is None
+
+
+class TestIndicesDoProcesso:
+    def test_farmacias_do_json(self, indexes):
+        index = get_spatial_index(FARMACIAS)
+        assert len(index) > 0
+        assert index.sample
+        assert get_spatial_index(FARMACIAS) is index
+
+    def test_cras_usa_json_quando_banco_vazio(self, indexes, monkeypatch):
+        monkeypatch.setattr(spatial_index, "_cras_points_from_db", lambda: [])
+        index = get_spatial_index(CRAS)
+
+        nome, _ = index.nearest(-23.5889, -46.6388, k=1, radius_m=1_000)[0]
+        assert nome["nome"] == "CRAS Vila Mariana"
+        assert index.sample
+
+    def test_cras_do_banco_nao_e_exemplo(self, indexes, monkeypatch):
+        monkeypatch.setattr(spatial_index, "_cras_points_from_db", lambda: [
+            {"nome": "CRAS Banco", "latitude": -23.55, "longitude": -46.63},
+        ])
+        assert not get_spatial_index(CRAS).sample
+
+    def test_erro_no_banco_nao_fixa_exemplo(self, indexes, monkeypatch):
+        """Erro no banco: exemplo temporario, refeito em background."""
+        agora = [1000.0]
+        monkeypatch.setattr(spatial_index.time, "monotonic", lambda: agora[0])
+        monkeypatch.setattr(spatial_index, "_cras_points_from_db", lambda: None)
+        exemplo = get_spatial_index(CRAS)
+        assert exemplo.sample
+        assert exemplo.expires_at == 1000.0 + spatial_index.DB_ERROR_RETRY_INTERVAL
+
+        monkeypatch.setattr(spatial_index, "_cras_points_from_db", lambda: [
+            {"nome": "CRAS Banco", "latitude": -23.55, "longitude": -46.63},
+        ])
+        assert get_spatial_index(CRAS) is exemplo
+        agora[0] += spatial_index.DB_ERROR_RETRY_INTERVAL
+        threads = []
+        thread_original = threading.Thread
+        monkeypatch.setattr(spatial_index.threading, "Thread",
+                            lambda **kw: threads.append(thread_original(**kw)) or threads[-1])
+        # Expirado: devolve o antigo enquanto refaz em outra thread
+        assert get_spatial_index(CRAS) is exemplo
+        assert get_spatial_index(CRAS) is exemplo
+        assert len(threads) == 1
+        threads[0].join(timeout=5)
+
+        novo = get_spatial_index(CRAS)
+        assert not novo.sample
+        assert novo.expires_at is None
+
+    def test_tabela_vazia_tenta_de_novo_mais_tarde(self, indexes, monkeypatch):
+        monkeypatch.setattr(spatial_index, "_cras_points_from_db", lambda: [])
+        index = get_spatial_index(CRAS)
+        restante = index.expires_at - spatial_index.time.monotonic()
+        assert spatial_index.DB_ERROR_RETRY_INTERVAL < restante <= spatial_index.EMPTY_RETRY_INTERVAL
+
+    def test_invalidate(self, indexes, monkeypatch):
+        monkeypatch.setattr(spatial_index, "_cras_points_from_db", lambda: [])
+        first = get_spatial_index(CRAS)
+        invalidate_spatial_index(CRAS)
+        assert get_spatial_index(CRAS) is not first
+
+
+class TestBuscaPorCoordenadas:
+    async def test_cras_local_sem_api_externa(self, indexes, monkeypatch):
+        module = importlib.import_module("app.agent.tools.buscar_cras")
+
+        indexes[CRAS] = SpatialIndex([
+            {"nome": "CRAS Perto", "endereco": "Rua A", "latitude": -23.551, "longitude": -46.631},
+            {"nome": "CRAS Longe", "endereco": "Rua B", "latitude": -23.700, "longitude": -46.800},
+        ])
+        google = AsyncMock()
+        monkeypatch.setattr("app.agent.tools.google_places.buscar_cras_proximos", google)
+
+        result = await module.buscar_cras_por_coordenadas(-23.55, -46.63, raio_metros=5_000)
+
+        assert result["encontrados"] == 1
+        assert result["cras"][0]["nome"] == "CRAS Perto"
+        assert result["cras"][0]["fonte"] == "local"
+        google.assert_not_awaited()
+
+    async def test_farmacia_local_filtra_programa(self, indexes, monkeypatch):
+        module = importlib.import_module("app.agent.tools.buscar_farmacia")
+
+        indexes[FARMACIAS] = SpatialIndex([
+            {"nome": "Sem programa", "endereco": "", "latitude": -23.5501, "longitude": -46.6301,
+             "programas": []},
+            {"nome": "Credenciada", "endereco": "", "latitude": -23.552, "longitude": -46.632,
+             "programas": ["DIGNIDADE_MENSTRUAL"]},
+        ])
+        mcp = AsyncMock()
+        monkeypatch.setattr(module, "_buscar_farmacia_mcp", mcp)
+
+        result = await module.buscar_farmacia_por_coordenadas(
+            -23.55, -46.63, programa="DIGNIDADE_MENSTRUAL"
+        )
+
+        assert [f["nome"] for f in result["farmacias"]] == ["Credenciada"]
+        mcp.assert_not_awaited()
+
+    async def test_cras_de_exemplo_consulta_google_primeiro(self, indexes, monkeypatch):
+        module = importlib.import_module("app.agent.tools.buscar_cras")
+
+        indexes[CRAS] = SpatialIndex([
+            {"nome": "CRAS Exemplo", "endereco": "Rua A", "latitude": -23.551, "longitude": -46.631},
+        ], sample=True)
+        google = AsyncMock(return_value={"sucesso": True, "cras": [
+            {"nome": "CRAS Real", "endereco": "Rua C", "fonte": "google_places"},
+        ]})
+        monkeypatch.setattr("app.agent.tools.google_places.buscar_cras_proximos", google)
+
+        result = await module.buscar_cras_por_coordenadas(-23.55, -46.63, raio_metros=5_000)
+
+        assert [c["nome"] for c in result["cras"]] == ["CRAS Real"]
+        google.assert_awaited_once()
+
+    async def test_cras_de_exemplo_quando_google_falha(self, indexes, monkeypatch):
+        module = importlib.import_module("app.agent.tools.buscar_cras")
+
+        indexes[CRAS] = SpatialIndex([
+            {"nome": "CRAS Exemplo", "endereco": "Rua A", "latitude": -23.551, "longitude": -46.631},
+        ], sample=True)
+        google = AsyncMock(return_value={"sucesso": False, "erro": "offline"})
+        monkeypatch.setattr("app.agent.tools.google_places.buscar_cras_proximos", google)
+
+        result = await module.buscar_cras_por_coordenadas(-23.55, -46.63, raio_metros=5_000)
+
+        assert [c["nome"] for c in result["cras"]] == ["CRAS Exemplo"]
+        assert result["cras"][0]["fonte"] == "local"
+
+    async def test_farmacia_de_exemplo_consulta_mcp_primeiro(self, indexes, monkeypatch):
+        module = importlib.import_module("app.agent.tools.buscar_farmacia")
+
+        indexes[FARMACIAS] = SpatialIndex([
+            {"nome": "Exemplo", "endereco": "", "latitude": -23.5501, "longitude": -46.6301},
+        ], sample=True)
+        mcp = AsyncMock(return_value=[
+            {"nome": "Drogaria Real", "endereco": "Rua D", "fonte": "mcp"},
+        ])
+        google = AsyncMock()
+        monkeypatch.setattr(module, "_buscar_farmacia_mcp", mcp)
+        monkeypatch.setattr(module, "_buscar_farmacia_google_direto", google)
+
+        result = await module.buscar_farmacia_por_coordenadas(-23.55, -46.63)
+
+        assert [f["nome"] for f in result["farmacias"]] == ["Drogaria Real"]
+        google.assert_not_awaited()
+
+    async def test_farmacia_de_exemplo_quando_apis_falham(self, indexes, monkeypatch):
+        module = importlib.import_module("app.agent.tools.buscar_farmacia")
+
+        indexes[FARMACIAS] = SpatialIndex([
+            {"nome": "Exemplo", "endereco": "", "latitude": -23.5501, "longitude": -46.6301},
+        ], sample=True)
+        monkeypatch.setattr(module, "_buscar_farmacia_mcp", AsyncMock(return_value=[]))
+        monkeypatch.setattr(module, "_buscar_farmacia_google_direto",
+                            AsyncMock(return_value={"sucesso": False, "farmacias": []}))
+
+        result = await module.buscar_farmacia_por_coordenadas(-23.55, -46.63)
+
+        assert [f["nome"] for f in result["farmacias"]] == ["Exemplo"]
+        assert result["farmacias"][0]["fonte"] == "local"
@@ -255,3 +255,102 @@ class TestRateLimiting:
             result = await consultar_bolsa_familia("52998224725")
             assert result["beneficiario"] is False
             assert "erro" in result or "Limite" in str(result)
+
+
+class TestClienteCompartilhado:
+    """Testes para o cliente HTTP reaproveitado entre consultas."""
+
+    @pytest.mark.asyncio
+    async def test_reaproveita_cliente(self):
+        """Varias consultas devem usar o mesmo cliente e fechar no shutdown."""
+        import httpx
+        from app.services import transparencia_service
+
+        chamadas = []
+
+        def responder(request):
+            chamadas.append(request)
+            return httpx.Response(200, json=[])
+
+        cliente = httpx.AsyncClient(
+            base_url=transparencia_service.TRANSPARENCIA_BASE_URL,
+            transport=httpx.MockTransport(responder),
+        )
+        with patch.object(transparencia_service, "_client", cliente), \
+                patch("app.services.transparencia_service._get_api_key", return_value="chave"):
+            await transparencia_service._fazer_requisicao("/bpc-por-cpf-ou-nis", "529.982.247-25")
+            await transparencia_service._fazer_requisicao("/seguro-defeso-por-cpf-ou-nis", "52998224725")
+            assert transparencia_service._get_client() is cliente
+
+            await transparencia_service.fechar_cliente()
+            assert transparencia_service._client is None
+
+        assert cliente.is_closed
+        assert len(chamadas) == 2
+        assert chamadas[0].headers["chave-api-dados"] == "chave"
+        assert chamadas[0].url.params["cpfNisBeneficiario"] == "52998224725"
+
+
+class TestCacheResultado:
+    """Testes para o cache do resultado consolidado."""
+
+    def test_chave_nao_contem_cpf(self):
+        """Chave do cache usa o hash completo, nunca o CPF."""
+        from app.services.transparencia_service import _chave_cache
+
+        chave = _chave_cache("52998224725")
+        assert "52998224725" not in chave
+        assert chave.endswith(_hash_cpf("52998224725", tamanho=64))
+        assert len(_hash_cpf("52998224725", tamanho=64)) == 64
+
+    def test_ttl_ate_publicacao(self):
+        """TTL deve durar ate a proxima publicacao mensal."""
+        from datetime import datetime
+        from app.services.transparencia_service import _ttl_ate_publicacao
+
+        assert _ttl_ate_publicacao(datetime(2025, 3, 5)) == 5 * 86400
+        assert _ttl_ate_publicacao(datetime(2025, 3, 20)) == 21 * 86400
+        assert _ttl_ate_publicacao(datetime(2025, 12, 31)) == 10 * 86400
+        # Logo antes da publicacao: minimo de 1 hora
+        assert _ttl_ate_publicacao(datetime(2025, 3, 9, 23, 59)) == 3600
+
+    @pytest.mark.asyncio
+    async def test_segunda_consulta_vem_do_cache(self, monkeypatch):
+        """Consulta repetida nao deve chamar a API."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        guardado = {}
+
+        async def fake_get(chave):
+            return guardado.get(chave)
+
+        async def fake_set(chave, valor, ttl=3600):
+            guardado[chave] = valor
+            return True
+
+        requisicao = AsyncMock(return_value={"success": True, "data": []})
+        with patch("app.services.transparencia_service.aget_cache", side_effect=fake_get), \
+                patch("app.services.transparencia_service.aset_cache", side_effect=fake_set), \
+                patch("app.services.transparencia_service._fazer_requisicao", requisicao):
+            primeira = await consultar_todos_beneficios("52998224725")
+            segunda = await consultar_todos_beneficios("529.982.247-25")
+
+        assert requisicao.await_count == 4
+        assert segunda == primeira
+        assert len(guardado) == 1
+
+    @pytest.mark.asyncio
+    async def test_erro_nao_vai_para_cache(self, monkeypatch):
+        """Resultado com erro (ex: rate limit) nao deve ser guardado."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+        erro = {"success": False, "error": "rate_limit", "message": "Limite"}
+        aset = AsyncMock(return_value=True)
+        with patch("app.services.transparencia_service.aget_cache", AsyncMock(return_value=None)), \
+                patch("app.services.transparencia_service.aset_cache", aset), \
+                patch("app.services.transparencia_service._fazer_requisicao", return_value=erro):
+            await consultar_todos_beneficios("52998224725")
+
+        aset.assert_not_awaited()
@@ -0,0 +1,72 @@
+"""Testes do recalculo set-based de cobertura."""
+
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+from app.jobs import update_coverage as job
+
+
+class TestEscopo:
+    def test_sem_escopo_recalcula_tudo(self):
+        assert job.scope_clause() == ("TRUE", {})
+
+    def test_carga_e_municipios_sao_alternativas(self):
+        clause, params = job.scope_clause(
+            program_ids=[3], reference_dates=[date(2024, 5, 1)], municipality_ids=[10, 11]
+        )
+
+        assert clause == (
+            "(bd.program_id = ANY(:program_ids) AND bd.reference_date = ANY(:reference_dates))"
+            " OR (bd.municipality_id = ANY(:municipality_ids))"
+        )
+        assert params == {
+            "program_ids": [3],
+            "reference_dates": [date(2024, 5, 1)],
+            "municipality_ids": [10, 11],
+        }
+
+    def test_desde_inclui_cadunico_novo(self):
+        desde = datetime(2024, 6, 1)
+        clause, params = job.scope_clause(since=desde)
+
+        assert "bd.ingested_at >= :since" in clause
+        assert "FROM cadunico_data WHERE ingested_at >= :since" in clause
+        assert params == {"since": desde}
+
+    def test_sql_usa_lateral_e_so_grava_alterados(self):
+        sql = job.RECOMPUTE_SQL.format(scope="TRUE")
+        assert "LEFT JOIN LATERAL" in sql
+        assert "IS DISTINCT FROM computed.coverage" in sql
+
+
+class TestRecalculo:
+    def test_resultado_do_sql(self):
+        db = MagicMock()
+        db.execute.return_value.one.return_value = (10, 2, 4, [5, 3], [date(2024, 5, 1)])
+
+        result = job.recompute_coverage(db, program_ids=[3])
+
+        assert db.execute.call_args.args[1] == {"program_ids": [3]}
+        assert (result.evaluated, result.without_cadunico, result.updated) == (10, 2, 4)
+        assert result.program_ids == [3, 5]
+        db.commit.assert_called_once()
+
+    def test_atualiza_resumos_dos_alterados(self):
+        result = job.CoverageResult(updated=4, program_ids=[3], reference_dates=[date(2024, 5, 1)])
+        with patch.object(job, "recompute_coverage", return_value=result), \
+             patch.object(job, "atualizar_agregados") as atualizar, \
+             patch.object(job, "bump_data_generation") as bump:
+            job.update_coverage_rates(MagicMock(), municipality_ids=[10])
+
+        atualizar.assert_called_once()
+        assert atualizar.call_args.args[1:] == ([3], [date(2024, 5, 1)])
+        bump.assert_called_once()
+
+    def test_nada_alterado_mantem_cache(self):
+        with patch.object(job, "recompute_coverage", return_value=job.CoverageResult(evaluated=7)), \
+             patch.object(job, "atualizar_agregados") as atualizar, \
+             patch.object(job, "bump_data_generation") as bump:
+            job.update_coverage_rates(MagicMock())
+
+        atualizar.assert_not_called()
+        bump.assert_not_called()
@@ -0,0 +1,301 @@
+"""
+Testes da fila de respostas do WhatsApp Chat.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from starlette.datastructures import URL, Headers
+from twilio.request_validator import RequestValidator
+
+from app.agent.channels import whatsapp_fila
+from app.agent.channels.whatsapp_fila import (
+    FilaPorSessao,
+    MensagemWhatsApp,
+    registrar_message_sid,
+)
+from app.config import settings
+from app.routers import webhook
+
+BASE_PUBLICA = "https://api.tanamao.test"
+CAMINHO_CHAT = "/api/v1/webhook/whatsapp/chat"
+URL_CHAT = BASE_PUBLICA + CAMINHO_CHAT
+# Valor documentado em .env.example (webhook de pedidos, nao o do chat)
+URL_WEBHOOK_PEDIDOS = "https://seu-dominio.com/api/v1/webhook/whatsapp"
+TOKEN_TESTE = "token-de-teste"
+
+
+def _mensagem(sid: str, telefone: str = "5511999999999", body: str = "oi") -> MensagemWhatsApp:
+    return MensagemWhatsApp(
+        message_sid=sid,
+        session_id=f"whatsapp:{telefone}",
+        telefone=telefone,
+        body=body,
+    )
+
+
+@pytest.fixture
+def sem_redis():
+    """Dedupe so com os SIDs locais."""
+    with patch("app.core.cache.get_async_redis", return_value=None), \
+            patch.object(whatsapp_fila, "_sids_locais", whatsapp_fila.OrderedDict()):
+        yield
+
+
+class TestFilaPorSessao:
+    """Testes da ordem e do limite da fila."""
+
+    @pytest.mark.asyncio
+    async def test_ordem_por_sessao(self):
+        """Mensagens da mesma sessao devem sair na ordem, uma de cada vez."""
+        processadas = []
+        em_andamento = set()
+
+        async def processar(mensagem):
+            assert mensagem.session_id not in em_andamento
+            em_andamento.add(mensagem.session_id)
+            await asyncio.sleep(0.001)
+            processadas.append((mensagem.session_id, mensagem.body))
+            em_andamento.discard(mensagem.session_id)
+
+        fila = FilaPorSessao(processar, workers=4)
+        for i in range(5):
+            for telefone in ("111", "222", "333"):
+                assert fila.enfileirar(_mensagem(f"SM{telefone}{i}", telefone, body=str(i)))
+
+        assert await fila.aguardar_vazia(timeout=5)
+        await fila.parar()
+
+        for telefone in ("111", "222", "333"):
+            da_sessao = [b for s, b in processadas if s == f"whatsapp:{telefone}"]
+            assert da_sessao == ["0", "1", "2", "3", "4"]
+
+    @pytest.mark.asyncio
+    async def test_sessoes_em_paralelo(self):
+        """Sessoes diferentes devem ser processadas ao mesmo tempo."""
+        liberar = asyncio.Event()
+        simultaneas = 0
+        maximo = 0
+
+        async def processar(mensagem):
+            nonlocal simultaneas, maximo
+            simultaneas += 1
+            maximo = max(maximo, simultaneas)
+            await liberar.wait()
+            simultaneas -= 1
+
+        fila = FilaPorSessao(processar, workers=3)
+        for telefone in ("111", "222", "333"):
+            fila.enfileirar(_mensagem(f"SM{telefone}", telefone))
+        await asyncio.sleep(0.01)
+        liberar.set()
+
+        assert await fila.aguardar_vazia(timeout=5)
+        await fila.parar()
+        assert maximo == 3
+
+    @pytest.mark.asyncio
+    async def test_fila_cheia_recusa(self):
+        """Acima do limite, enfileirar deve recusar."""
+        liberar = asyncio.Event()
+
+        async def processar(mensagem):
+            await liberar.wait()
+
+        fila = FilaPorSessao(processar, workers=1, max_pendentes=2)
+        assert fila.enfileirar(_mensagem("SM1"))
+        assert fila.enfileirar(_mensagem("SM2"))
+        assert not fila.enfileirar(_mensagem("SM3"))
+
+        liberar.set()
+        await fila.parar()
+
+    @pytest.mark.asyncio
+    async def test_erro_nao_para_o_worker(self):
+        """Erro em uma mensagem nao deve travar as seguintes da sessao."""
+        processadas = []
+
+        async def processar(mensagem):
+            if mensagem.body == "quebra":
+                raise RuntimeError("falhou")
+            processadas.append(mensagem.body)
+
+        fila = FilaPorSessao(processar, workers=1)
+        fila.enfileirar(_mensagem("SM1", body="quebra"))
+        fila.enfileirar(_mensagem("SM2", body="segue"))
+
+        assert await fila.aguardar_vazia(timeout=5)
+        await fila.parar()
+        assert processadas == ["segue"]
+
+
+class TestDedupe:
+    """Testes do descarte de reenvios do Twilio."""
+
+    @pytest.mark.asyncio
+    async def test_sid_repetido(self, sem_redis):
+        """Mesmo MessageSid so e aceito uma vez."""
+        assert await registrar_message_sid("SM123") is True
+        assert await registrar_message_sid("SM123") is False
+        assert await registrar_message_sid("SM456") is True
+
+    @pytest.mark.asyncio
+    async def test_sem_sid(self, sem_redis):
+        """Sem MessageSid nao da para deduplicar: sempre aceita."""
+        assert await registrar_message_sid(None) is True
+        assert await registrar_message_sid(None) is True
+
+    @pytest.mark.asyncio
+    async def test_usa_redis(self):
+        """Com Redis, o SID e gravado com NX (vale entre workers)."""
+        redis = MagicMock()
+        redis.set = AsyncMock(side_effect=[True, None])
+        with patch("app.core.cache.get_async_redis", return_value=redis):
+            assert await registrar_message_sid("SM789") is True
+            assert await registrar_message_sid("SM789") is False
+
+        args, kwargs = redis.set.call_args
+        assert args[0].endswith("SM789")
+        assert kwargs["nx"] is True
+
+
+def _requisicao(form: dict, assinatura: str | None, headers: dict | None = None) -> MagicMock:
+    """Request do Starlette como chega atras do proxy (http interno)."""
+    todos = {"Host": "backend:8000", **(headers or {})}
+    if assinatura:
+        todos["X-Twilio-Signature"] = assinatura
+    request = MagicMock()
+    request.headers = Headers(todos)
+    request.url = URL(f"http://backend:8000{CAMINHO_CHAT}")
+    request.form = AsyncMock(return_value=form)
+    return request
+
+
+@pytest.fixture
+def twilio_configurado():
+    """Token e URLs como no .env.example."""
+    with patch.object(settings, "TWILIO_AUTH_TOKEN", TOKEN_TESTE), \
+            patch.object(settings, "TWILIO_WEBHOOK_URL", URL_WEBHOOK_PEDIDOS), \
+            patch.object(settings, "WEBHOOK_BASE_URL", BASE_PUBLICA):
+        yield
+
+
+@pytest.mark.usefixtures("twilio_configurado")
+class TestWebhookComFila:
+    """Testes do webhook de chat no modo fila."""
+
+    async def _chamar(self, sid="SM1", body="quero meus beneficios", assinar=True):
+        form = {
+            "From": "whatsapp:+5511999999999", "To": "whatsapp:+14155238886",
+            "Body": body, "MessageSid": sid, "NumMedia": "0", "ProfileName": "Maria",
+        }
+        assinatura = RequestValidator(TOKEN_TESTE).compute_signature(URL_CHAT, form) if assinar else None
+        return await webhook.webhook_whatsapp_chat(
+            request=_requisicao(form, assinatura), From=form["From"], To=form["To"],
+            Body=body, MessageSid=sid, NumMedia="0", MediaUrl0=None,
+            MediaContentType0=None, Latitude=None, Longitude=None, ProfileName="Maria",
+        )
+
+    @pytest.mark.asyncio
+    async def test_enfileira_e_responde_vazio(self, sem_redis):
+        """Webhook deve responder 200 vazio sem chamar o orchestrator."""
+        fila = MagicMock()
+        fila.enfileirar.return_value = True
+        with patch.object(webhook, "_fila_habilitada", return_value=True), \
+                patch.object(webhook, "get_fila_whatsapp", return_value=fila), \
+                patch.object(webhook, "get_orchestrator", side_effect=AssertionError):
+            resposta = await self._chamar()
+
+        assert resposta.status_code == 200
+        assert resposta.body == b""
+        mensagem = fila.enfileirar.call_args.args[0]
+        assert mensagem.session_id == "whatsapp:5511999999999"
+        assert mensagem.body == "quero meus beneficios"
+
+    @pytest.mark.asyncio
+    async def test_sem_assinatura_recusado(self, sem_redis):
+        """Sem X-Twilio-Signature: 403, nada enfileirado nem registrado."""
+        fila = MagicMock()
+        registrar = AsyncMock(return_value=True)
+        with patch.object(webhook, "_fila_habilitada", return_value=True), \
+                patch.object(webhook, "get_fila_whatsapp", return_value=fila), \
+                patch.object(webhook, "registrar_message_sid", registrar):
+            resposta = await self._chamar(assinar=False)
+
+        assert resposta.status_code == 403
+        fila.enfileirar.assert_not_called()
+        registrar.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_assinatura_de_outro_corpo_recusada(self, sem_redis):
+        """Assinatura valida para outro corpo nao passa."""
+        form = {"From": "whatsapp:+5511999999999", "Body": "oi", "MessageSid": "SM7"}
+        assinatura = RequestValidator(TOKEN_TESTE).compute_signature(URL_CHAT, form)
+        fila = MagicMock()
+        with patch.object(webhook, "_fila_habilitada", return_value=True), \
+                patch.object(webhook, "get_fila_whatsapp", return_value=fila):
+            resposta = await webhook.webhook_whatsapp_chat(
+                request=_requisicao({**form, "Body": "outro"}, assinatura),
+                From=form["From"], To=None, Body="outro", MessageSid="SM7", NumMedia="0",
+                MediaUrl0=None, MediaContentType0=None, Latitude=None, Longitude=None,
+                ProfileName=None,
+            )
+
+        assert resposta.status_code == 403
+        fila.enfileirar.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_url_publica_pelos_headers_do_proxy(self, sem_redis):
+        """Sem WEBHOOK_BASE_URL, a URL vem de X-Forwarded-Proto e Host."""
+        form = {"From": "whatsapp:+5511999999999", "Body": "oi", "MessageSid": "SM8"}
+        assinatura = RequestValidator(TOKEN_TESTE).compute_signature(URL_CHAT, form)
+        request = _requisicao(form, assinatura, headers={
+            "Host": "api.tanamao.test", "X-Forwarded-Proto": "https",
+        })
+
+        with patch.object(settings, "WEBHOOK_BASE_URL", ""):
+            assert webhook._url_publica(request) == URL_CHAT
+            assert await webhook._assinatura_twilio_valida(request)
+
+    @pytest.mark.asyncio
+    async def test_reenvio_ignorado(self, sem_redis):
+        """Reenvio do mesmo MessageSid nao deve ser enfileirado de novo."""
+        fila = MagicMock()
+        fila.enfileirar.return_value = True
+        with patch.object(webhook, "_fila_habilitada", return_value=True), \
+                patch.object(webhook, "get_fila_whatsapp", return_value=fila):
+            await self._chamar(sid="SM42")
+            await self._chamar(sid="SM42")
+
+        assert fila.enfileirar.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_fila_cheia_responde_ocupado(self, sem_redis):
+        """Com a fila cheia, o cidadao recebe aviso em TwiML."""
+        fila = MagicMock()
+        fila.enfileirar.return_value = False
+        with patch.object(webhook, "_fila_habilitada", return_value=True), \
+                patch.object(webhook, "get_fila_whatsapp", return_value=fila):
+            resposta = await self._chamar()
+
+        assert b"<Message>" in resposta.body
+
+    @pytest.mark.asyncio
+    async def test_worker_envia_pela_api(self):
+        """Worker deve responder pela API do Twilio."""
+        enviar = MagicMock(return_value={"enviado": True, "sid": "SMresp"})
+        with patch.object(webhook, "_responder_chat", AsyncMock(return_value="Resposta & cia")), \
+                patch.object(webhook, "enviar_whatsapp", enviar):
+            await webhook._processar_e_enviar(_mensagem("SM1"))
+
+        enviar.assert_called_once_with(para="5511999999999", mensagem="Resposta & cia")
+
+    @pytest.mark.asyncio
+    async def test_modo_direto_responde_twiml(self, sem_redis):
+        """Sem fila, a resposta volta em TwiML (com XML escapado)."""
+        with patch.object(webhook, "_fila_habilitada", return_value=False), \
+                patch.object(webhook, "_responder_chat", AsyncMock(return_value="Bolsa & BPC")):
+            resposta = await self._chamar()
+
+        assert b"<Message>Bolsa &amp; BPC</Message>" in resposta.body
@@ -300,26 +300,33 @@ def check_content(benefit: dict) -> list[AuditFinding]:
     return findings
 
 
-def check_cross_reference(benefits: list[dict]) -> list[AuditFinding]:
-    """Check F: Cross-reference and duplicates."""
+def check_duplicate_ids(ids: list[str]) -> list[AuditFinding]:
+    """Check F.1: IDs used by more than one benefit."""
     findings = []
-
-    # Duplicate IDs
-    ids = [b.get("id", "") for b in benefits]
     id_counts = Counter(ids)
     for bid, count in id_counts.items():
         if count > 1:
             findings.append(AuditFinding(bid, "crossref", CRITICAL, f"Duplicate ID found {count} times", "id"))
+    return findings
 
-    # Ended/suspended programs
-    for b in benefits:
-        bid = b.get("id", "")
-        status = b.get("status", "")
-        if status == "ended":
-            findings.append(AuditFinding(bid, "crossref", INFO, "Program has status 'ended' — kept for user redirect", "status"))
-        elif status == "suspended":
-            findings.append(AuditFinding(bid, "crossref", INFO, "Program has status 'suspended'", "status"))
 
+def check_status(benefit: dict) -> list[AuditFinding]:
+    """Check F.2: Ended/suspended programs."""
+    findings = []
+    bid = benefit.get("id", "")
+    status = benefit.get("status", "")
+    if status == "ended":
+        findings.append(AuditFinding(bid, "crossref", INFO, "Program has status 'ended' — kept for user redirect", "status"))
+    elif status == "suspended":
+        findings.append(AuditFinding(bid, "crossref", INFO, "Program has status 'suspended'", "status"))
+    return findings
+
+
+def check_cross_reference(benefits: list[dict]) -> list[AuditFinding]:
+    """Check F: Cross-reference and duplicates."""
+    findings = check_duplicate_ids([b.get("id", "") for b in benefits])
+    for b in benefits:
+        findings.extend(check_status(b))
     return findings
 
 
@@ -361,6 +368,11 @@ def check_evaluator_fields(benefit: dict) -> list[AuditFinding]:
 
 def check_audit_status_orphans(benefits: list[dict]) -> list[AuditFinding]:
     """Check for orphan entries in audit-status.json."""
+    return check_audit_status_orphan_ids({b.get("id") for b in benefits})
+
+
+def check_audit_status_orphan_ids(benefit_ids: set[str]) -> list[AuditFinding]:
+    """Check for audit-status.json entries whose ID is not in benefit_ids."""
     findings = []
     audit_file = BASE_DIR / "audit-status.json"
     if not audit_file.exists():
@@ -369,7 +381,6 @@ def check_audit_status_orphans(benefits: list[dict]) -> list[AuditFinding]:
     with open(audit_file, encoding="utf-8") as f:
         audit = json.load(f)
 
-    benefit_ids = {b.get("id") for b in benefits}
     # Include municipal IDs pattern too
     for aid in audit.get("benefits", {}):
         # Skip municipal IDs (they're not in scope)
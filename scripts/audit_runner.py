@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Unified audit runner for the benefits catalog: parallel and incremental.
+
+Runs the checks of audit_benefits.py (schema, values, legal basis, URLs,
+content, evaluator fields, cross-reference, audit-status orphans) over
+federal, sectoral, state AND municipal files, plus the municipal file checks
+of generate_all_municipalities.py --validate-only (IBGE consistency, first
+rule municipioIbge).
+
+- Per-file checks run in a process pool, a batch of files per task.
+- Each file's findings, benefit ids and statuses are cached in
+  scripts/.cache/audit_cache.json, keyed by the file's sha256 (a size/mtime
+  match skips even the hashing). Unchanged files are not read again; the
+  cache is dropped when audit_benefits.py or this script change.
+- Cross-file checks (duplicate ids, audit-status orphans) run on the cached
+  id lists, without loading any benefit.
+
+The report has the audit-report.json format of audit_benefits.py; with
+--scope core it is the same report audit_benefits.py --json writes.
+
+Usage:
+  python3 scripts/audit_runner.py                 # Audit everything (cached)
+  python3 scripts/audit_runner.py --json          # Also write audit-report.json
+  python3 scripts/audit_runner.py --scope core    # Only federal/sectoral/states
+  python3 scripts/audit_runner.py --scope municipal
+  python3 scripts/audit_runner.py --no-cache --workers 4
+  python3 scripts/audit_runner.py --quiet         # Summary only (pre-commit hook)
+
+Exit code is 1 when there are CRITICAL findings, like audit_benefits.py.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import audit_benefits as checks
+from audit_benefits import CRITICAL, HIGH, INFO, LOW, MEDIUM, AuditFinding
+
+# Paths
+SCRIPT_DIR = Path(__file__).resolve().parent
+BENEFITS_DIR = checks.BASE_DIR
+CACHE_PATH = SCRIPT_DIR / ".cache" / "audit_cache.json"
+REPORT_PATH = BENEFITS_DIR / "audit-report.json"
+
+# Below this many files to audit, a pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+FILES_PER_TASK = 64
+
+SCOPES = {
+    "core": ("federal.json", "sectoral.json", "states/"),
+    "municipal": ("municipalities/",),
+    "all": ("federal.json", "sectoral.json", "states/", "municipalities/"),
+}
+
+# Checks run on every benefit, in audit_benefits.run_audit order
+BENEFIT_CHECKS = [
+    checks.check_schema,
+    checks.check_values,
+    checks.check_legal_basis,
+    checks.check_urls,
+    checks.check_content,
+    checks.check_evaluator_fields,
+]
+
+MUNICIPAL_REQUIRED = ["state", "municipalityIbge"]
+
+
+def checks_version() -> str:
+    """Hash of the check code: cached results are only valid for the same checks."""
+    digest = hashlib.sha256()
+    for path in (Path(checks.__file__), Path(__file__)):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def catalog_files(scope: str = "all") -> dict[str, tuple[int, int]]:
+    """{path: (size, mtime_ns)} of a scope's files, in audit_benefits load order."""
+    files = {}
+    for part in SCOPES[scope]:
+        if part.endswith("/"):
+            try:
+                entries = sorted((e for e in os.scandir(BENEFITS_DIR / part)
+                                  if e.name.endswith(".json") and e.is_file()), key=lambda e: e.name)
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                st = entry.stat()
+                files[f"{part}{entry.name}"] = (st.st_size, st.st_mtime_ns)
+        elif (BENEFITS_DIR / part).is_file():
+            st = (BENEFITS_DIR / part).stat()
+            files[part] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def check_municipal_file(rel: str, data: dict) -> list[AuditFinding]:
+    """Municipal file consistency (as generate_all_municipalities.validate_all)."""
+    findings = []
+    ibge = Path(rel).stem
+    if data.get("municipalityIbge") != ibge:
+        findings.append(AuditFinding(
+            rel, "municipal", HIGH,
+            f"municipalityIbge mismatch ({data.get('municipalityIbge')} vs {ibge})", "municipalityIbge",
+        ))
+
+    for b in data.get("benefits", []):
+        bid = b.get("id", "UNKNOWN")
+        for field in MUNICIPAL_REQUIRED:
+            if field not in b:
+                findings.append(AuditFinding(bid, "municipal", HIGH, f"Missing field: {field}", field))
+        if "municipalityIbge" in b and b["municipalityIbge"] != ibge:
+            findings.append(AuditFinding(
+                bid, "municipal", HIGH, f"Wrong IBGE {b['municipalityIbge']} in {ibge}.json", "municipalityIbge",
+            ))
+        rules = b.get("eligibilityRules") or []
+        if rules and rules[0].get("field") != "municipioIbge":
+            findings.append(AuditFinding(bid, "municipal", HIGH, "First rule is not municipioIbge", "eligibilityRules"))
+    return findings
+
+
+def audit_file(rel: str, content: bytes) -> dict:
+    """All per-file results: findings, status findings, ids and scope counts."""
+    result = {"benefits": 0, "scopes": {}, "ids": [], "findings": [], "status": []}
+    try:
+        data = json.loads(content)
+        benefits = data["benefits"]
+    except (ValueError, KeyError, TypeError) as e:
+        result["findings"].append(AuditFinding(rel, "schema", CRITICAL, f"Unreadable file: {e}", "").to_dict())
+        return result
+
+    uf = Path(rel).stem if rel.startswith("states/") else None
+    for b in benefits:
+        b["_source_file"] = rel
+        if uf:
+            b["_expected_uf"] = uf
+        for check in BENEFIT_CHECKS:
+            result["findings"].extend(f.to_dict() for f in check(b))
+        result["status"].extend(f.to_dict() for f in checks.check_status(b))
+        result["ids"].append(b.get("id", ""))
+        scope = b.get("scope") or "unknown"
+        result["scopes"][scope] = result["scopes"].get(scope, 0) + 1
+
+    if rel.startswith("municipalities/"):
+        result["findings"].extend(f.to_dict() for f in check_municipal_file(rel, data))
+    result["benefits"] = len(benefits)
+    return result
+
+
+def _audit_batch(jobs: list[tuple[str, str | None]]) -> list[tuple[str, dict]]:
+    """Audit (path, cached sha256) jobs.
+
+    Files whose sha256 matches the cache only get their new stat back
+    (no "findings" key); the rest are parsed and checked.
+    """
+    out = []
+    for rel, known_sha in jobs:
+        path = BENEFITS_DIR / rel
+        st = path.stat()
+        content = path.read_bytes()
+        sha = hashlib.sha256(content).hexdigest()
+        meta = {"sha256": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        out.append((rel, meta if sha == known_sha else {**meta, **audit_file(rel, content)}))
+    return out
+
+
+def _run_jobs(jobs: list[tuple[str, str | None]], workers: int):
+    if workers <= 1 or len(jobs) < PARALLEL_MIN_FILES:
+        yield from _audit_batch(jobs)
+        return
+    batches = [jobs[i:i + FILES_PER_TASK] for i in range(0, len(jobs), FILES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        for batch in executor.map(_audit_batch, batches):
+            yield from batch
+
+
+def load_cache(version: str) -> dict:
+    try:
+        with open(CACHE_PATH, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get("files", {}) if cache.get("version") == version else {}
+
+
+def save_cache(version: str, files: dict) -> None:
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CACHE_PATH.with_suffix(".tmp")
+    # json.dumps uses the C encoder; json.dump to a file does not
+    content = json.dumps({"version": version, "files": files}, ensure_ascii=False, separators=(",", ":"))
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def collect(scope: str = "all", workers: int | None = None, use_cache: bool = True) -> tuple[dict, dict]:
+    """Per-file results for a scope, auditing only files not in the cache.
+
+    Returns:
+        ({path: result}, stats with files/audited/unchanged/seconds)
+    """
+    start = time.perf_counter()
+    version = checks_version()
+    cached = load_cache(version) if use_cache else {}
+
+    results, jobs = {}, []
+    for rel, (size, mtime_ns) in catalog_files(scope).items():
+        entry = cached.get(rel)
+        if entry and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+            results[rel] = entry
+        else:
+            jobs.append((rel, entry["sha256"] if entry else None))
+
+    audited = 0
+    for rel, result in _run_jobs(jobs, workers or os.cpu_count() or 1):
+        if "findings" in result:
+            audited += 1
+            results[rel] = result
+        else:
+            results[rel] = {**cached[rel], **result}
+
+    if use_cache:
+        # Keep the other scopes' entries so switching --scope stays incremental
+        kept = {k: v for k, v in cached.items() if k not in results and (BENEFITS_DIR / k).exists()}
+        if jobs or len(kept) + len(results) != len(cached):
+            save_cache(version, {**kept, **results})
+
+    stats = {
+        "files": len(results),
+        "audited": audited,
+        "unchanged": len(results) - audited,
+        "seconds": time.perf_counter() - start,
+    }
+    return results, stats
+
+
+def merge_findings(results: dict) -> tuple[list[AuditFinding], int]:
+    """All findings in audit_benefits.run_audit order, and the benefit count."""
+    findings = []
+    ids = []
+    for result in results.values():
+        findings.extend(AuditFinding(**f) for f in result["findings"])
+        ids.extend(result["ids"])
+    findings.extend(checks.check_duplicate_ids(ids))
+    for result in results.values():
+        findings.extend(AuditFinding(**f) for f in result["status"])
+    findings.extend(checks.check_audit_status_orphan_ids(set(ids)))
+    return findings, len(ids)
+
+
+def build_report(findings: list[AuditFinding], total_benefits: int) -> dict:
+    """Report in the audit-report.json format."""
+    return {
+        "total_benefits": total_benefits,
+        "total_findings": len(findings),
+        "severity_counts": dict(Counter(f.severity for f in findings)),
+        "category_counts": dict(Counter(f.category for f in findings)),
+        "findings": [f.to_dict() for f in findings],
+    }
+
+
+def print_summary(results: dict, findings: list[AuditFinding], total_benefits: int, stats: dict,
+                  verbose: bool, limit: int) -> None:
+    print("=" * 70)
+    print("TÁ NA MÃO — BENEFIT AUDIT RUNNER")
+    print("=" * 70)
+    print(f"\n{stats['files']} files, {total_benefits} benefits: {stats['audited']} files audited, "
+          f"{stats['unchanged']} from cache ({stats['seconds']:.2f}s)")
+
+    scope_counts = Counter()
+    for result in results.values():
+        scope_counts.update(result["scopes"])
+    for scope, count in sorted(scope_counts.items()):
+        print(f"  {scope}: {count}")
+
+    severity_counts = Counter(f.severity for f in findings)
+    print(f"\nFindings: {len(findings)}")
+    for sev in [CRITICAL, HIGH, MEDIUM, LOW, INFO]:
+        if severity_counts.get(sev):
+            print(f"  {sev}: {severity_counts[sev]}")
+
+    print("\nBy category:")
+    for cat, count in sorted(Counter(f.category for f in findings).items()):
+        print(f"  {cat}: {count}")
+
+    by_severity = defaultdict(list)
+    for f in findings:
+        by_severity[f.severity].append(f)
+    for sev in [CRITICAL, HIGH, MEDIUM, LOW]:
+        listed = sorted(by_severity[sev], key=lambda x: x.benefit_id)
+        if not listed:
+            continue
+        shown = listed if verbose else listed[:limit]
+        print(f"\n{sev} FINDINGS ({len(listed)}):")
+        for f in shown:
+            print(f"  {f}")
+        if len(shown) < len(listed):
+            print(f"  ... and {len(listed) - len(shown)} more (--verbose to list all)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel, incremental audit of the benefits catalog")
+    parser.add_argument("--scope", choices=sorted(SCOPES), default="all")
+    parser.add_argument("--workers", type=int, default=None, help="Audit processes (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="Audit every file again")
+    parser.add_argument("--json", action="store_true", help=f"Write the report to {REPORT_PATH.name}")
+    parser.add_argument("--output", type=Path, default=REPORT_PATH, help="Report path for --json")
+    parser.add_argument("--verbose", action="store_true", help="List every finding")
+    parser.add_argument("--limit", type=int, default=20, help="Findings listed per severity")
+    parser.add_argument("--quiet", action="store_true", help="Only the summary line")
+    args = parser.parse_args()
+
+    results, stats = collect(args.scope, args.workers, use_cache=not args.no_cache)
+    findings, total_benefits = merge_findings(results)
+    severity_counts = Counter(f.severity for f in findings)
+
+    if args.quiet:
+        counts = ", ".join(f"{sev}: {severity_counts[sev]}" for sev in [CRITICAL, HIGH, MEDIUM, LOW, INFO]
+                           if severity_counts.get(sev))
+        print(f"Audit: {total_benefits} benefits in {stats['files']} files ({stats['audited']} audited, "
+              f"{stats['seconds']:.2f}s) — {len(findings)} findings" + (f" ({counts})" if counts else ""))
+    else:
+        print_summary(results, findings, total_benefits, stats, args.verbose, args.limit)
+
+    if args.json:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(build_report(findings, total_benefits), f, ensure_ascii=False, indent=2)
+        print(f"\nJSON report saved to: {args.output}")
+
+    sys.exit(1 if severity_counts.get(CRITICAL) else 0)
+
+
+if __name__ == "__main__":
+    main()
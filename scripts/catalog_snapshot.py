@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Compact, indexed snapshot of the benefits catalog.
+
+The catalog in frontend/src/data/benefits is ~95 MB of pretty-printed JSON
+spread over ~5,600 files; every script that needs it used to json.load all
+of it. The snapshot compiles it into one binary file that is memory-mapped
+and read on demand:
+
+  [magic "TNMCAT01"][header length: u64][header JSON][arrays][ids][source][data]
+
+- data:   every benefit as compact JSON, in file order; the benefits of one
+          file are contiguous and comma-separated, so a whole file decodes
+          with a single json.loads
+- arrays: record offsets (u64) and lengths (u32), record numbers sorted by
+          benefit id, and record numbers grouped by state (UF)
+- ids:    the sorted benefit ids, newline-separated (bisect lookup)
+- source: size and mtime of every source file (staleness check)
+- header: per-file metadata (the keys besides "benefits") and record
+          ranges, per-state ranges
+
+Opening the snapshot reads only the header and the index arrays; fetching a
+municipality decodes only its own records.
+
+Usage:
+  python3 scripts/catalog_snapshot.py                        # (Re)build if stale
+  python3 scripts/catalog_snapshot.py --force                # Always rebuild
+  python3 scripts/catalog_snapshot.py --check                # Exit 1 if stale
+  python3 scripts/catalog_snapshot.py --municipality 3550308 # Print a municipality's benefits
+  python3 scripts/catalog_snapshot.py --state SP --count     # Count a state's benefits
+
+From another script:
+  from catalog_snapshot import open_catalog
+
+  with open_catalog() as catalog:           # rebuilds first if the JSON changed
+      catalog.municipality("3550308")       # list of benefit dicts
+      catalog.get("federal-bolsa-familia")  # one benefit
+      catalog.state("SP")                   # state + municipal benefits of SP
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Iterator
+
+# Paths
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+BENEFITS_DIR = PROJECT_DIR / "frontend" / "src" / "data" / "benefits"
+SNAPSHOT_PATH = SCRIPT_DIR / ".cache" / "benefits_catalog.bin"
+
+MAGIC = b"TNMCAT01"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sQ")
+
+
+def source_files(benefits_dir: Path = BENEFITS_DIR) -> list[str]:
+    """Catalog files relative to benefits_dir: federal, sectoral, states, municipalities.
+
+    Audit reports and the by-state barrels are not source files.
+    """
+    files = [name for name in ("federal.json", "sectoral.json") if (benefits_dir / name).is_file()]
+    for subdir in ("states", "municipalities"):
+        if (benefits_dir / subdir).is_dir():
+            files.extend(f"{subdir}/{p.name}" for p in sorted((benefits_dir / subdir).glob("*.json")))
+    return files
+
+
+def source_stats(benefits_dir: Path = BENEFITS_DIR) -> dict[str, list[int]]:
+    """{relative path: [size, mtime_ns]} of every source file, in source_files order."""
+    stats = {}
+    for name in ("federal.json", "sectoral.json"):
+        try:
+            st = os.stat(benefits_dir / name)
+        except FileNotFoundError:
+            continue
+        stats[name] = [st.st_size, st.st_mtime_ns]
+    for subdir in ("states", "municipalities"):
+        try:
+            entries = sorted(
+                (e for e in os.scandir(benefits_dir / subdir) if e.name.endswith(".json") and e.is_file()),
+                key=lambda e: e.name,
+            )
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            st = entry.stat()
+            stats[f"{subdir}/{entry.name}"] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def _benefit_state(rel: str, benefit: dict, data: dict) -> str | None:
+    """UF a benefit belongs to, as the loaders fill it in."""
+    if benefit.get("state"):
+        return benefit["state"]
+    if rel.startswith("states/"):
+        return Path(rel).stem.upper()
+    if rel.startswith("municipalities/"):
+        return data.get("state")
+    return None
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def compile_catalog(benefits_dir: Path = BENEFITS_DIR, out_path: Path = SNAPSHOT_PATH) -> dict:
+    """Compile the JSON catalog into a snapshot at out_path.
+
+    Files that fail to parse are recorded in the header ("errors") and
+    skipped, like the scripts that read the JSON directly skip them.
+
+    Returns:
+        Summary: files, benefits, errors, bytes, seconds
+    """
+    start_time = time.perf_counter()
+    stats = source_stats(benefits_dir)
+
+    chunks: list[bytes] = []
+    offsets = array("Q")
+    lengths = array("I")
+    files: dict[str, list] = {}
+    errors: dict[str, str] = {}
+    ids: list[tuple[str, int]] = []
+    by_state: dict[str, list[int]] = {}
+    position = 0
+
+    for rel in stats:
+        try:
+            with open(benefits_dir / rel, "rb") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            errors[rel] = str(e)
+            continue
+        if not isinstance(data, dict):
+            errors[rel] = "not a JSON object"
+            continue
+
+        benefits = data.get("benefits") or []
+        meta = {k: v for k, v in data.items() if k != "benefits"}
+        first = len(offsets)
+        for i, benefit in enumerate(benefits):
+            record = json.dumps(benefit, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            if i:
+                chunks.append(b",")
+                position += 1
+            number = len(offsets)
+            offsets.append(position)
+            lengths.append(len(record))
+            chunks.append(record)
+            position += len(record)
+
+            if isinstance(benefit.get("id"), str):
+                ids.append((benefit["id"], number))
+            uf = _benefit_state(rel, benefit, data)
+            if uf:
+                by_state.setdefault(uf, []).append(number)
+        chunks.append(b"\n")
+        position += 1
+        files[rel] = [first, len(benefits), meta]
+
+    # Sorted ids (first occurrence wins) and per-state posting lists
+    ids.sort()
+    id_records = array("I", (number for _, number in ids))
+    id_blob = "\n".join(benefit_id for benefit_id, _ in ids).encode("utf-8")
+    state_postings = array("I")
+    states: dict[str, list[int]] = {}
+    for uf in sorted(by_state):
+        states[uf] = [len(state_postings), len(state_postings) + len(by_state[uf])]
+        state_postings.extend(by_state[uf])
+
+    # Body layout: arrays (8-byte aligned), ids, data; offsets relative to the body
+    sections = {}
+    body: list[bytes] = []
+    body_size = 0
+    for name, blob in (
+        ("record_offsets", offsets.tobytes()),
+        ("record_lengths", lengths.tobytes()),
+        ("id_records", id_records.tobytes()),
+        ("state_postings", state_postings.tobytes()),
+        ("ids", id_blob),
+        ("source", json.dumps(stats, separators=(",", ":")).encode("utf-8")),
+    ):
+        sections[name] = [body_size, len(blob)]
+        body.append(blob + b"\0" * _pad8(len(blob)))
+        body_size += len(blob) + _pad8(len(blob))
+    sections["data"] = [body_size, position]
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "records": len(offsets),
+        "sections": sections,
+        "files": files,
+        "states": states,
+        "errors": errors,
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, len(header)))
+        f.write(header + b"\0" * _pad8(len(header)))
+        for blob in body:
+            f.write(blob)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, out_path)
+
+    return {
+        "files": len(files),
+        "benefits": len(offsets),
+        "errors": len(errors),
+        "bytes": out_path.stat().st_size,
+        "seconds": time.perf_counter() - start_time,
+    }
+
+
+class CatalogSnapshot:
+    """Read-only, memory-mapped view of a compiled catalog."""
+
+    def __init__(self, path: Path = SNAPSHOT_PATH):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, header_len = _PREAMBLE.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a catalog snapshot")
+            self.header = json.loads(self._mm[_PREAMBLE.size:_PREAMBLE.size + header_len])
+            if self.header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"{self.path} has snapshot version {self.header.get('version')}")
+        except Exception:
+            self.close()
+            raise
+
+        self._base = _PREAMBLE.size + header_len + _pad8(header_len)
+        self._data = self._base + self.header["sections"]["data"][0]
+        self._offsets = self._array("Q", "record_offsets")
+        self._lengths = self._array("I", "record_lengths")
+        self._id_records = self._array("I", "id_records")
+        self._state_postings = self._array("I", "state_postings")
+        start, length = self.header["sections"]["ids"]
+        id_blob = self._mm[self._base + start:self._base + start + length].decode("utf-8")
+        self._ids = id_blob.split("\n") if id_blob else []
+
+    def _array(self, typecode: str, section: str) -> array:
+        start, length = self.header["sections"][section]
+        values = array(typecode)
+        values.frombytes(self._mm[self._base + start:self._base + start + length])
+        if self.header["byteorder"] != sys.byteorder:
+            values.byteswap()
+        return values
+
+    def close(self) -> None:
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self) -> "CatalogSnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, benefit_id: str) -> bool:
+        return self._id_position(benefit_id) is not None
+
+    # -- raw access ---------------------------------------------------------
+
+    def _record(self, number: int) -> dict:
+        start = self._data + self._offsets[number]
+        return json.loads(self._mm[start:start + self._lengths[number]])
+
+    def _records(self, first: int, count: int) -> list[dict]:
+        """Consecutive records of one file, decoded in a single call."""
+        if not count:
+            return []
+        last = first + count - 1
+        start = self._data + self._offsets[first]
+        end = self._data + self._offsets[last] + self._lengths[last]
+        return json.loads(b"[" + self._mm[start:end] + b"]")
+
+    def _id_position(self, benefit_id: str) -> int | None:
+        i = bisect.bisect_left(self._ids, benefit_id)
+        return i if i < len(self._ids) and self._ids[i] == benefit_id else None
+
+    # -- lookups ------------------------------------------------------------
+
+    def ids(self) -> list[str]:
+        """All benefit ids, sorted."""
+        return list(self._ids)
+
+    def get(self, benefit_id: str) -> dict | None:
+        """One benefit by id, or None."""
+        i = self._id_position(benefit_id)
+        return None if i is None else self._record(self._id_records[i])
+
+    def files(self, prefix: str = "") -> list[str]:
+        """Source files in the snapshot (e.g. prefix "municipalities/")."""
+        return [rel for rel in self.header["files"] if rel.startswith(prefix)]
+
+    def file_meta(self, rel: str) -> dict:
+        """Top-level keys of a source file except "benefits"."""
+        return dict(self.header["files"][rel][2])
+
+    def file_benefits(self, rel: str) -> list[dict]:
+        """Benefits of one source file, as written in the JSON."""
+        first, count, _ = self.header["files"][rel]
+        return self._records(first, count)
+
+    def load_file(self, rel: str) -> dict:
+        """A source file as json.load would return it."""
+        return {**self.file_meta(rel), "benefits": self.file_benefits(rel)}
+
+    def municipality(self, ibge: str) -> list[dict]:
+        """Benefits of one municipality (empty if it has no file)."""
+        rel = f"municipalities/{ibge}.json"
+        return self.file_benefits(rel) if rel in self.header["files"] else []
+
+    def state(self, uf: str) -> list[dict]:
+        """Every benefit of a UF: the state file plus its municipalities."""
+        span = self.header["states"].get(uf.upper())
+        if not span:
+            return []
+        return [self._record(n) for n in self._state_postings[span[0]:span[1]]]
+
+    def benefits(self, prefix: str = "") -> Iterator[dict]:
+        """Every benefit, file by file (optionally only files under prefix)."""
+        for rel in self.files(prefix):
+            yield from self.file_benefits(rel)
+
+    # -- freshness ----------------------------------------------------------
+
+    def is_fresh(self, benefits_dir: Path = BENEFITS_DIR) -> bool:
+        """True if no source file was added, removed or modified since compiling."""
+        start, length = self.header["sections"]["source"]
+        try:
+            return source_stats(benefits_dir) == json.loads(self._mm[self._base + start:self._base + start + length])
+        except OSError:
+            return False
+
+
+def open_catalog(
+    path: Path = SNAPSHOT_PATH,
+    benefits_dir: Path = BENEFITS_DIR,
+    rebuild: bool = True,
+) -> CatalogSnapshot:
+    """Open the snapshot, compiling it first if it is missing or stale.
+
+    With rebuild=False, a missing or stale snapshot raises instead.
+    """
+    snapshot = None
+    if Path(path).exists():
+        try:
+            snapshot = CatalogSnapshot(path)
+        except ValueError:
+            snapshot = None
+        if snapshot is not None and snapshot.is_fresh(benefits_dir):
+            return snapshot
+        if snapshot is not None:
+            snapshot.close()
+
+    if not rebuild:
+        raise FileNotFoundError(f"Catalog snapshot {path} is missing or stale; run scripts/catalog_snapshot.py")
+    compile_catalog(benefits_dir, Path(path))
+    return CatalogSnapshot(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile and query the benefits catalog snapshot")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the snapshot is fresh")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the snapshot is missing or stale")
+    parser.add_argument("--output", type=Path, default=SNAPSHOT_PATH, help="Snapshot path")
+    parser.add_argument("--municipality", help="Print the benefits of an IBGE code")
+    parser.add_argument("--state", help="Print the benefits of a UF")
+    parser.add_argument("--get", help="Print one benefit by id")
+    parser.add_argument("--count", action="store_true", help="Only print how many benefits matched")
+    args = parser.parse_args()
+
+    if args.check:
+        try:
+            open_catalog(args.output, rebuild=False).close()
+        except (FileNotFoundError, ValueError) as e:
+            print(e)
+            sys.exit(1)
+        print(f"{args.output} is up to date")
+        sys.exit(0)
+
+    if args.force:
+        summary = compile_catalog(BENEFITS_DIR, args.output)
+    else:
+        start = time.perf_counter()
+        open_catalog(args.output).close()
+        summary = None
+        if not (args.municipality or args.state or args.get):
+            print(f"Snapshot ready in {(time.perf_counter() - start) * 1000:.0f} ms: {args.output}")
+
+    if summary:
+        print(f"Compiled {summary['benefits']} benefits from {summary['files']} files "
+              f"into {summary['bytes'] / 1e6:.1f} MB in {summary['seconds']:.2f}s"
+              + (f" ({summary['errors']} files skipped)" if summary["errors"] else ""))
+
+    if args.municipality or args.state or args.get:
+        start = time.perf_counter()
+        with CatalogSnapshot(args.output) as catalog:
+            if args.get:
+                found = [b for b in [catalog.get(args.get)] if b]
+            elif args.municipality:
+                found = catalog.municipality(args.municipality)
+            else:
+                found = catalog.state(args.state)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.count:
+            print(f"{len(found)} benefits ({elapsed:.1f} ms including open)")
+        else:
+            print(json.dumps(found, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
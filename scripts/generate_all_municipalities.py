@@ -26,6 +26,8 @@ import unicodedata
 from pathlib import Path
 from typing import Any
 
+from catalog_snapshot import open_catalog
+
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_DIR = SCRIPT_DIR.parent
@@ -452,24 +454,17 @@ def generate_state_barrel_files():
     barrel_dir = BENEFITS_DIR / "by-state"
     barrel_dir.mkdir(exist_ok=True)
 
-    # Group municipalities by state
+    # Group municipalities by state (from the catalog snapshot, rebuilt if stale)
     state_municipalities: dict[str, dict[str, list]] = {}
 
-    for filepath in sorted(BENEFITS_DIR.glob("*.json")):
-        if filepath.parent.name != "municipalities":
-            continue  # Skip by-state subdirectory
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            state = data.get("state", "")
-            ibge = filepath.stem
-            benefits = data.get("benefits", [])
+    with open_catalog() as catalog:
+        for rel in catalog.files("municipalities/"):
+            state = catalog.file_meta(rel).get("state", "")
+            ibge = Path(rel).stem
             if state:
                 if state not in state_municipalities:
                     state_municipalities[state] = {}
-                state_municipalities[state][ibge] = benefits
-        except (json.JSONDecodeError, KeyError):
-            continue
+                state_municipalities[state][ibge] = catalog.file_benefits(rel)
 
     # Write barrel files
     total_municipalities = 0
@@ -756,29 +751,24 @@ def generate_municipalities(
 
     # Build existing slugs set from existing JSON files to avoid ID collisions
     existing_slugs: set[str] = set()
-    for filepath in BENEFITS_DIR.glob("*.json"):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            for b in data.get("benefits", []):
-                bid = b.get("id", "")
-                # Extract state-slug prefix from ID like "sc-saojose-restaurante-popular"
-                parts = bid.split("-")
-                if len(parts) >= 3:
-                    st = parts[0]
-                    # The slug is between the state and program_id. Find it by
-                    # removing the known program suffixes
-                    program_ids = ["restaurante-popular", "transporte-social",
-                                   "iptu-social", "habitacao-municipal",
-                                   "capacitacao-emprego", "farmacia-municipal",
-                                   "cesta-basica"]
-                    for pid in program_ids:
-                        if bid.endswith(f"-{pid}"):
-                            slug_part = bid[len(st)+1:-(len(pid)+1)]
-                            existing_slugs.add(f"{st}-{slug_part}")
-                            break
-        except (json.JSONDecodeError, KeyError):
-            continue
+    program_ids = ["restaurante-popular", "transporte-social",
+                   "iptu-social", "habitacao-municipal",
+                   "capacitacao-emprego", "farmacia-municipal",
+                   "cesta-basica"]
+    with open_catalog() as catalog:
+        for b in catalog.benefits("municipalities/"):
+            bid = b.get("id", "")
+            # Extract state-slug prefix from ID like "sc-saojose-restaurante-popular"
+            parts = bid.split("-")
+            if len(parts) >= 3:
+                st = parts[0]
+                # The slug is between the state and program_id. Find it by
+                # removing the known program suffixes
+                for pid in program_ids:
+                    if bid.endswith(f"-{pid}"):
+                        slug_part = bid[len(st)+1:-(len(pid)+1)]
+                        existing_slugs.add(f"{st}-{slug_part}")
+                        break
 
     # Check for slug collisions (including existing cities)
     collisions = check_slug_collisions(to_generate, existing_slugs)
@@ -0,0 +1,130 @@
+"""Testes do snapshot do catalogo de beneficios (ida e volta com um catalogo temporario)."""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from catalog_snapshot import CatalogSnapshot, compile_catalog, open_catalog  # noqa: E402
+
+
+FEDERAL = {
+    "version": "2026-01",
+    "benefits": [
+        {"id": "federal-bolsa-familia", "name": "Bolsa Família", "scope": "federal"},
+        {"id": "federal-bpc", "name": "BPC", "scope": "federal"},
+    ],
+}
+ESTADO_SP = {"benefits": [{"id": "sp-renda-cidada", "name": "Renda Cidadã"}]}
+MUNICIPIO_SP = {
+    "municipality": "São Paulo",
+    "state": "SP",
+    "benefits": [
+        {"id": "3550308-bilhete-unico", "name": "Bilhete Único"},
+        {"id": "3550308-renda-minima", "name": "Renda Mínima"},
+    ],
+}
+MUNICIPIO_RJ = {
+    "municipality": "Rio de Janeiro",
+    "state": "RJ",
+    "benefits": [{"id": "3304557-cartao-familia", "name": "Cartão Família Carioca"}],
+}
+
+
+def _escrever(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+@pytest.fixture
+def catalogo(tmp_path):
+    """Catalogo em JSON no formato de frontend/src/data/benefits."""
+    benefits_dir = tmp_path / "benefits"
+    _escrever(benefits_dir / "federal.json", FEDERAL)
+    _escrever(benefits_dir / "states" / "sp.json", ESTADO_SP)
+    _escrever(benefits_dir / "municipalities" / "3550308.json", MUNICIPIO_SP)
+    _escrever(benefits_dir / "municipalities" / "3304557.json", MUNICIPIO_RJ)
+    return benefits_dir
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return tmp_path / ".cache" / "benefits_catalog.bin"
+
+
+def test_ida_e_volta(catalogo, snapshot_path):
+    resumo = compile_catalog(catalogo, snapshot_path)
+
+    assert resumo["files"] == 4
+    assert resumo["benefits"] == 6
+    assert resumo["errors"] == 0
+    with CatalogSnapshot(snapshot_path) as catalog:
+        assert len(catalog) == 6
+        assert catalog.get("federal-bpc") == FEDERAL["benefits"][1]
+        assert catalog.get("nao-existe") is None
+        assert "sp-renda-cidada" in catalog
+        assert catalog.municipality("3550308") == MUNICIPIO_SP["benefits"]
+        assert catalog.municipality("9999999") == []
+        assert catalog.load_file("municipalities/3304557.json") == MUNICIPIO_RJ
+        assert catalog.load_file("federal.json") == FEDERAL
+
+
+def test_estado_junta_arquivo_estadual_e_municipios(catalogo, snapshot_path):
+    compile_catalog(catalogo, snapshot_path)
+
+    with CatalogSnapshot(snapshot_path) as catalog:
+        ids = sorted(b["id"] for b in catalog.state("sp"))
+        assert ids == ["3550308-bilhete-unico", "3550308-renda-minima", "sp-renda-cidada"]
+        assert [b["id"] for b in catalog.state("RJ")] == ["3304557-cartao-familia"]
+        assert catalog.state("AC") == []
+
+
+def test_arquivo_invalido_e_ignorado(catalogo, snapshot_path):
+    (catalogo / "municipalities" / "1100015.json").write_text("{quebrado", encoding="utf-8")
+
+    resumo = compile_catalog(catalogo, snapshot_path)
+
+    assert resumo["errors"] == 1
+    with CatalogSnapshot(snapshot_path) as catalog:
+        assert catalog.municipality("1100015") == []
+        assert len(catalog) == 6
+
+
+def test_recompila_quando_o_json_muda(catalogo, snapshot_path):
+    with open_catalog(snapshot_path, catalogo) as catalog:
+        assert catalog.is_fresh(catalogo)
+
+    alterado = dict(MUNICIPIO_RJ, benefits=MUNICIPIO_RJ["benefits"] + [{"id": "3304557-novo", "name": "Novo"}])
+    _escrever(catalogo / "municipalities" / "3304557.json", alterado)
+
+    with CatalogSnapshot(snapshot_path) as antigo:
+        assert not antigo.is_fresh(catalogo)
+    with pytest.raises(FileNotFoundError):
+        open_catalog(snapshot_path, catalogo, rebuild=False)
+
+    with open_catalog(snapshot_path, catalogo) as catalog:
+        assert catalog.is_fresh(catalogo)
+        assert catalog.get("3304557-novo") == {"id": "3304557-novo", "name": "Novo"}
+        assert len(catalog.municipality("3304557")) == 2
+
+
+def test_arquivo_novo_torna_snapshot_velho(catalogo, snapshot_path):
+    compile_catalog(catalogo, snapshot_path)
+    _escrever(catalogo / "states" / "rj.json", {"benefits": [{"id": "rj-supera", "name": "Supera RJ"}]})
+
+    with open_catalog(snapshot_path, catalogo) as catalog:
+        assert catalog.files("states/") == ["states/rj.json", "states/sp.json"]
+        assert "rj-supera" in {b["id"] for b in catalog.state("RJ")}
+
+
+def test_snapshot_corrompido_e_recompilado(catalogo, snapshot_path):
+    snapshot_path.parent.mkdir(parents=True)
+    snapshot_path.write_bytes(b"nao e um snapshot".ljust(64, b"\0"))
+
+    with open_catalog(snapshot_path, catalogo) as catalog:
+        assert len(catalog) == 6
+    assert os.path.getsize(snapshot_path) > 64